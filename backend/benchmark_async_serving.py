@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+Benchmark de requisições por segundo: SERVING_MODE=sync x SERVING_MODE=async
+
+Sobe um servidor local que imita a API do Google Maps (Directions e Places,
+com atraso fixo por chamada) e um gunicorn com um worker servindo uma rota
+no formato de /along-route: uma chamada de Directions e uma busca de Places
+por ponto da rota, pelo GoogleMapsService configurado para o servidor local.
+Para cada modo, C clientes concorrentes fazem requisições durante D segundos.
+
+O banco fica de fora: a rota mede só a espera pelas chamadas externas, que é
+o que o modo assíncrono muda.
+
+Uso: python benchmark_async_serving.py [clientes] [segundos] [atraso_ms]
+"""
+import sys
+import os
+import json
+import multiprocessing
+import socket
+import statistics
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.client import HTTPConnection
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+ROUTE_STEPS = 10
+STEP_KM = 10
+
+def directions_payload():
+    steps = [{
+        'html_instructions': f'Trecho {i}', 'distance': {'value': STEP_KM * 1000}, 'duration': {'value': 420},
+        'start_location': {'lat': -23.55 + i * 0.09, 'lng': -46.63},
+        'end_location': {'lat': -23.55 + (i + 1) * 0.09, 'lng': -46.63}
+    } for i in range(ROUTE_STEPS)]
+    return {'status': 'OK', 'routes': [{
+        'overview_polyline': {'points': 'stub'},
+        'legs': [{'distance': {'value': ROUTE_STEPS * STEP_KM * 1000}, 'duration': {'value': 4200},
+                  'start_address': 'Origem', 'end_address': 'Destino', 'steps': steps}]
+    }]}
+
+def places_payload(location):
+    lat, lng = (float(value) for value in location.split(','))
+    return {'status': 'OK', 'results': [{
+        'place_id': f'{lat:.3f}:{lng:.3f}:{i}', 'name': f'Posto {i}', 'vicinity': 'Rodovia',
+        'geometry': {'location': {'lat': lat + i * 0.001, 'lng': lng}}, 'types': ['gas_station']
+    } for i in range(5)]}
+
+class StubMapsHandler(BaseHTTPRequestHandler):
+    """Responde Directions e Places depois de ``delay`` segundos"""
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+    delay = 0.05
+
+    def do_GET(self):
+        from urllib.parse import parse_qs, urlparse
+        url = urlparse(self.path)
+        query = {key: values[0] for key, values in parse_qs(url.query).items()}
+        time.sleep(self.delay)
+        if url.path.endswith('/directions/json'):
+            payload = directions_payload()
+        elif url.path.endswith('/nearbysearch/json'):
+            payload = places_payload(query['location'])
+        else:
+            payload = {'status': 'NOT_FOUND'}
+        body = json.dumps(payload).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+def serve_stub(port, delay):
+    """Servidor do Maps em processo próprio, para não disputar o GIL com os clientes"""
+    StubMapsHandler.delay = delay
+    stub = ThreadingHTTPServer(('127.0.0.1', port), StubMapsHandler)
+    stub.daemon_threads = True
+    stub.request_queue_size = 1024
+    stub.serve_forever()
+
+def benchmark_app():
+    """App do gunicorn: rota /along-route usando o GoogleMapsService contra o servidor local"""
+    from flask import Flask, jsonify, request
+    from src.services.google_maps import GoogleMapsService
+
+    app = Flask(__name__)
+    app.config.update(
+        GOOGLE_MAPS_API_KEY='AIza-benchmark-stub',
+        GOOGLE_MAPS_BASE_URL=os.environ['STUB_MAPS_URL'],
+        GOOGLE_MAPS_QPS=100000
+    )
+    with app.app_context():
+        service = GoogleMapsService()
+
+    @app.route('/along-route')
+    def along_route():
+        origin = (request.args.get('lat', -23.55, type=float), -46.63)
+        destination = (origin[0] + ROUTE_STEPS * 0.09, -46.63)
+        route = service.get_directions(origin, destination)
+        stations = service.find_gas_stations_along_route(origin, destination, 2000, directions=route)
+        return jsonify({'distance_km': route['distance_km'], 'stations': len(stations)})
+
+    return app
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+def wait_for_port(port, timeout=20):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=0.5):
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"gunicorn não abriu a porta {port}")
+
+def load(port, clients, seconds):
+    """C clientes em laço fechado por ``seconds``; devolve as latências em ms"""
+    deadline = time.perf_counter() + seconds
+    lock = threading.Lock()
+    latencies, failures = [], []
+
+    def client(index):
+        connection = HTTPConnection('127.0.0.1', port, timeout=60)
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            try:
+                connection.request('GET', f'/along-route?lat={-23.55 + index * 0.001}')
+                response = connection.getresponse()
+                response.read()
+                ok = response.status == 200
+            except OSError:
+                connection.close()
+                connection = HTTPConnection('127.0.0.1', port, timeout=60)
+                ok = False
+            with lock:
+                (latencies if ok else failures).append((time.perf_counter() - started) * 1000)
+        connection.close()
+
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        list(pool.map(client, range(clients)))
+    return latencies, len(failures)
+
+def run_mode(mode, stub_url, clients, seconds):
+    port = free_port()
+    env = dict(os.environ, SERVING_MODE=mode, STUB_MAPS_URL=stub_url, WEB_CONCURRENCY='1')
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', '--bind', f'127.0.0.1:{port}',
+         '--workers', '1', '--log-level', 'warning', 'benchmark_async_serving:benchmark_app()'],
+        cwd=BACKEND_DIR, env=env
+    )
+    try:
+        wait_for_port(port)
+        started = time.perf_counter()
+        latencies, failures = load(port, clients, seconds)
+        elapsed = time.perf_counter() - started
+    finally:
+        server.terminate()
+        server.wait()
+    return len(latencies) / elapsed, latencies, failures
+
+def main():
+    clients = int(sys.argv[1]) if len(sys.argv) > 1 else 64
+    seconds = float(sys.argv[2]) if len(sys.argv) > 2 else 5
+    delay = (float(sys.argv[3]) if len(sys.argv) > 3 else 50) / 1000
+
+    stub_port = free_port()
+    stub = multiprocessing.Process(target=serve_stub, args=(stub_port, delay), daemon=True)
+    stub.start()
+    wait_for_port(stub_port)
+    stub_url = f'http://127.0.0.1:{stub_port}'
+
+    print(f"/along-route com {clients} clientes por {seconds:.0f}s, 1 worker, "
+          f"atraso do Maps {delay * 1000:.0f} ms por chamada")
+    results = {}
+    for mode in ('sync', 'async'):
+        rps, latencies, failures = run_mode(mode, stub_url, clients, seconds)
+        results[mode] = rps
+        p50 = statistics.median(latencies) if latencies else 0
+        p95 = statistics.quantiles(latencies, n=20)[-1] if len(latencies) > 1 else p50
+        print(f"SERVING_MODE={mode:<6} {rps:8.1f} req/s   p50 {p50:7.0f} ms   p95 {p95:7.0f} ms   falhas {failures}")
+    stub.terminate()
+    if results['sync']:
+        print(f"Ganho do modo async: {results['async'] / results['sync']:.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Teste de carga do login
+
+Com --url, dispara logins concorrentes contra a API em execução:
+    python benchmark_login.py --url http://localhost:5000 --email teste@x.com --password segredo
+
+Sem --url, mede só a gravação da sessão (INSERT da sessão + UPDATE do
+last_login) num SQLite temporário: um commit por login, como antes, contra
+a fila gravada em lote (services/session_writer.py).
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+from sqlalchemy import create_engine, insert, text, update
+
+from src.services.session_writer import SessionWriter, hash_token, user_sessions_table, users_table
+
+def run_threads(threads, per_thread, action):
+    """Executa ``action`` em paralelo; devolve (logins/s, latências em ms)"""
+    latencies = []
+    lock = threading.Lock()
+    barrier = threading.Barrier(threads)
+
+    def worker(worker_id):
+        barrier.wait()
+        local = []
+        for index in range(per_thread):
+            started = time.perf_counter()
+            action(worker_id, index)
+            local.append((time.perf_counter() - started) * 1000)
+        with lock:
+            latencies.extend(local)
+
+    workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    started = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    return len(latencies) / elapsed, np.array(latencies)
+
+def report(label, throughput, latencies):
+    print(f"{label:<32} {throughput:>8.0f} logins/s   p50 {np.percentile(latencies, 50):6.2f} ms"
+          f"   p95 {np.percentile(latencies, 95):6.2f} ms")
+
+def http_load_test(args):
+    import requests
+
+    session = requests.Session()
+    payload = {'email': args.email, 'password': args.password}
+
+    def login(worker_id, index):
+        response = session.post(f"{args.url.rstrip('/')}/api/auth/login", json=payload, timeout=30)
+        if response.status_code != 200:
+            raise SystemExit(f"Login falhou ({response.status_code}): {response.text[:200]}")
+
+    throughput, latencies = run_threads(args.threads, args.requests, login)
+    report(f"POST /api/auth/login x{args.threads}", throughput, latencies)
+
+def bookkeeping_benchmark(args):
+    directory = tempfile.mkdtemp()
+    engine = create_engine(f"sqlite:///{os.path.join(directory, 'sessoes.db')}", pool_size=args.threads + 2)
+    user_sessions_table.metadata.create_all(engine)
+    with engine.begin() as connection:
+        connection.execute(text(
+            'CREATE TABLE users (id VARCHAR(36) PRIMARY KEY, last_login TIMESTAMP, sessions_revoked_before TIMESTAMP)'
+        ))
+        connection.execute(text('INSERT INTO users (id) VALUES ' + ', '.join(f"('u{i}')" for i in range(1000))))
+    expires_at = datetime.now(timezone.utc) + timedelta(hours=1)
+
+    def synchronous(worker_id, index):
+        user_id = f"u{(worker_id * args.requests + index) % 1000}"
+        with engine.begin() as connection:
+            connection.execute(insert(user_sessions_table).values(
+                id=f"s-{worker_id}-{index}", user_id=user_id, token_hash=hash_token(f"a{index}"),
+                refresh_token_hash=hash_token(f"r{index}"), expires_at=expires_at,
+                created_at=datetime.now(timezone.utc)
+            ))
+            connection.execute(update(users_table).where(users_table.c.id == user_id)
+                               .values(last_login=datetime.now(timezone.utc)))
+
+    throughput, latencies = run_threads(args.threads, args.requests, synchronous)
+    report('Síncrono (commit por login)', throughput, latencies)
+
+    writer = SessionWriter()
+
+    def batched(worker_id, index):
+        user_id = f"u{(worker_id * args.requests + index) % 1000}"
+        writer.record_login(engine, user_id, f"a{worker_id}-{index}", f"r{worker_id}-{index}", expires_at)
+
+    throughput, latencies = run_threads(args.threads, args.requests, batched)
+    started = time.perf_counter()
+    writer.flush()
+    report('Fila em lote (session_writer)', throughput, latencies)
+    print(f"{'':<32} {writer.batches_written} lotes; esvaziar o restante levou "
+          f"{(time.perf_counter() - started) * 1000:.0f} ms")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url')
+    parser.add_argument('--email')
+    parser.add_argument('--password')
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--requests', type=int, default=250, help='logins por thread')
+    args = parser.parse_args()
+
+    if args.url:
+        http_load_test(args)
+    else:
+        bookkeeping_benchmark(args)
+
+if __name__ == "__main__":
+    main()
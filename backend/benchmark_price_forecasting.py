@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+Benchmark do ajuste de previsões em lote (sem banco de dados)
+
+Uso: python benchmark_price_forecasting.py [número de séries]
+"""
+import sys
+import os
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+from datetime import datetime, timezone
+
+from src.services.price_forecasting import SECONDS_PER_DAY, WINDOW_DAYS, daily_matrix, forecast_matrix
+
+def synthetic_views(series_count, points_per_series=20, seed=42):
+    """Séries com preços diários irregulares (passeio aleatório em torno de R$ 5,80)"""
+    rng = np.random.default_rng(seed)
+    end = int(datetime.now(timezone.utc).timestamp())
+    views = []
+    for _ in range(series_count):
+        offsets = np.sort(rng.choice(WINDOW_DAYS * SECONDS_PER_DAY, points_per_series, replace=False))
+        timestamps = (end - WINDOW_DAYS * SECONDS_PER_DAY + offsets).astype(np.int64)
+        prices = 5.8 + np.cumsum(rng.normal(0, 0.02, points_per_series))
+        views.append((timestamps, prices))
+    return views, end // SECONDS_PER_DAY
+
+def main():
+    series_count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    views, end_day = synthetic_views(series_count)
+    keys = [(f'station_{i}', 'gasoline') for i in range(series_count)]
+    
+    started = time.perf_counter()
+    matrix = daily_matrix(views, end_day)
+    resample_seconds = time.perf_counter() - started
+    
+    started = time.perf_counter()
+    batch = forecast_matrix(keys, matrix, datetime.now(timezone.utc).date())
+    fit_seconds = time.perf_counter() - started
+    
+    print(f"📈 Benchmark de previsão em lote")
+    print(f"   - Séries: {series_count:,}")
+    print(f"   - Reamostragem diária: {resample_seconds:.3f}s")
+    print(f"   - Ajuste + previsão ({batch.predicted.shape[1]} dias): {fit_seconds:.3f}s")
+    print(f"   - Por série: {fit_seconds / series_count * 1e6:.1f}µs")
+
+if __name__ == "__main__":
+    main()
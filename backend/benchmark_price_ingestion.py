@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Benchmark da ingestão em lote de preços (services/price_ingestion.py)
+
+Grava os preços num SQLite temporário duas vezes: a primeira cria os postos
+e insere os preços, a segunda reenvia o mesmo dia e vira UPDATE.
+
+Uso: python benchmark_price_ingestion.py [número de preços]
+"""
+import sys
+import os
+import tempfile
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from datetime import datetime, timezone
+from flask import Flask
+from sqlalchemy import text
+
+from src.database import db
+from src.models.gas_station import FuelPrice, GasStation
+from src.services.price_ingestion import VALID_FUEL_TYPES, bulk_upsert_prices
+
+def synthetic_prices(count, delta=0.0):
+    """Um preço por posto e combustível; cada posto tem os 5 combustíveis"""
+    scraped_at = datetime.now(timezone.utc)
+    return [
+        {
+            'station_name': f'Posto {index // len(VALID_FUEL_TYPES)}',
+            'cnpj': f'{index // len(VALID_FUEL_TYPES):014d}',
+            'location': 'Itajaí, SC',
+            'state': 'SC',
+            'fuel_type': VALID_FUEL_TYPES[index % len(VALID_FUEL_TYPES)],
+            'price': round(5.5 + (index % 50) / 100 + delta, 2),
+            'source': 'benchmark',
+            'scraped_at': scraped_at
+        }
+        for index in range(count)
+    ]
+
+def timed(prices):
+    started = time.perf_counter()
+    stats = bulk_upsert_prices(prices)
+    return time.perf_counter() - started, stats
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    directory = tempfile.mkdtemp()
+    
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(directory, 'precos.db')}"
+    db.init_app(app)
+    
+    with app.app_context():
+        db.metadata.create_all(db.engine, tables=[GasStation.__table__, FuelPrice.__table__])
+        with db.engine.begin() as connection:
+            connection.execute(text(
+                'CREATE UNIQUE INDEX uq_fuel_prices_station_fuel_day '
+                'ON fuel_prices (gas_station_id, fuel_type, date(reported_at)) WHERE is_active'
+            ))
+        
+        insert_seconds, inserted = timed(synthetic_prices(count))
+        update_seconds, updated = timed(synthetic_prices(count, delta=0.1))
+    
+    print(f"⛽ Benchmark de ingestão de preços (SQLite)")
+    print(f"   - Preços: {count:,} ({count // len(VALID_FUEL_TYPES):,} postos)")
+    print(f"   - Primeira carga: {insert_seconds:.2f}s "
+          f"({inserted['created']:,} linhas criadas, postos incluídos)")
+    print(f"   - Mesmo dia de novo: {update_seconds:.2f}s ({updated['updated']:,} preços atualizados)")
+    print(f"   - Lotes com erro: {len(inserted['failed_chunks']) + len(updated['failed_chunks'])}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Benchmark do limite de requisições contra um Redis local simulado (fakeredis)
+
+Compara o contador antigo (GET seguido de SETEX/INCR) com o GCRA em Lua,
+com e sem a reserva local de fichas, sob várias threads concorrentes.
+
+Uso: python benchmark_rate_limiter.py [threads] [requisições por thread]
+"""
+import sys
+import os
+import time
+import threading
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import fakeredis
+
+from src.services.rate_limiter import RateLimiter
+
+WINDOW = 3600
+
+def legacy_check(client, identifier, limit, window):
+    """Versão antiga de database.check_rate_limit (True = bloqueado)"""
+    key = f"rate_limit:{identifier}"
+    current = client.get(key)
+    if current is None:
+        client.setex(key, window, 1)
+        return False
+    if int(current) >= limit:
+        return True
+    client.incr(key)
+    return False
+
+def run(name, check, threads, per_thread, limit):
+    allowed = []
+    barrier = threading.Barrier(threads)
+
+    def worker():
+        barrier.wait()
+        allowed.append(sum(1 for _ in range(per_thread) if check()))
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    started = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    total = threads * per_thread
+    print(f"{name:<28} {total / elapsed:>10.0f} req/s   permitidas: {sum(allowed)} (limite {limit})")
+
+def main():
+    threads = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    per_thread = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+
+    # Abaixo da cota (tráfego normal) e acima dela (cliente abusivo)
+    for scenario, limit in (('abaixo da cota', 10 ** 6), ('acima da cota', threads * per_thread // 4)):
+        print(f"\n--- {scenario}: {threads} threads x {per_thread} requisições ---")
+        client = fakeredis.FakeRedis(server=fakeredis.FakeServer())
+        run('GET + SETEX/INCR (antigo)', lambda: not legacy_check(client, 'partner:p1', limit, WINDOW),
+            threads, per_thread, limit)
+
+        for label, max_lease in (('GCRA Lua, ficha a ficha', 1), ('GCRA Lua + reserva local', 32)):
+            client = fakeredis.FakeRedis(server=fakeredis.FakeServer())
+            limiter = RateLimiter(client=lambda: client, max_lease=max_lease)
+            run(label, lambda: limiter.hit('partner:p1', limit, WINDOW).allowed, threads, per_thread, limit)
+            print(f"{'':<28} idas ao Redis: {limiter.redis_calls}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+"""
+Benchmark do planejador de abastecimento (sem banco de dados)
+
+Uso: python benchmark_refuel_planner.py [km da rota] [número de postos]
+"""
+import sys
+import os
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+
+from src.services.refuel_planner import plan_refuel
+
+def synthetic_corridor(route_km, station_count, seed=42):
+    """Postos espalhados ao longo da rota com preços entre R$ 5,40 e R$ 6,60 e desvios de até 6 km"""
+    rng = np.random.default_rng(seed)
+    along_km = np.sort(rng.uniform(0, route_km, station_count))
+    prices = rng.uniform(5.4, 6.6, station_count)
+    detour_km = rng.uniform(0, 6, station_count)
+    return along_km, prices, detour_km
+
+def main():
+    route_km = float(sys.argv[1]) if len(sys.argv) > 1 else 2000.0
+    station_count = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+    along_km, prices, detour_km = synthetic_corridor(route_km, station_count)
+    
+    runs = 20
+    started = time.perf_counter()
+    for _ in range(runs):
+        plan = plan_refuel(along_km, prices, detour_km, route_km, tank_capacity=55,
+                           consumption_per_100km=8.5, initial_fuel=20, reserve=5)
+    elapsed = (time.perf_counter() - started) / runs
+    
+    print(f"⛽ Benchmark do plano de abastecimento")
+    print(f"   - Rota: {route_km:,.0f} km, {station_count} postos candidatos")
+    print(f"   - Paradas: {len(plan.stops)}, custo total R$ {plan.total_cost:.2f}")
+    print(f"   - Tempo por plano: {elapsed * 1000:.1f}ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark da serialização do payload de /nearby (50 postos)
+
+Monta o payload de 50 postos com 5 preços cada num SQLite em memória e
+compara:
+- o caminho antigo: uma consulta de preços por posto e dicionários montados
+  campo a campo (como os antigos to_dict), codificados pelo json padrão;
+- o caminho novo: duas consultas só de colunas e os serializadores
+  compilados (src/serializers.py), codificados pelo FastJSONProvider.
+
+Uso: python benchmark_serialization.py [repetições]
+"""
+import sys
+import os
+import time
+from datetime import datetime, timedelta, timezone
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+from sqlalchemy import Boolean, Column, DateTime, Float, MetaData, String, Table, create_engine, insert, select
+
+from src.serializers import FUEL_PRICE_SERIALIZER, STATION_SERIALIZER, FastJSONProvider, orjson
+
+STATIONS = 50
+FUELS = ('gasoline', 'ethanol', 'diesel', 'diesel_s10', 'gnv')
+FUEL_NAMES = {'gasoline': 'Gasolina', 'ethanol': 'Etanol', 'gnv': 'GNV', 'diesel': 'Diesel', 'diesel_s10': 'Diesel S10'}
+
+metadata = MetaData()
+stations = Table('gas_stations', metadata, *[
+    Column(name, Float if name in ('latitude', 'longitude', 'data_confidence') else
+           Boolean if name == 'is_active' else DateTime(timezone=True) if name.endswith('_at') else String)
+    for name in STATION_SERIALIZER.columns
+])
+prices = Table('fuel_prices', metadata, *[
+    Column(name, Float if name in ('price', 'source_confidence') else
+           Boolean if name == 'is_active' else DateTime(timezone=True) if name.endswith('_at') else String)
+    for name in FUEL_PRICE_SERIALIZER.columns
+])
+
+def build_database():
+    engine = create_engine('sqlite://')
+    metadata.create_all(engine)
+    now = datetime.now(timezone.utc)
+    with engine.begin() as connection:
+        connection.execute(insert(stations), [{
+            'id': f's{i}', 'name': f'Posto {i}', 'brand': 'Rede', 'address': f'Rua {i}, 100', 'city': 'São Paulo',
+            'state': 'SP', 'postal_code': '01000-000', 'cnpj': f'{i:014d}', 'latitude': -23.55 + i / 1000,
+            'longitude': -46.63 - i / 1000, 'phone': '11 5555-0000', 'partner_id': None, 'data_source': 'anp',
+            'data_confidence': 0.8, 'is_active': True, 'created_at': now, 'updated_at': now
+        } for i in range(STATIONS)])
+        connection.execute(insert(prices), [{
+            'id': f'p{i}-{fuel}', 'gas_station_id': f's{i}', 'fuel_type': fuel, 'price': 5.5 + i / 100,
+            'source': 'anp', 'source_confidence': 0.9, 'reported_at': now - timedelta(hours=i % 30),
+            'is_active': True, 'created_at': now, 'updated_at': now
+        } for i in range(STATIONS) for fuel in FUELS])
+    return engine
+
+def legacy_payload(connection):
+    """Como antes: objetos lidos campo a campo e uma consulta de preços por posto"""
+    recent = datetime.now(timezone.utc) - timedelta(hours=24)
+    result = []
+    for station in connection.execute(select(stations)).all():
+        data = {
+            'id': station.id, 'name': station.name, 'brand': station.brand, 'address': station.address,
+            'city': station.city, 'state': station.state, 'postal_code': station.postal_code, 'cnpj': station.cnpj,
+            'latitude': float(station.latitude), 'longitude': float(station.longitude), 'phone': station.phone,
+            'operating_hours': station.operating_hours, 'amenities': station.amenities,
+            'partner_id': station.partner_id, 'data_source': station.data_source,
+            'data_confidence': float(station.data_confidence), 'is_active': station.is_active,
+            'created_at': station.created_at.isoformat() if station.created_at else None,
+            'updated_at': station.updated_at.isoformat() if station.updated_at else None
+        }
+        data['current_prices'] = [{
+            'id': price.id, 'gas_station_id': price.gas_station_id, 'fuel_type': price.fuel_type,
+            'fuel_type_display': FUEL_NAMES.get(price.fuel_type, price.fuel_type), 'price': float(price.price),
+            'source': price.source, 'source_confidence': float(price.source_confidence),
+            'reported_at': price.reported_at.isoformat() if price.reported_at else None,
+            'verified_at': price.verified_at.isoformat() if price.verified_at else None,
+            'verified_by': price.verified_by, 'is_active': price.is_active,
+            'is_recent': price.reported_at.replace(tzinfo=timezone.utc) > recent,
+            'created_at': price.created_at.isoformat() if price.created_at else None,
+            'updated_at': price.updated_at.isoformat() if price.updated_at else None
+        } for price in connection.execute(
+            select(prices).where(prices.c.gas_station_id == station.id).order_by(prices.c.reported_at.desc())
+        )]
+        data['distance_km'] = 1.0
+        result.append(data)
+    return result
+
+def compiled_payload(connection):
+    """Caminho novo: duas consultas só de colunas e serializadores compilados"""
+    result = STATION_SERIALIZER.many(connection.execute(select(*STATION_SERIALIZER.select_columns(stations))))
+    by_station = {station['id']: [] for station in result}
+    for price in FUEL_PRICE_SERIALIZER.many(connection.execute(
+        select(*FUEL_PRICE_SERIALIZER.select_columns(prices))
+        .where(prices.c.gas_station_id.in_(list(by_station))).order_by(prices.c.reported_at.desc())
+    )):
+        by_station[price['gas_station_id']].append(price)
+    for station in result:
+        station['current_prices'] = by_station[station['id']]
+        station['distance_km'] = 1.0
+    return result
+
+def timed(repetitions, function):
+    started = time.perf_counter()
+    for _ in range(repetitions):
+        value = function()
+    return (time.perf_counter() - started) / repetitions * 1000, value
+
+def envelope(stations_data):
+    return {'success': True, 'data': {'stations': stations_data, 'radius_km': 10,
+                                      'search_center': {'latitude': -23.55, 'longitude': -46.63},
+                                      'total_found': len(stations_data)}}
+
+def main():
+    repetitions = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    engine = build_database()
+    app = Flask(__name__)
+    default_provider, fast_provider = DefaultJSONProvider(app), FastJSONProvider(app)
+
+    with engine.connect() as connection, app.app_context():
+        legacy_ms, legacy = timed(repetitions, lambda: legacy_payload(connection))
+        compiled_ms, compiled = timed(repetitions, lambda: compiled_payload(connection))
+        assert legacy == compiled, "os dois caminhos devem gerar o mesmo payload"
+
+        stdlib_ms, body = timed(repetitions, lambda: default_provider.response(envelope(compiled)))
+        fast_ms, fast_body = timed(repetitions, lambda: fast_provider.response(envelope(compiled)))
+        assert default_provider.loads(body.get_data()) == fast_provider.loads(fast_body.get_data())
+
+    print(f"Payload de /nearby: {STATIONS} postos x {len(FUELS)} preços, {len(body.get_data()) / 1024:.0f} KiB, "
+          f"{repetitions} repetições (orjson {'ativo' if orjson else 'ausente'})")
+    print(f"{'Montagem antiga (N+1, campo a campo)':<44} {legacy_ms:8.2f} ms")
+    print(f"{'Montagem nova (2 consultas, compilado)':<44} {compiled_ms:8.2f} ms   {legacy_ms / compiled_ms:5.1f}x")
+    print(f"{'Codificação json padrão (jsonify)':<44} {stdlib_ms:8.2f} ms")
+    print(f"{'Codificação FastJSONProvider':<44} {fast_ms:8.2f} ms   {stdlib_ms / fast_ms:5.1f}x")
+    print(f"{'Total antigo / novo':<44} {legacy_ms + stdlib_ms:8.2f} ms / {compiled_ms + fast_ms:.2f} ms")
+
+if __name__ == "__main__":
+    main()
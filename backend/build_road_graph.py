@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+"""
+Gera o grafo viário para o roteamento offline a partir de um extrato do OSM
+
+Uso: python build_road_graph.py nodes.csv edges.csv saida.npz
+
+nodes.csv: id, lat, lon
+edges.csv: u, v, length (m), highway, maxspeed, oneway
+(formato das tabelas exportadas por ferramentas como osmnx/pyrosm)
+"""
+import sys
+import os
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import pandas as pd
+
+from src.services.road_graph import RoadGraph
+
+def main():
+    if len(sys.argv) != 4:
+        print(__doc__)
+        sys.exit(1)
+    nodes_path, edges_path, output_path = sys.argv[1:]
+    
+    started = time.perf_counter()
+    nodes = pd.read_csv(nodes_path)
+    edges = pd.read_csv(edges_path, low_memory=False)
+    graph = RoadGraph.from_osm_tables(nodes, edges)
+    graph.save(output_path)
+    
+    print(f"✅ Grafo gerado em {time.perf_counter() - started:.1f}s")
+    print(f"   - {len(graph)} nós, {len(graph.targets)} arestas dirigidas")
+    print(f"   - Arquivo: {output_path} ({os.path.getsize(output_path) / 1e6:.1f} MB)")
+
+if __name__ == "__main__":
+    main()
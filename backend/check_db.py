@@ -1,42 +1,35 @@
 import os
 import sys
-import psycopg2
-from urllib.parse import urlparse
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import create_engine, text
+from src.config_consolidated import Config
+from src.db_pool import engine_options, instrument_engine, pool_snapshot
 
 def check_database():
     print("🔍 Verificando conexão com o banco de dados...")
     
-    # Configurações de conexão
-    db_config = {
-        'dbname': 'railway',
-        'user': 'postgres',
-        'password': 'HXmzPSGlMEcjpzICIZphyTFuNLcGbAjL',
-        'host': 'postgres-admt.railway.internal',
-        'port': '5432',
-        'connect_timeout': 5
-    }
+    # Mesmo engine e pool da aplicação (DATABASE_URL e opções de src/db_pool.py)
+    engine = create_engine(Config.SQLALCHEMY_DATABASE_URI, **engine_options(Config.SQLALCHEMY_DATABASE_URI))
+    instrument_engine(engine)
     
     try:
         # Tentar conectar ao banco de dados
-        print(f"🔗 Conectando ao banco de dados em {db_config['host']}:{db_config['port']}...")
-        conn = psycopg2.connect(**db_config)
-        
-        # Criar cursor
-        cur = conn.cursor()
+        print(f"🔗 Conectando ao banco de dados em {engine.url.host}:{engine.url.port}...")
+        conn = engine.connect()
         
         # Verificar versão do PostgreSQL
-        cur.execute("SELECT version();")
-        version = cur.fetchone()[0]
+        version = conn.execute(text("SELECT version();")).scalar()
         print(f"✅ Conexão bem-sucedida!")
         print(f"📊 {version}")
         
         # Listar tabelas
-        cur.execute("""
+        cur = conn.execute(text("""
             SELECT table_name 
             FROM information_schema.tables 
             WHERE table_schema = 'public'
             ORDER BY table_name;
-        """)
+        """))
         
         tables = cur.fetchall()
         print(f"\n📋 Tabelas no banco de dados ({len(tables)}):")
@@ -52,9 +45,10 @@ def check_database():
         else:
             print("\n✅ Todas as tabelas importantes estão presentes!")
         
-        # Fechar conexão
-        cur.close()
+        # Fechar conexão e mostrar o pool
         conn.close()
+        pool = pool_snapshot({'primary': engine})['primary']
+        print(f"\n🔌 Pool: {pool['pool']} | checkout máx. {pool['checkout']['wait_max_ms']} ms")
         
     except Exception as e:
         print(f"\n❌ Erro ao conectar ao banco de dados:")
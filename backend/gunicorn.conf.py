@@ -0,0 +1,92 @@
+"""
+Configuração do gunicorn (lida automaticamente a partir do diretório backend)
+
+SERVING_MODE escolhe como cada worker atende requisições:
+- ``sync`` (padrão): um worker atende uma requisição por vez;
+- ``async``: worker gevent, com até SERVING_CONNECTIONS requisições em
+  andamento por worker. As chamadas ao Google Maps (requests) e ao Postgres
+  (psycopg2, pelo wait callback abaixo) cedem a vez enquanto esperam a rede.
+  Sem gevent instalado, cai para o worker gthread com SERVING_THREADS threads.
+  O pool de chamadas externas (IO_POOL_SIZE) e o pool do Postgres acompanham
+  essa concorrência (exportados para o create_app; ver _export_sizing).
+
+Opções passadas na linha de comando (--workers, --timeout, ...) têm precedência.
+"""
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 8080)}"
+workers = int(os.environ.get('WEB_CONCURRENCY', 1))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 120))
+
+serving_mode = os.environ.get('SERVING_MODE', 'sync').lower()
+
+if serving_mode == 'async':
+    try:
+        import gevent  # noqa: F401
+        worker_class = 'gevent'
+        worker_connections = int(os.environ.get('SERVING_CONNECTIONS', 500))
+    except ImportError:
+        worker_class = 'gthread'
+        threads = int(os.environ.get('SERVING_THREADS', 64))
+
+
+def _gevent_wait_callback(connection, timeout=None):
+    """Espera do psycopg2 que cede a vez ao hub do gevent (como o psycogreen)"""
+    import psycopg2
+    from psycopg2 import extensions
+    from gevent.socket import wait_read, wait_write
+
+    while True:
+        state = connection.poll()
+        if state == extensions.POLL_OK:
+            break
+        elif state == extensions.POLL_READ:
+            wait_read(connection.fileno(), timeout=timeout)
+        elif state == extensions.POLL_WRITE:
+            wait_write(connection.fileno(), timeout=timeout)
+        else:
+            raise psycopg2.OperationalError(f"Estado de poll inesperado: {state!r}")
+
+
+def _serving_concurrency(worker_class, connections, threads):
+    """(requisições em andamento por worker, tamanho do pool de chamadas externas)"""
+    if worker_class == 'gevent':
+        return connections, connections
+    if worker_class == 'gthread':
+        return threads, threads * 4
+    return 1, None
+
+
+def _export_sizing(workers, concurrency, io_pool_size):
+    # Lidos pelo create_app: pool do Postgres (src/db_pool.py) e de chamadas externas (services/concurrency.py)
+    os.environ['WEB_CONCURRENCY'] = str(workers)
+    os.environ['SERVING_CONCURRENCY'] = str(concurrency)
+    if io_pool_size:
+        os.environ.setdefault('IO_POOL_SIZE', str(io_pool_size))
+
+
+# Com preload_app o app é criado no master antes de qualquer hook: exporta já
+# o dimensionamento do pool do Postgres com os valores deste arquivo
+# (post_fork corrige com os da linha de comando)
+_export_sizing(workers, _serving_concurrency(
+    globals().get('worker_class', 'sync'), globals().get('worker_connections', 1000), globals().get('threads', 1)
+)[0], None)
+
+
+def post_fork(server, worker):
+    # Valores efetivos (linha de comando incluída), lidos pelo app ao carregar no worker
+    cfg = server.cfg
+    concurrency, io_pool_size = _serving_concurrency(cfg.worker_class_str, cfg.worker_connections, cfg.threads)
+    if cfg.preload_app and (os.environ.get('WEB_CONCURRENCY'), os.environ.get('SERVING_CONCURRENCY')) != \
+            (str(cfg.workers), str(concurrency)):
+        server.log.warning(
+            "preload_app: o pool do Postgres foi dimensionado no master com WEB_CONCURRENCY="
+            f"{os.environ.get('WEB_CONCURRENCY')} e SERVING_CONCURRENCY={os.environ.get('SERVING_CONCURRENCY')}, "
+            f"mas os workers rodam com {cfg.workers} e {concurrency}; defina os valores pelo ambiente"
+        )
+    _export_sizing(cfg.workers, concurrency, io_pool_size)
+
+    if cfg.worker_class_str == 'gevent':
+        from psycopg2 import extensions
+        extensions.set_wait_callback(_gevent_wait_callback)
+        server.log.info(f"Worker {worker.pid}: psycopg2 cooperativo (gevent)")
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Perfil do cold start da API
+
+Roda ``python -X importtime`` num subprocesso que importa ``main`` e chama
+``create_app``, e mostra:
+- os módulos mais caros por tempo próprio e acumulado;
+- o total por pacote de primeiro nível (flask_sqlalchemy, pandas, ...);
+- o tempo de ``create_app`` e quais serviços preguiçosos já foram
+  construídos (o esperado é nenhum antes da primeira requisição).
+
+Uso: python profile_startup.py [quantidade] [config]
+"""
+import json
+import os
+import subprocess
+import sys
+from collections import defaultdict
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+CHILD_SCRIPT = """
+import json, sys, time
+sys.path.insert(0, 'src')
+started = time.perf_counter()
+import main
+imported = time.perf_counter()
+app = main.create_app(sys.argv[1] if len(sys.argv) > 1 else None)
+created = time.perf_counter()
+from services.lazy import loaded_services
+print('STARTUP ' + json.dumps({
+    'import_s': imported - started, 'create_app_s': created - imported,
+    'blueprints': sorted(app.blueprints), 'services': loaded_services()
+}))
+"""
+
+def parse_importtime(stderr):
+    """Linhas ``import time: self | cumulative | módulo`` em (módulo, próprio_us, acumulado_us)"""
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        try:
+            own, cumulative, name = line[len('import time:'):].split('|')
+            entries.append((name.strip(), int(own), int(cumulative)))
+        except ValueError:
+            continue
+    return entries
+
+def run_child(config_name):
+    env = dict(os.environ)
+    env.setdefault('SECRET_KEY', 'profile-startup')
+    env.setdefault('JWT_SECRET_KEY', 'profile-startup')
+    arguments = [sys.executable, '-X', 'importtime', '-c', CHILD_SCRIPT]
+    if config_name:
+        arguments.append(config_name)
+    process = subprocess.run(arguments, cwd=BACKEND_DIR, env=env, capture_output=True, text=True)
+    summary = None
+    for line in process.stdout.splitlines():
+        if line.startswith('STARTUP '):
+            summary = json.loads(line[len('STARTUP '):])
+    if summary is None:
+        sys.stderr.write(process.stdout + process.stderr)
+        raise SystemExit(f"subprocesso terminou com código {process.returncode} sem o resumo do startup")
+    return parse_importtime(process.stderr), summary
+
+def main():
+    limit = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    config_name = sys.argv[2] if len(sys.argv) > 2 else None
+    entries, summary = run_child(config_name)
+
+    packages = defaultdict(int)
+    for name, own, _ in entries:
+        packages[name.split('.')[0]] += own
+    total_us = sum(own for _, own, _ in entries)
+
+    print(f"Importação de main: {summary['import_s'] * 1000:.0f} ms "
+          f"({len(entries)} módulos, {total_us / 1000:.0f} ms medidos pelo importtime)")
+    print(f"create_app: {summary['create_app_s'] * 1000:.0f} ms, blueprints: {', '.join(summary['blueprints'])}")
+    services = summary['services']
+    loaded = [name for name, is_loaded in services.items() if is_loaded]
+    print(f"Serviços preguiçosos: {len(services)} registrados, carregados: {', '.join(loaded) or 'nenhum'}")
+
+    print(f"\n{'Módulos por tempo próprio':<52} {'próprio':>9} {'acumulado':>10}")
+    for name, own, cumulative in sorted(entries, key=lambda entry: entry[1], reverse=True)[:limit]:
+        print(f"{name:<52} {own / 1000:7.1f}ms {cumulative / 1000:8.1f}ms")
+
+    print(f"\n{'Módulos por tempo acumulado':<52} {'acumulado':>10}")
+    for name, _, cumulative in sorted(entries, key=lambda entry: entry[2], reverse=True)[:limit]:
+        print(f"{name:<52} {cumulative / 1000:8.1f}ms")
+
+    print(f"\n{'Pacotes (soma do tempo próprio)':<52} {'total':>10} {'%':>6}")
+    for package, own in sorted(packages.items(), key=lambda item: item[1], reverse=True)[:limit]:
+        print(f"{package:<52} {own / 1000:8.1f}ms {own / total_us * 100:5.1f}%")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,25 @@
+#!/usr/bin/env python3
+"""
+Script para reconciliar os contadores de user_stats com as tabelas de origem
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from src.main import create_app
+from src.services.user_stats_service import reconcile_user_stats
+
+def main():
+    app = create_app()
+    
+    with app.app_context():
+        user_ids = sys.argv[1:] or None
+        stats = reconcile_user_stats(user_ids)
+        
+        print(f"✅ Reconciliação concluída!")
+        print(f"   - {stats['checked']} usuários verificados")
+        print(f"   - {stats['repaired']} contadores corrigidos")
+        print(f"   - {stats['created']} contadores criados")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,25 @@
+#!/usr/bin/env python3
+"""
+Script para gerar as previsões de preço em lote (agendar via cron)
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from src.main import create_app
+from src.services.price_intelligence import price_intelligence
+
+def main():
+    app = create_app()
+    
+    with app.app_context():
+        loaded = price_intelligence.refresh_from_database()
+        stats = price_intelligence.run_forecasts(persist=True)
+        
+        print(f"✅ Previsões geradas!")
+        print(f"   - {loaded} novos registros de histórico carregados")
+        print(f"   - {stats['series']} séries ajustadas em {stats['fit_seconds']}s")
+        print(f"   - {stats['rows_written']} previsões gravadas")
+
+if __name__ == "__main__":
+    main()
@@ -45,12 +45,7 @@ class Config:
     # SQLAlchemy Configuration
     SQLALCHEMY_DATABASE_URI = DATABASE_URL
     SQLALCHEMY_TRACK_MODIFICATIONS = False
-    SQLALCHEMY_ENGINE_OPTIONS = {
-        'pool_pre_ping': True,
-        'pool_recycle': 300,
-        'pool_timeout': 20,
-        'max_overflow': 0
-    }
+    # Opções do pool calculadas no create_app (ver configure_engines em src/db_pool.py)
 
 class DevelopmentConfig(Config):
     """Configuração para desenvolvimento"""
@@ -61,15 +56,6 @@ class ProductionConfig(Config):
     """Configuração para produção"""
     DEBUG = False
     TESTING = False
-    
-    # Configurações específicas de produção
-    SQLALCHEMY_ENGINE_OPTIONS = {
-        'pool_pre_ping': True,
-        'pool_recycle': 300,
-        'pool_timeout': 20,
-        'max_overflow': 10,
-        'pool_size': 20
-    }
 
 class TestingConfig(Config):
     """Configuração para testes"""
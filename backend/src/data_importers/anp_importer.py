@@ -1,69 +1,385 @@
 # backend/src/data_importers/anp_importer.py
-import pandas as pd
+"""
+Importador da série histórica de preços da ANP (levantamento semanal).
+
+O CSV é lido em blocos (``chunksize``) com todas as colunas como texto, de
+modo que a memória fica limitada ao tamanho do bloco mesmo para o arquivo
+nacional com centenas de milhares de linhas. Para cada bloco:
+
+1. normaliza as colunas (CNPJ, bandeira, endereço, município, UF, CEP,
+   produto, preço e data da coleta);
+2. faz upsert dos postos por CNPJ;
+3. carrega os preços em lote (COPY no PostgreSQL, ``executemany`` nos demais).
+
+Os preços têm id determinístico (CNPJ + combustível + data), então reimportar
+o mesmo arquivo não duplica registros. O progresso é gravado em
+``<csv>.progress`` a cada bloco e a importação retoma do último bloco
+concluído.
+
+Uso (na pasta backend):
+    python -m src.data_importers.anp_importer caminho/para/arquivo.csv
+"""
+import csv
+import io
+import json
 import os
+import re
+import uuid
+import unicodedata
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional, Set
+import pandas as pd
+from sqlalchemy import insert, select
+from src.database import db
+from src.models.gas_station import GasStation, FuelPrice
+from src.services.price_intelligence import record_committed_prices
+from src.services.response_cache import response_cache
+
+DEFAULT_CHUNK_SIZE = 20000
+
+# Postos novos do CSV não têm coordenadas: ficam inativos (fora das buscas
+# por proximidade) até serem geocodificados.
+PLACEHOLDER_LATITUDE = 0.0
+PLACEHOLDER_LONGITUDE = 0.0
+
+PRICE_ID_NAMESPACE = uuid.UUID('6f1c3f5e-6c1b-4d8e-9a59-4a0a3e9e2a10')
+
+# Cabeçalho normalizado (minúsculo, sem acentos) -> campo interno
+COLUMN_MAPPING = {
+    'estado - sigla': 'state',
+    'estado': 'state',
+    'municipio': 'city',
+    'revenda': 'name',
+    'cnpj da revenda': 'cnpj',
+    'cnpj': 'cnpj',
+    'nome da rua': 'street',
+    'numero rua': 'number',
+    'complemento': 'complement',
+    'bairro': 'neighborhood',
+    'cep': 'postal_code',
+    'produto': 'product',
+    'data da coleta': 'collected_at',
+    'valor de venda': 'price',
+    'bandeira': 'brand',
+}
+
+# Produto da ANP -> fuel_type do sistema (demais produtos são ignorados)
+FUEL_MAPPING = {
+    'GASOLINA': 'gasoline',
+    'GASOLINA COMUM': 'gasoline',
+    'ETANOL': 'ethanol',
+    'DIESEL': 'diesel',
+    'DIESEL S500': 'diesel',
+    'DIESEL S10': 'diesel_s10',
+    'GNV': 'gnv',
+}
+
+STATION_COLUMNS = ('cnpj', 'name', 'brand', 'address', 'city', 'state', 'postal_code')
+
+
+def _normalize_header(name: str) -> str:
+    name = name.replace('\ufeff', '').strip().lower()
+    name = unicodedata.normalize('NFKD', name)
+    return ''.join(c for c in name if not unicodedata.combining(c))
+
+
+def _detect_encoding(csv_path: str) -> str:
+    with open(csv_path, 'rb') as f:
+        sample = f.read(64 * 1024)
+    try:
+        sample.decode('utf-8')
+        return 'utf-8-sig'
+    except UnicodeDecodeError:
+        return 'latin-1'
+
+
+def _format_cnpj(value: str) -> Optional[str]:
+    digits = re.sub(r'\D', '', value or '')
+    if not digits or len(digits) > 14:
+        return None
+    digits = digits.zfill(14)
+    return f'{digits[:2]}.{digits[2:5]}.{digits[5:8]}/{digits[8:12]}-{digits[12:]}'
+
+
+def _text(series: pd.Series) -> pd.Series:
+    return series.fillna('').astype(str).str.strip().str.replace(r'\s+', ' ', regex=True)
+
+
+def normalize_chunk(chunk: pd.DataFrame) -> pd.DataFrame:
+    """
+    Normaliza um bloco do CSV. Linhas sem CNPJ, combustível, preço ou data
+    válidos são descartadas antes do tratamento (mais caro) dos textos.
+    """
+    df = chunk.rename(columns=lambda c: COLUMN_MAPPING[_normalize_header(c)])
+    for column in set(COLUMN_MAPPING.values()) - set(df.columns):
+        df[column] = ''
+
+    df['fuel_type'] = df['product'].str.strip().str.upper().map(FUEL_MAPPING)
+    df['price'] = pd.to_numeric(df['price'].str.strip().str.replace(',', '.', regex=False), errors='coerce')
+    df['reported_at'] = pd.to_datetime(df['collected_at'].str.strip(), format='%d/%m/%Y', errors='coerce')
+    df['state'] = df['state'].str.strip().str.upper()
+
+    df = df[
+        df['fuel_type'].notna() & (df['price'] > 0) &
+        df['reported_at'].notna() & (df['state'].str.len() == 2)
+    ]
+    df = df.assign(cnpj=df['cnpj'].map(_format_cnpj))
+    return df[df['cnpj'].notna()]
+
+
+def normalize_stations(df: pd.DataFrame) -> pd.DataFrame:
+    """Dados cadastrais de cada posto (um registro por CNPJ) de um bloco normalizado"""
+    df = df.drop_duplicates('cnpj', keep='last')
+
+    out = pd.DataFrame(index=df.index)
+    out['cnpj'] = df['cnpj']
+    out['name'] = _text(df['name']).str.slice(0, 255)
+    out['brand'] = _text(df['brand']).str.title().str.slice(0, 100)
+    out['city'] = _text(df['city']).str.title().str.slice(0, 100)
+    out['state'] = df['state']
+    out['postal_code'] = _text(df['postal_code']).str.replace(r'\D', '', regex=True).str.slice(0, 10)
+
+    street = _text(df['street'])
+    number = _text(df['number'])
+    complement = _text(df['complement'])
+    neighborhood = _text(df['neighborhood'])
+    address = street.where(number == '', street + ', ' + number)
+    address = address.where(complement == '', address + ' - ' + complement)
+    out['address'] = address.where(neighborhood == '', address + ', ' + neighborhood)
+
+    return out[list(STATION_COLUMNS)]
+
 
-# Importar o app e o db para ter o contexto da aplicação
-# from ..app import create_app
-# from ..database import db
-# from ..models.gas_station import GasStation
+def _upsert_stations(stations: pd.DataFrame) -> Dict[str, str]:
+    """Upsert dos postos por CNPJ; retorna o mapa CNPJ -> id"""
+    now = datetime.now(timezone.utc)
+    rows = []
+    for record in stations.to_dict('records'):
+        record.update({
+            'id': str(uuid.uuid4()),
+            'latitude': PLACEHOLDER_LATITUDE,
+            'longitude': PLACEHOLDER_LONGITUDE,
+            'data_source': 'anp',
+            'data_confidence': 0.9,
+            'is_active': False,
+            'created_at': now,
+            'updated_at': now
+        })
+        rows.append(record)
 
-def import_anp_data(csv_path):
+    table = GasStation.__table__
+    dialect = db.session.get_bind().dialect.name
+    if dialect in ('postgresql', 'sqlite'):
+        if dialect == 'postgresql':
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        stmt = dialect_insert(table)
+        # Dados cadastrais vêm da ANP; coordenadas e status existentes são preservados
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.cnpj],
+            set_={column: stmt.excluded[column] for column in STATION_COLUMNS + ('updated_at',)
+                  if column != 'cnpj'}
+        )
+        db.session.execute(stmt, rows)
+    else:
+        existing = set(db.session.scalars(select(table.c.cnpj).where(table.c.cnpj.in_(stations['cnpj']))))
+        new_rows = [row for row in rows if row['cnpj'] not in existing]
+        if new_rows:
+            db.session.execute(insert(table), new_rows)
+
+    result = db.session.execute(
+        select(table.c.cnpj, table.c.id).where(table.c.cnpj.in_(list(stations['cnpj'])))
+    )
+    return {cnpj: station_id for cnpj, station_id in result}
+
+
+def _price_rows(prices: pd.DataFrame, station_ids: Dict[str, str]) -> List[Dict]:
+    prices = prices.assign(
+        gas_station_id=prices['cnpj'].map(station_ids),
+        day=prices['reported_at'].dt.strftime('%Y-%m-%d'),
+        price=prices['price'].round(3)
+    )
+    prices = prices[prices['gas_station_id'].notna()]
+
+    now = datetime.now(timezone.utc)
+    return [
+        {
+            'id': str(uuid.uuid5(PRICE_ID_NAMESPACE, f'anp:{cnpj}:{fuel_type}:{day}')),
+            'gas_station_id': station_id,
+            'fuel_type': fuel_type,
+            'price': price,
+            'source': 'anp',
+            'source_confidence': 0.9,
+            'reported_at': reported_at.to_pydatetime().replace(tzinfo=timezone.utc),
+            'is_active': True,
+            'created_at': now,
+            'updated_at': now
+        }
+        for cnpj, station_id, fuel_type, price, day, reported_at in prices[
+            ['cnpj', 'gas_station_id', 'fuel_type', 'price', 'day', 'reported_at']
+        ].itertuples(index=False)
+    ]
+
+
+def _copy_prices(rows: List[Dict]) -> Set[str]:
+    """PostgreSQL: COPY para tabela temporária + INSERT ... ON CONFLICT DO NOTHING; retorna os ids novos"""
+    columns = ['id', 'gas_station_id', 'fuel_type', 'price', 'source', 'source_confidence',
+               'reported_at', 'is_active', 'created_at', 'updated_at']
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow([row[column].isoformat() if isinstance(row[column], datetime) else row[column]
+                         for column in columns])
+    buffer.seek(0)
+
+    cursor = db.session.connection().connection.cursor()
+    try:
+        cursor.execute('CREATE TEMP TABLE IF NOT EXISTS anp_prices_stage '
+                       '(LIKE fuel_prices INCLUDING DEFAULTS) ON COMMIT DELETE ROWS')
+        cursor.copy_expert(f"COPY anp_prices_stage ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", buffer)
+        cursor.execute(f"INSERT INTO fuel_prices ({', '.join(columns)}) "
+                       f"SELECT {', '.join(columns)} FROM anp_prices_stage ON CONFLICT DO NOTHING RETURNING id")
+        return {str(price_id) for price_id, in cursor.fetchall()}
+    finally:
+        cursor.close()
+
+
+def _insert_prices(rows: List[Dict]) -> Set[str]:
+    """Insere os preços que ainda não existem; retorna os ids novos"""
+    if not rows:
+        return set()
+
+    table = FuelPrice.__table__
+    dialect = db.session.get_bind().dialect.name
+    if dialect in ('postgresql', 'sqlite'):
+        if dialect == 'postgresql':
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        # Sem alvo: ignora o mesmo id e também o dia já gravado (índice único da migração 018)
+        result = db.session.execute(dialect_insert(table).on_conflict_do_nothing().returning(table.c.id), rows)
+        return set(result.scalars())
+
+    existing = set(db.session.scalars(select(table.c.id).where(table.c.id.in_([row['id'] for row in rows]))))
+    new_rows = [row for row in rows if row['id'] not in existing]
+    if new_rows:
+        db.session.execute(insert(table), new_rows)
+    return {row['id'] for row in new_rows}
+
+
+def _load_progress(progress_path: str, fingerprint: Dict, resume: bool) -> Dict:
+    """Progresso salvo para o mesmo arquivo (tamanho/mtime) ou um novo"""
+    if resume and os.path.exists(progress_path):
+        with open(progress_path) as f:
+            progress = json.load(f)
+        if progress.get('fingerprint') == fingerprint and not progress.get('completed_at'):
+            return progress
+    return {'fingerprint': fingerprint, 'chunks_done': 0, 'rows_read': 0,
+            'stations': 0, 'prices': 0, 'skipped': 0}
+
+
+def _save_progress(progress_path: str, progress: Dict):
+    tmp_path = progress_path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(progress, f)
+    os.replace(tmp_path, progress_path)
+
+
+def _print_progress(progress: Dict):
+    print(f"  bloco {progress['chunks_done']}: {progress['rows_read']} linhas lidas, "
+          f"{progress['stations']} postos, {progress['prices']} preços novos, "
+          f"{progress['skipped']} linhas descartadas")
+
+
+def import_anp_data(csv_path, chunk_size: int = DEFAULT_CHUNK_SIZE, resume: bool = True,
+                    progress_callback: Optional[Callable[[Dict], None]] = _print_progress) -> Optional[Dict]:
     """
-    Importa dados de postos de combustível de um arquivo CSV da ANP.
+    Importa postos e preços de um arquivo CSV da ANP.
 
-    Este script deve ser executado no contexto da aplicação Flask para ter acesso ao banco de dados.
-    Exemplo de uso (a ser executado na raiz do projeto):
-    `flask shell < backend/src/data_importers/anp_importer.py`
+    Deve ser executado no contexto da aplicação Flask. Retorna o resumo da
+    importação (o mesmo conteúdo gravado no arquivo de progresso).
     """
     print(f"Iniciando a importação do arquivo: {csv_path}")
 
     if not os.path.exists(csv_path):
         print(f"Erro: Arquivo não encontrado em {csv_path}")
-        return
+        return None
+
+    stat = os.stat(csv_path)
+    fingerprint = {'size': stat.st_size, 'mtime': int(stat.st_mtime)}
+    progress_path = f'{csv_path}.progress'
+    progress = _load_progress(progress_path, fingerprint, resume)
+
+    if progress['chunks_done']:
+        print(f"Retomando a partir do bloco {progress['chunks_done']} ({progress['rows_read']} linhas já importadas)")
+
+    use_copy = db.session.get_bind().dialect.name == 'postgresql'
+    station_ids: Dict[str, str] = {}
+
+    reader = pd.read_csv(
+        csv_path,
+        sep=';',
+        encoding=_detect_encoding(csv_path),
+        dtype=str,
+        keep_default_na=False,
+        usecols=lambda column: _normalize_header(column) in COLUMN_MAPPING,
+        chunksize=chunk_size,
+        # Linhas já importadas são puladas sem parse (exceto o cabeçalho)
+        skiprows=range(1, progress['rows_read'] + 1) if progress['rows_read'] else None
+    )
 
     try:
-        # Leitura do CSV com pandas. Ajustar separador e encoding se necessário.
-        df = pd.read_csv(csv_path, sep=';', encoding='latin-1')
-
-        # TODO: Mapear as colunas do CSV para os campos do modelo GasStation
-        # Exemplo de mapeamento:
-        # column_mapping = {
-        #     'CNPJ': 'cnpj',
-        #     'Razão Social': 'name',
-        #     'Bandeira': 'brand',
-        #     'Endereço': 'address',
-        #     'Bairro': 'neighborhood',
-        #     'Município': 'city',
-        #     'Estado': 'state',
-        #     'CEP': 'cep'
-        # }
-
-        print(f"{len(df)} registros encontrados no CSV.")
-
-        # TODO: Iterar sobre o DataFrame e criar/atualizar os postos no DB
-        # for index, row in df.iterrows():
-        #     cnpj = row['CNPJ']
-        #     existing_station = GasStation.query.filter_by(cnpj=cnpj).first()
-        #     
-        #     if not existing_station:
-        #         new_station = GasStation(
-        #             cnpj=cnpj,
-        #             name=row['Razão Social'],
-        #             # ... outros campos
-        #         )
-        #         db.session.add(new_station)
-        # 
-        # db.session.commit()
-
-        print("Importação concluída (lógica de inserção no DB pendente).")
+        for chunk in reader:
+            normalized = normalize_chunk(chunk)
+
+            try:
+                # Cada posto é atualizado uma vez por execução, no primeiro bloco em que aparece
+                new_stations = normalized[~normalized['cnpj'].isin(station_ids)]
+                if not new_stations.empty:
+                    upserted = _upsert_stations(normalize_stations(new_stations))
+                    station_ids.update(upserted)
+                    progress['stations'] += len(upserted)
+
+                rows = _price_rows(normalized, station_ids)
+                inserted = _copy_prices(rows) if use_copy else _insert_prices(rows)
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                raise
+
+            record_committed_prices([(row['gas_station_id'], row['fuel_type'], row['price'], row['reported_at'])
+                                     for row in rows if row['id'] in inserted])
+
+            progress['chunks_done'] += 1
+            progress['rows_read'] += len(chunk)
+            progress['prices'] += len(inserted)
+            progress['skipped'] += len(chunk) - len(normalized)
+            _save_progress(progress_path, progress)
+
+            if progress_callback:
+                progress_callback(progress)
 
     except Exception as e:
         print(f"Ocorreu um erro durante a importação: {e}")
+        print(f"Execute novamente para retomar do bloco {progress['chunks_done']}.")
+        raise
+
+    response_cache.invalidate_all()
+    progress['completed_at'] = datetime.now(timezone.utc).isoformat()
+    _save_progress(progress_path, progress)
+    print(f"Importação concluída: {progress['prices']} preços novos de {progress['rows_read']} linhas.")
+    return progress
+
+
+if __name__ == '__main__':
+    import sys
+    from src.main import create_app
+
+    if len(sys.argv) < 2:
+        print("Uso: python -m src.data_importers.anp_importer <arquivo.csv> [--restart]")
+        sys.exit(1)
 
-# Exemplo de como chamar a função (requer contexto da app)
-# if __name__ == '__main__':
-#     app = create_app()
-#     with app.app_context():
-#         # O caminho para o CSV pode vir de uma config ou argumento
-#         path_to_csv = 'path/to/your/anp_data.csv'
-#         import_anp_data(path_to_csv)
+    app = create_app()
+    with app.app_context():
+        import_anp_data(sys.argv[1], resume='--restart' not in sys.argv[2:])
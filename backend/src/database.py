@@ -1,19 +1,22 @@
 from flask_sqlalchemy import SQLAlchemy
-from flask_migrate import Migrate
 import redis
 import os
+from src.db_routing import RoutingSession
 
-# Initialize extensions
-db = SQLAlchemy()
-migrate = Migrate()
+# Initialize extensions (db.session routes read-only views to the replica bind, see db_routing)
+db = SQLAlchemy(session_options={'class_': RoutingSession})
+migrate = None  # Flask-Migrate (alembic) is only loaded by init_database
 
 # Redis connection
 redis_client = None
 
 def init_database(app):
     """Initialize database with Flask app"""
+    global migrate
     db.init_app(app)
-    migrate.init_app(app, db)
+    # Alembic is heavy and only needed by the `flask db` commands
+    from flask_migrate import Migrate
+    migrate = Migrate(app, db)
     
     # Initialize Redis
     global redis_client
@@ -104,43 +107,13 @@ def is_token_blacklisted(jti):
             print(f"Check blacklist error: {e}")
     return False
 
-# Rate limiting utilities
+# Rate limiting utilities (GCRA atômico no Redis, com camada local; ver services/rate_limiter.py)
 def check_rate_limit(identifier, limit, window):
     """Check if rate limit is exceeded"""
-    if not redis_client:
-        return False
-    
-    try:
-        key = f"rate_limit:{identifier}"
-        current = redis_client.get(key)
-        
-        if current is None:
-            redis_client.setex(key, window, 1)
-            return False
-        
-        if int(current) >= limit:
-            return True
-        
-        redis_client.incr(key)
-        return False
-    except Exception as e:
-        print(f"Rate limit check error: {e}")
-        return False
+    from src.services.rate_limiter import rate_limiter
+    return not rate_limiter.hit(identifier, limit, window).allowed
 
 def get_rate_limit_remaining(identifier, limit, window):
     """Get remaining rate limit count"""
-    if not redis_client:
-        return limit
-    
-    try:
-        key = f"rate_limit:{identifier}"
-        current = redis_client.get(key)
-        
-        if current is None:
-            return limit
-        
-        return max(0, limit - int(current))
-    except Exception as e:
-        print(f"Rate limit remaining error: {e}")
-        return limit
-
+    from src.services.rate_limiter import rate_limiter
+    return rate_limiter.peek(identifier, limit, window)
@@ -1,8 +1,8 @@
-from flask_sqlalchemy import SQLAlchemy
 import os
 
-# Instância global do SQLAlchemy
-db = SQLAlchemy()
+# Mesma instância usada pelos modelos e blueprints (src.database): uma só
+# configuração de engines, binds e session para o app inteiro
+from src.database import db
 
 def init_database(app):
     """
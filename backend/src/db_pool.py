@@ -0,0 +1,309 @@
+"""
+Dimensionamento e instrumentação do pool de conexões do Postgres.
+
+``engine_options`` calcula o ``SQLALCHEMY_ENGINE_OPTIONS`` a partir do
+número de workers (WEB_CONCURRENCY) e da concorrência de cada um
+(SERVING_CONCURRENCY, definida pelo gunicorn.conf.py), dividindo o limite de
+conexões do servidor entre os processos em vez de usar 5/20 fixos. Com
+DB_PGBOUNCER ligado, as opções deixam de depender de estado de sessão.
+
+O pool instrumentado mede a espera no checkout, e ``instrument_engine``
+acompanha criação e descarte de conexões (churn) e registra as consultas
+lentas com uma impressão digital do SQL normalizado, para agrupar a mesma
+consulta com valores diferentes. ``pool_snapshot`` junta tudo para o
+endpoint de saúde.
+"""
+import hashlib
+import logging
+import os
+import re
+import threading
+import time
+import weakref
+from collections import deque
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import event, exc
+from sqlalchemy.pool import QueuePool
+
+logger = logging.getLogger(__name__)
+
+SLOW_QUERY_MS = float(os.environ.get('DB_SLOW_QUERY_MS', 200))
+LATENCY_WINDOW = 2048
+MAX_SLOW_FINGERPRINTS = 200
+
+
+def _env_int(name: str, default: Optional[int]) -> Optional[int]:
+    value = os.environ.get(name)
+    return int(value) if value not in (None, '') else default
+
+
+def pool_size_for(workers: int, concurrency: int, max_connections: int,
+                  reserved: int = 10, background: int = 1) -> Tuple[int, int]:
+    """(pool_size, max_overflow) de um processo
+
+    Cada worker fica com uma fatia igual de ``max_connections - reserved``.
+    O pool fixo cobre uma conexão por requisição em andamento mais as threads
+    de fundo; o overflow usa o que sobrar da fatia, até 5 conexões.
+    """
+    budget = max(1, (max_connections - reserved) // max(1, workers))
+    pool_size = max(1, min(concurrency + background, budget))
+    max_overflow = max(0, min(5, budget - pool_size))
+    return pool_size, max_overflow
+
+
+def engine_options(database_uri: str, name: str = 'primary',
+                   statement_timeout_ms: Optional[int] = None) -> Dict:
+    """``SQLALCHEMY_ENGINE_OPTIONS`` para ``database_uri`` (vazio fora do Postgres)"""
+    if not database_uri.startswith(('postgres://', 'postgresql')):
+        return {}
+
+    computed_size, computed_overflow = pool_size_for(
+        workers=_env_int('WEB_CONCURRENCY', 1),
+        concurrency=_env_int('SERVING_CONCURRENCY', 1),
+        max_connections=_env_int('DB_MAX_CONNECTIONS', 100),
+        reserved=_env_int('DB_RESERVED_CONNECTIONS', 10)
+    )
+    pgbouncer = os.environ.get('DB_PGBOUNCER', 'false').lower() in ('true', 'transaction', 'session')
+    if statement_timeout_ms is None:
+        statement_timeout_ms = _env_int('DB_STATEMENT_TIMEOUT_MS', 5000)
+
+    connect_args = {'connect_timeout': _env_int('DB_CONNECT_TIMEOUT', 5)}
+    # O PgBouncer recusa o parâmetro de startup ``options``: o statement_timeout
+    # fica na configuração do role (ALTER ROLE ... SET statement_timeout)
+    if statement_timeout_ms and not pgbouncer:
+        connect_args['options'] = f'-c statement_timeout={statement_timeout_ms}'
+
+    return {
+        'poolclass': InstrumentedQueuePool,
+        'pool_logging_name': name,
+        'pool_size': _env_int('DB_POOL_SIZE', computed_size),
+        'max_overflow': _env_int('DB_MAX_OVERFLOW', computed_overflow),
+        'pool_timeout': _env_int('DB_POOL_TIMEOUT', 20),
+        'pool_pre_ping': True,
+        # Atrás do PgBouncer quem recicla as conexões do servidor é ele (server_lifetime)
+        'pool_recycle': -1 if pgbouncer else _env_int('DB_POOL_RECYCLE', 300),
+        # LIFO deixa as conexões ociosas no fundo da fila, onde o recycle as fecha
+        'pool_use_lifo': True,
+        'connect_args': connect_args
+    }
+
+
+def configure_engines(config) -> None:
+    """Preenche as opções de pool do engine principal e dos binds no ``create_app``
+
+    Calculadas na criação do app, e não no import da configuração, para usar
+    o WEB_CONCURRENCY/SERVING_CONCURRENCY do worker. Opções já definidas na
+    configuração são mantidas; binds dados só pela URL ganham as opções do pool.
+    """
+    statement_timeout_ms = config.get('DB_STATEMENT_TIMEOUT_MS')
+    if not config.get('SQLALCHEMY_ENGINE_OPTIONS'):
+        config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(
+            config['SQLALCHEMY_DATABASE_URI'], statement_timeout_ms=statement_timeout_ms
+        )
+    config['SQLALCHEMY_BINDS'] = {
+        key: dict(engine_options(value, name=key or 'primary', statement_timeout_ms=statement_timeout_ms), url=value)
+        if isinstance(value, str) else value
+        for key, value in (config.get('SQLALCHEMY_BINDS') or {}).items()
+    }
+
+
+# --- Impressão digital do SQL ---
+
+_WHITESPACE = re.compile(r'\s+')
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_PARAMETER = re.compile(r'%\(\w+\)s|%s|(?<!:):\w+|\$\d+|\?')
+_NUMBER = re.compile(r'(?<![\w.])-?\d+(?:\.\d+)?\b')
+_LIST = re.compile(r'\(\?(?:, \?)*\)')
+_REPEATED_ROWS = re.compile(r'(\(\?(?:, \?)*\))(?:, \(\?(?:, \?)*\))+')
+
+
+def normalize_statement(statement: str) -> str:
+    """SQL sem valores: literais e parâmetros viram ``?`` e listas viram ``(?+)``"""
+    normalized = _WHITESPACE.sub(' ', statement).strip()
+    normalized = _STRING.sub('?', normalized)
+    normalized = _PARAMETER.sub('?', normalized)
+    normalized = _NUMBER.sub('?', normalized)
+    normalized = _REPEATED_ROWS.sub(r'\1, ...', normalized)
+    return _LIST.sub('(?+)', normalized)
+
+
+def statement_fingerprint(statement: str) -> Tuple[str, str]:
+    """(impressão digital, SQL normalizado)"""
+    normalized = normalize_statement(statement)
+    return hashlib.sha1(normalized.lower().encode()).hexdigest()[:16], normalized
+
+
+# --- Métricas ---
+
+class PoolMetrics:
+    """Contadores de um pool: espera no checkout, churn e consultas lentas"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.started = time.time()
+            self.checkouts = 0
+            self.checkout_timeouts = 0
+            self.wait_ms = deque(maxlen=LATENCY_WINDOW)
+            self.max_wait_ms = 0.0
+            self.connects = 0
+            self.closes = 0
+            self.invalidations = 0
+            self.slow_queries: Dict[str, Dict] = {}
+
+    def record_checkout(self, wait_ms: float, timed_out: bool = False):
+        with self._lock:
+            if timed_out:
+                self.checkout_timeouts += 1
+            else:
+                self.checkouts += 1
+            self.wait_ms.append(wait_ms)
+            self.max_wait_ms = max(self.max_wait_ms, wait_ms)
+
+    def record_connection(self, kind: str):
+        with self._lock:
+            setattr(self, kind, getattr(self, kind) + 1)
+
+    def record_slow_query(self, fingerprint: str, statement: str, elapsed_ms: float):
+        with self._lock:
+            entry = self.slow_queries.get(fingerprint)
+            if entry is None:
+                if len(self.slow_queries) >= MAX_SLOW_FINGERPRINTS:
+                    return
+                entry = self.slow_queries[fingerprint] = {
+                    'fingerprint': fingerprint, 'statement': statement, 'count': 0, 'total_ms': 0.0, 'max_ms': 0.0
+                }
+            entry['count'] += 1
+            entry['total_ms'] += elapsed_ms
+            entry['max_ms'] = max(entry['max_ms'], elapsed_ms)
+
+    def snapshot(self, pool=None, slow_queries: int = 10) -> Dict:
+        with self._lock:
+            waits = sorted(self.wait_ms)
+            minutes = max((time.time() - self.started) / 60, 1 / 60)
+            data = {
+                'checkout': {
+                    'count': self.checkouts,
+                    'timeouts': self.checkout_timeouts,
+                    'wait_p50_ms': round(_percentile(waits, 0.5), 2),
+                    'wait_p95_ms': round(_percentile(waits, 0.95), 2),
+                    'wait_max_ms': round(self.max_wait_ms, 2)
+                },
+                'churn': {
+                    'connects': self.connects,
+                    'closes': self.closes,
+                    'invalidations': self.invalidations,
+                    'connects_per_minute': round(self.connects / minutes, 2)
+                },
+                'slow_queries': [
+                    dict(entry, total_ms=round(entry['total_ms'], 1), max_ms=round(entry['max_ms'], 1))
+                    for entry in sorted(self.slow_queries.values(), key=lambda item: item['total_ms'], reverse=True)
+                ][:slow_queries]
+            }
+        if pool is not None:
+            data['pool'] = pool_state(pool)
+        return data
+
+
+def _percentile(values, fraction: float) -> float:
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+_metrics: Dict[str, PoolMetrics] = {}
+_metrics_lock = threading.Lock()
+# engine -> nome das métricas, para não registrar os eventos duas vezes
+_instrumented = weakref.WeakKeyDictionary()
+
+
+def metrics_for(name: str) -> PoolMetrics:
+    with _metrics_lock:
+        if name not in _metrics:
+            _metrics[name] = PoolMetrics(name)
+        return _metrics[name]
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool que mede quanto cada checkout esperou por uma conexão"""
+
+    def __init__(self, creator, pool_size: int = 5, max_overflow: int = 10, **kwargs):
+        super().__init__(creator, pool_size=pool_size, max_overflow=max_overflow, **kwargs)
+        self.max_overflow = max_overflow
+        self.metrics_name = kwargs.get('logging_name') or 'primary'
+
+    def _do_get(self):
+        metrics = metrics_for(self.metrics_name)
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            metrics.record_checkout((time.perf_counter() - started) * 1000, timed_out=True)
+            raise
+        metrics.record_checkout((time.perf_counter() - started) * 1000)
+        return connection
+
+
+def pool_state(pool) -> Dict:
+    """Ocupação atual do pool (saturação = conexões em uso / capacidade)"""
+    if not isinstance(pool, QueuePool):
+        return {'class': type(pool).__name__}
+    size, checked_out = pool.size(), pool.checkedout()
+    # Só o pool instrumentado guarda o limite de overflow num atributo público
+    max_overflow = getattr(pool, 'max_overflow', None)
+    capacity = size + max_overflow if max_overflow is not None and max_overflow >= 0 else None
+    return {
+        'class': type(pool).__name__,
+        'size': size,
+        'max_overflow': max_overflow,
+        'checked_out': checked_out,
+        'checked_in': pool.checkedin(),
+        'overflow_in_use': max(0, pool.overflow()),
+        'saturation': round(checked_out / capacity, 3) if capacity else None
+    }
+
+
+def instrument_engine(engine, name: str = 'primary', slow_query_ms: Optional[float] = None):
+    """Liga churn de conexões e log de consultas lentas aos eventos do ``engine``"""
+    metrics = metrics_for(name)
+    threshold = SLOW_QUERY_MS if slow_query_ms is None else slow_query_ms
+    if engine in _instrumented:
+        return metrics
+    _instrumented[engine] = name
+
+    event.listen(engine, 'connect', lambda *args: metrics.record_connection('connects'))
+    event.listen(engine, 'close', lambda *args: metrics.record_connection('closes'))
+    event.listen(engine, 'close_detached', lambda *args: metrics.record_connection('closes'))
+    event.listen(engine, 'invalidate', lambda *args: metrics.record_connection('invalidations'))
+
+    def before_cursor_execute(connection, cursor, statement, parameters, context, executemany):
+        if context is not None:
+            context._query_started = time.perf_counter()
+
+    def after_cursor_execute(connection, cursor, statement, parameters, context, executemany):
+        started = getattr(context, '_query_started', None)
+        if started is None:
+            return
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        if elapsed_ms < threshold:
+            return
+        fingerprint, normalized = statement_fingerprint(statement)
+        metrics.record_slow_query(fingerprint, normalized, elapsed_ms)
+        logger.warning("Consulta lenta (%s) %.0f ms [%s] %s", name, elapsed_ms, fingerprint, normalized[:500])
+
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    event.listen(engine, 'after_cursor_execute', after_cursor_execute)
+    return metrics
+
+
+def pool_snapshot(engines: Dict[str, object], slow_queries: int = 10) -> Dict:
+    """Métricas de cada engine instrumentado, por nome"""
+    return {
+        name: metrics_for(_instrumented.get(engine, name)).snapshot(engine.pool, slow_queries)
+        for name, engine in engines.items()
+    }
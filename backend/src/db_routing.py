@@ -0,0 +1,226 @@
+"""
+Roteamento das leituras para a réplica do Postgres.
+
+Views marcadas com ``@replica_reads`` (busca de postos, preços, históricos,
+estatísticas) consultam o bind ``replica`` (DATABASE_REPLICA_URL); todo o
+resto, e qualquer flush, continua no primário. ``RoutingSession`` é o
+``db.session`` do app e decide a cada consulta:
+
+- leitura de uma view ``@replica_reads`` -> réplica;
+- usuário que gravou algo nos últimos REPLICA_STICKY_SECONDS -> primário
+  (lê as próprias gravações mesmo com atraso de replicação). A marca fica no
+  Redis, compartilhada entre workers, com um cache local de reserva;
+- erro de conexão na réplica -> ela fica fora por REPLICA_RETRY_SECONDS e a
+  requisição é refeita no primário.
+
+Sem DATABASE_REPLICA_URL nada muda: tudo vai para o primário.
+"""
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+from typing import Callable, Dict, Optional
+
+from flask import current_app, g, has_request_context
+from flask_sqlalchemy.session import Session as FlaskSession
+from sqlalchemy import event, exc
+
+from src.services.ttl_cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+REPLICA_BIND = 'replica'
+STICKY_SECONDS = float(os.environ.get('REPLICA_STICKY_SECONDS', 5))
+RETRY_SECONDS = float(os.environ.get('REPLICA_RETRY_SECONDS', 30))
+STICKY_KEY_PREFIX = 'db_routing:wrote:'
+
+
+def replica_binds(replica_url: str) -> Dict:
+    """``SQLALCHEMY_BINDS`` com a réplica (vazio sem URL); o pool é configurado no create_app"""
+    if not replica_url:
+        return {}
+    return {REPLICA_BIND: replica_url}
+
+
+def _default_client():
+    from src.database import get_redis
+    return get_redis()
+
+
+class ReplicaRouter:
+    """Marcas de leitura das próprias gravações e saúde da réplica"""
+
+    def __init__(self, client: Callable = _default_client, sticky_seconds: float = STICKY_SECONDS,
+                 retry_seconds: float = RETRY_SECONDS, clock: Callable[[], float] = time.monotonic):
+        self.client = client
+        self.sticky_seconds = sticky_seconds
+        self.retry_seconds = retry_seconds
+        self.clock = clock
+        self.local_writes = TTLCache(sticky_seconds, 50000, clock=clock)
+        self.down_until = 0.0
+        self.counts = {'replica': 0, 'primary': 0, 'sticky': 0, 'fallback': 0}
+        self._lock = threading.Lock()
+
+    def count(self, kind: str):
+        with self._lock:
+            self.counts[kind] += 1
+
+    # --- Leitura das próprias gravações ---
+
+    def record_write(self, identity):
+        self.local_writes.set(str(identity), True)
+        client = self.client()
+        if client is None:
+            return
+        try:
+            client.set(f"{STICKY_KEY_PREFIX}{identity}", 1, px=int(self.sticky_seconds * 1000))
+        except Exception as e:
+            logger.error(f"Replica stickiness write error: {e}")
+
+    def wrote_recently(self, identity) -> bool:
+        if self.local_writes.get(str(identity)):
+            return True
+        client = self.client()
+        if client is None:
+            return False
+        try:
+            return bool(client.exists(f"{STICKY_KEY_PREFIX}{identity}"))
+        except Exception as e:
+            # Na dúvida, o primário sempre tem o dado mais novo
+            logger.error(f"Replica stickiness read error: {e}")
+            return True
+
+    # --- Saúde da réplica ---
+
+    def available(self) -> bool:
+        return self.clock() >= self.down_until
+
+    def mark_down(self, error):
+        if self.available():
+            logger.warning(f"Réplica indisponível por {self.retry_seconds:.0f}s, lendo do primário: {error}")
+        self.down_until = self.clock() + self.retry_seconds
+
+    def stats(self) -> Dict:
+        with self._lock:
+            counts = dict(self.counts)
+        return dict(counts, available=self.available(), sticky_seconds=self.sticky_seconds)
+
+
+replica_router = ReplicaRouter()
+
+
+def _database():
+    return current_app.extensions.get('sqlalchemy')
+
+
+def replica_enabled() -> bool:
+    database = _database()
+    return database is not None and REPLICA_BIND in database.engines
+
+
+def request_identity() -> Optional[str]:
+    """Usuário do JWT da requisição, se houver (token inválido conta como anônimo)"""
+    try:
+        from flask_jwt_extended import get_jwt_identity, verify_jwt_in_request
+        verify_jwt_in_request(optional=True)
+        return get_jwt_identity()
+    except Exception:
+        return None
+
+
+class RoutingSession(FlaskSession):
+    """Session do app: leituras das views ``@replica_reads`` vão para a réplica"""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        engine = super().get_bind(mapper, clause=clause, bind=bind, **kwargs)
+        if bind is None and self._reads_from_replica(engine, clause):
+            return self._db.engines[REPLICA_BIND]
+        return engine
+
+    def _reads_from_replica(self, engine, clause) -> bool:
+        if not has_request_context() or g.get('db_route') != REPLICA_BIND:
+            return False
+        if self._flushing or g.get('db_wrote') or getattr(clause, 'is_dml', False):
+            return False
+        engines = self._db.engines
+        # Só o bind padrão tem réplica; modelos com bind_key próprio ficam onde estão
+        if engine is not engines.get(None) or REPLICA_BIND not in engines:
+            return False
+        return replica_router.available()
+
+
+def _flushed(session, flush_context):
+    session.info['replica_sticky'] = True
+    if has_request_context():
+        g.db_wrote = True
+
+
+def _committed(session):
+    if session.info.pop('replica_sticky', False) and has_request_context():
+        identity = g.get('db_identity') or request_identity()
+        if identity is not None:
+            replica_router.record_write(identity)
+
+
+event.listen(RoutingSession, 'after_flush', _flushed)
+event.listen(RoutingSession, 'after_commit', _committed)
+event.listen(RoutingSession, 'after_soft_rollback',
+             lambda session, previous_transaction: session.info.pop('replica_sticky', None))
+
+
+def instrument_replica(engine):
+    """Erros de conexão na réplica tiram ela de rotação e pedem nova tentativa no primário"""
+    def handle_error(context):
+        if context.is_disconnect or isinstance(context.sqlalchemy_exception, exc.OperationalError):
+            replica_router.mark_down(context.original_exception)
+            if has_request_context():
+                g.db_replica_failed = True
+
+    event.listen(engine, 'handle_error', handle_error)
+
+
+def replica_reads(view):
+    """View só de leitura: consultas na réplica, salvo leitura das próprias gravações"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if g.get('db_route') == 'primary' or not replica_enabled():
+            return view(*args, **kwargs)
+
+        identity = g.db_identity = request_identity()
+        if identity is not None and replica_router.wrote_recently(identity):
+            replica_router.count('sticky')
+            g.db_route = 'primary'
+            return view(*args, **kwargs)
+
+        g.db_route = REPLICA_BIND if replica_router.available() else 'primary'
+        replica_router.count('replica' if g.db_route == REPLICA_BIND else 'primary')
+        try:
+            response = view(*args, **kwargs)
+        except Exception:
+            if not g.get('db_replica_failed'):
+                raise
+            response = None
+        if g.pop('db_replica_failed', False):
+            # A réplica caiu no meio da requisição: a leitura é refeita no primário
+            replica_router.count('fallback')
+            _database().session.rollback()
+            g.db_route = 'primary'
+            response = view(*args, **kwargs)
+        return response
+    return wrapper
+
+
+@contextmanager
+def primary_reads():
+    """Força o primário nas leituras feitas dentro do bloco"""
+    if not has_request_context():
+        yield
+        return
+    previous = g.get('db_route')
+    g.db_route = 'primary'
+    try:
+        yield
+    finally:
+        g.db_route = previous
@@ -1,4 +1,4 @@
-from flask import Flask, request, jsonify, send_from_directory, current_app
+from flask import Flask, request, jsonify, send_from_directory, current_app, g
 from flask_jwt_extended import (
     JWTManager, create_access_token, create_refresh_token,
     jwt_required, get_jwt_identity, get_jwt, verify_jwt_in_request
@@ -12,13 +12,39 @@ import json
 from database_postgres import db, init_database, test_connection, get_db_stats
 from config_consolidated import get_config, config_by_name
 from functools import wraps
+import hmac
+import importlib
+from serializers import FastJSONProvider
+from src.db_pool import configure_engines, instrument_engine, pool_snapshot
+from src.db_routing import REPLICA_BIND, instrument_replica, replica_router
 
 # Configuração do sistema
 sys.path.append(os.path.dirname(__file__))
 
+# Blueprints opcionais: (feature flag, módulo, blueprint, prefixo). O módulo
+# só é importado com a flag ligada; o prefixo None usa o do próprio blueprint.
+OPTIONAL_BLUEPRINTS = [
+    ('FEATURE_INTELLIGENCE_API', 'routes.intelligence_api', 'intelligence_bp', '/api/intelligence'),
+    ('FEATURE_PARTNER_API', 'routes.partner_api', 'partner_api_bp', None),
+    ('FEATURE_RATINGS_API', 'routes.ratings', 'ratings_bp', None),
+]
+
+def register_optional_blueprints(app):
+    """Registra os blueprints opcionais ligados na configuração"""
+    for flag, module_name, blueprint_name, url_prefix in OPTIONAL_BLUEPRINTS:
+        if not app.config.get(flag):
+            continue
+        try:
+            blueprint = getattr(importlib.import_module(module_name), blueprint_name)
+            app.register_blueprint(blueprint, url_prefix=url_prefix)
+        except Exception as e:
+            app.logger.error(f"Erro ao registrar {module_name} ({flag}): {e}")
+
 def create_app(config_name=None):
     """Factory function para criar a aplicação Flask"""
     app = Flask(__name__)
+    # JSON das respostas via orjson quando instalado (mesmo formato do provider padrão)
+    app.json = FastJSONProvider(app)
     
     # Configuração da aplicação
     if config_name:
@@ -34,7 +60,15 @@ def create_app(config_name=None):
     jwt = JWTManager(app)
     
     # Inicializar banco de dados PostgreSQL
+    # Pool dimensionado aqui, com WEB_CONCURRENCY/SERVING_CONCURRENCY do worker
+    configure_engines(app.config)
     db.init_app(app)
+    with app.app_context():
+        # Espera no checkout, churn de conexões e consultas lentas (src/db_pool.py)
+        instrument_engine(db.engine)
+        if REPLICA_BIND in db.engines:
+            instrument_engine(db.engines[REPLICA_BIND], REPLICA_BIND)
+            instrument_replica(db.engines[REPLICA_BIND])
     
     # Criar tabelas se não existirem (apenas em desenvolvimento)
     if app.config.get('ENV') == 'production':
@@ -81,6 +115,7 @@ def create_app(config_name=None):
     app.register_blueprint(auth_bp, url_prefix='/api/auth')
     app.register_blueprint(profile_bp, url_prefix='/api/profile')
     app.register_blueprint(gas_stations_bp, url_prefix='/api/gas-stations')
+    register_optional_blueprints(app)
     
     # Configuração do JWT
     @jwt.expired_token_loader
@@ -107,6 +142,17 @@ def create_app(config_name=None):
             'is_authenticated': False
         }), 401
 
+    from services.ttl_cache import TTLCache
+    refreshed_tokens = TTLCache(ttl_seconds=30 * 60, max_entries=50000)
+    
+    @app.after_request
+    def add_new_token_header(response):
+        new_token = g.get('new_token')
+        if new_token:
+            response.headers['X-New-Token'] = new_token
+            response.headers['Access-Control-Expose-Headers'] = 'X-New-Token'
+        return response
+    
     @app.before_request
     @jwt_required(optional=True)
     def check_token():
@@ -125,18 +171,15 @@ def create_app(config_name=None):
                 now = datetime.now(timezone.utc)
                 target_timestamp = datetime.timestamp(now + timedelta(minutes=30))
                 if target_timestamp > exp_timestamp:
-                    # Criar novo token
-                    identity = get_jwt_identity()
-                    new_token = create_access_token(identity=identity, fresh=False)
+                    # Um token novo por jti: as requisições seguintes com o mesmo token reaproveitam o emitido
+                    jti = get_jwt().get('jti')
+                    new_token = refreshed_tokens.get(jti)
+                    if new_token is None:
+                        new_token = create_access_token(identity=get_jwt_identity(), fresh=False)
+                        refreshed_tokens.set(jti, new_token)
                     
-                    # Adicionar novo token ao cabeçalho da resposta
-                    response = jsonify({
-                        'success': True,
-                        'message': 'Token atualizado',
-                        'new_token': new_token
-                    })
-                    response.headers['X-New-Token'] = new_token
-                    return response
+                    # Vai no cabeçalho da resposta da própria rota
+                    g.new_token = new_token
                     
         except Exception as e:
             return jsonify({
@@ -169,6 +212,19 @@ def create_app(config_name=None):
                 'database': 'PostgreSQL connection failed'
             }), 500
     
+    @app.route('/api/health/db-pool', methods=['GET'])
+    def db_pool_health():
+        # Sem METRICS_TOKEN configurado o endpoint fica desligado
+        token = app.config.get('METRICS_TOKEN')
+        if not token:
+            return jsonify({'success': False, 'error': 'Métricas desativadas'}), 404
+        if not hmac.compare_digest(request.headers.get('X-Metrics-Token', ''), token):
+            return jsonify({'success': False, 'error': 'Token de métricas inválido'}), 403
+        engines = {name or 'primary': engine for name, engine in db.engines.items()}
+        data = pool_snapshot(engines, slow_queries=request.args.get('slow', 10, type=int))
+        data['routing'] = replica_router.stats()
+        return jsonify({'success': True, 'data': data})
+    
     # Rota de registro
     @app.route('/api/auth/register', methods=['POST'])
     def register():
@@ -303,32 +359,53 @@ def create_app(config_name=None):
                 }), 400
             
             from models.gas_station import GasStation, FuelPrice
-            import math
-            
-            # Buscar postos com o combustível solicitado
-            fuel_prices = FuelPrice.query.filter_by(fuel_type=fuel_type).all()
+            import numpy as np
+            from services.scoring_engine import (
+                coordinates_of, resolve_weights, route_detour_km, score_candidates, top_k
+            )
+            from services.detour_time import detour_time_service
+            
+            try:
+                weights = resolve_weights(data.get('profile'), data.get('weights'))
+            except ValueError as e:
+                return jsonify({'success': False, 'error': str(e)}), 400
+            
+            # Buscar postos ativos com o combustível solicitado
+            fuel_prices = FuelPrice.query.filter_by(fuel_type=fuel_type).join(GasStation)\
+                .filter(GasStation.is_active == True).all()
+            
+            # Desvio real quando origem/destino vêm com coordenadas; endereço em texto deixa o desvio desconhecido
+            stations = [fuel_price.gas_station for fuel_price in fuel_prices]
+            latitudes = [float(station.latitude) for station in stations]
+            longitudes = [float(station.longitude) for station in stations]
+            origin_point, destination_point = coordinates_of(origin), coordinates_of(destination)
+            detours = route_detour_km(latitudes, longitudes, origin_point, destination_point)
+            
+            # Minutos de desvio pela Distance Matrix (em lote e com cache), ou estimados sem a API
+            detour_times = np.full(len(stations), np.nan)
+            if origin_point is not None and stations:
+                detour_times = detour_time_service.detour_minutes(
+                    origin_point, destination_point, [station.id for station in stations], latitudes, longitudes
+                )
+            
+            regional_average = 5.75  # Média regional simulada
+            estimated_fuel_needed = 50  # Litros estimados
+            prices = [float(fuel_price.price) for fuel_price in fuel_prices]
+            scores = score_candidates(
+                prices,
+                detour_km=detours,
+                detour_minutes=detour_times,
+                confidence=[float(fuel_price.source_confidence or 0.5) for fuel_price in fuel_prices],
+                reference_price=regional_average,
+                weights=weights
+            )
             
             recommendations = []
-            for fuel_price in fuel_prices:
-                station = fuel_price.gas_station
-                if not station.is_active:
-                    continue
-                
-                # Calcular distância simulada (em produção usaria Google Maps)
-                distance_from_route = abs(hash(station.name)) % 10 + 1  # 1-10 km
-                detour_time = distance_from_route * 2  # 2 min por km
-                
-                # Calcular economia estimada
-                regional_average = 5.75  # Média regional simulada
-                savings_per_liter = max(0, regional_average - fuel_price.price)
-                estimated_fuel_needed = 50  # Litros estimados
+            for index in top_k(scores, 5).tolist():
+                fuel_price, station = fuel_prices[index], stations[index]
+                savings_per_liter = max(0, regional_average - prices[index])
                 total_savings = savings_per_liter * estimated_fuel_needed
-                
-                # Calcular score (economia vs desvio)
-                if distance_from_route > 0:
-                    score = max(0, (savings_per_liter * 10) - (distance_from_route * 0.5))
-                else:
-                    score = savings_per_liter * 10
+                known_detour = not np.isnan(detours[index])
                 
                 recommendations.append({
                     'station': {
@@ -345,17 +422,14 @@ def create_app(config_name=None):
                         'last_updated': fuel_price.last_updated.isoformat() if fuel_price.last_updated else None
                     },
                     'route_info': {
-                        'distance_from_route': distance_from_route,
-                        'detour_time_minutes': detour_time,
+                        'distance_from_route': round(float(detours[index]), 2) if known_detour else None,
+                        'detour_time_minutes': round(float(detour_times[index]), 1) if known_detour else None,
                         'savings_per_liter': round(savings_per_liter, 2),
                         'estimated_total_savings': round(total_savings, 2)
                     },
-                    'score': round(score, 2)
+                    'score': round(float(scores[index]), 2)
                 })
             
-            # Ordenar por score (melhor primeiro)
-            recommendations.sort(key=lambda x: x['score'], reverse=True)
-            
             # Informações da rota
             route_info = {
                 'origin': origin,
@@ -368,8 +442,8 @@ def create_app(config_name=None):
             return jsonify({
                 'success': True,
                 'route': route_info,
-                'recommendations': recommendations[:5],  # Top 5
-                'total_found': len(recommendations)
+                'recommendations': recommendations,  # Top 5
+                'total_found': len(fuel_prices)
             })
             
         except Exception as e:
@@ -610,18 +684,19 @@ def create_app(config_name=None):
     
     return app
 
-# Criar a aplicação
-app = create_app(os.getenv('FLASK_CONFIG', 'production'))
+_app = None
 
-# Registrar APIs de inteligência de preços
-try:
-    from routes.intelligence_api import intelligence_bp
-    app.register_blueprint(intelligence_bp, url_prefix='/api/intelligence')
-    print("✅ APIs de inteligência de preços registradas")
-except Exception as e:
-    print(f"⚠️ Erro ao registrar APIs de inteligência: {e}")
+def __getattr__(name):
+    """``main.app`` criado só quando pedido: importar create_app não monta outra aplicação"""
+    global _app
+    if name == 'app':
+        if _app is None:
+            _app = create_app(os.getenv('FLASK_CONFIG', 'production'))
+        return _app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 if __name__ == '__main__':
+    app = create_app(os.getenv('FLASK_CONFIG', 'production'))
     port = int(os.environ.get('PORT', 8080))
     print(f"🚀 Iniciando Tanque Cheio API PostgreSQL na porta {port}")
     app.run(host='0.0.0.0', port=port)
@@ -12,6 +12,8 @@ import uuid
 from datetime import datetime, timedelta
 import traceback
 import math
+import numpy as np
+from src.services.scoring_engine import resolve_weights, route_detour_km, score_candidates, top_k
 
 DATABASE_PATH = "/tmp/tanque_cheio.db"
 
@@ -407,36 +409,39 @@ def create_app():
             stations = cur.fetchall()
             conn.close()
             
-            recommendations = []
+            try:
+                weights = resolve_weights(data.get('profile'), data.get('weights'))
+            except ValueError as e:
+                return jsonify({'success': False, 'error': str(e)}), 400
+            
+            direct_distance = calculate_distance(origin_coords, dest_coords)
+            latitudes = [station['latitude'] for station in stations]
+            longitudes = [station['longitude'] for station in stations]
+            
+            # Distância até o posto e desvio de todos os postos de uma vez
+            distances = route_detour_km(latitudes, longitudes, origin_coords)
+            detours = route_detour_km(latitudes, longitudes, origin_coords, dest_coords)
+            prices = np.array([station[fuel_column] for station in stations], dtype=float)
+            
+            # Máximo 10km de desvio; preço comparado com a média dos candidatos
+            candidates = np.flatnonzero(detours <= 10)
+            scores = score_candidates(
+                prices[candidates],
+                detour_km=detours[candidates],
+                reference_price=float(prices[candidates].mean()) if len(candidates) else None,
+                weights=weights
+            )
             
-            for station in stations:
-                # Calcular distância do posto à rota
-                station_coords = (station['latitude'], station['longitude'])
-                distance_to_station = calculate_distance(origin_coords, station_coords)
-                
-                # Calcular desvio
-                direct_distance = calculate_distance(origin_coords, dest_coords)
-                detour_distance = distance_to_station + calculate_distance(station_coords, dest_coords) - direct_distance
-                
-                if detour_distance <= 10:  # Máximo 10km de desvio
-                    fuel_price = station[fuel_column]
-                    
-                    # Calcular score (menor é melhor)
-                    price_score = fuel_price * 0.4
-                    distance_score = distance_to_station * 0.3
-                    detour_score = detour_distance * 0.3
-                    total_score = price_score + distance_score + detour_score
-                    
-                    recommendations.append({
-                        'station': dict(station),
-                        'fuel_price': fuel_price,
-                        'distance_km': round(distance_to_station, 2),
-                        'detour_km': round(detour_distance, 2),
-                        'score': round(total_score, 2)
-                    })
-            
-            # Ordenar por score
-            recommendations.sort(key=lambda x: x['score'])
+            recommendations = []
+            for position in top_k(scores, 5).tolist():
+                index = candidates[position]
+                recommendations.append({
+                    'station': dict(stations[index]),
+                    'fuel_price': stations[index][fuel_column],
+                    'distance_km': round(float(distances[index]), 2),
+                    'detour_km': round(float(detours[index]), 2),
+                    'score': round(float(scores[position]), 2)
+                })
             
             return jsonify({
                 'success': True,
@@ -446,8 +451,8 @@ def create_app():
                     'distance_km': round(direct_distance, 2),
                     'estimated_fuel_liters': round(direct_distance * 0.08, 2)
                 },
-                'recommendations': recommendations[:5],
-                'count': len(recommendations)
+                'recommendations': recommendations,
+                'count': len(candidates)
             }), 200
             
         except Exception as e:
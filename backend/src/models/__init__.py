@@ -5,6 +5,8 @@ from .partner import Partner
 from .route import Route, RouteRecommendation
 from .gps_tracking import GPSTracking, Notification
 from .coupon import Coupon
+from .user_stats import UserStats
+from .trip_summary import TripSummary
 
 __all__ = [
     'User', 'UserSession',
@@ -13,6 +15,8 @@ __all__ = [
     'Partner',
     'Route', 'RouteRecommendation',
     'GPSTracking', 'Notification',
-    'Coupon'
+    'Coupon',
+    'UserStats',
+    'TripSummary'
 ]
 
@@ -24,7 +24,8 @@ class Coupon(db.Model):
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     # Relacionamentos
-    gas_station = db.relationship('GasStation', backref='coupons')
+    # Sem backref: GasStation.coupons aponta para o Coupon de src.models.gas_station
+    gas_station = db.relationship('GasStation', viewonly=True)
     
     def to_dict(self):
         return {
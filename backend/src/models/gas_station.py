@@ -1,5 +1,6 @@
 from src.database import db
-from datetime import datetime, timezone
+from src.serializers import COUPON_SERIALIZER, FUEL_PRICE_SERIALIZER, STATION_SERIALIZER
+from datetime import datetime, timezone, timedelta
 import uuid
 import math
 
@@ -14,6 +15,7 @@ class GasStation(db.Model):
     city = db.Column(db.String(100), nullable=False, index=True)
     state = db.Column(db.String(2), nullable=False, index=True)
     postal_code = db.Column(db.String(10))
+    cnpj = db.Column(db.String(18), unique=True)  # migração 011
     latitude = db.Column(db.Numeric(10, 8), nullable=False, index=True)
     longitude = db.Column(db.Numeric(11, 8), nullable=False, index=True)
     phone = db.Column(db.String(20))
@@ -28,8 +30,8 @@ class GasStation(db.Model):
     
     # Relationships
     fuel_prices = db.relationship('FuelPrice', backref='gas_station', cascade='all, delete-orphan')
-    coupons = db.relationship('Coupon', backref='gas_station', cascade='all, delete-orphan')
-    notifications = db.relationship('Notification', backref='gas_station')
+    coupons = db.relationship('src.models.gas_station.Coupon', backref='gas_station', cascade='all, delete-orphan')
+    notifications = db.relationship('src.models.user_profile.Notification', backref='gas_station')
     
     # Constraints
     __table_args__ = (
@@ -119,26 +121,7 @@ class GasStation(db.Model):
     
     def to_dict(self, include_prices=False, include_coupons=False):
         """Convert gas station to dictionary"""
-        data = {
-            'id': self.id,
-            'name': self.name,
-            'brand': self.brand,
-            'address': self.address,
-            'city': self.city,
-            'state': self.state,
-            'postal_code': self.postal_code,
-            'latitude': float(self.latitude),
-            'longitude': float(self.longitude),
-            'phone': self.phone,
-            'operating_hours': self.operating_hours,
-            'amenities': self.amenities,
-            'partner_id': self.partner_id,
-            'data_source': self.data_source,
-            'data_confidence': float(self.data_confidence),
-            'is_active': self.is_active,
-            'created_at': self.created_at.isoformat() if self.created_at else None,
-            'updated_at': self.updated_at.isoformat() if self.updated_at else None
-        }
+        data = STATION_SERIALIZER.from_object(self)
         
         if include_prices:
             data['current_prices'] = [price.to_dict() for price in self.get_current_prices()]
@@ -148,6 +131,40 @@ class GasStation(db.Model):
         
         return data
     
+    @staticmethod
+    def current_prices_for(station_ids):
+        """Current active prices of many stations in one query, newest first per station"""
+        prices = {station_id: [] for station_id in station_ids}
+        if not prices:
+            return prices
+        cutoff_date = datetime.now(timezone.utc) - timedelta(days=7)
+        table = FuelPrice.__table__
+        rows = db.session.execute(
+            db.select(*FUEL_PRICE_SERIALIZER.select_columns(table))
+            .where(table.c.gas_station_id.in_(list(prices)), table.c.is_active == True,
+                   table.c.reported_at > cutoff_date)
+            .order_by(table.c.reported_at.desc())
+        )
+        for price in FUEL_PRICE_SERIALIZER.many(rows):
+            prices[price['gas_station_id']].append(price)
+        return prices
+    
+    @staticmethod
+    def active_coupons_for(station_ids):
+        """Active coupons of many stations in one query"""
+        coupons = {station_id: [] for station_id in station_ids}
+        if not coupons:
+            return coupons
+        table = Coupon.__table__
+        rows = db.session.execute(
+            db.select(*COUPON_SERIALIZER.select_columns(table))
+            .where(table.c.gas_station_id.in_(list(coupons)), table.c.is_active == True,
+                   table.c.valid_until > datetime.now(timezone.utc))
+        )
+        for coupon in COUPON_SERIALIZER.many(rows):
+            coupons[coupon['gas_station_id']].append(coupon)
+        return coupons
+    
     @staticmethod
     def find_nearby(latitude, longitude, radius_km=50, fuel_type=None, limit=20):
         """Find gas stations within radius"""
@@ -155,26 +172,33 @@ class GasStation(db.Model):
         lat_delta = radius_km / 111.0  # Approximate km per degree latitude
         lon_delta = radius_km / (111.0 * math.cos(math.radians(latitude)))
         
-        query = GasStation.query.filter(
-            GasStation.is_active == True,
-            GasStation.latitude.between(latitude - lat_delta, latitude + lat_delta),
-            GasStation.longitude.between(longitude - lon_delta, longitude + lon_delta)
+        # Column-only query: no ORM objects for the candidates
+        table = GasStation.__table__
+        rows = db.session.execute(
+            db.select(*STATION_SERIALIZER.select_columns(table)).where(
+                table.c.is_active == True,
+                table.c.latitude.between(latitude - lat_delta, latitude + lat_delta),
+                table.c.longitude.between(longitude - lon_delta, longitude + lon_delta)
+            ).limit(limit * 2)  # Get more to filter by exact distance
         )
         
-        stations = query.limit(limit * 2).all()  # Get more to filter by exact distance
-        
         # Calculate exact distances and filter
         nearby_stations = []
-        for station in stations:
-            distance = station.calculate_distance_to(latitude, longitude)
+        for station_dict in STATION_SERIALIZER.many(rows):
+            distance = GasStation._calculate_distance(
+                latitude, longitude, station_dict['latitude'], station_dict['longitude']
+            )
             if distance <= radius_km:
-                station_dict = station.to_dict(include_prices=True)
                 station_dict['distance_km'] = round(distance, 2)
                 nearby_stations.append(station_dict)
         
-        # Sort by distance and limit results
+        # Sort by distance and limit results, then load prices for the kept stations at once
         nearby_stations.sort(key=lambda x: x['distance_km'])
-        return nearby_stations[:limit]
+        nearby_stations = nearby_stations[:limit]
+        prices = GasStation.current_prices_for([station['id'] for station in nearby_stations])
+        for station_dict in nearby_stations:
+            station_dict['current_prices'] = prices[station_dict['id']]
+        return nearby_stations
     
     @staticmethod
     def find_cheapest_nearby(latitude, longitude, fuel_type, radius_km=50, limit=10):
@@ -182,14 +206,15 @@ class GasStation(db.Model):
         nearby_stations = GasStation.find_nearby(latitude, longitude, radius_km, fuel_type, limit * 2)
         
         # Filter stations that have the requested fuel type and add price info
+        # (current_prices is newest first, same as get_price_for_fuel)
         stations_with_prices = []
         for station_data in nearby_stations:
-            station = GasStation.query.get(station_data['id'])
-            price = station.get_price_for_fuel(fuel_type)
+            price = next((price for price in station_data['current_prices']
+                          if price['fuel_type'] == fuel_type), None)
             
             if price:
-                station_data['fuel_price'] = price.to_dict()
-                station_data['price_per_liter'] = float(price.price)
+                station_data['fuel_price'] = price
+                station_data['price_per_liter'] = price['price']
                 stations_with_prices.append(station_data)
         
         # Sort by price and return top results
@@ -217,7 +242,7 @@ class FuelPrice(db.Model):
     updated_at = db.Column(db.DateTime(timezone=True), default=datetime.now, onupdate=datetime.now)
     
     # Relationships
-    notifications = db.relationship('Notification', backref='fuel_price')
+    notifications = db.relationship('src.models.user_profile.Notification', backref='fuel_price')
     price_reports = db.relationship('PriceReport', backref='fuel_price', cascade='all, delete-orphan')
     
     # Constraints
@@ -227,6 +252,8 @@ class FuelPrice(db.Model):
         db.CheckConstraint(source_confidence >= 0),
         db.CheckConstraint(source_confidence <= 1),
         db.Index('idx_fuel_prices_station_fuel', 'gas_station_id', 'fuel_type'),
+        db.Index('idx_fuel_prices_station_reported_id', 'gas_station_id', 'reported_at', 'id'),
+        db.Index('idx_fuel_prices_station_fuel_reported', 'gas_station_id', 'fuel_type', 'reported_at'),
     )
     
     def __init__(self, gas_station_id, fuel_type, price, source, reported_at=None, **kwargs):
@@ -265,22 +292,7 @@ class FuelPrice(db.Model):
     
     def to_dict(self):
         """Convert fuel price to dictionary"""
-        return {
-            'id': self.id,
-            'gas_station_id': self.gas_station_id,
-            'fuel_type': self.fuel_type,
-            'fuel_type_display': self.get_fuel_type_display(),
-            'price': float(self.price),
-            'source': self.source,
-            'source_confidence': float(self.source_confidence),
-            'reported_at': self.reported_at.isoformat() if self.reported_at else None,
-            'verified_at': self.verified_at.isoformat() if self.verified_at else None,
-            'verified_by': self.verified_by,
-            'is_active': self.is_active,
-            'is_recent': self.is_recent(),
-            'created_at': self.created_at.isoformat() if self.created_at else None,
-            'updated_at': self.updated_at.isoformat() if self.updated_at else None
-        }
+        return FUEL_PRICE_SERIALIZER.from_object(self)
     
     def __repr__(self):
         return f'<FuelPrice {self.fuel_type} at {self.price} for Station {self.gas_station_id}>'
@@ -371,25 +383,7 @@ class Coupon(db.Model):
     
     def to_dict(self):
         """Convert coupon to dictionary"""
-        return {
-            'id': self.id,
-            'gas_station_id': self.gas_station_id,
-            'code': self.code,
-            'title': self.title,
-            'description': self.description,
-            'discount_type': self.discount_type,
-            'discount_value': float(self.discount_value),
-            'fuel_types': self.fuel_types,
-            'min_liters': float(self.min_liters) if self.min_liters else None,
-            'min_amount': float(self.min_amount) if self.min_amount else None,
-            'valid_from': self.valid_from.isoformat() if self.valid_from else None,
-            'valid_until': self.valid_until.isoformat() if self.valid_until else None,
-            'max_uses': self.max_uses,
-            'current_uses': self.current_uses,
-            'remaining_uses': (self.max_uses - self.current_uses) if self.max_uses else None,
-            'is_active': self.is_active,
-            'created_at': self.created_at.isoformat() if self.created_at else None
-        }
+        return COUPON_SERIALIZER.from_object(self)
     
     def __repr__(self):
         return f'<Coupon {self.code} for Station {self.gas_station_id}>'
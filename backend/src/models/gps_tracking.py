@@ -1,11 +1,15 @@
 from src.database import db
+from src.serializers import NOTIFICATION_SERIALIZER
 from datetime import datetime, timezone
 import uuid
 
 class GPSTracking(db.Model):
     __tablename__ = 'gps_tracking'
-    __table_args__ = {'extend_existing': True}
-    __table_args__ = {'extend_existing': True}
+    __table_args__ = (
+        # Cobre o agrupamento por viagem do histórico paginado por cursor
+        db.Index('idx_gps_user_trip_timestamp', 'user_id', 'trip_id', 'timestamp'),
+        {'extend_existing': True}
+    )
     
     id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     user_id = db.Column(db.String(36), db.ForeignKey('users.id'), nullable=False, index=True)
@@ -68,8 +72,11 @@ class GPSTracking(db.Model):
 
 class Notification(db.Model):
     __tablename__ = 'notifications'
-    __table_args__ = {'extend_existing': True}
-    __table_args__ = {'extend_existing': True}
+    __table_args__ = (
+        # Chave da paginação por cursor (created_at, id) por usuário
+        db.Index('idx_notifications_user_created_id', 'user_id', 'created_at', 'id'),
+        {'extend_existing': True}
+    )
     
     id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     user_id = db.Column(db.String(36), db.ForeignKey('users.id'), nullable=False, index=True)
@@ -103,13 +110,19 @@ class Notification(db.Model):
     def mark_as_read(self):
         """Mark notification as read"""
         if not self.is_read:
+            from src.services.user_stats_service import increment_counters
+            
             self.is_read = True
             self.read_at = datetime.now(timezone.utc)
+            increment_counters(self.user_id, notifications_unread=-1)
             db.session.commit()
     
     def mark_as_clicked(self):
         """Mark notification as clicked"""
         if not self.is_clicked:
+            from src.services.user_stats_service import increment_counters
+            
+            deltas = {'notifications_clicked': 1}
             self.is_clicked = True
             self.clicked_at = datetime.now(timezone.utc)
             
@@ -117,32 +130,21 @@ class Notification(db.Model):
             if not self.is_read:
                 self.is_read = True
                 self.read_at = datetime.now(timezone.utc)
+                deltas['notifications_unread'] = -1
             
+            increment_counters(self.user_id, **deltas)
             db.session.commit()
     
     def to_dict(self):
         """Convert notification to dictionary"""
-        return {
-            'id': self.id,
-            'user_id': self.user_id,
-            'gas_station_id': self.gas_station_id,
-            'fuel_type': self.fuel_type,
-            'price': float(self.price),
-            'distance_km': float(self.distance_km),
-            'message': self.message,
-            'latitude': float(self.latitude),
-            'longitude': float(self.longitude),
-            'is_read': self.is_read,
-            'is_clicked': self.is_clicked,
-            'read_at': self.read_at.isoformat() if self.read_at else None,
-            'clicked_at': self.clicked_at.isoformat() if self.clicked_at else None,
-            'created_at': self.created_at.isoformat() if self.created_at else None
-        }
+        return NOTIFICATION_SERIALIZER.from_object(self)
     
     @staticmethod
     def get_unread_count(user_id):
         """Get count of unread notifications for user"""
-        return Notification.query.filter_by(user_id=user_id, is_read=False).count()
+        from src.services.user_stats_service import get_user_stats
+        
+        return get_user_stats(user_id).notifications_unread
     
     @staticmethod
     def get_recent_notifications(user_id, limit=10):
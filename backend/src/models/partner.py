@@ -1,4 +1,5 @@
 from src.database import db
+from src.services.auth_cache import auth_cache
 from datetime import datetime, timezone
 import uuid
 import secrets
@@ -36,8 +37,10 @@ class Partner(db.Model):
     
     def regenerate_api_key(self):
         """Regenerate API key"""
+        old_api_key = self.api_key
         self.api_key = self.generate_api_key()
         db.session.commit()
+        auth_cache.partner_changed(old_api_key)
         return self.api_key
     
     def is_api_key_valid(self):
@@ -54,16 +57,19 @@ class Partner(db.Model):
         """Deactivate partner account"""
         self.is_active = False
         db.session.commit()
+        auth_cache.partner_changed(self.api_key)
     
     def activate(self):
         """Activate partner account"""
         self.is_active = True
         db.session.commit()
+        auth_cache.partner_changed(self.api_key)
     
     def update_rate_limit(self, new_limit):
         """Update rate limit"""
         self.rate_limit_per_hour = new_limit
         db.session.commit()
+        auth_cache.partner_changed(self.api_key)
     
     def to_dict(self, include_sensitive=False):
         """Convert partner to dictionary"""
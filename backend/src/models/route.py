@@ -1,6 +1,9 @@
 from src.database import db
 from datetime import datetime, timezone
 import uuid
+import numpy as np
+from src.services.refuel_planner import plan_refuel
+from src.services.scoring_engine import resolve_weights, score_candidates
 
 class Route(db.Model):
     __tablename__ = 'routes'
@@ -19,6 +22,8 @@ class Route(db.Model):
     estimated_fuel_needed = db.Column(db.Numeric(6, 2))
     route_polyline = db.Column(db.Text)  # Encoded polyline from Google Maps
     preferences = db.Column(db.JSON)
+    route_key = db.Column(db.String(64), index=True)  # migração 015: células origem/destino + combustível
+    fuel_type = db.Column(db.String(20))
     created_at = db.Column(db.DateTime(timezone=True), default=datetime.now)
     
     # Relationships
@@ -45,6 +50,31 @@ class Route(db.Model):
         
         return float(self.estimated_fuel_needed)
     
+    def plan_refuel(self, tank_capacity, initial_fuel, vehicle_efficiency=12.0, reserve=0.0, stop_penalty=0.0):
+        """Plan the cheapest refuel stops among this route's recommendations"""
+        fuel_needed = self.calculate_fuel_consumption(vehicle_efficiency)
+        distance = float(self.distance_km)
+        candidates = [r for r in self.recommendations if r.fuel_price]
+        
+        plan = plan_refuel(
+            along_km=[float(r.position_on_route or 0) * distance for r in candidates],
+            prices=[float(r.fuel_price.price) for r in candidates],
+            detour_km=[float(r.detour_distance_km) for r in candidates],
+            route_km=distance,
+            tank_capacity=tank_capacity,
+            consumption_per_100km=fuel_needed / distance * 100 if distance else vehicle_efficiency,
+            initial_fuel=initial_fuel,
+            reserve=reserve,
+            stop_penalty=stop_penalty
+        )
+        
+        data = plan.to_dict()
+        for stop, plan_stop in zip(data['stops'], plan.stops):
+            recommendation = candidates[plan_stop.index]
+            stop['route_recommendation_id'] = recommendation.id
+            stop['gas_station_id'] = recommendation.gas_station_id
+        return data
+    
     def get_recommendations_by_score(self, limit=10):
         """Get route recommendations ordered by score"""
         return RouteRecommendation.query.filter_by(route_id=self.id)\
@@ -95,6 +125,7 @@ class RouteRecommendation(db.Model):
     savings_amount = db.Column(db.Numeric(6, 2))
     recommendation_score = db.Column(db.Numeric(4, 2))
     position_on_route = db.Column(db.Numeric(4, 2))  # 0.0 to 1.0
+    scored_price = db.Column(db.Numeric(6, 3))  # migração 015: preço usado no score
     created_at = db.Column(db.DateTime(timezone=True), default=datetime.now)
     
     # Relationships
@@ -111,43 +142,43 @@ class RouteRecommendation(db.Model):
             if hasattr(self, key):
                 setattr(self, key, value)
     
-    def calculate_score(self, price_weight=0.4, distance_weight=0.3, time_weight=0.2, reliability_weight=0.1):
+    def calculate_score(self, profile=None, weights=None):
         """Calculate recommendation score based on multiple factors"""
-        # Get fuel price and gas station data
-        fuel_price = self.fuel_price
-        gas_station = self.gas_station
-        
-        if not fuel_price or not gas_station:
+        if not self.fuel_price or not self.gas_station:
             return 0.0
         
-        # Price score (lower price = higher score)
-        # Normalize price between 0-10 (assuming price range 3.00-8.00)
-        price_score = max(0, 10 - (float(fuel_price.price) - 3.0) * 2)
-        
-        # Distance score (shorter detour = higher score)
-        # Normalize detour distance (0-5km range)
-        distance_score = max(0, 10 - float(self.detour_distance_km) * 2)
-        
-        # Time score (less time = higher score)
-        time_score = 10
-        if self.detour_time_minutes:
-            time_score = max(0, 10 - (self.detour_time_minutes / 5))
-        
-        # Reliability score based on data confidence and source
-        reliability_score = float(fuel_price.source_confidence) * 10
-        if gas_station.data_confidence:
-            reliability_score = (reliability_score + float(gas_station.data_confidence) * 10) / 2
-        
-        # Calculate weighted score
-        total_score = (
-            price_score * price_weight +
-            distance_score * distance_weight +
-            time_score * time_weight +
-            reliability_score * reliability_weight
+        RouteRecommendation.score_recommendations([self], profile, weights)
+        return self.recommendation_score
+    
+    @staticmethod
+    def score_recommendations(recommendations, profile=None, weights=None):
+        """Score a batch of recommendations at once with the shared scoring engine"""
+        recommendations = [r for r in recommendations if r.fuel_price and r.gas_station]
+        if not recommendations:
+            return []
+        
+        # Route preferences act as the user's weight profile
+        preferences = (recommendations[0].route.preferences if recommendations[0].route else None) or {}
+        weight_vector = resolve_weights(profile or preferences.get('profile'), weights or preferences.get('weights'))
+        
+        # Reliability combines source and station confidence
+        confidence = np.nanmean(np.array([
+            [float(r.fuel_price.source_confidence) if r.fuel_price.source_confidence is not None else np.nan,
+             float(r.gas_station.data_confidence) if r.gas_station.data_confidence else np.nan]
+            for r in recommendations
+        ]), axis=1)
+        
+        scores = score_candidates(
+            prices=[float(r.fuel_price.price) for r in recommendations],
+            detour_km=[float(r.detour_distance_km) for r in recommendations],
+            detour_minutes=[r.detour_time_minutes if r.detour_time_minutes else np.nan for r in recommendations],
+            confidence=confidence,
+            weights=weight_vector
         )
         
-        self.recommendation_score = round(total_score, 2)
-        return self.recommendation_score
+        for recommendation, score in zip(recommendations, scores.tolist()):
+            recommendation.recommendation_score = round(score, 2)
+        return recommendations
     
     def calculate_savings(self, reference_price, fuel_needed):
         """Calculate potential savings compared to reference price"""
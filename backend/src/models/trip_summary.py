@@ -0,0 +1,39 @@
+from src.database import db
+from datetime import datetime
+
+class TripSummary(db.Model):
+    """Resumo de uma viagem (uma linha por viagem), mantido a cada ponto GPS"""
+    __tablename__ = 'gps_trip_summaries'
+    __table_args__ = (
+        # Paginação por cursor de /api/profile/trips (fim) e /api/gps/trip-history (início)
+        db.Index('idx_trip_summaries_user_end', 'user_id', 'end_time', 'trip_id'),
+        db.Index('idx_trip_summaries_user_start', 'user_id', 'start_time', 'trip_id'),
+        {'extend_existing': True}
+    )
+
+    user_id = db.Column(db.String(36), db.ForeignKey('users.id'), primary_key=True)
+    trip_id = db.Column(db.String(36), primary_key=True)
+    start_time = db.Column(db.DateTime(timezone=True), nullable=False, default=datetime.now)
+    end_time = db.Column(db.DateTime(timezone=True), nullable=False, default=datetime.now)
+    points_count = db.Column(db.Integer, nullable=False, default=0)
+    total_distance_km = db.Column(db.Numeric(10, 3), nullable=False, default=0)
+
+    @property
+    def duration_minutes(self):
+        if not self.start_time or not self.end_time:
+            return None
+        return int((self.end_time - self.start_time).total_seconds() / 60)
+
+    def to_dict(self):
+        """Convert trip summary to dictionary"""
+        return {
+            'trip_id': self.trip_id,
+            'points_count': self.points_count,
+            'start_time': self.start_time.isoformat() if self.start_time else None,
+            'end_time': self.end_time.isoformat() if self.end_time else None,
+            'total_distance_km': float(self.total_distance_km) if self.total_distance_km else 0.0,
+            'duration_minutes': self.duration_minutes
+        }
+
+    def __repr__(self):
+        return f'<TripSummary {self.trip_id} for User {self.user_id}>'
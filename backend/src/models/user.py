@@ -18,6 +18,7 @@ class User(db.Model):
     password_reset_token = db.Column(db.String(255))
     password_reset_expires = db.Column(db.DateTime(timezone=True))
     last_login = db.Column(db.DateTime(timezone=True))
+    sessions_revoked_before = db.Column(db.DateTime(timezone=True))  # marca do logout-all (session_writer)
     is_active = db.Column(db.Boolean, default=True, index=True)
     created_at = db.Column(db.DateTime(timezone=True), default=datetime.now)
     updated_at = db.Column(db.DateTime(timezone=True), default=datetime.now, onupdate=datetime.now)
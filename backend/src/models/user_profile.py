@@ -21,9 +21,11 @@ class UserProfile(db.Model):
     created_at = db.Column(db.DateTime(timezone=True), default=datetime.now)
     updated_at = db.Column(db.DateTime(timezone=True), default=datetime.now, onupdate=datetime.now)
     
-    # Relationships
-    gps_tracking = db.relationship('GPSTracking', backref='user_profile', cascade='all, delete-orphan')
-    notifications = db.relationship('Notification', backref='user_profile', cascade='all, delete-orphan')
+    # Relationships (caminho completo: src.models.gps_tracking declara classes com os mesmos nomes)
+    gps_tracking = db.relationship('src.models.user_profile.GPSTracking', backref='user_profile',
+                                   cascade='all, delete-orphan')
+    notifications = db.relationship('src.models.user_profile.Notification', backref='user_profile',
+                                    cascade='all, delete-orphan')
     routes = db.relationship('Route', backref='user_profile', cascade='all, delete-orphan')
     
     # Fuel type constraints
@@ -137,7 +139,11 @@ class UserProfile(db.Model):
 
 class GPSTracking(db.Model):
     __tablename__ = 'gps_tracking'
-    __table_args__ = {'extend_existing': True}
+    __table_args__ = (
+        db.Index('idx_gps_profile_recorded_id', 'user_profile_id', 'recorded_at', 'id'),
+        db.Index('idx_gps_profile_trip_recorded', 'user_profile_id', 'trip_id', 'recorded_at'),
+        {'extend_existing': True}
+    )
     
     id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     user_profile_id = db.Column(db.String(36), db.ForeignKey('user_profiles.id'), nullable=False)
@@ -181,7 +187,10 @@ class GPSTracking(db.Model):
 
 class Notification(db.Model):
     __tablename__ = 'notifications'
-    __table_args__ = {'extend_existing': True}
+    __table_args__ = (
+        db.Index('idx_notifications_profile_sent_id', 'user_profile_id', 'sent_at', 'id'),
+        {'extend_existing': True}
+    )
     
     id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     user_profile_id = db.Column(db.String(36), db.ForeignKey('user_profiles.id'), nullable=False)
@@ -208,16 +217,24 @@ class Notification(db.Model):
     def mark_as_read(self):
         """Mark notification as read"""
         if not self.read_at:
+            from src.services.user_stats_service import increment_counters
+            
             self.read_at = datetime.now(timezone.utc)
+            increment_counters(self.user_profile.user_id, notifications_unread=-1)
             db.session.commit()
     
     def mark_as_clicked(self):
         """Mark notification as clicked"""
         if not self.clicked_at:
+            from src.services.user_stats_service import increment_counters
+            
+            deltas = {'notifications_clicked': 1}
             self.clicked_at = datetime.now(timezone.utc)
             # Also mark as read if not already
             if not self.read_at:
                 self.read_at = self.clicked_at
+                deltas['notifications_unread'] = -1
+            increment_counters(self.user_profile.user_id, **deltas)
             db.session.commit()
     
     def is_read(self):
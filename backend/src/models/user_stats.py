@@ -0,0 +1,74 @@
+from src.database import db
+from datetime import datetime, timezone
+
+class UserStats(db.Model):
+    """Contadores agregados por usuário (read-model das estatísticas)"""
+    __tablename__ = 'user_stats'
+    __table_args__ = {'extend_existing': True}
+
+    # Campos mantidos incrementalmente pelas rotinas de escrita
+    COUNTER_FIELDS = (
+        'notifications_total',
+        'notifications_unread',
+        'notifications_clicked',
+        'gps_points_total',
+        'trips_total'
+    )
+
+    user_id = db.Column(db.String(36), db.ForeignKey('users.id'), primary_key=True)
+    notifications_total = db.Column(db.Integer, nullable=False, default=0)
+    notifications_unread = db.Column(db.Integer, nullable=False, default=0)
+    notifications_clicked = db.Column(db.Integer, nullable=False, default=0)
+    gps_points_total = db.Column(db.Integer, nullable=False, default=0)
+    trips_total = db.Column(db.Integer, nullable=False, default=0)
+    reconciled_at = db.Column(db.DateTime(timezone=True))
+    updated_at = db.Column(db.DateTime(timezone=True), default=datetime.now)
+
+    def __init__(self, user_id, **kwargs):
+        self.user_id = user_id
+        for field in self.COUNTER_FIELDS:
+            setattr(self, field, 0)
+
+        for key, value in kwargs.items():
+            if hasattr(self, key):
+                setattr(self, key, value)
+
+        self.updated_at = datetime.now(timezone.utc)
+
+    @property
+    def notifications_read(self):
+        """Notificações lidas (derivado de total - não lidas)"""
+        return max(0, self.notifications_total - self.notifications_unread)
+
+    @property
+    def click_rate(self):
+        """Taxa de cliques em percentual"""
+        if not self.notifications_total:
+            return 0
+        return round(self.notifications_clicked / self.notifications_total * 100, 2)
+
+    @property
+    def read_rate(self):
+        """Taxa de leitura em percentual"""
+        if not self.notifications_total:
+            return 0
+        return round(self.notifications_read / self.notifications_total * 100, 2)
+
+    def to_dict(self):
+        """Convert counters to dictionary"""
+        return {
+            'user_id': self.user_id,
+            'notifications_total': self.notifications_total,
+            'notifications_unread': self.notifications_unread,
+            'notifications_read': self.notifications_read,
+            'notifications_clicked': self.notifications_clicked,
+            'click_rate': self.click_rate,
+            'read_rate': self.read_rate,
+            'gps_points_total': self.gps_points_total,
+            'trips_total': self.trips_total,
+            'reconciled_at': self.reconciled_at.isoformat() if self.reconciled_at else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
+
+    def __repr__(self):
+        return f'<UserStats for User {self.user_id}>'
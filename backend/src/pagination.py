@@ -0,0 +1,123 @@
+"""
+Paginação por cursor (keyset) para os endpoints de histórico.
+
+Em vez de OFFSET, cada página filtra pelos valores da chave de ordenação do
+último item retornado, de modo que o custo de uma página não cresce com a
+profundidade. O cursor é opaco para o cliente: JSON compactado em base64
+url-safe com os valores da chave.
+"""
+import base64
+import json
+from datetime import datetime
+from decimal import Decimal
+from typing import Any, List, Optional, Sequence, Tuple
+from sqlalchemy import and_, or_
+
+DEFAULT_PER_PAGE = 20
+MAX_PER_PAGE = 100
+
+
+class InvalidCursorError(ValueError):
+    """Cursor malformado ou adulterado"""
+
+
+def _encode_value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return {'dt': value.isoformat()}
+    if isinstance(value, Decimal):
+        return {'dec': str(value)}
+    return value
+
+
+def _decode_value(value: Any) -> Any:
+    if isinstance(value, dict):
+        if 'dt' in value:
+            return datetime.fromisoformat(value['dt'])
+        if 'dec' in value:
+            return Decimal(value['dec'])
+        raise InvalidCursorError('Cursor inválido')
+    return value
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    """Gera um cursor opaco a partir dos valores da chave de ordenação"""
+    payload = json.dumps([_encode_value(v) for v in values], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str, size: int) -> List[Any]:
+    """Decodifica um cursor gerado por encode_cursor"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+    except (ValueError, UnicodeDecodeError):
+        raise InvalidCursorError('Cursor inválido')
+
+    if not isinstance(values, list) or len(values) != size:
+        raise InvalidCursorError('Cursor inválido')
+
+    try:
+        return [_decode_value(v) for v in values]
+    except (TypeError, ValueError):
+        raise InvalidCursorError('Cursor inválido')
+
+
+def get_page_args(args, default: int = DEFAULT_PER_PAGE, maximum: int = MAX_PER_PAGE) -> Tuple[Optional[str], int]:
+    """Lê ``cursor`` e ``per_page`` dos parâmetros da requisição"""
+    per_page = args.get('per_page', default, type=int) or default
+    return args.get('cursor') or None, max(1, min(per_page, maximum))
+
+
+def keyset_filter(keys: Sequence, values: Sequence[Any]):
+    """
+    Condição "depois do cursor" para ordenação descendente em todas as chaves:
+    (k1 < v1) OR (k1 = v1 AND k2 < v2) OR ...
+
+    Expandida em vez de comparação de tuplas para funcionar em qualquer banco
+    e continuar aproveitando o índice composto da chave.
+    """
+    clauses = []
+    for i, (key, value) in enumerate(zip(keys, values)):
+        equals = [k == v for k, v in zip(keys[:i], values[:i])]
+        clauses.append(and_(*equals, key < value))
+    return or_(*clauses)
+
+
+def keyset_paginate(query, keys: Sequence, cursor: Optional[str], per_page: int,
+                    key_values=None, having: bool = False) -> Tuple[list, Optional[str]]:
+    """
+    Aplica paginação por cursor a ``query``.
+
+    ``keys`` são as expressões de ordenação (descendentes, a última deve ser
+    única, ex.: id). ``key_values`` extrai os valores da chave de um item
+    retornado (padrão: atributos com o nome de cada coluna). Com ``having``
+    o filtro vai para o HAVING, para chaves agregadas em consultas agrupadas.
+
+    Retorna os itens da página e o cursor da próxima página (ou None).
+    """
+    if cursor:
+        condition = keyset_filter(keys, decode_cursor(cursor, len(keys)))
+        query = query.having(condition) if having else query.filter(condition)
+
+    items = query.order_by(*[key.desc() for key in keys]).limit(per_page + 1).all()
+
+    next_cursor = None
+    if len(items) > per_page:
+        items = items[:per_page]
+        last = items[-1]
+        if key_values:
+            values = key_values(last)
+        else:
+            values = [getattr(last, key.key) for key in keys]
+        next_cursor = encode_cursor(values)
+
+    return items, next_cursor
+
+
+def pagination_info(per_page: int, next_cursor: Optional[str]) -> dict:
+    """Bloco ``pagination`` padrão das respostas paginadas por cursor"""
+    return {
+        'per_page': per_page,
+        'next_cursor': next_cursor,
+        'has_next': next_cursor is not None
+    }
@@ -4,8 +4,10 @@ from flask_jwt_extended import (
     get_jwt_identity, get_jwt, verify_jwt_in_request
 )
 from src.database import db, blacklist_token, is_token_blacklisted, check_rate_limit
-from src.models.user import User, UserSession
+from src.models.user import User
 from src.models.user_profile import UserProfile
+from src.services.auth_cache import auth_cache
+from src.services.session_writer import serialize_session, session_writer
 from datetime import datetime, timezone, timedelta
 import hashlib
 import uuid
@@ -88,21 +90,12 @@ def register():
         # Generate tokens
         tokens = user.generate_tokens()
         
-        # Create session
-        access_token_hash = hash_token(tokens['access_token'])
-        refresh_token_hash = hash_token(tokens['refresh_token'])
+        # Create session (gravação em lote)
         expires_at = datetime.now(timezone.utc) + current_app.config['JWT_ACCESS_TOKEN_EXPIRES']
-        
-        session = UserSession(
-            user_id=user.id,
-            token_hash=access_token_hash,
-            refresh_token_hash=refresh_token_hash,
-            expires_at=expires_at,
-            device_info=request.headers.get('User-Agent'),
-            ip_address=client_ip
+        session_writer.record_login(
+            db.engine, user.id, tokens['access_token'], tokens['refresh_token'], expires_at,
+            user_agent=request.headers.get('User-Agent'), ip_address=client_ip, update_last_login=False
         )
-        db.session.add(session)
-        db.session.commit()
         
         return jsonify({
             'success': True,
@@ -172,27 +165,15 @@ def login():
                 'error': 'Conta desativada'
             }), 401
         
-        # Update last login
-        user.update_last_login()
-        
         # Generate tokens
         tokens = user.generate_tokens()
         
-        # Create session
-        access_token_hash = hash_token(tokens['access_token'])
-        refresh_token_hash = hash_token(tokens['refresh_token'])
+        # Sessão e last_login vão para a fila de gravação em lote (services/session_writer.py)
         expires_at = datetime.now(timezone.utc) + current_app.config['JWT_ACCESS_TOKEN_EXPIRES']
-        
-        session = UserSession(
-            user_id=user.id,
-            token_hash=access_token_hash,
-            refresh_token_hash=refresh_token_hash,
-            expires_at=expires_at,
-            device_info=request.headers.get('User-Agent'),
-            ip_address=client_ip
+        session_writer.record_login(
+            db.engine, user.id, tokens['access_token'], tokens['refresh_token'], expires_at,
+            user_agent=request.headers.get('User-Agent'), ip_address=client_ip
         )
-        db.session.add(session)
-        db.session.commit()
         
         # Get user profile
         profile = UserProfile.find_by_user_id(user.id)
@@ -221,6 +202,13 @@ def refresh():
     try:
         current_user_id = get_jwt_identity()
         
+        # Clientes em laço de refresh não chegam ao banco
+        if check_rate_limit(f"refresh:{current_user_id}", 60, 3600):  # 60 renovações por hora
+            return jsonify({
+                'success': False,
+                'error': 'Muitas renovações de token. Tente novamente mais tarde.'
+            }), 429
+        
         # Get user
         user = User.query.get(current_user_id)
         if not user or not user.is_active:
@@ -268,19 +256,12 @@ def logout():
         # Blacklist current token
         expires_in = current_app.config['JWT_ACCESS_TOKEN_EXPIRES'].total_seconds()
         blacklist_token(jti, int(expires_in))
+        auth_cache.token_revoked(jti)
         
         # Deactivate current session
         access_token = request.headers.get('Authorization', '').replace('Bearer ', '')
         if access_token:
-            token_hash = hash_token(access_token)
-            session = UserSession.query.filter_by(
-                user_id=current_user_id,
-                token_hash=token_hash,
-                is_active=True
-            ).first()
-            
-            if session:
-                session.revoke()
+            session_writer.revoke(db.engine, current_user_id, token_hash=hash_token(access_token))
         
         return jsonify({
             'success': True,
@@ -301,8 +282,8 @@ def logout_all():
     try:
         current_user_id = get_jwt_identity()
         
-        # Revoke all user sessions
-        UserSession.revoke_user_sessions(current_user_id)
+        # Revoke all user sessions (inclusive as ainda na fila de gravação)
+        session_writer.revoke(db.engine, current_user_id)
         
         return jsonify({
             'success': True,
@@ -356,16 +337,13 @@ def get_user_sessions():
     try:
         current_user_id = get_jwt_identity()
         
-        # Get active sessions
-        sessions = UserSession.query.filter_by(
-            user_id=current_user_id,
-            is_active=True
-        ).order_by(UserSession.created_at.desc()).all()
+        # Get active sessions (cache por usuário, atualizado no login e na revogação)
+        sessions = session_writer.active_sessions(db.engine, current_user_id)
         
         return jsonify({
             'success': True,
             'data': {
-                'sessions': [session.to_dict() for session in sessions],
+                'sessions': [serialize_session(session) for session in sessions],
                 'total': len(sessions)
             }
         }), 200
@@ -422,7 +400,7 @@ def change_password():
         db.session.commit()
         
         # Revoke all other sessions (force re-login on other devices)
-        UserSession.revoke_user_sessions(current_user_id)
+        session_writer.revoke(db.engine, current_user_id)
         
         return jsonify({
             'success': True,
@@ -444,7 +422,8 @@ def check_if_token_revoked():
         verify_jwt_in_request(optional=True)
         jti = get_jwt().get('jti') if get_jwt() else None
         
-        if jti and is_token_blacklisted(jti):
+        # Cache em processo; o Redis só é consultado em cache miss
+        if jti and auth_cache.is_token_revoked(jti, is_token_blacklisted):
             return jsonify({
                 'success': False,
                 'error': 'Token inválido'
@@ -3,20 +3,47 @@ from flask_jwt_extended import jwt_required, get_jwt_identity
 from src.database import db
 from src.models.gas_station import GasStation, FuelPrice, Coupon
 from src.models.user_profile import UserProfile
-from src.services.google_maps import google_maps_service
-from src.services.fuel_scraper import fuel_scraper
+from src.services.google_maps import get_google_maps_service, google_maps_service
+from src.services.concurrency import submit
+from src.db_routing import replica_reads
+from src.services.refuel_planner import plan_refuel
+from src.services.route_memo import route_memo
+from src.services.scoring_engine import resolve_weights
+from src.services.response_cache import area_dependencies, response_cache
+from src.pagination import InvalidCursorError, get_page_args, keyset_paginate, pagination_info
+from src.serializers import FUEL_PRICE_SERIALIZER, STATION_SERIALIZER
 from datetime import datetime, timezone, timedelta
 import uuid
 from sqlalchemy import or_
 
 gas_stations_bp = Blueprint('gas_stations', __name__)
 
+
+def station_dependencies(station_id):
+    """Versões das respostas de um posto (dados, preços e cupons)"""
+    return [f'station:{station_id}']
+
+
+def search_dependencies(default_radius_km):
+    """Versões de uma busca por raio; dados do Google ficam fora do cache"""
+    def dependencies(**kwargs):
+        if request.args.get('include_google_data', 'false').lower() == 'true':
+            return None
+        return area_dependencies(
+            request.args.get('latitude', type=float),
+            request.args.get('longitude', type=float),
+            request.args.get('radius_km', type=float, default=default_radius_km)
+        )
+    return dependencies
+
 # Cache for POI searches to avoid redundant API calls
 from functools import lru_cache
 from datetime import timedelta
 from sqlalchemy import or_
 
 @gas_stations_bp.route('/', methods=['GET'])
+@response_cache.cached(search_dependencies(50))
+@replica_reads
 def get_gas_stations():
     """Get gas stations with optional filtering"""
     try:
@@ -58,10 +85,15 @@ def get_gas_stations():
         stations_paginated = query.order_by(GasStation.name)\
                                  .paginate(page=page, per_page=per_page, error_out=False)
         
-        # Include prices and coupons
+        # Include prices and coupons (one query each for the whole page)
+        page_ids = [station.id for station in stations_paginated.items]
+        prices = GasStation.current_prices_for(page_ids)
+        coupons = GasStation.active_coupons_for(page_ids)
         stations_data = []
         for station in stations_paginated.items:
-            station_dict = station.to_dict(include_prices=True, include_coupons=True)
+            station_dict = station.to_dict()
+            station_dict['current_prices'] = prices[station.id]
+            station_dict['active_coupons'] = coupons[station.id]
             
             # Add distance if location provided
             if latitude and longitude:
@@ -94,6 +126,8 @@ def get_gas_stations():
         }), 500
 
 @gas_stations_bp.route('/<station_id>', methods=['GET'])
+@response_cache.cached(station_dependencies)
+@replica_reads
 def get_gas_station(station_id):
     """Get specific gas station details"""
     try:
@@ -127,6 +161,8 @@ def get_gas_station(station_id):
         }), 500
 
 @gas_stations_bp.route('/nearby', methods=['GET'])
+@response_cache.cached(search_dependencies(10))
+@replica_reads
 def get_nearby_stations():
     """Get gas stations near a location"""
     try:
@@ -146,14 +182,19 @@ def get_nearby_stations():
         limit = min(int(request.args.get('limit', 20)), 50)
         include_google_data = request.args.get('include_google_data', 'false').lower() == 'true'
         
+        # Places request goes out first and runs while the database is queried
+        google_request = None
+        if include_google_data and google_maps_service.is_configured():
+            google_request = submit(
+                google_maps_service.find_gas_stations_nearby, latitude, longitude, int(radius_km * 1000)
+            )
+        
         # Find nearby stations in database
         nearby_stations = GasStation.find_nearby(latitude, longitude, radius_km, fuel_type, limit)
         
         # Optionally include Google Maps data
-        if include_google_data and google_maps_service.is_configured():
-            google_stations = google_maps_service.find_gas_stations_nearby(
-                latitude, longitude, int(radius_km * 1000)
-            )
+        if google_request is not None:
+            google_stations = google_request.result()
             
             # Merge Google data with database stations
             for station in nearby_stations:
@@ -185,6 +226,8 @@ def get_nearby_stations():
         }), 500
 
 @gas_stations_bp.route('/cheapest', methods=['GET'])
+@response_cache.cached(search_dependencies(50))
+@replica_reads
 def get_cheapest_stations():
     """Get cheapest gas stations for fuel type"""
     try:
@@ -219,22 +262,28 @@ def get_cheapest_stations():
             # Find cheapest stations globally
             cutoff_date = datetime.now(timezone.utc) - timedelta(days=7)
             
-            cheapest_prices = db.session.query(FuelPrice)\
-                .join(GasStation)\
-                .filter(
-                    FuelPrice.fuel_type == fuel_type,
-                    FuelPrice.is_active == True,
-                    FuelPrice.reported_at > cutoff_date,
-                    GasStation.is_active == True
-                )\
-                .order_by(FuelPrice.price.asc())\
-                .limit(limit).all()
+            stations, prices = GasStation.__table__, FuelPrice.__table__
+            station_columns = STATION_SERIALIZER.select_columns(stations)
+            rows = db.session.execute(
+                db.select(*station_columns, *FUEL_PRICE_SERIALIZER.select_columns(prices))
+                .join_from(prices, stations, prices.c.gas_station_id == stations.c.id)
+                .where(
+                    prices.c.fuel_type == fuel_type,
+                    prices.c.is_active == True,
+                    prices.c.reported_at > cutoff_date,
+                    stations.c.is_active == True
+                )
+                .order_by(prices.c.price.asc())
+                .limit(limit)
+            )
             
+            # Station and price come from the same row tuple, no lazy loads
+            split = len(station_columns)
             cheapest_stations = []
-            for price in cheapest_prices:
-                station_data = price.gas_station.to_dict()
-                station_data['fuel_price'] = price.to_dict()
-                station_data['price_per_liter'] = float(price.price)
+            for row in rows:
+                station_data = STATION_SERIALIZER.from_row(row[:split])
+                station_data['fuel_price'] = FUEL_PRICE_SERIALIZER.from_row(row[split:])
+                station_data['price_per_liter'] = station_data['fuel_price']['price']
                 cheapest_stations.append(station_data)
         
         return jsonify({
@@ -301,7 +350,7 @@ def get_stations_along_route():
             
             # Find stations along route
             google_stations = google_maps_service.find_gas_stations_along_route(
-                origin_coords, dest_coords, search_radius
+                origin_coords, dest_coords, search_radius, directions=route_info
             )
             
             # Match with database stations and get prices
@@ -367,6 +416,153 @@ def get_stations_along_route():
             'error': 'Erro ao buscar postos na rota'
         }), 500
 
+@gas_stations_bp.route('/route-recommendations', methods=['POST'])
+@jwt_required()
+def get_route_recommendations():
+    """Get scored recommendations along a route, reusing stored corridors"""
+    try:
+        current_user_id = get_jwt_identity()
+        data = request.get_json()
+        
+        origin = data.get('origin') or {}
+        destination = data.get('destination') or {}
+        origin_coords = (origin.get('latitude'), origin.get('longitude'))
+        dest_coords = (destination.get('latitude'), destination.get('longitude'))
+        
+        if None in origin_coords or None in dest_coords:
+            return jsonify({
+                'success': False,
+                'error': 'Coordenadas de origem e destino são obrigatórias'
+            }), 400
+        
+        profile = UserProfile.find_by_user_id(current_user_id)
+        fuel_type = data.get('fuel_type', profile.preferred_fuel_type if profile else 'gasoline')
+        
+        try:
+            weights = None
+            if data.get('profile') or data.get('weights'):
+                weights = resolve_weights(data.get('profile'), data.get('weights'))
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
+        
+        origin_coords = (float(origin_coords[0]), float(origin_coords[1]))
+        dest_coords = (float(dest_coords[0]), float(dest_coords[1]))
+        
+        # Directions are only requested when the corridor is not stored yet
+        directions = None
+        maps_service = get_google_maps_service()
+        if maps_service and maps_service.is_configured():
+            directions = lambda: maps_service.get_directions(origin_coords, dest_coords)
+        
+        with db.engine.begin() as connection:
+            result = route_memo.recommend(
+                connection, origin_coords, dest_coords, fuel_type,
+                directions=directions,
+                user_profile_id=profile.id if profile else None,
+                weights=weights,
+                limit=min(int(data.get('limit', 10)), 50)
+            )
+        
+        return jsonify({
+            'success': True,
+            'data': dict(result, fuel_type=fuel_type)
+        }), 200
+        
+    except Exception as e:
+        current_app.logger.error(f"Get route recommendations error: {e}")
+        return jsonify({
+            'success': False,
+            'error': 'Erro ao buscar recomendações na rota'
+        }), 500
+
+@gas_stations_bp.route('/refuel-plan', methods=['POST'])
+@jwt_required()
+def get_refuel_plan():
+    """Plan the cheapest refuel stops for a long trip"""
+    try:
+        current_user_id = get_jwt_identity()
+        data = request.get_json()
+        
+        origin = data.get('origin') or {}
+        destination = data.get('destination') or {}
+        origin_coords = (origin.get('latitude'), origin.get('longitude'))
+        dest_coords = (destination.get('latitude'), destination.get('longitude'))
+        
+        if None in origin_coords or None in dest_coords:
+            return jsonify({
+                'success': False,
+                'error': 'Coordenadas de origem e destino são obrigatórias'
+            }), 400
+        
+        try:
+            tank_capacity = float(data['tank_capacity'])
+            current_fuel = float(data['current_fuel'])
+            fuel_efficiency = float(data.get('fuel_efficiency', 12))  # km/l
+            reserve = float(data.get('reserve_liters', 0))
+            if tank_capacity <= 0 or fuel_efficiency <= 0 or not 0 <= current_fuel <= tank_capacity:
+                raise ValueError()
+        except (KeyError, TypeError, ValueError):
+            return jsonify({
+                'success': False,
+                'error': 'tank_capacity, current_fuel (litros) e fuel_efficiency (km/l) devem ser válidos'
+            }), 400
+        
+        profile = UserProfile.find_by_user_id(current_user_id)
+        fuel_type = data.get('fuel_type', profile.preferred_fuel_type if profile else 'gasoline')
+        origin_coords = (float(origin_coords[0]), float(origin_coords[1]))
+        dest_coords = (float(dest_coords[0]), float(dest_coords[1]))
+        
+        directions = None
+        maps_service = get_google_maps_service()
+        if maps_service and maps_service.is_configured():
+            directions = lambda: maps_service.get_directions(origin_coords, dest_coords)
+        
+        with db.engine.begin() as connection:
+            corridor = route_memo.corridor_stations(
+                connection, origin_coords, dest_coords, fuel_type,
+                directions=directions,
+                user_profile_id=profile.id if profile else None
+            )
+        
+        stations = corridor['stations']
+        route_km = corridor['route']['distance_km']
+        plan = plan_refuel(
+            along_km=[station['along_km'] for station in stations],
+            prices=[station['scored_price'] for station in stations],
+            detour_km=[station['detour_distance_km'] for station in stations],
+            route_km=route_km,
+            tank_capacity=tank_capacity,
+            consumption_per_100km=100.0 / fuel_efficiency,
+            initial_fuel=current_fuel,
+            reserve=reserve
+        )
+        
+        result = plan.to_dict()
+        for stop, plan_stop in zip(result['stops'], plan.stops):
+            stop['station'] = stations[plan_stop.index]['station']
+            stop['detour_km'] = stations[plan_stop.index]['detour_distance_km']
+        
+        if not plan.feasible:
+            result['message'] = 'Não há postos suficientes no corredor para completar a viagem com este tanque'
+        
+        return jsonify({
+            'success': True,
+            'data': dict(
+                result,
+                route_distance_km=route_km,
+                fuel_type=fuel_type,
+                candidate_stations=len(stations),
+                cached=corridor['cached']
+            )
+        }), 200
+        
+    except Exception as e:
+        current_app.logger.error(f"Refuel plan error: {e}")
+        return jsonify({
+            'success': False,
+            'error': 'Erro ao planejar abastecimento'
+        }), 500
+
 @gas_stations_bp.route('/prices/update', methods=['POST'])
 @jwt_required()
 def update_fuel_prices():
@@ -378,6 +574,8 @@ def update_fuel_prices():
         # For now, allow any authenticated user
         
         # Run scraping in background (in production, use Celery or similar)
+        # (scraper imported here: requests/BeautifulSoup stay out of the cold start)
+        from src.services.fuel_scraper import fuel_scraper
         scraping_result = fuel_scraper.run_full_scraping_cycle()
         
         return jsonify({
@@ -394,6 +592,8 @@ def update_fuel_prices():
         }), 500
 
 @gas_stations_bp.route('/<station_id>/prices', methods=['GET'])
+@response_cache.cached(station_dependencies)
+@replica_reads
 def get_station_prices(station_id):
     """Get price history for a gas station"""
     try:
@@ -407,6 +607,7 @@ def get_station_prices(station_id):
         # Get query parameters
         fuel_type = request.args.get('fuel_type')
         days = int(request.args.get('days', 30))
+        cursor, per_page = get_page_args(request.args, default=50, maximum=200)
         
         # Build query
         cutoff_date = datetime.now(timezone.utc) - timedelta(days=days)
@@ -418,7 +619,9 @@ def get_station_prices(station_id):
         if fuel_type:
             query = query.filter_by(fuel_type=fuel_type)
         
-        prices = query.order_by(FuelPrice.reported_at.desc()).all()
+        prices, next_cursor = keyset_paginate(
+            query, [FuelPrice.reported_at, FuelPrice.id], cursor, per_page
+        )
         
         return jsonify({
             'success': True,
@@ -426,10 +629,16 @@ def get_station_prices(station_id):
                 'station': station.to_dict(),
                 'prices': [price.to_dict() for price in prices],
                 'period_days': days,
-                'fuel_type_filter': fuel_type
+                'fuel_type_filter': fuel_type,
+                'pagination': pagination_info(per_page, next_cursor)
             }
         }), 200
         
+    except InvalidCursorError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
     except Exception as e:
         current_app.logger.error(f"Get station prices error: {e}")
         return jsonify({
@@ -498,6 +707,8 @@ def search_by_poi():
 
 
 @gas_stations_bp.route('/<station_id>/coupons', methods=['GET'])
+@response_cache.cached(station_dependencies)
+@replica_reads
 def get_station_coupons(station_id):
     """Get active coupons for a gas station"""
     try:
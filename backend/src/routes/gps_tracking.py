@@ -5,6 +5,9 @@ from src.models.user_profile import UserProfile
 from src.models.gas_station import GasStation, FuelPrice
 from src.models.gps_tracking import GPSTracking, Notification
 from src.models.coupon import Coupon
+from src.models.trip_summary import TripSummary
+from src.services.user_stats_service import increment_counters, record_trip_point
+from src.pagination import InvalidCursorError, get_page_args, keyset_paginate, pagination_info
 import math
 from datetime import datetime, timezone
 import uuid
@@ -58,6 +61,9 @@ def start_trip():
         )
         
         db.session.add(gps_point)
+        db.session.flush()
+        new_trip = record_trip_point(user_id, trip_id, gps_point.timestamp)
+        increment_counters(user_id, gps_points_total=1, trips_total=1 if new_trip else 0)
         
         # Atualizar perfil do usuário
         profile = UserProfile.query.filter_by(user_id=user_id).first()
@@ -104,6 +110,9 @@ def update_location():
         )
         
         db.session.add(gps_point)
+        db.session.flush()
+        new_trip = record_trip_point(user_id, data['trip_id'], gps_point.timestamp)
+        increment_counters(user_id, gps_points_total=1, trips_total=1 if new_trip else 0)
         
         # Obter perfil do usuário
         profile = UserProfile.query.filter_by(user_id=user_id).first()
@@ -150,6 +159,7 @@ def update_location():
                 )
                 
                 db.session.add(notification)
+                increment_counters(user_id, notifications_total=1, notifications_unread=1)
                 
                 # Reset contador de distância
                 profile.distance_since_last_notification = 0
@@ -204,6 +214,9 @@ def stop_trip():
         )
         
         db.session.add(gps_point)
+        db.session.flush()
+        new_trip = record_trip_point(user_id, data['trip_id'], gps_point.timestamp)
+        increment_counters(user_id, gps_points_total=1, trips_total=1 if new_trip else 0)
         
         # Calcular estatísticas da viagem
         trip_points = GPSTracking.query.filter_by(
@@ -247,58 +260,74 @@ def get_trip_history():
     try:
         user_id = get_jwt_identity()
         
-        # Buscar todas as viagens
-        trips = db.session.query(GPSTracking.trip_id).filter_by(user_id=user_id).distinct().all()
+        cursor, per_page = get_page_args(request.args)
+        
+        # Uma linha por viagem no resumo (apenas viagens com 2+ pontos), mais recentes primeiro
+        trips_query = TripSummary.query.filter(
+            TripSummary.user_id == user_id,
+            TripSummary.points_count >= 2
+        )
+        
+        trips, next_cursor = keyset_paginate(
+            trips_query, [TripSummary.start_time, TripSummary.trip_id], cursor, per_page
+        )
+        
+        # Pontos de todas as viagens da página em uma única consulta
+        points_by_trip = {trip.trip_id: [] for trip in trips}
+        if points_by_trip:
+            points = GPSTracking.query.filter(
+                GPSTracking.user_id == user_id,
+                GPSTracking.trip_id.in_(list(points_by_trip))
+            ).order_by(GPSTracking.trip_id, GPSTracking.timestamp).all()
+            for point in points:
+                points_by_trip[point.trip_id].append(point)
         
         trip_list = []
         for trip in trips:
-            trip_id = trip[0]
+            trip_id = trip.trip_id
+            points = points_by_trip[trip_id]
             
-            # Obter pontos da viagem
-            points = GPSTracking.query.filter_by(
-                user_id=user_id, 
-                trip_id=trip_id
-            ).order_by(GPSTracking.timestamp).all()
+            start_point = points[0]
+            end_point = points[-1]
             
-            if len(points) >= 2:
-                start_point = points[0]
-                end_point = points[-1]
-                
-                # Calcular distância total
-                total_distance = 0
-                for i in range(1, len(points)):
-                    prev_point = points[i-1]
-                    curr_point = points[i]
-                    distance = calculate_distance(
-                        prev_point.latitude, prev_point.longitude,
-                        curr_point.latitude, curr_point.longitude
-                    )
-                    total_distance += distance
-                
-                duration = (end_point.timestamp - start_point.timestamp).total_seconds() / 3600
-                
-                trip_list.append({
-                    'trip_id': trip_id,
-                    'start_time': start_point.timestamp.isoformat(),
-                    'end_time': end_point.timestamp.isoformat(),
-                    'start_location': {
-                        'latitude': start_point.latitude,
-                        'longitude': start_point.longitude
-                    },
-                    'end_location': {
-                        'latitude': end_point.latitude,
-                        'longitude': end_point.longitude
-                    },
-                    'total_distance_km': round(total_distance, 2),
-                    'duration_hours': round(duration, 2),
-                    'points_count': len(points)
-                })
+            # Calcular distância total
+            total_distance = 0
+            for i in range(1, len(points)):
+                prev_point = points[i-1]
+                curr_point = points[i]
+                distance = calculate_distance(
+                    prev_point.latitude, prev_point.longitude,
+                    curr_point.latitude, curr_point.longitude
+                )
+                total_distance += distance
+            
+            duration = (end_point.timestamp - start_point.timestamp).total_seconds() / 3600
+            
+            trip_list.append({
+                'trip_id': trip_id,
+                'start_time': start_point.timestamp.isoformat(),
+                'end_time': end_point.timestamp.isoformat(),
+                'start_location': {
+                    'latitude': start_point.latitude,
+                    'longitude': start_point.longitude
+                },
+                'end_location': {
+                    'latitude': end_point.latitude,
+                    'longitude': end_point.longitude
+                },
+                'total_distance_km': round(total_distance, 2),
+                'duration_hours': round(duration, 2),
+                'points_count': len(points)
+            })
         
         return jsonify({
             'success': True,
-            'trips': sorted(trip_list, key=lambda x: x['start_time'], reverse=True)
+            'trips': trip_list,
+            'pagination': pagination_info(per_page, next_cursor)
         })
         
+    except InvalidCursorError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
     except Exception as e:
         return jsonify({'success': False, 'error': 'Erro interno do servidor'}), 500
 
@@ -309,9 +338,12 @@ def get_notifications():
     try:
         user_id = get_jwt_identity()
         
-        notifications = Notification.query.filter_by(user_id=user_id).order_by(
-            Notification.created_at.desc()
-        ).limit(50).all()
+        cursor, per_page = get_page_args(request.args, default=50)
+        
+        notifications, next_cursor = keyset_paginate(
+            Notification.query.filter_by(user_id=user_id),
+            [Notification.created_at, Notification.id], cursor, per_page
+        )
         
         notification_list = []
         for notif in notifications:
@@ -357,9 +389,12 @@ def get_notifications():
         
         return jsonify({
             'success': True,
-            'notifications': notification_list
+            'notifications': notification_list,
+            'pagination': pagination_info(per_page, next_cursor)
         })
         
+    except InvalidCursorError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
     except Exception as e:
         return jsonify({'success': False, 'error': 'Erro interno do servidor'}), 500
 
@@ -378,8 +413,10 @@ def mark_notification_read(notification_id):
         if not notification:
             return jsonify({'success': False, 'error': 'Notificação não encontrada'}), 404
         
-        notification.is_read = True
-        notification.read_at = datetime.now(timezone.utc)
+        if not notification.is_read:
+            notification.is_read = True
+            notification.read_at = datetime.now(timezone.utc)
+            increment_counters(user_id, notifications_unread=-1)
         
         db.session.commit()
         
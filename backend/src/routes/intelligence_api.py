@@ -1,15 +1,24 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
-import sys
-import os
-
-# Adicionar path para importar serviços
-sys.path.append(os.path.dirname(os.path.dirname(__file__)))
-
-from services.price_intelligence import price_intelligence, get_smart_recommendation
+# Mesmo caminho (src.services) das rotinas de escrita, que atualizam esta instância
+from src.services.price_intelligence import price_intelligence, get_smart_recommendation
 
 intelligence_bp = Blueprint('intelligence', __name__)
 
+def _location_from(source):
+    """Posto, coordenada ou UF/município informados na requisição"""
+    location = {}
+    if source.get('station_id'):
+        location['station_id'] = str(source['station_id'])
+    if source.get('latitude') is not None and source.get('longitude') is not None:
+        location['latitude'] = float(source['latitude'])
+        location['longitude'] = float(source['longitude'])
+    if source.get('state'):
+        location['state'] = source['state']
+        if source.get('city'):
+            location['city'] = source['city']
+    return location
+
 @intelligence_bp.route('/predict-prices', methods=['POST'])
 @jwt_required()
 def predict_prices():
@@ -53,14 +62,23 @@ def get_best_opportunities():
     try:
         fuel_type = request.args.get('fuel_type', 'gasoline')
         max_distance = float(request.args.get('max_distance', 10.0))
+        latitude = request.args.get('latitude', type=float)
+        longitude = request.args.get('longitude', type=float)
         
-        opportunities = price_intelligence.find_best_price_opportunity(fuel_type, max_distance)
+        opportunities = price_intelligence.find_best_price_opportunity(
+            fuel_type, max_distance, latitude, longitude, profile=request.args.get('profile')
+        )
         
         return jsonify({
             'success': True,
             'opportunities': opportunities
         })
         
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
     except Exception as e:
         return jsonify({
             'success': False,
@@ -104,7 +122,9 @@ def analyze_savings():
         fuel_consumption = data.get('fuel_consumption', 50.0)  # Litros por mês
         fuel_type = data.get('fuel_type', 'gasoline')
         
-        analysis = price_intelligence.analyze_user_savings(user_id, fuel_consumption, fuel_type)
+        analysis = price_intelligence.analyze_user_savings(
+            user_id, fuel_consumption, fuel_type, **_location_from(data)
+        )
         
         if 'error' in analysis:
             return jsonify({
@@ -134,13 +154,21 @@ def get_smart_recommendation_api():
         consumption = data.get('consumption', 50.0)
         max_distance = data.get('max_distance', 10.0)
         
-        recommendation = get_smart_recommendation(fuel_type, consumption, max_distance)
+        recommendation = get_smart_recommendation(
+            fuel_type, consumption, max_distance, data.get('latitude'), data.get('longitude'),
+            profile=data.get('profile'), weights=data.get('weights')
+        )
         
         return jsonify({
             'success': True,
             'recommendation': recommendation
         })
         
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
     except Exception as e:
         return jsonify({
             'success': False,
@@ -166,7 +194,9 @@ def create_price_alert():
             }), 400
         
         # Verificar se já existe preço igual ou menor
-        opportunities = price_intelligence.find_best_price_opportunity(fuel_type, max_distance)
+        opportunities = price_intelligence.find_best_price_opportunity(
+            fuel_type, max_distance, data.get('latitude'), data.get('longitude')
+        )
         
         alert_triggered = False
         matching_stations = []
@@ -211,39 +241,15 @@ def get_regional_comparison():
     try:
         fuel_type = request.args.get('fuel_type', 'gasoline')
         
-        # Obter dados regionais
-        regional_data = price_intelligence.regional_averages.get('sul_brasil', {}).get(fuel_type, {})
+        # Comparar a região do posto/coordenada/UF informados com as demais
+        comparison_data = price_intelligence.compare_regions(fuel_type, **_location_from(request.args))
         
-        if not regional_data:
+        if not comparison_data:
             return jsonify({
                 'success': False,
                 'error': 'Dados regionais não disponíveis'
             }), 404
         
-        # Adicionar comparação com outras regiões (simulado)
-        comparison_data = {
-            'current_region': {
-                'name': 'Sul do Brasil',
-                'data': regional_data
-            },
-            'national_average': {
-                'average': regional_data['average'] * 1.05,  # Simular média nacional 5% maior
-                'comparison': 'Região 5% mais barata que a média nacional'
-            },
-            'nearby_regions': [
-                {
-                    'name': 'Sudeste',
-                    'average': regional_data['average'] * 1.08,
-                    'difference': f"+{((regional_data['average'] * 1.08 - regional_data['average']) / regional_data['average'] * 100):.1f}%"
-                },
-                {
-                    'name': 'Centro-Oeste',
-                    'average': regional_data['average'] * 0.97,
-                    'difference': f"{((regional_data['average'] * 0.97 - regional_data['average']) / regional_data['average'] * 100):.1f}%"
-                }
-            ]
-        }
-        
         return jsonify({
             'success': True,
             'fuel_type': fuel_type,
@@ -277,7 +283,7 @@ def fuel_calculator():
         fuel_needed = distance / fuel_efficiency
         
         # Obter preços regionais
-        regional_data = price_intelligence.regional_averages.get('sul_brasil', {}).get(fuel_type, {})
+        regional_data = price_intelligence.get_regional_stats(fuel_type, **_location_from(data))
         
         if not regional_data:
             return jsonify({
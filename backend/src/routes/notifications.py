@@ -5,6 +5,8 @@ from src.models.user_profile import UserProfile
 from src.models.gps_tracking import Notification
 from src.models.gas_station import GasStation
 from src.models.coupon import Coupon
+from src.services.user_stats_service import increment_counters, get_user_stats
+from src.pagination import InvalidCursorError, get_page_args, keyset_paginate, pagination_info
 from datetime import datetime, timezone
 import json
 
@@ -41,6 +43,7 @@ def send_test_notification():
         )
         
         db.session.add(notification)
+        increment_counters(user_id, notifications_total=1, notifications_unread=1)
         db.session.commit()
         
         return jsonify({
@@ -144,9 +147,8 @@ def get_notification_history():
     try:
         user_id = get_jwt_identity()
         
-        # Parâmetros de paginação
-        page = request.args.get('page', 1, type=int)
-        per_page = request.args.get('per_page', 20, type=int)
+        # Parâmetros de paginação (cursor opaco da página anterior)
+        cursor, per_page = get_page_args(request.args)
         
         # Filtros
         fuel_type = request.args.get('fuel_type')
@@ -160,16 +162,12 @@ def get_notification_history():
         if is_read is not None:
             query = query.filter_by(is_read=is_read.lower() == 'true')
         
-        notifications = query.order_by(
-            Notification.created_at.desc()
-        ).paginate(
-            page=page, 
-            per_page=per_page, 
-            error_out=False
+        notifications, next_cursor = keyset_paginate(
+            query, [Notification.created_at, Notification.id], cursor, per_page
         )
         
         notification_list = []
-        for notif in notifications.items:
+        for notif in notifications:
             # Buscar informações do posto
             station = GasStation.query.get(notif.gas_station_id)
             
@@ -216,16 +214,11 @@ def get_notification_history():
         return jsonify({
             'success': True,
             'notifications': notification_list,
-            'pagination': {
-                'page': page,
-                'per_page': per_page,
-                'total': notifications.total,
-                'pages': notifications.pages,
-                'has_next': notifications.has_next,
-                'has_prev': notifications.has_prev
-            }
+            'pagination': pagination_info(per_page, next_cursor)
         })
         
+    except InvalidCursorError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
     except Exception as e:
         return jsonify({'success': False, 'error': 'Erro interno do servidor'}), 500
 
@@ -244,14 +237,19 @@ def mark_notification_clicked(notification_id):
         if not notification:
             return jsonify({'success': False, 'error': 'Notificação não encontrada'}), 404
         
-        notification.is_clicked = True
-        notification.clicked_at = datetime.now(timezone.utc)
+        deltas = {}
+        if not notification.is_clicked:
+            notification.is_clicked = True
+            notification.clicked_at = datetime.now(timezone.utc)
+            deltas['notifications_clicked'] = 1
         
         # Marcar como lida também se ainda não foi
         if not notification.is_read:
             notification.is_read = True
             notification.read_at = datetime.now(timezone.utc)
+            deltas['notifications_unread'] = -1
         
+        increment_counters(user_id, **deltas)
         db.session.commit()
         
         return jsonify({
@@ -278,6 +276,7 @@ def mark_all_notifications_read():
             'is_read': True,
             'read_at': datetime.now(timezone.utc)
         })
+        increment_counters(user_id, notifications_unread=-updated)
         
         db.session.commit()
         
@@ -297,10 +296,8 @@ def get_notification_stats():
     try:
         user_id = get_jwt_identity()
         
-        # Contar notificações por status
-        total_notifications = Notification.query.filter_by(user_id=user_id).count()
-        unread_notifications = Notification.query.filter_by(user_id=user_id, is_read=False).count()
-        clicked_notifications = Notification.query.filter_by(user_id=user_id, is_clicked=True).count()
+        # Contadores por status (read-model mantido nas escritas)
+        counters = get_user_stats(user_id)
         
         # Estatísticas por tipo de combustível
         fuel_stats = db.session.query(
@@ -326,10 +323,10 @@ def get_notification_stats():
         return jsonify({
             'success': True,
             'stats': {
-                'total_notifications': total_notifications,
-                'unread_notifications': unread_notifications,
-                'clicked_notifications': clicked_notifications,
-                'click_rate': round((clicked_notifications / total_notifications * 100), 2) if total_notifications > 0 else 0,
+                'total_notifications': counters.notifications_total,
+                'unread_notifications': counters.notifications_unread,
+                'clicked_notifications': counters.notifications_clicked,
+                'click_rate': counters.click_rate,
                 'fuel_statistics': fuel_statistics,
                 'travel_stats': {
                     'total_distance_km': profile.total_distance_traveled if profile else 0,
@@ -2,11 +2,18 @@ from flask import Blueprint, request, jsonify, g
 from functools import wraps
 from src.database import db
 from src.models.partner import Partner
-from src.models.gas_station import GasStation, FuelPrice
-from datetime import datetime, timezone
+from src.services.auth_cache import auth_cache
+from src.services.rate_limiter import rate_limiter
+from src.services.partner_prices import PartnerPriceImport, iter_csv, iter_json_lines, serialize_price
+from src.services.price_intelligence import record_committed_prices
+from src.services.response_cache import response_cache
 
 partner_api_bp = Blueprint('partner_api', __name__, url_prefix='/api/partner')
 
+DEFAULT_PARTNER_RATE_LIMIT = 1000  # requisições por hora
+NDJSON_MIMETYPES = ('application/x-ndjson', 'application/ndjson', 'application/jsonl')
+CSV_MIMETYPES = ('text/csv',)
+
 # --- Decorator para Autenticação por API Key ---
 def require_api_key(f):
     @wraps(f)
@@ -15,15 +22,30 @@ def require_api_key(f):
         if not api_key:
             return jsonify({'success': False, 'error': 'Chave de API ausente no cabeçalho X-API-Key.'}), 401
 
-        partner = Partner.find_by_api_key(api_key)
+        # Registro em cache (invalidado via pub/sub); o banco só é consultado em cache miss
+        partner = auth_cache.get_partner(api_key, Partner.find_by_api_key)
         if not partner or not partner.is_api_key_valid():
             return jsonify({'success': False, 'error': 'Chave de API inválida ou expirada.'}), 403
 
+        # Cota por parceiro (rate_limit_per_hour)
+        limit = partner.rate_limit_per_hour or DEFAULT_PARTNER_RATE_LIMIT
+        g.rate_limit = rate_limiter.hit(f"partner:{partner.id}", limit, 3600)
+        if not g.rate_limit.allowed:
+            return jsonify({'success': False, 'error': 'Limite de requisições por hora excedido.'}), 429
+
         # Anexa o parceiro ao contexto global da requisição para uso posterior
         g.partner = partner
         return f(*args, **kwargs)
     return decorated_function
 
+@partner_api_bp.after_request
+def add_rate_limit_headers(response):
+    """Cabeçalhos X-RateLimit-* em todas as respostas autenticadas"""
+    rate_limit = g.get('rate_limit')
+    if rate_limit is not None:
+        response.headers.update(rate_limit.headers())
+    return response
+
 # --- Endpoint de Teste de Autenticação ---
 @partner_api_bp.route('/auth-test', methods=['GET'])
 @require_api_key
@@ -43,65 +65,43 @@ def auth_test():
 @partner_api_bp.route('/prices', methods=['POST'])
 @require_api_key
 def update_prices():
-    """Permite que um parceiro atualize os preços de múltiplos combustíveis em múltiplos postos."""
-    partner = g.partner
-    data = request.get_json()
-
-    if not isinstance(data, list):
-        return jsonify({'success': False, 'error': 'O corpo da requisição deve ser uma lista de atualizações de preço.'}), 400
-
-    partner_station_ids = {station.id for station in partner.gas_stations}
-    updated_prices = []
-    errors = []
+    """
+    Permite que um parceiro atualize os preços de múltiplos combustíveis em múltiplos postos.
 
-    for item in data:
-        station_id = item.get('station_id')
-        fuel_type = item.get('fuel_type')
-        price = item.get('price')
-
-        # --- Validações ---
-        if not all([station_id, fuel_type, price]):
-            errors.append({'item': item, 'error': 'Campos station_id, fuel_type e price são obrigatórios.'})
-            continue
-
-        if station_id not in partner_station_ids:
-            errors.append({'item': item, 'error': f'Acesso negado. O posto {station_id} não pertence a este parceiro.'})
-            continue
-
-        try:
-            price = float(price)
-            if price <= 0:
-                raise ValueError()
-        except (ValueError, TypeError):
-            errors.append({'item': item, 'error': 'O preço deve ser um número positivo.'})
-            continue
-        
-        # --- Lógica de Atualização ---
-        try:
-            # Desativa o preço antigo, se houver
-            FuelPrice.query.filter_by(gas_station_id=station_id, fuel_type=fuel_type, is_active=True).update({'is_active': False})
+    Aceita uma lista JSON ou, para redes grandes, um upload em streaming
+    (Content-Type application/x-ndjson ou text/csv com cabeçalho
+    station_id,fuel_type,price). Tudo ou nada: qualquer item inválido desfaz o lote.
+    """
+    partner = g.partner
+    content_type = request.mimetype
 
-            # Cria o novo preço
-            new_price = FuelPrice(
-                gas_station_id=station_id,
-                fuel_type=fuel_type,
-                price=price,
-                reported_by='partner',
-                is_active=True,
-                reported_at=datetime.now(timezone.utc)
-            )
-            db.session.add(new_price)
-            updated_prices.append(new_price.to_dict())
+    if content_type in NDJSON_MIMETYPES:
+        items, keep_rows = iter_json_lines(request.stream), False
+    elif content_type in CSV_MIMETYPES:
+        items, keep_rows = iter_csv(request.stream), False
+    else:
+        data = request.get_json(silent=True)
+        if not isinstance(data, list):
+            return jsonify({'success': False, 'error': 'O corpo da requisição deve ser uma lista de atualizações de preço.'}), 400
+        items, keep_rows = enumerate(data, start=1), True
 
-        except Exception as e:
-            db.session.rollback()
-            errors.append({'item': item, 'error': f'Erro de banco de dados: {str(e)}'})
-            # Se um falhar, paramos para evitar inconsistência parcial
-            return jsonify({'success': False, 'error': 'Ocorreu um erro durante a transação.', 'details': errors}), 500
+    try:
+        with db.engine.connect() as connection:
+            transaction = connection.begin()
+            importer = PartnerPriceImport(connection, partner.id)
+            result = importer.run(items, keep_rows=keep_rows)
+            if result['error_count']:
+                transaction.rollback()
+                return jsonify({'success': False, 'message': 'Alguns itens continham erros e nenhuma alteração foi feita.', **result}), 400
+            transaction.commit()
+        response_cache.stations_changed(importer.changed_points())
+        record_committed_prices(importer.prices)
+    except UnicodeDecodeError:
+        return jsonify({'success': False, 'error': 'O arquivo enviado deve estar em UTF-8.'}), 400
+    except Exception as e:
+        return jsonify({'success': False, 'error': 'Ocorreu um erro durante a transação.', 'details': str(e)}), 500
 
-    if not errors:
-        db.session.commit()
-        return jsonify({'success': True, 'message': f'{len(updated_prices)} preços atualizados com sucesso.', 'data': updated_prices}), 200
-    else:
-        db.session.rollback()
-        return jsonify({'success': False, 'message': 'Alguns itens continham erros e nenhuma alteração foi feita.', 'errors': errors}), 400
+    response = {'success': True, 'message': f"{result['updated']} preços atualizados com sucesso.", **result}
+    if keep_rows:
+        response['data'] = [serialize_price(row) for row in importer.written]
+    return jsonify(response), 200
@@ -1,5 +1,7 @@
 from flask import Blueprint, request, jsonify
 from ..models.gas_station import GasStation, FuelPrice
+from ..services.detour_time import detour_time_service
+from ..services.scoring_engine import coordinates_of, resolve_weights, route_detour_km, score_candidates, top_k
 
 stations_bp = Blueprint('stations_bp', __name__, url_prefix='/api')
 
@@ -57,18 +59,38 @@ def get_recommendations():
                 'error': 'Origem e destino são obrigatórios'
             }), 400
         
-        # TODO: Isolar esta lógica em um serviço de recomendação
-        fuel_prices = FuelPrice.query.filter_by(fuel_type=fuel_type).all()
+        try:
+            weights = resolve_weights(data.get('profile'), data.get('weights'))
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
+        
+        fuel_prices = FuelPrice.query.filter_by(fuel_type=fuel_type).join(GasStation)\
+            .filter(GasStation.is_active == True).all()
+        
+        stations = [fuel_price.gas_station for fuel_price in fuel_prices]
+        latitudes = [float(station.latitude) for station in stations]
+        longitudes = [float(station.longitude) for station in stations]
+        origin_point, destination_point = coordinates_of(origin), coordinates_of(destination)
+        detours = route_detour_km(latitudes, longitudes, origin_point, destination_point)
+        detour_times = None
+        if origin_point is not None and stations:
+            detour_times = detour_time_service.detour_minutes(
+                origin_point, destination_point, [station.id for station in stations], latitudes, longitudes
+            )
+        prices = [float(fuel_price.price) for fuel_price in fuel_prices]
+        scores = score_candidates(
+            prices,
+            detour_km=detours,
+            detour_minutes=detour_times,
+            confidence=[float(fuel_price.source_confidence or 0.5) for fuel_price in fuel_prices],
+            reference_price=5.75, # Simulado
+            weights=weights
+        )
         
         recommendations = []
-        for fuel_price in fuel_prices:
-            station = fuel_price.gas_station
-            if not station.is_active:
-                continue
-            
-            distance_from_route = abs(hash(station.name)) % 10 + 1  # Simulado
-            savings_per_liter = max(0, 5.75 - fuel_price.price) # Simulado
-            score = max(0, (savings_per_liter * 10) - (distance_from_route * 0.5))
+        for index in top_k(scores, 5).tolist():
+            station = stations[index]
+            savings_per_liter = max(0, 5.75 - prices[index]) # Simulado
             
             recommendations.append({
                 'station': {
@@ -79,17 +101,15 @@ def get_recommendations():
                 },
                 'fuel': {
                     'type': fuel_type,
-                    'price': fuel_price.price,
+                    'price': fuel_prices[index].price,
                 },
-                'score': score,
+                'score': round(float(scores[index]), 2),
                 'estimated_savings': savings_per_liter * 50 # Simulado
             })
         
-        recommendations.sort(key=lambda x: x['score'], reverse=True)
-        
         return jsonify({
             'success': True,
-            'recommendations': recommendations[:5]
+            'recommendations': recommendations
         })
 
     except Exception as e:
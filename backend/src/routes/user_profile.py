@@ -1,8 +1,12 @@
 from flask import Blueprint, request, jsonify, current_app
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from src.database import db
+from src.db_routing import replica_reads
 from src.models.user_profile import UserProfile, GPSTracking, Notification
 from src.models.gas_station import GasStation
+from src.models.trip_summary import TripSummary
+from src.services.user_stats_service import increment_counters, record_trip_point, get_user_stats
+from src.pagination import InvalidCursorError, get_page_args, keyset_paginate, pagination_info
 from datetime import datetime, timezone
 import uuid
 
@@ -161,6 +165,13 @@ def update_location():
             distance_from_last=distance_from_last
         )
         db.session.add(gps_record)
+        db.session.flush()
+        new_trip = record_trip_point(current_user_id, trip_id, gps_record.recorded_at, distance_from_last)
+        increment_counters(
+            current_user_id,
+            gps_points_total=1,
+            trips_total=1 if new_trip else 0
+        )
         
         # Update profile location
         profile.update_location(latitude, longitude)
@@ -200,6 +211,7 @@ def update_location():
                     user_longitude=longitude
                 )
                 db.session.add(notification)
+                increment_counters(current_user_id, notifications_total=1, notifications_unread=1)
                 
                 # Mark notification as sent
                 profile.mark_notification_sent()
@@ -238,6 +250,7 @@ def update_location():
 
 @profile_bp.route('/notifications', methods=['GET'])
 @jwt_required()
+@replica_reads
 def get_notifications():
     """Get user notifications"""
     try:
@@ -252,8 +265,7 @@ def get_notifications():
             }), 404
         
         # Get query parameters
-        page = int(request.args.get('page', 1))
-        per_page = min(int(request.args.get('per_page', 20)), 100)
+        cursor, per_page = get_page_args(request.args)
         unread_only = request.args.get('unread_only', 'false').lower() == 'true'
         
         # Build query
@@ -262,25 +274,24 @@ def get_notifications():
         if unread_only:
             query = query.filter(Notification.read_at.is_(None))
         
-        # Paginate
-        notifications_paginated = query.order_by(Notification.sent_at.desc())\
-                                      .paginate(page=page, per_page=per_page, error_out=False)
+        # Paginate (keyset)
+        notifications, next_cursor = keyset_paginate(
+            query, [Notification.sent_at, Notification.id], cursor, per_page
+        )
         
         return jsonify({
             'success': True,
             'data': {
-                'notifications': [notif.to_dict() for notif in notifications_paginated.items],
-                'pagination': {
-                    'page': page,
-                    'per_page': per_page,
-                    'total': notifications_paginated.total,
-                    'pages': notifications_paginated.pages,
-                    'has_next': notifications_paginated.has_next,
-                    'has_prev': notifications_paginated.has_prev
-                }
+                'notifications': [notif.to_dict() for notif in notifications],
+                'pagination': pagination_info(per_page, next_cursor)
             }
         }), 200
         
+    except InvalidCursorError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
     except Exception as e:
         current_app.logger.error(f"Get notifications error: {e}")
         return jsonify({
@@ -376,6 +387,7 @@ def mark_notification_clicked(notification_id):
 
 @profile_bp.route('/gps-history', methods=['GET'])
 @jwt_required()
+@replica_reads
 def get_gps_history():
     """Get GPS tracking history"""
     try:
@@ -390,8 +402,7 @@ def get_gps_history():
             }), 404
         
         # Get query parameters
-        page = int(request.args.get('page', 1))
-        per_page = min(int(request.args.get('per_page', 50)), 200)
+        cursor, per_page = get_page_args(request.args, default=50, maximum=200)
         trip_id = request.args.get('trip_id')
         
         # Build query
@@ -400,25 +411,24 @@ def get_gps_history():
         if trip_id:
             query = query.filter_by(trip_id=trip_id)
         
-        # Paginate
-        gps_paginated = query.order_by(GPSTracking.recorded_at.desc())\
-                            .paginate(page=page, per_page=per_page, error_out=False)
+        # Paginate (keyset)
+        gps_points, next_cursor = keyset_paginate(
+            query, [GPSTracking.recorded_at, GPSTracking.id], cursor, per_page
+        )
         
         return jsonify({
             'success': True,
             'data': {
-                'gps_history': [gps.to_dict() for gps in gps_paginated.items],
-                'pagination': {
-                    'page': page,
-                    'per_page': per_page,
-                    'total': gps_paginated.total,
-                    'pages': gps_paginated.pages,
-                    'has_next': gps_paginated.has_next,
-                    'has_prev': gps_paginated.has_prev
-                }
+                'gps_history': [gps.to_dict() for gps in gps_points],
+                'pagination': pagination_info(per_page, next_cursor)
             }
         }), 200
         
+    except InvalidCursorError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
     except Exception as e:
         current_app.logger.error(f"Get GPS history error: {e}")
         return jsonify({
@@ -428,6 +438,7 @@ def get_gps_history():
 
 @profile_bp.route('/trips', methods=['GET'])
 @jwt_required()
+@replica_reads
 def get_trips():
     """Get user trips"""
     try:
@@ -441,46 +452,28 @@ def get_trips():
                 'error': 'Perfil não encontrado'
             }), 404
         
-        # Get distinct trip IDs with statistics
-        trips_query = db.session.query(
-            GPSTracking.trip_id,
-            db.func.count(GPSTracking.id).label('points_count'),
-            db.func.min(GPSTracking.recorded_at).label('start_time'),
-            db.func.max(GPSTracking.recorded_at).label('end_time'),
-            db.func.sum(GPSTracking.distance_from_last).label('total_distance')
-        ).filter(
-            GPSTracking.user_profile_id == profile.id,
-            GPSTracking.trip_id.isnot(None)
-        ).group_by(GPSTracking.trip_id).order_by(db.func.max(GPSTracking.recorded_at).desc())
-        
-        trips = trips_query.all()
-        
-        trips_data = []
-        for trip in trips:
-            trip_data = {
-                'trip_id': trip.trip_id,
-                'points_count': trip.points_count,
-                'start_time': trip.start_time.isoformat() if trip.start_time else None,
-                'end_time': trip.end_time.isoformat() if trip.end_time else None,
-                'total_distance_km': float(trip.total_distance) if trip.total_distance else 0.0,
-                'duration_minutes': None
-            }
-            
-            # Calculate duration
-            if trip.start_time and trip.end_time:
-                duration = trip.end_time - trip.start_time
-                trip_data['duration_minutes'] = int(duration.total_seconds() / 60)
-            
-            trips_data.append(trip_data)
+        cursor, per_page = get_page_args(request.args)
+        
+        # Uma linha por viagem no resumo, paginada pelo fim da viagem
+        trips_query = TripSummary.query.filter(TripSummary.user_id == current_user_id)
+        trips, next_cursor = keyset_paginate(
+            trips_query, [TripSummary.end_time, TripSummary.trip_id], cursor, per_page
+        )
         
         return jsonify({
             'success': True,
             'data': {
-                'trips': trips_data,
-                'total_trips': len(trips_data)
+                'trips': [trip.to_dict() for trip in trips],
+                'total_trips': get_user_stats(current_user_id).trips_total,
+                'pagination': pagination_info(per_page, next_cursor)
             }
         }), 200
         
+    except InvalidCursorError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
     except Exception as e:
         current_app.logger.error(f"Get trips error: {e}")
         return jsonify({
@@ -490,7 +483,8 @@ def get_trips():
 
 @profile_bp.route('/stats', methods=['GET'])
 @jwt_required()
-def get_user_stats():
+@replica_reads
+def get_stats():
     """Get user statistics"""
     try:
         current_user_id = get_jwt_identity()
@@ -503,37 +497,23 @@ def get_user_stats():
                 'error': 'Perfil não encontrado'
             }), 404
         
-        # Get statistics
-        total_notifications = Notification.query.filter_by(user_profile_id=profile.id).count()
-        unread_notifications = Notification.query.filter_by(
-            user_profile_id=profile.id
-        ).filter(Notification.read_at.is_(None)).count()
-        
-        clicked_notifications = Notification.query.filter_by(
-            user_profile_id=profile.id
-        ).filter(Notification.clicked_at.isnot(None)).count()
-        
-        total_gps_points = GPSTracking.query.filter_by(user_profile_id=profile.id).count()
-        
-        unique_trips = db.session.query(GPSTracking.trip_id).filter(
-            GPSTracking.user_profile_id == profile.id,
-            GPSTracking.trip_id.isnot(None)
-        ).distinct().count()
+        # Get statistics (single-row read from aggregated counters)
+        stats = get_user_stats(current_user_id)
         
         return jsonify({
             'success': True,
             'data': {
                 'profile': profile.to_dict(),
                 'notifications': {
-                    'total': total_notifications,
-                    'unread': unread_notifications,
-                    'clicked': clicked_notifications,
-                    'click_rate': round((clicked_notifications / total_notifications * 100), 2) if total_notifications > 0 else 0
+                    'total': stats.notifications_total,
+                    'unread': stats.notifications_unread,
+                    'clicked': stats.notifications_clicked,
+                    'click_rate': stats.click_rate
                 },
                 'tracking': {
                     'total_distance_km': float(profile.total_distance_km),
-                    'total_gps_points': total_gps_points,
-                    'unique_trips': unique_trips,
+                    'total_gps_points': stats.gps_points_total,
+                    'unique_trips': stats.trips_total,
                     'last_location_update': profile.last_location_update.isoformat() if profile.last_location_update else None
                 }
             }
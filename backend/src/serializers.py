@@ -0,0 +1,175 @@
+"""
+Serializadores compilados dos modelos e provider JSON rápido.
+
+Cada serializador é declarado uma vez (campo, colunas de origem, conversão)
+e compilado para duas funções geradas com o dicionário literal: ``from_row``,
+que lê tuplas de consultas só de colunas (``select(*serializer.select_columns(tabela))``),
+e ``from_object``, usada pelos ``to_dict`` dos modelos. Assim as listagens
+não instanciam objetos do ORM nem fazem um ``getattr`` dinâmico por campo.
+
+``FastJSONProvider`` troca o ``json`` da biblioteca padrão pelo orjson quando
+ele está instalado, mantendo o mesmo resultado do provider padrão do Flask
+(chaves ordenadas, datas no formato HTTP, Decimal como texto).
+"""
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # dependência opcional: sem ela, fica o json da biblioteca padrão
+    orjson = None
+
+
+class Field(NamedTuple):
+    name: str
+    sources: Tuple[str, ...]
+    convert: Optional[Callable] = None
+
+
+def field(name: str, *sources: str, convert: Optional[Callable] = None) -> Field:
+    """Campo ``name`` lido da coluna de mesmo nome, ou de ``sources`` via ``convert``"""
+    return Field(name, sources or (name,), convert)
+
+
+# --- Conversões ---
+
+def iso(value) -> Optional[str]:
+    return value.isoformat() if value else None
+
+
+def to_float(value) -> Optional[float]:
+    return float(value) if value is not None else None
+
+
+def is_set(value) -> bool:
+    return value is not None
+
+
+FUEL_TYPE_DISPLAY = {
+    'gasoline': 'Gasolina',
+    'ethanol': 'Etanol',
+    'gnv': 'GNV',
+    'diesel': 'Diesel',
+    'diesel_s10': 'Diesel S10'
+}
+
+
+def fuel_type_display(fuel_type: str) -> str:
+    return FUEL_TYPE_DISPLAY.get(fuel_type, fuel_type)
+
+
+def is_recent(reported_at, hours: int = 24) -> bool:
+    if reported_at is None:
+        return False
+    if reported_at.tzinfo is None:
+        reported_at = reported_at.replace(tzinfo=timezone.utc)
+    return reported_at > datetime.now(timezone.utc) - timedelta(hours=hours)
+
+
+def remaining_uses(max_uses, current_uses) -> Optional[int]:
+    return (max_uses - (current_uses or 0)) if max_uses else None
+
+
+class RowSerializer:
+    """Serializador de um modelo, compilado para tuplas e para objetos"""
+
+    def __init__(self, fields: Sequence[Field]):
+        self.fields = list(fields)
+        self.columns: List[str] = []
+        for item in self.fields:
+            for source in item.sources:
+                if source not in self.columns:
+                    self.columns.append(source)
+        self.from_row = self._compile(lambda source: f"row[{self.columns.index(source)}]")
+        self.from_object = self._compile(lambda source: f"row.{source}")
+
+    def select_columns(self, table) -> List:
+        """Colunas de ``table`` na ordem esperada por ``from_row``"""
+        return [table.c[name] for name in self.columns]
+
+    def many(self, rows) -> List[Dict]:
+        from_row = self.from_row
+        return [from_row(row) for row in rows]
+
+    def _compile(self, read: Callable[[str], str]) -> Callable:
+        namespace = {}
+        entries = []
+        for index, item in enumerate(self.fields):
+            arguments = ', '.join(read(source) for source in item.sources)
+            if item.convert is None:
+                entries.append(f"{item.name!r}: {arguments}")
+            else:
+                namespace[f"_convert{index}"] = item.convert
+                entries.append(f"{item.name!r}: _convert{index}({arguments})")
+        source = "def serialize(row):\n    return {" + ", ".join(entries) + "}\n"
+        exec(compile(source, f"<serializer {self.fields[0].name}>", 'exec'), namespace)
+        return namespace['serialize']
+
+
+STATION_SERIALIZER = RowSerializer([
+    field('id'), field('name'), field('brand'), field('address'), field('city'), field('state'),
+    field('postal_code'), field('cnpj'),
+    field('latitude', convert=to_float), field('longitude', convert=to_float),
+    field('phone'), field('operating_hours'), field('amenities'), field('partner_id'), field('data_source'),
+    field('data_confidence', convert=to_float), field('is_active'),
+    field('created_at', convert=iso), field('updated_at', convert=iso)
+])
+
+FUEL_PRICE_SERIALIZER = RowSerializer([
+    field('id'), field('gas_station_id'), field('fuel_type'),
+    field('fuel_type_display', 'fuel_type', convert=fuel_type_display),
+    field('price', convert=to_float), field('source'), field('source_confidence', convert=to_float),
+    field('reported_at', convert=iso), field('verified_at', convert=iso), field('verified_by'),
+    field('is_active'), field('is_recent', 'reported_at', convert=is_recent),
+    field('created_at', convert=iso), field('updated_at', convert=iso)
+])
+
+COUPON_SERIALIZER = RowSerializer([
+    field('id'), field('gas_station_id'), field('code'), field('title'), field('description'),
+    field('discount_type'), field('discount_value', convert=to_float), field('fuel_types'),
+    field('min_liters', convert=to_float), field('min_amount', convert=to_float),
+    field('valid_from', convert=iso), field('valid_until', convert=iso),
+    field('max_uses'), field('current_uses'),
+    field('remaining_uses', 'max_uses', 'current_uses', convert=remaining_uses),
+    field('is_active'), field('created_at', convert=iso)
+])
+
+NOTIFICATION_SERIALIZER = RowSerializer([
+    field('id'), field('user_id'), field('gas_station_id'), field('fuel_type'),
+    field('price', convert=to_float), field('distance_km', convert=to_float), field('message'),
+    field('latitude', convert=to_float), field('longitude', convert=to_float),
+    field('is_read'), field('is_clicked'),
+    field('read_at', convert=iso), field('clicked_at', convert=iso), field('created_at', convert=iso)
+])
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """Provider JSON do app: orjson quando disponível, mesmo formato do padrão do Flask"""
+
+    def _orjson_options(self) -> int:
+        # Datas passam pelo ``default`` do Flask (formato HTTP), como no provider padrão
+        options = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+        if self.sort_keys:
+            options |= orjson.OPT_SORT_KEYS
+        return options
+
+    def dumps(self, obj, **kwargs) -> str:
+        if orjson is None or kwargs:
+            return super().dumps(obj, **kwargs)
+        try:
+            return orjson.dumps(obj, default=self.default, option=self._orjson_options()).decode()
+        except TypeError:
+            # Inteiros fora de 64 bits e afins: o json padrão decide
+            return super().dumps(obj)
+
+    def response(self, *args, **kwargs):
+        # Saída indentada (debug) continua com o json padrão
+        if orjson is None or self.compact is False or (self.compact is None and self._app.debug):
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        try:
+            body = orjson.dumps(obj, default=self.default, option=self._orjson_options())
+        except TypeError:
+            return super().response(*args, **kwargs)
+        return self._app.response_class(body + b"\n", mimetype=self.mimetype)
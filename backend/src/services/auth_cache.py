@@ -0,0 +1,148 @@
+"""
+Cache em processo para a checagem de tokens revogados e das chaves de API.
+
+``check_if_token_revoked`` roda em toda requisição e ``require_api_key`` em
+toda chamada de parceiro; com o cache, o caso comum é uma consulta a um
+dicionário. Resultados negativos (token não revogado, chave desconhecida)
+também ficam em cache, com TTL curto. Revogar um token, gerar outra chave ou
+desativar um parceiro publica a invalidação no canal Redis
+``auth:invalidate``, e cada processo limpa a entrada ao receber a mensagem;
+o TTL limita o atraso se uma mensagem se perder.
+"""
+import hashlib
+import json
+import logging
+import threading
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Callable, Optional
+from .ttl_cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+INVALIDATION_CHANNEL = 'auth:invalidate'
+
+REVOKED_TTL_SECONDS = 3600
+NOT_REVOKED_TTL_SECONDS = 30
+PARTNER_TTL_SECONDS = 300
+UNKNOWN_PARTNER_TTL_SECONDS = 30
+MAX_ENTRIES = 50000
+
+
+@dataclass(frozen=True)
+class PartnerRecord:
+    """Dados do parceiro usados na autenticação (sem sessão do ORM)"""
+    id: str
+    company_name: str
+    is_active: bool
+    api_key_expires: Optional[datetime]
+    rate_limit_per_hour: Optional[int]
+
+    @classmethod
+    def from_model(cls, partner) -> 'PartnerRecord':
+        return cls(partner.id, partner.company_name, bool(partner.is_active),
+                   partner.api_key_expires, partner.rate_limit_per_hour)
+
+    def is_api_key_valid(self) -> bool:
+        """Mesma regra de Partner.is_api_key_valid"""
+        if not self.is_active:
+            return False
+        if self.api_key_expires:
+            return datetime.now(timezone.utc) < self.api_key_expires
+        return True
+
+
+def key_digest(api_key: str) -> str:
+    """A chave de API não circula em claro no canal nem fica na memória do cache"""
+    return hashlib.sha256(api_key.encode()).hexdigest()
+
+
+def _default_client():
+    from src.database import get_redis
+    return get_redis()
+
+
+class AuthCache:
+    """Revogação de tokens e parceiros por chave, com invalidação via pub/sub"""
+
+    def __init__(self, client: Callable = _default_client, clock: Optional[Callable[[], float]] = None):
+        self.client = client
+        cache_args = {'max_entries': MAX_ENTRIES}
+        if clock is not None:
+            cache_args['clock'] = clock
+        self.revocations = TTLCache(REVOKED_TTL_SECONDS, **cache_args)
+        self.partners = TTLCache(PARTNER_TTL_SECONDS, **cache_args)
+        self._listener = None
+        self._listener_lock = threading.Lock()
+
+    def is_token_revoked(self, jti: str, lookup: Callable[[str], bool]) -> bool:
+        """Status de revogação do ``jti``; ``lookup`` só roda em cache miss"""
+        self._ensure_listener()
+        revoked = self.revocations.get(jti)
+        if revoked is None:
+            revoked = bool(lookup(jti))
+            self.revocations.set(jti, revoked, None if revoked else NOT_REVOKED_TTL_SECONDS)
+        return revoked
+
+    def token_revoked(self, jti: str):
+        """Registra a revogação aqui e avisa os outros processos"""
+        self.revocations.set(jti, True)
+        self._publish('token', jti)
+
+    def get_partner(self, api_key: str, loader: Callable[[str], object]) -> Optional[PartnerRecord]:
+        """Parceiro ativo da chave; ``loader`` (consulta ao banco) só roda em cache miss"""
+        self._ensure_listener()
+        digest = key_digest(api_key)
+        record = self.partners.get(digest)
+        if record is None:
+            partner = loader(api_key)
+            record = PartnerRecord.from_model(partner) if partner else False
+            self.partners.set(digest, record, None if record else UNKNOWN_PARTNER_TTL_SECONDS)
+        return record or None
+
+    def partner_changed(self, api_key: str):
+        """Descarta a chave aqui e nos outros processos (nova chave, desativação, nova cota)"""
+        digest = key_digest(api_key)
+        self.partners.delete(digest)
+        self._publish('partner', digest)
+
+    def handle_message(self, data):
+        """Aplica uma invalidação recebida pelo canal"""
+        try:
+            message = json.loads(data)
+        except (TypeError, ValueError):
+            return
+        if message.get('type') == 'token':
+            self.revocations.set(message['key'], True)
+        elif message.get('type') == 'partner':
+            self.partners.delete(message['key'])
+
+    def _publish(self, kind: str, key: str):
+        client = self.client()
+        if client is None:
+            return
+        try:
+            client.publish(INVALIDATION_CHANNEL, json.dumps({'type': kind, 'key': key}))
+        except Exception as e:
+            logger.error(f"Auth cache publish error: {e}")
+
+    def _ensure_listener(self):
+        """Assina o canal uma vez por processo, em thread daemon"""
+        if self._listener is not None:
+            return
+        with self._listener_lock:
+            if self._listener is not None:
+                return
+            client = self.client()
+            if client is None:
+                return
+            try:
+                pubsub = client.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(**{INVALIDATION_CHANNEL: lambda message: self.handle_message(message['data'])})
+                self._listener = pubsub.run_in_thread(sleep_time=1.0, daemon=True)
+            except Exception as e:
+                logger.error(f"Auth cache subscribe error: {e}")
+                self._listener = False
+
+
+auth_cache = AuthCache()
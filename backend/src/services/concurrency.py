@@ -0,0 +1,61 @@
+"""
+Chamadas de E/S concorrentes dentro de uma requisição.
+
+As rotas que consultam o Google Maps faziam as chamadas uma depois da outra
+(uma busca de Places por ponto amostrado da rota, e o banco esperando a
+API). ``submit`` e ``run_concurrently`` disparam essas chamadas num pool
+compartilhado, com o contexto da aplicação disponível em cada uma.
+
+No modo de serviço assíncrono (``SERVING_MODE=async``, ver gunicorn.conf.py)
+o worker gevent troca as threads do pool por greenlets: o mesmo código
+mantém centenas de chamadas em andamento por worker em vez de uma.
+"""
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import partial
+from typing import Callable, Iterable, List, Optional
+
+from flask import current_app, has_app_context
+
+IO_POOL_SIZE = int(os.environ.get('IO_POOL_SIZE', 32))
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def io_executor() -> ThreadPoolExecutor:
+    """Pool de E/S do processo, criado no primeiro uso (depois do fork do worker)"""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=IO_POOL_SIZE, thread_name_prefix='io')
+    return _executor
+
+
+def submit(function: Callable, *args, **kwargs) -> Future:
+    """Roda ``function`` no pool de E/S, dentro do contexto da aplicação atual
+
+    As funções submetidas não devem submeter outras e esperar por elas: com o
+    pool cheio, isso trava.
+    """
+    call = partial(function, *args, **kwargs)
+    if has_app_context():
+        app = current_app._get_current_object()
+
+        def call_in_context():
+            with app.app_context():
+                return function(*args, **kwargs)
+
+        call = call_in_context
+    return io_executor().submit(call)
+
+
+def run_concurrently(function: Callable, items: Iterable) -> List:
+    """``[function(item) for item in items]`` com as chamadas em paralelo, na mesma ordem"""
+    items = list(items)
+    if len(items) <= 1:
+        return [function(item) for item in items]
+    futures = [submit(function, item) for item in items]
+    return [future.result() for future in futures]
@@ -0,0 +1,139 @@
+"""
+Tempo de desvio (minutos) até os postos candidatos.
+
+Os tempos vêm da Distance Matrix em lotes que respeitam os limites do
+provedor (até 25 origens ou destinos e 100 elementos por chamada) e ficam em
+cache por (célula da origem, posto) com TTL, já que o trânsito muda ao longo
+do dia. Sem API, ou quando um elemento falha, o tempo é estimado por um
+perfil local de velocidade (distância em linha reta x fator de rota, com
+velocidade por faixa de distância e horário de pico).
+"""
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+import numpy as np
+from .region_index import geohash
+from .spatial_index import haversine_km
+from .ttl_cache import TTLCache
+
+# Limites da Distance Matrix por requisição
+MAX_MATRIX_DIMENSION = 25
+MAX_MATRIX_ELEMENTS = 100
+
+# Células de ~1,2 km x 0,6 km: usuários próximos compartilham os tempos
+ORIGIN_CELL_PRECISION = 6
+
+CACHE_TTL_SECONDS = 15 * 60
+CACHE_MAX_ENTRIES = 50000
+
+# Perfil local: estrada real ~30% mais longa que a reta; velocidade média por faixa de distância
+ROUTE_FACTOR = 1.3
+SPEED_PROFILE_KMH = ((5.0, 25.0), (20.0, 40.0), (float('inf'), 70.0))
+PEAK_HOURS = ((7, 9), (17, 19))
+PEAK_SPEED_FACTOR = 0.7
+
+Point = Tuple[float, float]
+MatrixProvider = Callable[[List[Point], List[Point]], Optional[Dict]]
+
+
+def estimate_minutes(distance_km, hour: Optional[int] = None) -> np.ndarray:
+    """Tempo estimado pelo perfil local de velocidade (distância em linha reta)"""
+    road_km = np.asarray(distance_km, dtype=float) * ROUTE_FACTOR
+    limits = np.array([limit for limit, _ in SPEED_PROFILE_KMH])
+    speeds = np.array([speed for _, speed in SPEED_PROFILE_KMH])
+    speed = speeds[np.minimum(np.searchsorted(limits, road_km), len(speeds) - 1)]
+
+    hour = datetime.now().hour if hour is None else hour
+    if any(start <= hour < end for start, end in PEAK_HOURS):
+        speed = speed * PEAK_SPEED_FACTOR
+    return road_km / speed * 60
+
+
+class DetourTimeService:
+    """Tempos de viagem até os postos, em lote e com cache por célula de origem"""
+
+    def __init__(self, matrix: Optional[MatrixProvider] = None, cache: Optional[TTLCache] = None):
+        self.matrix = matrix
+        self.cache = cache if cache is not None else TTLCache(CACHE_TTL_SECONDS, CACHE_MAX_ENTRIES)
+        self.api_calls = 0
+
+    def travel_minutes(self, point: Point, station_ids: Sequence[str], latitudes, longitudes,
+                       to_stations: bool = True, hour: Optional[int] = None) -> np.ndarray:
+        """
+        Minutos de ``point`` até cada posto (ou de cada posto até ``point``,
+        com ``to_stations=False``). Só os pares fora do cache vão para a API.
+        """
+        latitudes = np.asarray(latitudes, dtype=float)
+        longitudes = np.asarray(longitudes, dtype=float)
+        cell = geohash(point[0], point[1], ORIGIN_CELL_PRECISION)
+        direction = 'to' if to_stations else 'from'
+
+        minutes = np.full(len(station_ids), np.nan)
+        missing = []
+        for index, station_id in enumerate(station_ids):
+            cached = self.cache.get((direction, cell, str(station_id)))
+            if cached is None:
+                missing.append(index)
+            else:
+                minutes[index] = cached
+
+        if missing and self.matrix is not None:
+            fetched = self._fetch(point, [(latitudes[i], longitudes[i]) for i in missing], to_stations)
+            for index, value in zip(missing, fetched):
+                if value is not None:
+                    minutes[index] = value
+                    self.cache.set((direction, cell, str(station_ids[index])), value)
+
+        unknown = np.isnan(minutes)
+        if unknown.any():
+            distances = haversine_km(point[0], point[1], latitudes[unknown], longitudes[unknown])
+            minutes[unknown] = estimate_minutes(distances, hour)
+        return minutes
+
+    def detour_minutes(self, origin: Point, destination: Optional[Point], station_ids: Sequence[str],
+                       latitudes, longitudes, hour: Optional[int] = None) -> np.ndarray:
+        """
+        Minutos a mais para passar em cada posto: origem -> posto -> destino
+        menos origem -> destino. Sem destino, o tempo de ida e volta ao posto.
+        """
+        to_station = self.travel_minutes(origin, station_ids, latitudes, longitudes, hour=hour)
+        if destination is None:
+            return to_station * 2
+
+        from_station = self.travel_minutes(destination, station_ids, latitudes, longitudes,
+                                           to_stations=False, hour=hour)
+        direct = self.travel_minutes(origin, ['destino:' + geohash(destination[0], destination[1], ORIGIN_CELL_PRECISION)],
+                                     [destination[0]], [destination[1]], hour=hour)[0]
+        return np.maximum(to_station + from_station - direct, 0.0)
+
+    def _fetch(self, point: Point, stations: List[Point], to_stations: bool) -> List[Optional[float]]:
+        """Uma chamada por lote de até 25 postos (1 x 25 = 25 elementos)"""
+        batch_size = min(MAX_MATRIX_DIMENSION, MAX_MATRIX_ELEMENTS)
+        values: List[Optional[float]] = []
+        for start in range(0, len(stations), batch_size):
+            batch = [(float(lat), float(lon)) for lat, lon in stations[start:start + batch_size]]
+            origins, destinations = ([point], batch) if to_stations else (batch, [point])
+            self.api_calls += 1
+            result = self.matrix(origins, destinations)
+            if not result:
+                values.extend([None] * len(batch))
+                continue
+
+            matrix = result['matrix']
+            elements = matrix[0] if to_stations else [row[0] for row in matrix]
+            for element in elements:
+                if not element:
+                    values.append(None)
+                else:
+                    values.append(element.get('duration_in_traffic_minutes') or element['duration_minutes'])
+        return values
+
+
+def _google_matrix(origins: List[Point], destinations: List[Point]) -> Optional[Dict]:
+    from .google_maps import get_google_maps_service
+    service = get_google_maps_service()
+    if service is None or not service.is_configured():
+        return None
+    return service.get_travel_time_matrix(origins, destinations)
+
+
+detour_time_service = DetourTimeService(matrix=_google_matrix)
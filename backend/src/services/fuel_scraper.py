@@ -5,20 +5,38 @@ import re
 from datetime import datetime, timezone
 from typing import List, Dict, Optional
 from flask import current_app
-from src.models.gas_station import GasStation, FuelPrice
-from src.models.partner import Partner
-from src.database import db
-import time
-import random
+from src.services.scraping_pipeline import HostRateLimiter, ScrapeJob, ScrapingPipeline
+from src.services.price_ingestion import bulk_upsert_prices
 
 class FuelPriceScraper:
     """Service for scraping fuel prices from various sources"""
     
-    def __init__(self):
-        self.session = requests.Session()
+    PETROBRAS_URL = "https://petrobras.com.br/pt/nossas-atividades/precos-de-combustiveis/"
+    COMBUSTIVEL_API_URL = "https://combustivelapi.com.br/api/precos"
+    PRICE_PATTERN = re.compile(r'R\$\s*(\d+[,\.]\d{2,3})')
+    
+    def __init__(self, session: Optional[requests.Session] = None):
+        self.session = session or requests.Session()
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
         })
+        self._pipeline = None
+    
+    @property
+    def pipeline(self) -> ScrapingPipeline:
+        """Pipeline concorrente, configurado no primeiro uso a partir do app config"""
+        if self._pipeline is None:
+            config = current_app.config
+            self._pipeline = ScrapingPipeline(
+                session=self.session,
+                max_workers=config.get('SCRAPER_MAX_WORKERS', 4),
+                rate_limiter=HostRateLimiter(
+                    rate=config.get('SCRAPER_REQUESTS_PER_SECOND', 0.5),
+                    capacity=config.get('SCRAPER_BURST', 1)
+                ),
+                timeout=config.get('SCRAPER_TIMEOUT', 10)
+            )
+        return self._pipeline
     
     def scrape_anp_prices(self, state: str = 'SP', city: str = None) -> List[Dict]:
         """Scrape fuel prices from ANP (Agência Nacional do Petróleo)"""
@@ -42,44 +60,99 @@ class FuelPriceScraper:
             current_app.logger.error(f"ANP scraping error: {e}")
             return []
     
-    def scrape_petrobras_prices(self) -> List[Dict]:
-        """Scrape fuel prices from Petrobras website"""
-        try:
-            url = "https://petrobras.com.br/pt/nossas-atividades/precos-de-combustiveis/"
-            
-            response = self.session.get(url, timeout=10)
-            response.raise_for_status()
-            
-            soup = BeautifulSoup(response.content, 'html.parser')
-            
-            prices = []
+    def parse_petrobras_html(self, content) -> List[Dict]:
+        """Extract prices from the Petrobras prices page"""
+        soup = BeautifulSoup(content, 'html.parser')
+        
+        prices = []
+        
+        # Look for price tables or sections
+        price_sections = soup.find_all(['table', 'div'], class_=re.compile(r'price|combustivel|fuel', re.I))
+        
+        for section in price_sections:
+            # Extract price information
+            # This is a simplified implementation
+            text = section.get_text()
             
-            # Look for price tables or sections
-            price_sections = soup.find_all(['table', 'div'], class_=re.compile(r'price|combustivel|fuel', re.I))
+            # Look for price patterns (R$ X,XX)
+            price_matches = self.PRICE_PATTERN.findall(text)
             
-            for section in price_sections:
-                # Extract price information
-                # This is a simplified implementation
-                text = section.get_text()
+            for price_match in price_matches:
+                price_value = float(price_match.replace(',', '.'))
+                
+                # Try to determine fuel type from context
+                fuel_type = self.detect_fuel_type(text)
+                
+                if fuel_type:
+                    prices.append({
+                        'source': 'petrobras_website',
+                        'fuel_type': fuel_type,
+                        'price': price_value,
+                        'location': 'Brasil',
+                        'confidence': 0.7,
+                        'scraped_at': datetime.now(timezone.utc)
+                    })
+        
+        return prices
+    
+    def parse_combustivel_api(self, data: Dict) -> List[Dict]:
+        """Convert a combustivelapi.com.br payload to price records"""
+        prices = []
+        for item in data.get('precos', []):
+            prices.append({
+                'source': 'combustivel_api',
+                'fuel_type': self.normalize_fuel_type(item.get('combustivel')),
+                'price': float(item.get('preco', 0)),
+                'location': item.get('cidade', ''),
+                'state': item.get('estado', ''),
+                'station_name': item.get('posto', ''),
+                'confidence': 0.8,
+                'scraped_at': datetime.now(timezone.utc)
+            })
+        
+        return prices
+    
+    def parse_station_website(self, content, url: str) -> List[Dict]:
+        """Extract prices from an individual gas station website"""
+        soup = BeautifulSoup(content, 'html.parser')
+        
+        prices = []
+        
+        # Look for price information
+        price_elements = soup.find_all(string=re.compile(r'R\$\s*\d+[,\.]\d{2,3}'))
+        
+        for price_text in price_elements:
+            price_match = self.PRICE_PATTERN.search(price_text)
+            if price_match:
+                price_value = float(price_match.group(1).replace(',', '.'))
                 
-                # Look for price patterns (R$ X,XX)
-                price_matches = re.findall(r'R\$\s*(\d+[,\.]\d{2,3})', text)
+                # Try to determine fuel type from surrounding context
+                parent = price_text.parent if hasattr(price_text, 'parent') else None
+                context = parent.get_text() if parent else price_text
                 
-                for price_match in price_matches:
-                    price_value = float(price_match.replace(',', '.'))
-                    
-                    # Try to determine fuel type from context
-                    fuel_type = self.detect_fuel_type(text)
-                    
-                    if fuel_type:
-                        prices.append({
-                            'source': 'petrobras_website',
-                            'fuel_type': fuel_type,
-                            'price': price_value,
-                            'location': 'Brasil',
-                            'confidence': 0.7,
-                            'scraped_at': datetime.now(timezone.utc)
-                        })
+                fuel_type = self.detect_fuel_type(context)
+                
+                if fuel_type:
+                    prices.append({
+                        'source': f'website_{url}',
+                        'fuel_type': fuel_type,
+                        'price': price_value,
+                        'url': url,
+                        'confidence': 0.6,
+                        'scraped_at': datetime.now(timezone.utc)
+                    })
+        
+        return prices
+    
+    def scrape_petrobras_prices(self) -> List[Dict]:
+        """Scrape fuel prices from Petrobras website"""
+        try:
+            response = self.pipeline.fetch(self.PETROBRAS_URL)
+            if response is None:
+                current_app.logger.info("Petrobras prices not modified since last scrape")
+                return []
+            
+            prices = self.parse_petrobras_html(response.content)
             
             current_app.logger.info(f"Scraped {len(prices)} prices from Petrobras")
             return prices
@@ -92,25 +165,10 @@ class FuelPriceScraper:
         """Scrape from combustivelapi.com.br"""
         try:
             # This API might require authentication or have rate limits
-            url = "https://combustivelapi.com.br/api/precos"
+            response = self.pipeline.fetch(self.COMBUSTIVEL_API_URL)
             
-            response = self.session.get(url, timeout=10)
-            
-            if response.status_code == 200:
-                data = response.json()
-                
-                prices = []
-                for item in data.get('precos', []):
-                    prices.append({
-                        'source': 'combustivel_api',
-                        'fuel_type': self.normalize_fuel_type(item.get('combustivel')),
-                        'price': float(item.get('preco', 0)),
-                        'location': item.get('cidade', ''),
-                        'state': item.get('estado', ''),
-                        'station_name': item.get('posto', ''),
-                        'confidence': 0.8,
-                        'scraped_at': datetime.now(timezone.utc)
-                    })
+            if response is not None:
+                prices = self.parse_combustivel_api(response.json())
                 
                 current_app.logger.info(f"Scraped {len(prices)} prices from Combustível API")
                 return prices
@@ -120,46 +178,26 @@ class FuelPriceScraper:
         
         return []
     
+    def station_website_jobs(self, station_urls: List[str]) -> List[ScrapeJob]:
+        return [
+            ScrapeJob(
+                name=f'website_{url}',
+                url=url,
+                parser=lambda response, url=url: self.parse_station_website(response.content, url)
+            )
+            for url in station_urls
+        ]
+    
     def scrape_local_gas_station_websites(self, station_urls: List[str]) -> List[Dict]:
         """Scrape prices from individual gas station websites"""
         prices = []
         
-        for url in station_urls:
-            try:
-                time.sleep(random.uniform(1, 3))  # Rate limiting
-                
-                response = self.session.get(url, timeout=10)
-                response.raise_for_status()
-                
-                soup = BeautifulSoup(response.content, 'html.parser')
-                
-                # Look for price information
-                price_elements = soup.find_all(text=re.compile(r'R\$\s*\d+[,\.]\d{2,3}'))
-                
-                for price_text in price_elements:
-                    price_match = re.search(r'R\$\s*(\d+[,\.]\d{2,3})', price_text)
-                    if price_match:
-                        price_value = float(price_match.group(1).replace(',', '.'))
-                        
-                        # Try to determine fuel type from surrounding context
-                        parent = price_text.parent if hasattr(price_text, 'parent') else None
-                        context = parent.get_text() if parent else price_text
-                        
-                        fuel_type = self.detect_fuel_type(context)
-                        
-                        if fuel_type:
-                            prices.append({
-                                'source': f'website_{url}',
-                                'fuel_type': fuel_type,
-                                'price': price_value,
-                                'url': url,
-                                'confidence': 0.6,
-                                'scraped_at': datetime.now(timezone.utc)
-                            })
-                
-            except Exception as e:
-                current_app.logger.error(f"Error scraping {url}: {e}")
+        # Busca concorrente; o rate limit é aplicado por host pelo pipeline
+        for result in self.pipeline.run(self.station_website_jobs(station_urls)):
+            if result.error:
+                current_app.logger.error(f"Error scraping {result.job.url}: {result.error}")
                 continue
+            prices.extend(result.prices)
         
         return prices
     
@@ -205,129 +243,58 @@ class FuelPriceScraper:
     
     def update_database_prices(self, scraped_prices: List[Dict]) -> Dict:
         """Update database with scraped prices"""
-        stats = {
-            'processed': 0,
-            'updated': 0,
-            'created': 0,
-            'errors': 0
-        }
-        
-        for price_data in scraped_prices:
-            try:
-                stats['processed'] += 1
-                
-                # Find or create gas station
-                station = None
-                
-                if price_data.get('station_name') and price_data.get('location'):
-                    # Try to find existing station
-                    station = GasStation.query.filter_by(
-                        name=price_data['station_name']
-                    ).first()
-                    
-                    if not station:
-                        # Create new station with minimal data
-                        station = GasStation(
-                            name=price_data['station_name'],
-                            address=price_data.get('location', ''),
-                            city=price_data.get('location', '').split(',')[0] if ',' in price_data.get('location', '') else price_data.get('location', ''),
-                            state=price_data.get('state', 'SP'),
-                            latitude=-23.5505,  # Default São Paulo coordinates
-                            longitude=-46.6333,
-                            data_source='web_scraping',
-                            data_confidence=price_data.get('confidence', 0.5)
-                        )
-                        db.session.add(station)
-                        db.session.flush()  # Get ID
-                        stats['created'] += 1
-                
-                if station:
-                    # Check if price already exists (recent)
-                    existing_price = FuelPrice.query.filter_by(
-                        gas_station_id=station.id,
-                        fuel_type=price_data['fuel_type']
-                    ).filter(
-                        FuelPrice.reported_at > datetime.now(timezone.utc).replace(hour=0, minute=0, second=0)
-                    ).first()
-                    
-                    if existing_price:
-                        # Update existing price
-                        existing_price.price = price_data['price']
-                        existing_price.source = price_data['source']
-                        existing_price.source_confidence = price_data.get('confidence', 0.5)
-                        existing_price.reported_at = price_data.get('scraped_at', datetime.now(timezone.utc))
-                        stats['updated'] += 1
-                    else:
-                        # Create new price
-                        new_price = FuelPrice(
-                            gas_station_id=station.id,
-                            fuel_type=price_data['fuel_type'],
-                            price=price_data['price'],
-                            source=price_data['source'],
-                            source_confidence=price_data.get('confidence', 0.5),
-                            reported_at=price_data.get('scraped_at', datetime.now(timezone.utc))
-                        )
-                        db.session.add(new_price)
-                        stats['created'] += 1
-                
-            except Exception as e:
-                current_app.logger.error(f"Error updating price data: {e}")
-                stats['errors'] += 1
-                continue
-        
-        try:
-            db.session.commit()
-            current_app.logger.info(f"Price update stats: {stats}")
-        except Exception as e:
-            db.session.rollback()
-            current_app.logger.error(f"Database commit error: {e}")
-            stats['errors'] += stats['processed']
-            stats['updated'] = 0
-            stats['created'] = 0
-        
+        stats = bulk_upsert_prices(
+            scraped_prices,
+            chunk_size=current_app.config.get('PRICE_INGESTION_CHUNK_SIZE', 1000)
+        )
+        current_app.logger.info(f"Price update stats: {stats}")
         return stats
     
-    def run_full_scraping_cycle(self) -> Dict:
+    def run_full_scraping_cycle(self, station_urls: Optional[List[str]] = None) -> Dict:
         """Run complete scraping cycle from all sources"""
         current_app.logger.info("Starting full fuel price scraping cycle")
         
-        all_prices = []
+        jobs = [
+            ScrapeJob('petrobras', self.PETROBRAS_URL,
+                      lambda response: self.parse_petrobras_html(response.content)),
+            ScrapeJob('combustivel_api', self.COMBUSTIVEL_API_URL,
+                      lambda response: self.parse_combustivel_api(response.json())),
+        ] + self.station_website_jobs(station_urls or [])
         
-        # Scrape from different sources
-        sources = [
-            ('petrobras', self.scrape_petrobras_prices),
-            ('combustivel_api', self.scrape_combustivel_api),
-            ('anp', lambda: self.scrape_anp_prices('SP'))
-        ]
+        stats = {'processed': 0, 'updated': 0, 'created': 0, 'errors': 0, 'failed_chunks': []}
+        sources = {}
+        total_scraped = 0
         
-        for source_name, scraper_func in sources:
-            try:
-                current_app.logger.info(f"Scraping from {source_name}")
-                prices = scraper_func()
-                all_prices.extend(prices)
-                
-                # Rate limiting between sources
-                time.sleep(random.uniform(2, 5))
-                
-            except Exception as e:
-                current_app.logger.error(f"Error scraping {source_name}: {e}")
-                continue
+        def ingest(source_name, prices):
+            # Cada fonte é gravada assim que termina, sem esperar as demais
+            nonlocal total_scraped
+            total_scraped += len(prices)
+            sources[source_name] = len(prices)
+            if prices:
+                for key, value in self.update_database_prices(prices).items():
+                    stats[key] = stats.get(key, 0) + value
         
-        # Update database
-        stats = self.update_database_prices(all_prices)
+        for result in self.pipeline.run(jobs):
+            if result.error:
+                current_app.logger.error(f"Error scraping {result.job.name}: {result.error}")
+                sources[result.job.name] = 'error'
+            elif result.not_modified:
+                current_app.logger.info(f"{result.job.name} not modified since last scrape")
+                sources[result.job.name] = 'not_modified'
+            else:
+                current_app.logger.info(f"Scraped {len(result.prices)} prices from {result.job.name}")
+                ingest(result.job.name, result.prices)
         
-        # Log scraping activity
-        from src.models.gas_station import db
-        try:
-            # You would create a ScrapingLog model for this
-            current_app.logger.info(f"Scraping completed: {stats}")
-        except Exception as e:
-            current_app.logger.error(f"Error logging scraping activity: {e}")
+        # ANP ainda não tem endpoint implementado (não faz requisição)
+        ingest('anp', self.scrape_anp_prices('SP'))
+        
+        current_app.logger.info(f"Scraping completed: {stats}")
         
         return {
-            'total_scraped': len(all_prices),
+            'total_scraped': total_scraped,
             'update_stats': stats,
             'sources_used': len(sources),
+            'sources': sources,
             'completed_at': datetime.now(timezone.utc).isoformat()
         }
 
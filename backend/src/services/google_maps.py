@@ -1,7 +1,7 @@
-import googlemaps
-import requests
-from flask import current_app
+from flask import current_app, has_app_context
 from typing import List, Dict, Optional, Tuple
+from .lazy import LazyService
+from .concurrency import run_concurrently
 import math
 
 class GoogleMapsService:
@@ -11,7 +11,7 @@ class GoogleMapsService:
         self.api_key = api_key or current_app.config.get('GOOGLE_MAPS_API_KEY')
         if self.api_key and self.api_key != 'your-google-maps-api-key-here':
             try:
-                self.client = googlemaps.Client(key=self.api_key)
+                self.client = self._build_client(current_app.config)
             except Exception as e:
                 current_app.logger.warning(f"Google Maps API initialization failed: {e}")
                 self.client = None
@@ -19,6 +19,27 @@ class GoogleMapsService:
             self.client = None
             current_app.logger.warning("Google Maps API key not configured")
     
+    def _build_client(self, config):
+        """Client sharing one pooled HTTP session across concurrent calls"""
+        import googlemaps
+        import requests
+        from requests.adapters import HTTPAdapter
+        
+        pool_size = config.get('GOOGLE_MAPS_POOL_SIZE', 100)
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        return googlemaps.Client(
+            key=self.api_key,
+            requests_session=session,
+            base_url=config.get('GOOGLE_MAPS_BASE_URL', 'https://maps.googleapis.com'),
+            timeout=config.get('GOOGLE_MAPS_TIMEOUT', 10),
+            # The client throttles to min(per second, per minute / 60); both follow the config
+            queries_per_second=config.get('GOOGLE_MAPS_QPS', 60),
+            queries_per_minute=config.get('GOOGLE_MAPS_QPS', 60) * 60
+        )
+    
     def is_configured(self) -> bool:
         """Check if Google Maps API is properly configured"""
         return self.client is not None
@@ -184,13 +205,14 @@ class GoogleMapsService:
     
     def find_gas_stations_along_route(self, origin: Tuple[float, float], 
                                     destination: Tuple[float, float],
-                                    search_radius: int = 2000) -> List[Dict]:
-        """Find gas stations along a route"""
+                                    search_radius: int = 2000,
+                                    directions: Optional[Dict] = None) -> List[Dict]:
+        """Find gas stations along a route (reuses ``directions`` when the caller has them)"""
         if not self.is_configured():
             return []
         
         # Get route directions
-        directions = self.get_directions(origin, destination)
+        directions = directions or self.get_directions(origin, destination)
         if not directions:
             return []
         
@@ -215,15 +237,15 @@ class GoogleMapsService:
         # Add destination
         waypoints.append(destination)
         
-        # Find gas stations near each waypoint
+        # Find gas stations near each waypoint (one Places call per waypoint, in parallel)
         all_stations = []
         seen_place_ids = set()
         
-        for waypoint in waypoints:
-            stations = self.find_gas_stations_nearby(
-                waypoint[0], waypoint[1], search_radius
-            )
-            
+        nearby_lists = run_concurrently(
+            lambda waypoint: self.find_gas_stations_nearby(waypoint[0], waypoint[1], search_radius),
+            waypoints
+        )
+        for stations in nearby_lists:
             for station in stations:
                 if station['place_id'] not in seen_place_ids:
                     # Calculate position on route (0.0 to 1.0)
@@ -318,12 +340,16 @@ class GoogleMapsService:
         
         return None
 
-# Global service instance - will be initialized in app context
-google_maps_service = None
+# Global service instance - built on first use, inside the app context
+google_maps_service = LazyService(GoogleMapsService, 'google_maps_service')
 
 def init_google_maps_service(app):
-    """Initialize Google Maps service with app context"""
-    global google_maps_service
+    """Build the Google Maps service now instead of on first use"""
     with app.app_context():
-        google_maps_service = GoogleMapsService()
+        google_maps_service.instance
 
+def get_google_maps_service():
+    """Configured service instance (None without an API key or outside the app context)"""
+    if not google_maps_service.loaded and not has_app_context():
+        return None
+    return google_maps_service if google_maps_service.is_configured() else None
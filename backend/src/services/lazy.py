@@ -0,0 +1,55 @@
+"""
+Serviços globais criados no primeiro uso.
+
+Instâncias como ``price_intelligence`` (que gera dados de exemplo) ou os
+clientes do Google Maps eram construídas na importação do módulo, e esse
+custo entrava no cold start de todo processo, usasse ele o serviço ou não.
+``LazyService`` mantém o mesmo nome global e só chama a fábrica no primeiro
+acesso a um atributo (uma vez, mesmo com várias threads).
+"""
+import threading
+from typing import Callable, Dict, Optional
+
+
+class LazyService:
+    """Proxy que constrói o serviço no primeiro acesso"""
+
+    registry: Dict[str, 'LazyService'] = {}
+
+    def __init__(self, factory: Callable, name: Optional[str] = None):
+        self._factory = factory
+        self._name = name or getattr(factory, '__name__', repr(factory))
+        self._instance = None
+        self._lock = threading.Lock()
+        LazyService.registry[self._name] = self
+
+    @property
+    def instance(self):
+        instance = self._instance
+        if instance is None:
+            with self._lock:
+                if self._instance is None:
+                    self._instance = self._factory()
+                instance = self._instance
+        return instance
+
+    @property
+    def loaded(self) -> bool:
+        return self._instance is not None
+
+    def reset(self):
+        """Descarta a instância; a próxima chamada constrói outra"""
+        with self._lock:
+            self._instance = None
+
+    def __getattr__(self, name):
+        return getattr(self.instance, name)
+
+    def __repr__(self):
+        state = 'carregado' if self.loaded else 'pendente'
+        return f"<LazyService {self._name} ({state})>"
+
+
+def loaded_services() -> Dict[str, bool]:
+    """Estado de cada serviço preguiçoso (para diagnóstico do cold start)"""
+    return {name: service.loaded for name, service in LazyService.registry.items()}
@@ -1,7 +1,8 @@
-import googlemaps
 import os
 from typing import Dict, List, Tuple, Optional
 import logging
+from .road_graph import load_road_graph
+from .lazy import LazyService
 
 logger = logging.getLogger(__name__)
 
@@ -12,10 +13,38 @@ class MapsService:
         self.use_simulation = self.api_key == 'demo_key'
         
         if not self.use_simulation:
+            import googlemaps
             self.gmaps = googlemaps.Client(key=self.api_key)
         else:
             self.gmaps = None
             logger.info("Google Maps em modo simulação - usando dados mock")
+        
+        # 'offline' usa o grafo viário local mesmo com chave, sem custo por requisição
+        self.routing_mode = os.getenv('MAPS_ROUTING_MODE', 'auto')
+        self._road_graph = None
+        self._road_graph_loaded = False
+    
+    @property
+    def road_graph(self):
+        """Grafo viário local, carregado na primeira rota"""
+        if not self._road_graph_loaded:
+            self._road_graph = load_road_graph()
+            self._road_graph_loaded = True
+        return self._road_graph
+    
+    def _use_offline_routing(self) -> bool:
+        return self.use_simulation or self.routing_mode == 'offline'
+    
+    def _offline_route(self, origin_lat: float, origin_lng: float,
+                       dest_lat: float, dest_lng: float) -> Optional[Dict]:
+        """Rota pelo grafo local; None sem grafo ou fora da cobertura"""
+        if self.road_graph is None:
+            return None
+        try:
+            return self.road_graph.route(origin_lat, origin_lng, dest_lat, dest_lng)
+        except Exception as e:
+            logger.error(f"Erro no roteamento offline: {e}")
+            return None
     
     def geocode_address(self, address: str) -> Optional[Dict]:
         """Converte endereço em coordenadas lat/lng"""
@@ -39,6 +68,16 @@ class MapsService:
     
     def get_route(self, origin: str, destination: str) -> Optional[Dict]:
         """Obtém rota detalhada entre dois pontos"""
+        if self._use_offline_routing():
+            origin_coords = self.geocode_address(origin)
+            dest_coords = self.geocode_address(destination)
+            if origin_coords and dest_coords:
+                route = self._offline_route(origin_coords['latitude'], origin_coords['longitude'],
+                                            dest_coords['latitude'], dest_coords['longitude'])
+                if route:
+                    route['start_address'] = origin_coords['formatted_address']
+                    route['end_address'] = dest_coords['formatted_address']
+                    return route
         if self.use_simulation:
             return self._simulate_route(origin, destination)
         
@@ -87,6 +126,10 @@ class MapsService:
     def get_route_coordinates(self, origin_lat: float, origin_lng: float, 
                             dest_lat: float, dest_lng: float) -> Optional[Dict]:
         """Obtém rota usando coordenadas"""
+        if self._use_offline_routing():
+            route = self._offline_route(origin_lat, origin_lng, dest_lat, dest_lng)
+            if route:
+                return route
         if self.use_simulation:
             return self._simulate_route_coordinates(origin_lat, origin_lng, dest_lat, dest_lng)
         
@@ -248,6 +291,6 @@ class MapsService:
         
         return known_stations
 
-# Instância global do serviço
-maps_service = MapsService()
+# Instância global do serviço, criada no primeiro uso
+maps_service = LazyService(MapsService, 'maps_service')
 
@@ -0,0 +1,342 @@
+"""
+Agregados de mercado incrementais por (região, combustível).
+
+Cada agregado (um por nível da hierarquia de regiões) acompanha o último preço de cada posto da região e mantém, com
+custo O(1) por escrita:
+
+- média/variância pelo algoritmo de Welford (com remoção do preço substituído);
+- um histograma esparso de preços em centavos para mediana, mínimo e máximo;
+- média e variância exponenciais (EWMA) para a tendência e a volatilidade.
+
+Os snapshots são gravados na tabela ``market_analysis`` (migração 007).
+"""
+import math
+from datetime import date
+from typing import Dict, Iterable, List, Optional, Tuple
+import numpy as np
+from sqlalchemy import Column, Date, DateTime, Integer, MetaData, Numeric, String, Table, delete, func, insert
+
+SECONDS_PER_DAY = 86400
+
+# Resolução do histograma de preços (R$ 0,01)
+HISTOGRAM_STEP = 0.01
+
+# Meia-vida das médias exponenciais e horizonte usado no change_percent
+TREND_HALFLIFE_DAYS = 3.0
+TREND_HORIZON_DAYS = 7
+VOLATILITY_ALPHA = 0.05
+
+market_analysis_table = Table(
+    'market_analysis', MetaData(),
+    Column('id', Integer, primary_key=True),
+    Column('fuel_type', String(20), nullable=False),
+    Column('region', String(100)),
+    Column('average_price', Numeric(6, 3), nullable=False),
+    Column('min_price', Numeric(6, 3), nullable=False),
+    Column('max_price', Numeric(6, 3), nullable=False),
+    Column('median_price', Numeric(6, 3)),
+    Column('std_deviation', Numeric(6, 3)),
+    Column('volatility_level', String(20)),
+    Column('trend_direction', String(20)),
+    Column('trend_strength', Numeric(5, 2)),
+    Column('sample_size', Integer),
+    Column('analysis_date', Date),
+    Column('created_at', DateTime, server_default=func.now()),
+)
+
+
+class RunningStats:
+    """Média e variância de Welford com suporte a remoção"""
+
+    __slots__ = ('count', 'mean', 'm2')
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def add(self, value: float):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+
+    def remove(self, value: float):
+        if self.count <= 1:
+            self.count, self.mean, self.m2 = 0, 0.0, 0.0
+            return
+        delta = value - self.mean
+        self.count -= 1
+        self.mean -= delta / self.count
+        self.m2 = max(0.0, self.m2 - delta * (value - self.mean))
+
+    @property
+    def variance(self) -> float:
+        return self.m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    @property
+    def std(self) -> float:
+        return math.sqrt(self.variance)
+
+
+class PriceHistogram:
+    """Histograma esparso em centavos: inserção e remoção O(1), quantis na leitura"""
+
+    __slots__ = ('counts', 'total')
+
+    def __init__(self):
+        self.counts: Dict[int, int] = {}
+        self.total = 0
+
+    @staticmethod
+    def _bin(price: float) -> int:
+        return int(round(price / HISTOGRAM_STEP))
+
+    def add(self, price: float):
+        index = self._bin(price)
+        self.counts[index] = self.counts.get(index, 0) + 1
+        self.total += 1
+
+    def remove(self, price: float):
+        index = self._bin(price)
+        count = self.counts.get(index)
+        if not count:
+            return
+        if count == 1:
+            del self.counts[index]
+        else:
+            self.counts[index] = count - 1
+        self.total -= 1
+
+    def quantiles(self, *qs: float) -> Tuple[Optional[float], ...]:
+        if not self.total:
+            return tuple(None for _ in qs)
+        bins = sorted(self.counts)
+        cumulative = np.cumsum([self.counts[index] for index in bins])
+        ranks = [min(self.total - 1, max(0, int(math.ceil(q * self.total)) - 1)) for q in qs]
+        positions = np.searchsorted(cumulative, np.array(ranks) + 1)
+        return tuple(round(bins[position] * HISTOGRAM_STEP, 2) for position in positions)
+
+
+class EwmaTrend:
+    """Nível e inclinação (R$/dia) exponenciais, ponderados pelo tempo entre observações"""
+
+    __slots__ = ('level', 'slope', 'timestamp', 'halflife')
+
+    def __init__(self, halflife_days: float = TREND_HALFLIFE_DAYS):
+        self.level = None
+        self.slope = 0.0
+        self.timestamp = None
+        self.halflife = halflife_days * SECONDS_PER_DAY
+
+    def update(self, timestamp: int, value: float):
+        if self.level is None:
+            self.level, self.timestamp = value, timestamp
+            return
+
+        elapsed = timestamp - self.timestamp
+        if elapsed <= 0:
+            # Mesma marca de tempo (ou atrasada): só ajusta o nível
+            self.level = value
+            return
+
+        alpha = 1 - 0.5 ** (elapsed / self.halflife)
+        observed_slope = (value - self.level) / (elapsed / SECONDS_PER_DAY)
+        self.slope += alpha * (observed_slope - self.slope)
+        self.level = value
+        self.timestamp = timestamp
+
+
+class MarketAggregate:
+    """Agregado de uma região/combustível sobre o último preço de cada posto"""
+
+    def __init__(self):
+        self.latest: Dict[str, float] = {}
+        self.stats = RunningStats()
+        self.histogram = PriceHistogram()
+        self.trend = EwmaTrend()
+        self.ew_mean = None
+        self.ew_var = 0.0
+        self._snapshot = None
+
+    def update(self, station_id: str, price: float, timestamp: int):
+        previous = self.latest.get(station_id)
+        if previous is not None:
+            self.stats.remove(previous)
+            self.histogram.remove(previous)
+        self.latest[station_id] = price
+        self.stats.add(price)
+        self.histogram.add(price)
+
+        # Volatilidade: média e variância exponenciais dos preços observados
+        if self.ew_mean is None:
+            self.ew_mean = price
+        else:
+            delta = price - self.ew_mean
+            self.ew_mean += VOLATILITY_ALPHA * delta
+            self.ew_var = (1 - VOLATILITY_ALPHA) * (self.ew_var + VOLATILITY_ALPHA * delta * delta)
+
+        self.trend.update(timestamp, self.stats.mean)
+        self._snapshot = None
+
+    def seed(self, station_ids, prices: np.ndarray, daily_timestamps: np.ndarray,
+             daily_means: np.ndarray, price_variance: float):
+        """Inicialização em lote a partir do histórico (sem replay ponto a ponto)"""
+        for station_id, price in zip(station_ids, prices.tolist()):
+            self.latest[station_id] = price
+            self.stats.add(price)
+            self.histogram.add(price)
+        for timestamp, value in zip(daily_timestamps.tolist(), daily_means.tolist()):
+            self.trend.update(timestamp, value)
+        if self.latest:
+            self.trend.level = self.stats.mean
+        self.ew_mean = float(prices.mean()) if len(prices) else None
+        self.ew_var = price_variance
+        self._snapshot = None
+
+    def regional_stats(self) -> Dict:
+        if self._snapshot is None:
+            minimum, median, maximum = self.histogram.quantiles(0.0, 0.5, 1.0)
+            self._snapshot = {
+                'average': round(self.stats.mean, 2),
+                'min': minimum,
+                'max': maximum,
+                'median': median,
+                'std_deviation': round(self.stats.std, 3),
+                'sample_size': self.stats.count
+            }
+        return self._snapshot
+
+    @property
+    def change_percent(self) -> float:
+        if not self.trend.level:
+            return 0.0
+        return self.trend.slope * TREND_HORIZON_DAYS / self.trend.level * 100
+
+    @property
+    def volatility(self) -> str:
+        if self.ew_mean is None or not self.stats.count:
+            return 'unknown'
+        coefficient_variation = math.sqrt(self.ew_var) / self.ew_mean * 100
+        if coefficient_variation < 1:
+            return 'low'
+        elif coefficient_variation < 3:
+            return 'medium'
+        return 'high'
+
+    def market_trend(self) -> Dict:
+        change_percent = self.change_percent
+        if change_percent > 2:
+            trend = 'rising'
+        elif change_percent < -2:
+            trend = 'falling'
+        else:
+            trend = 'stable'
+            change_percent = 0
+        return {
+            'trend': trend,
+            'change_percent': round(change_percent, 2),
+            'current_average': round(self.stats.mean, 2),
+            'volatility': self.volatility
+        }
+
+
+class MarketAggregator:
+    """Agregados por (região, combustível), atualizados a cada preço recebido"""
+
+    def __init__(self):
+        self.aggregates: Dict[Tuple[str, str], MarketAggregate] = {}
+
+    def get(self, region: str, fuel_type: str) -> Optional[MarketAggregate]:
+        aggregate = self.aggregates.get((region, fuel_type))
+        return aggregate if aggregate and aggregate.stats.count else None
+
+    def _aggregate(self, region: str, fuel_type: str) -> MarketAggregate:
+        key = (region, fuel_type)
+        if key not in self.aggregates:
+            self.aggregates[key] = MarketAggregate()
+        return self.aggregates[key]
+
+    def update(self, regions: Iterable[str], station_id: str, fuel_type: str, price: float, timestamp: int):
+        """Aplica o preço em todos os níveis da hierarquia do posto"""
+        for region in regions:
+            self._aggregate(region, fuel_type).update(station_id, float(price), int(timestamp))
+
+    def rebuild(self, history, regions_of):
+        """Reconstrói todos os agregados a partir de um PriceHistoryStore"""
+        self.aggregates = {}
+
+        for fuel_type in history.fuel_types():
+            by_region: Dict[str, list] = {}
+            for (station_id, _), series in history.items(fuel_type):
+                for region in regions_of(station_id):
+                    by_region.setdefault(region, []).append((station_id, series))
+
+            for region, members in by_region.items():
+                station_ids = [station_id for station_id, _ in members]
+                latest = np.array([series.last_price for _, series in members])
+                timestamps = np.concatenate([series.view()[0] for _, series in members])
+                prices = np.concatenate([series.view()[1] for _, series in members])
+
+                # Média diária da região para semear a tendência
+                days, inverse = np.unique(timestamps // SECONDS_PER_DAY, return_inverse=True)
+                daily_means = np.bincount(inverse, weights=prices) / np.bincount(inverse)
+
+                self._aggregate(region, fuel_type).seed(
+                    station_ids, latest, days * SECONDS_PER_DAY, daily_means,
+                    float(prices.var()) if len(prices) > 1 else 0.0
+                )
+
+    def regions(self, prefix: Optional[str] = None) -> List[str]:
+        return sorted({
+            region for region, _ in self.aggregates
+            if prefix is None or region.startswith(prefix)
+        })
+
+    def regional_averages(self) -> Dict[str, Dict[str, Dict]]:
+        result: Dict[str, Dict[str, Dict]] = {}
+        for (region, fuel_type), aggregate in self.aggregates.items():
+            if aggregate.stats.count:
+                result.setdefault(region, {})[fuel_type] = aggregate.regional_stats()
+        return result
+
+    def market_trends(self, region: Optional[str] = None) -> Dict[str, Dict]:
+        result = {}
+        for (aggregate_region, fuel_type), aggregate in self.aggregates.items():
+            if aggregate.stats.count and (region is None or aggregate_region == region):
+                result[fuel_type] = aggregate.market_trend()
+        return result
+
+    def persist(self, connection, analysis_date: Optional[date] = None) -> int:
+        """Grava (substitui) o snapshot do dia em market_analysis; retorna o número de linhas"""
+        analysis_date = analysis_date or date.today()
+        rows = []
+        for (region, fuel_type), aggregate in self.aggregates.items():
+            # Células geohash ficam só em memória
+            if not aggregate.stats.count or region.startswith('geo:'):
+                continue
+            stats = aggregate.regional_stats()
+            trend = aggregate.market_trend()
+            rows.append({
+                'fuel_type': fuel_type,
+                'region': region,
+                'average_price': stats['average'],
+                'min_price': stats['min'],
+                'max_price': stats['max'],
+                'median_price': stats['median'],
+                'std_deviation': stats['std_deviation'],
+                'volatility_level': trend['volatility'] if trend['volatility'] != 'unknown' else None,
+                'trend_direction': trend['trend'],
+                'trend_strength': min(100.0, abs(round(aggregate.change_percent, 2)) * 10),
+                'sample_size': stats['sample_size'],
+                'analysis_date': analysis_date
+            })
+
+        if not rows:
+            return 0
+
+        # UNIQUE(fuel_type, region, analysis_date): substitui o snapshot do dia
+        table = market_analysis_table
+        connection.execute(delete(table).where(table.c.analysis_date == analysis_date))
+        connection.execute(insert(table), rows)
+        return len(rows)
@@ -0,0 +1,194 @@
+"""
+Atualização de preços em lote pelos parceiros.
+
+Os itens (lista JSON, NDJSON ou CSV) são lidos e validados em streaming, em
+lotes de ``chunk_size``. Para cada lote: a posse dos postos é resolvida com
+uma consulta só (cacheada entre lotes), os preços ativos de (posto,
+combustível) são desativados com um UPDATE set-based e os novos entram num
+INSERT com vários registros. Tudo corre numa única transação: qualquer item
+inválido desfaz a importação inteira (tudo ou nada), mas a leitura continua
+até o fim para devolver todos os erros de uma vez.
+"""
+import csv
+import io
+import json
+import uuid
+from datetime import datetime, timezone
+from typing import Dict, Iterable, Iterator, List, Set, Tuple
+from sqlalchemy import column, insert, select, table, tuple_, update
+
+VALID_FUEL_TYPES = ('gasoline', 'ethanol', 'gnv', 'diesel', 'diesel_s10')
+DEFAULT_CHUNK_SIZE = 1000
+MAX_REPORTED_ERRORS = 100
+
+# Preço informado pelo próprio posto
+PARTNER_SOURCE = 'partner'
+PARTNER_CONFIDENCE = 0.9
+
+gas_stations_table = table('gas_stations', column('id'), column('partner_id'), column('latitude'), column('longitude'))
+
+fuel_prices_table = table(
+    'fuel_prices',
+    column('id'), column('gas_station_id'), column('fuel_type'), column('price'), column('source'),
+    column('source_confidence'), column('reported_at'), column('is_active'), column('created_at'),
+    column('updated_at')
+)
+
+
+def _chunks(items: Iterable, size: int) -> Iterator[List]:
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def iter_json_lines(stream) -> Iterator[Tuple[int, object]]:
+    """(linha, item) de um corpo NDJSON, lido linha a linha"""
+    for line_number, line in enumerate(io.TextIOWrapper(stream, encoding='utf-8'), start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield line_number, json.loads(line)
+        except ValueError:
+            yield line_number, None
+
+
+def iter_csv(stream) -> Iterator[Tuple[int, object]]:
+    """(linha, item) de um CSV com cabeçalho station_id,fuel_type,price"""
+    reader = csv.DictReader(io.TextIOWrapper(stream, encoding='utf-8', newline=''))
+    for row in reader:
+        yield reader.line_num, row
+
+
+def _validate(item) -> Tuple[Dict, str]:
+    """(linha pronta, erro) de um item; mesmas regras do endpoint item a item"""
+    if not isinstance(item, dict):
+        return None, 'Item inválido.'
+    station_id, fuel_type, price = item.get('station_id'), item.get('fuel_type'), item.get('price')
+    if not all([station_id, fuel_type, price]):
+        return None, 'Campos station_id, fuel_type e price são obrigatórios.'
+    if fuel_type not in VALID_FUEL_TYPES:
+        return None, f'Tipo de combustível inválido: {fuel_type}.'
+    try:
+        price = float(price)
+        if price <= 0:
+            raise ValueError()
+    except (ValueError, TypeError):
+        return None, 'O preço deve ser um número positivo.'
+    return {'gas_station_id': str(station_id), 'fuel_type': fuel_type, 'price': price}, None
+
+
+class PartnerPriceImport:
+    """Importação tudo ou nada dos preços de um parceiro, em lotes set-based"""
+
+    def __init__(self, connection, partner_id: str, chunk_size: int = DEFAULT_CHUNK_SIZE):
+        self.connection = connection
+        self.partner_id = partner_id
+        self.chunk_size = chunk_size
+        self.owned: Dict[str, Tuple[float, float]] = {}
+        self.not_owned: Set[str] = set()
+        self.changed: Set[str] = set()
+        self.processed = 0
+        self.written: List[Dict] = []
+        self.prices: List[Tuple[str, str, float, datetime]] = []  # para os agregados, após o commit
+        self.errors: List[Dict] = []
+        self.error_count = 0
+
+    def run(self, items: Iterable[Tuple[int, object]], keep_rows: bool = False) -> Dict:
+        """
+        Processa ``(linha, item)`` em lotes. Com ``keep_rows``, guarda os
+        preços gravados para a resposta (lotes pequenos em JSON).
+        """
+        now = datetime.now(timezone.utc)
+        for chunk in _chunks(items, self.chunk_size):
+            rows = self._validate_chunk(chunk)
+            # Depois do primeiro erro a transação será desfeita: só valida o restante
+            if rows and not self.error_count:
+                self._write(rows, now)
+                if keep_rows:
+                    self.written.extend(rows)
+
+        return {
+            'processed': self.processed,
+            'updated': 0 if self.error_count else self.processed,
+            'error_count': self.error_count,
+            'errors': self.errors
+        }
+
+    def _error(self, line: int, item, message: str):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'line': line, 'item': item, 'error': message})
+
+    def _validate_chunk(self, chunk: List[Tuple[int, object]]) -> List[Dict]:
+        validated = [(line, item) + _validate(item) for line, item in chunk]
+        self.processed += len(chunk)
+
+        # Posse dos postos: uma consulta por lote, só para ids ainda não vistos
+        unknown = {row['gas_station_id'] for _, _, row, _ in validated if row} - set(self.owned) - self.not_owned
+        if unknown:
+            stations = gas_stations_table.c
+            found = {station_id: (latitude, longitude) for station_id, latitude, longitude in self.connection.execute(
+                select(stations.id, stations.latitude, stations.longitude).where(
+                    stations.partner_id == self.partner_id,
+                    stations.id.in_(unknown)
+                )
+            )}
+            self.owned.update(found)
+            self.not_owned |= unknown - set(found)
+
+        # Duplicatas (posto, combustível) no mesmo lote: vale a última
+        rows: Dict[Tuple[str, str], Dict] = {}
+        for line, item, row, error in validated:
+            if row and row['gas_station_id'] not in self.owned:
+                error = f"Acesso negado. O posto {row['gas_station_id']} não pertence a este parceiro."
+            if error:
+                self._error(line, item, error)
+                continue
+            rows[(row['gas_station_id'], row['fuel_type'])] = row
+        return list(rows.values())
+
+    def _write(self, rows: List[Dict], now: datetime):
+        prices = fuel_prices_table
+        pairs = {(row['gas_station_id'], row['fuel_type']) for row in rows}
+        self.connection.execute(
+            update(prices)
+            .where(prices.c.is_active.is_(True),
+                   tuple_(prices.c.gas_station_id, prices.c.fuel_type).in_(sorted(pairs)))
+            .values(is_active=False, updated_at=now)
+        )
+
+        for row in rows:
+            row.update({
+                'id': str(uuid.uuid4()),
+                'source': PARTNER_SOURCE,
+                'source_confidence': PARTNER_CONFIDENCE,
+                'reported_at': now,
+                'is_active': True,
+                'created_at': now,
+                'updated_at': now
+            })
+        self.connection.execute(insert(prices), rows)
+        self.changed.update(station_id for station_id, _ in pairs)
+        self.prices.extend((row['gas_station_id'], row['fuel_type'], row['price'], now) for row in rows)
+
+    def changed_points(self) -> Dict[str, Tuple[float, float]]:
+        """Postos com preço novo e suas coordenadas, para invalidar o cache de respostas"""
+        return {station_id: self.owned[station_id] for station_id in self.changed}
+
+
+def serialize_price(row: Dict) -> Dict:
+    return {
+        'id': row['id'],
+        'gas_station_id': row['gas_station_id'],
+        'fuel_type': row['fuel_type'],
+        'price': row['price'],
+        'source': row['source'],
+        'reported_at': row['reported_at'].isoformat(),
+        'is_active': True
+    }
@@ -0,0 +1,320 @@
+"""
+Previsão de preços em lote para todas as séries (posto, combustível).
+
+As séries do PriceHistoryStore são reamostradas por dia (último preço do
+dia, com forward-fill) em uma matriz séries x dias. Em seguida, um Holt com
+tendência amortecida é ajustado em uma única passada vetorizada: o laço é
+sobre os dias da janela, e cada passo atualiza todas as séries de uma vez.
+O desvio dos erros de um passo define os intervalos de previsão.
+
+O lote é gravado em ``price_predictions`` pelo job agendado
+(run_price_forecasts.py). O ``/predict-prices`` só lê a tabela; sem linha
+gravada, ajusta em memória apenas a série pedida, sem gravar nada.
+"""
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from sqlalchemy import (
+    Column, Date, DateTime, Integer, MetaData, Numeric, String, Table, UniqueConstraint,
+    and_, delete, func, insert, select
+)
+
+SECONDS_PER_DAY = 86400
+
+WINDOW_DAYS = 30
+HORIZON_DAYS = 7
+MIN_OBSERVATIONS = 3
+
+# Suavização do nível e da tendência, e amortecimento da tendência no horizonte
+ALPHA = 0.5
+BETA = 0.2
+PHI = 0.9
+
+# Intervalo de 90% (z) e largura relativa a partir da qual a confiança é zero
+INTERVAL_Z = 1.645
+MAX_RELATIVE_HALF_WIDTH = 0.10
+
+# Inclinação mínima (R$/dia) para considerar alta ou baixa
+TREND_THRESHOLD = 0.01
+
+ALGORITHM = 'holt_damped'
+
+price_predictions_table = Table(
+    'price_predictions', MetaData(),
+    Column('id', Integer, primary_key=True),
+    Column('gas_station_id', String(36)),
+    Column('fuel_type', String(20), nullable=False),
+    Column('current_price', Numeric(6, 3), nullable=False),
+    Column('predicted_price', Numeric(6, 3), nullable=False),
+    Column('lower_price', Numeric(6, 3)),
+    Column('upper_price', Numeric(6, 3)),
+    Column('prediction_date', Date, nullable=False),
+    Column('confidence_level', Numeric(5, 2)),
+    Column('trend_analysis', String(20)),
+    Column('algorithm_used', String(50)),
+    Column('created_at', DateTime, server_default=func.now()),
+    # Uma previsão por posto/combustível/dia (migração 014)
+    UniqueConstraint('gas_station_id', 'fuel_type', 'prediction_date',
+                     name='uq_price_predictions_station_fuel_date'),
+)
+
+FORECAST_KEY = ('gas_station_id', 'fuel_type', 'prediction_date')
+
+
+@dataclass
+class ForecastBatch:
+    """Previsões de um lote: linha i corresponde a keys[i]"""
+    keys: List[Tuple[str, str]]
+    base_date: date
+    current: np.ndarray     # (n,)
+    slope: np.ndarray       # (n,) R$/dia
+    predicted: np.ndarray   # (n, horizon)
+    lower: np.ndarray       # (n, horizon)
+    upper: np.ndarray       # (n, horizon)
+    confidence: np.ndarray  # (n, horizon) 0-100
+
+    def __post_init__(self):
+        self.index = {key: row for row, key in enumerate(self.keys)}
+
+    @property
+    def trends(self) -> np.ndarray:
+        return np.where(self.slope > TREND_THRESHOLD, 'rising',
+                        np.where(self.slope < -TREND_THRESHOLD, 'falling', 'stable'))
+
+    def get(self, station_id: str, fuel_type: str) -> Optional[Dict]:
+        row = self.index.get((str(station_id), fuel_type))
+        if row is None:
+            return None
+        return {
+            'current_price': round(float(self.current[row]), 3),
+            'trend_analysis': str(self.trends[row]),
+            'predictions': [
+                {
+                    'day': day + 1,
+                    'date': (self.base_date + timedelta(days=day + 1)).strftime('%Y-%m-%d'),
+                    'predicted_price': round(float(self.predicted[row, day]), 2),
+                    'lower_price': round(float(self.lower[row, day]), 2),
+                    'upper_price': round(float(self.upper[row, day]), 2),
+                    'confidence': round(float(self.confidence[row, day]) / 100, 2)
+                }
+                for day in range(self.predicted.shape[1])
+            ]
+        }
+
+
+def daily_matrix(series_views, end_day: int, window_days: int = WINDOW_DAYS) -> np.ndarray:
+    """
+    Matriz (séries x dias) com o último preço de cada dia e forward-fill.
+    Dias anteriores à primeira observação ficam como NaN.
+    """
+    n = len(series_views)
+    matrix = np.full((n, window_days), np.nan)
+    if not n:
+        return matrix
+
+    start_day = end_day - window_days + 1
+    lengths = [len(prices) for _, prices in series_views]
+    rows = np.repeat(np.arange(n), lengths)
+    days = np.concatenate([timestamps for timestamps, _ in series_views]) // SECONDS_PER_DAY
+    values = np.concatenate([prices for _, prices in series_views])
+
+    # Pontos anteriores à janela caem na primeira coluna (valor inicial)
+    cols = np.clip(days - start_day, 0, None)
+    keep = cols < window_days
+    rows, cols, values = rows[keep], cols[keep], values[keep]
+
+    # Pontos em ordem de tempo: o último de cada (série, dia) prevalece
+    flat = rows * window_days + cols
+    last = np.unique(flat[::-1], return_index=True)[1]
+    last = len(flat) - 1 - last
+    matrix.flat[flat[last]] = values[last]
+
+    # Forward-fill vetorizado
+    valid = ~np.isnan(matrix)
+    index = np.where(valid, np.arange(window_days), 0)
+    np.maximum.accumulate(index, axis=1, out=index)
+    filled = matrix[np.arange(n)[:, None], index]
+    filled[~np.maximum.accumulate(valid, axis=1)] = np.nan
+    return filled
+
+
+def fit_holt(matrix: np.ndarray, horizon: int = HORIZON_DAYS,
+             alpha: float = ALPHA, beta: float = BETA, phi: float = PHI):
+    """
+    Holt com tendência amortecida, vetorizado sobre as linhas.
+    Retorna (nível, tendência, desvio dos erros de um passo, previsões).
+    """
+    n, days = matrix.shape
+    level = np.full(n, np.nan)
+    trend = np.zeros(n)
+    sse = np.zeros(n)
+    errors = np.zeros(n)
+
+    for day in range(days):
+        value = matrix[:, day]
+        has_value = ~np.isnan(value)
+        started = ~np.isnan(level)
+
+        start = has_value & ~started
+        level[start] = value[start]
+
+        update = has_value & started
+        forecast = level[update] + phi * trend[update]
+        error = value[update] - forecast
+        sse[update] += error * error
+        errors[update] += 1
+
+        new_level = forecast + alpha * error
+        trend[update] = beta * (new_level - level[update]) + (1 - beta) * phi * trend[update]
+        level[update] = new_level
+
+    sigma = np.sqrt(sse / np.maximum(errors - 1, 1))
+
+    # Tendência amortecida: soma de phi^1..phi^h
+    damping = np.cumsum(phi ** np.arange(1, horizon + 1))
+    predicted = level[:, None] + trend[:, None] * damping[None, :]
+    return level, trend, sigma, predicted
+
+
+def forecast_store(history, now: Optional[datetime] = None, window_days: int = WINDOW_DAYS,
+                   horizon: int = HORIZON_DAYS) -> ForecastBatch:
+    """Ajusta e prevê todas as séries do PriceHistoryStore em lote"""
+    keys, views = [], []
+    for key, series in history.items():
+        if len(series) >= MIN_OBSERVATIONS:
+            keys.append(key)
+            views.append(series.view())
+    return forecast_views(keys, views, now, window_days, horizon)
+
+
+def forecast_series(key: Tuple[str, str], series, now: Optional[datetime] = None,
+                    window_days: int = WINDOW_DAYS, horizon: int = HORIZON_DAYS) -> Optional[ForecastBatch]:
+    """Previsão de uma única série, sem gravar (None se houver poucas observações)"""
+    if series is None or len(series) < MIN_OBSERVATIONS:
+        return None
+    return forecast_views([key], [series.view()], now, window_days, horizon)
+
+
+def forecast_views(keys, views, now: Optional[datetime] = None, window_days: int = WINDOW_DAYS,
+                   horizon: int = HORIZON_DAYS) -> ForecastBatch:
+    now = now or datetime.now(timezone.utc)
+    end_day = int(now.timestamp()) // SECONDS_PER_DAY
+    matrix = daily_matrix(views, end_day, window_days)
+    return forecast_matrix(keys, matrix, now.date(), horizon)
+
+
+def forecast_matrix(keys, matrix: np.ndarray, base_date: date, horizon: int = HORIZON_DAYS) -> ForecastBatch:
+    level, trend, sigma, predicted = fit_holt(matrix, horizon)
+
+    current = matrix[:, -1] if matrix.shape[1] else level
+    steps = np.sqrt(np.arange(1, horizon + 1))
+    half_width = INTERVAL_Z * sigma[:, None] * steps[None, :]
+    relative = half_width / np.maximum(predicted, 0.01)
+    confidence = np.clip(100 * (1 - relative / MAX_RELATIVE_HALF_WIDTH), 0, 100)
+
+    return ForecastBatch(
+        keys=keys,
+        base_date=base_date,
+        current=current,
+        slope=trend,
+        predicted=predicted,
+        lower=np.maximum(predicted - half_width, 0.01),
+        upper=predicted + half_width,
+        confidence=confidence
+    )
+
+
+def _upsert(connection, table):
+    """INSERT ... ON CONFLICT (posto, combustível, dia) DO UPDATE no dialeto em uso"""
+    dialect = connection.dialect.name
+    if dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    elif dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    else:
+        return insert(table)
+
+    stmt = dialect_insert(table)
+    return stmt.on_conflict_do_update(
+        index_elements=[table.c[name] for name in FORECAST_KEY],
+        set_={
+            column.name: stmt.excluded[column.name]
+            for column in table.columns
+            if column.name not in FORECAST_KEY and column.name != 'id'
+        }
+    )
+
+
+def persist_forecasts(connection, batch: ForecastBatch, chunk_size: int = 5000) -> int:
+    """
+    Substitui as previsões futuras pelas do lote; retorna o número de linhas.
+    O upsert pela chave única evita duplicatas se dois lotes rodarem ao mesmo tempo.
+    """
+    table = price_predictions_table
+    connection.execute(delete(table).where(table.c.prediction_date > batch.base_date))
+    stmt = _upsert(connection, table)
+
+    trends = batch.trends
+    horizon = batch.predicted.shape[1]
+    dates = [batch.base_date + timedelta(days=day + 1) for day in range(horizon)]
+    predicted = np.round(batch.predicted, 3).tolist()
+    lower = np.round(batch.lower, 3).tolist()
+    upper = np.round(batch.upper, 3).tolist()
+    confidence = np.round(batch.confidence, 2).tolist()
+    current = np.round(batch.current, 3).tolist()
+
+    rows, written = [], 0
+    for row, (station_id, fuel_type) in enumerate(batch.keys):
+        for day in range(horizon):
+            rows.append({
+                'gas_station_id': station_id,
+                'fuel_type': fuel_type,
+                'current_price': current[row],
+                'predicted_price': predicted[row][day],
+                'lower_price': lower[row][day],
+                'upper_price': upper[row][day],
+                'prediction_date': dates[day],
+                'confidence_level': confidence[row][day],
+                'trend_analysis': str(trends[row]),
+                'algorithm_used': ALGORITHM
+            })
+        if len(rows) >= chunk_size:
+            connection.execute(stmt, rows)
+            written += len(rows)
+            rows = []
+
+    if rows:
+        connection.execute(stmt, rows)
+        written += len(rows)
+    return written
+
+
+def load_forecast(connection, station_id: str, fuel_type: str, after: date) -> Optional[Dict]:
+    """Previsões gravadas para um posto/combustível (para processos sem o lote em memória)"""
+    table = price_predictions_table
+    rows = connection.execute(
+        select(table).where(and_(
+            table.c.gas_station_id == str(station_id),
+            table.c.fuel_type == fuel_type,
+            table.c.prediction_date > after
+        )).order_by(table.c.prediction_date)
+    ).mappings().all()
+    if not rows:
+        return None
+
+    return {
+        'current_price': float(rows[0]['current_price']),
+        'trend_analysis': rows[0]['trend_analysis'],
+        'predictions': [
+            {
+                'day': (row['prediction_date'] - after).days,
+                'date': row['prediction_date'].strftime('%Y-%m-%d'),
+                'predicted_price': round(float(row['predicted_price']), 2),
+                'lower_price': round(float(row['lower_price']), 2) if row['lower_price'] is not None else None,
+                'upper_price': round(float(row['upper_price']), 2) if row['upper_price'] is not None else None,
+                'confidence': round(float(row['confidence_level'] or 0) / 100, 2)
+            }
+            for row in rows
+        ]
+    }
@@ -0,0 +1,255 @@
+"""
+Armazenamento colunar do histórico de preços para o serviço de inteligência.
+
+Cada série (posto, combustível) guarda timestamps (segundos epoch, int64) e
+preços (float64) em arrays NumPy contíguos. As análises recebem fatias
+(views) desses arrays, sem cópia. A carga inicial vem da tabela
+``price_history`` (migração 007) e as atualizações seguintes são
+incrementais: apenas linhas com ``id`` maior que o último lido.
+"""
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+import numpy as np
+from sqlalchemy import Column, DateTime, Integer, MetaData, Numeric, String, Table, select
+
+SeriesKey = Tuple[str, str]  # (station_id, fuel_type)
+
+price_history_table = Table(
+    'price_history', MetaData(),
+    Column('id', Integer, primary_key=True),
+    Column('gas_station_id', String(36), nullable=False),
+    Column('fuel_type', String(20), nullable=False),
+    Column('price', Numeric(6, 3), nullable=False),
+    Column('recorded_at', DateTime),
+)
+
+
+def to_epoch(value) -> int:
+    """datetime (naive = UTC) ou string ISO -> segundos epoch"""
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return int(value.timestamp())
+
+
+class PriceSeries:
+    """Série de preços de um posto/combustível com buffers que crescem por dobra"""
+
+    __slots__ = ('timestamps', 'prices', 'size', 'max_points')
+
+    def __init__(self, capacity: int = 8, max_points: Optional[int] = None):
+        self.timestamps = np.empty(capacity, dtype=np.int64)
+        self.prices = np.empty(capacity, dtype=np.float64)
+        self.size = 0
+        self.max_points = max_points
+
+    def _reserve(self, extra: int):
+        needed = self.size + extra
+        if needed <= len(self.prices):
+            return
+
+        if self.max_points and needed > self.max_points:
+            # Descarta os pontos mais antigos; capacidade fica em 2x max_points,
+            # então a compactação acontece no máximo a cada max_points inserções
+            keep = max(0, self.max_points - extra)
+            start = self.size - keep
+            self.timestamps[:keep] = self.timestamps[start:self.size]
+            self.prices[:keep] = self.prices[start:self.size]
+            self.size = keep
+            if self.size + extra <= len(self.prices):
+                return
+
+        capacity = max(needed, 2 * len(self.prices))
+        if self.max_points:
+            capacity = min(capacity, max(2 * self.max_points, needed))
+
+        timestamps = np.empty(capacity, dtype=np.int64)
+        prices = np.empty(capacity, dtype=np.float64)
+        timestamps[:self.size] = self.timestamps[:self.size]
+        prices[:self.size] = self.prices[:self.size]
+        self.timestamps, self.prices = timestamps, prices
+
+    def extend(self, timestamps: np.ndarray, prices: np.ndarray):
+        """Acrescenta pontos (já ordenados por tempo)"""
+        count = len(prices)
+        if not count:
+            return
+
+        if self.max_points and count > self.max_points:
+            timestamps, prices = timestamps[-self.max_points:], prices[-self.max_points:]
+            count = self.max_points
+
+        out_of_order = self.size and timestamps[0] < self.timestamps[self.size - 1]
+
+        self._reserve(count)
+        self.timestamps[self.size:self.size + count] = timestamps
+        self.prices[self.size:self.size + count] = prices
+        self.size += count
+
+        if out_of_order:
+            # Raro (correções retroativas): reordena mantendo a estabilidade
+            order = np.argsort(self.timestamps[:self.size], kind='stable')
+            self.timestamps[:self.size] = self.timestamps[:self.size][order]
+            self.prices[:self.size] = self.prices[:self.size][order]
+
+    def append(self, timestamp: int, price: float):
+        self.extend(np.array([timestamp], dtype=np.int64), np.array([price], dtype=np.float64))
+
+    @property
+    def start(self) -> int:
+        """Início da janela: o buffer guarda até 2x max_points entre compactações"""
+        if self.max_points and self.size > self.max_points:
+            return self.size - self.max_points
+        return 0
+
+    def view(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Fatias somente-leitura (sem cópia) de timestamps e preços"""
+        timestamps = self.timestamps[self.start:self.size]
+        prices = self.prices[self.start:self.size]
+        timestamps.flags.writeable = False
+        prices.flags.writeable = False
+        return timestamps, prices
+
+    @property
+    def last_price(self) -> Optional[float]:
+        return float(self.prices[self.size - 1]) if self.size else None
+
+    @property
+    def nbytes(self) -> int:
+        return self.timestamps.nbytes + self.prices.nbytes
+
+    def __len__(self):
+        return self.size - self.start
+
+
+class PriceHistoryStore:
+    """Histórico de preços por (posto, combustível) em arrays NumPy"""
+
+    def __init__(self, max_points: Optional[int] = 180, history_days: int = 180):
+        self.series: Dict[SeriesKey, PriceSeries] = {}
+        self.max_points = max_points
+        self.history_days = history_days
+        self.last_id = 0
+
+    def series_for(self, station_id: str, fuel_type: str) -> PriceSeries:
+        """Série do posto/combustível, criada se ainda não existir"""
+        return self._series((str(station_id), fuel_type))
+
+    def _series(self, key: SeriesKey) -> PriceSeries:
+        series = self.series.get(key)
+        if series is None:
+            series = PriceSeries(max_points=self.max_points)
+            self.series[key] = series
+        return series
+
+    def append(self, station_id: str, fuel_type: str, recorded_at, price: float):
+        """Registra um novo preço (caminho de escrita)"""
+        self._series((str(station_id), fuel_type)).append(to_epoch(recorded_at), float(price))
+
+    def load(self, station_ids: List[str], fuel_types: List[str],
+             timestamps: Iterable[int], prices: Iterable[float]):
+        """
+        Carga em lote: agrupa as linhas por série com um lexsort e copia cada
+        grupo de uma vez para o buffer da série.
+        """
+        if not len(station_ids):
+            return
+
+        # Códigos inteiros por (posto, combustível) via hash (pandas.factorize)
+        import pandas as pd  # só na carga do histórico, fora do cold start
+        station_codes, stations = pd.factorize(np.asarray(station_ids, dtype=object))
+        fuel_codes, fuels = pd.factorize(np.asarray(fuel_types, dtype=object))
+        codes = station_codes.astype(np.int64) * len(fuels) + fuel_codes
+        timestamps = np.asarray(timestamps, dtype=np.int64)
+        prices = np.asarray(prices, dtype=np.float64)
+
+        order = np.lexsort((timestamps, codes))
+        codes, timestamps, prices = codes[order], timestamps[order], prices[order]
+        boundaries = np.flatnonzero(np.diff(codes)) + 1
+        starts = np.concatenate(([0], boundaries))
+        ends = np.concatenate((boundaries, [len(codes)]))
+
+        for start, end in zip(starts.tolist(), ends.tolist()):
+            station, fuel = divmod(int(codes[start]), len(fuels))
+            self._series((str(stations[station]), fuels[fuel])).extend(timestamps[start:end], prices[start:end])
+
+    def refresh(self, connection, batch_size: int = 50000, on_batch=None) -> int:
+        """
+        Lê da tabela price_history as linhas novas desde a última leitura
+        (append-only por id), limitadas aos últimos ``history_days`` dias.
+        ``on_batch(station_ids, fuel_types, timestamps, prices)`` recebe cada
+        lote carregado, em ordem de id. Retorna o número de linhas carregadas.
+        """
+        table = price_history_table
+        loaded = 0
+        cutoff = (datetime.now(timezone.utc) - timedelta(days=self.history_days or 0)).replace(tzinfo=None)
+
+        while True:
+            query = select(
+                table.c.id, table.c.gas_station_id, table.c.fuel_type,
+                table.c.price, table.c.recorded_at
+            ).where(table.c.id > self.last_id).order_by(table.c.id).limit(batch_size)
+
+            if self.history_days:
+                # Correções retroativas além da janela também são ignoradas
+                query = query.where(table.c.recorded_at >= cutoff)
+
+            rows = connection.execute(query).fetchall()
+            if not rows:
+                break
+
+            ids, station_ids, fuel_types, prices, recorded = zip(*rows)
+            station_ids = [str(station_id) for station_id in station_ids]
+            timestamps = [to_epoch(value) for value in recorded]
+            prices = [float(price) for price in prices]
+            self.load(station_ids, list(fuel_types), timestamps, prices)
+            if on_batch:
+                on_batch(station_ids, fuel_types, timestamps, prices)
+            self.last_id = max(ids)
+            loaded += len(rows)
+
+            if len(rows) < batch_size:
+                break
+
+        return loaded
+
+    def get(self, station_id: str, fuel_type: str) -> Optional[PriceSeries]:
+        return self.series.get((str(station_id), fuel_type))
+
+    def items(self, fuel_type: Optional[str] = None) -> Iterator[Tuple[SeriesKey, PriceSeries]]:
+        for key, series in self.series.items():
+            if series.size and (fuel_type is None or key[1] == fuel_type):
+                yield key, series
+
+    def station_ids(self) -> List[str]:
+        return sorted({station_id for station_id, _ in self.series})
+
+    def fuel_types(self) -> List[str]:
+        return sorted({fuel_type for _, fuel_type in self.series})
+
+    def latest_prices(self, fuel_type: str) -> Tuple[List[str], np.ndarray]:
+        """Último preço de cada posto para o combustível"""
+        station_ids, prices = [], []
+        for (station_id, _), series in self.items(fuel_type):
+            station_ids.append(station_id)
+            prices.append(series.prices[series.size - 1])
+        return station_ids, np.asarray(prices, dtype=np.float64)
+
+    def concatenated(self, fuel_type: str) -> Tuple[np.ndarray, np.ndarray]:
+        """Todos os pontos do combustível, ordenados por tempo"""
+        views = [series.view() for _, series in self.items(fuel_type)]
+        if not views:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+        timestamps = np.concatenate([v[0] for v in views])
+        prices = np.concatenate([v[1] for v in views])
+        order = np.argsort(timestamps, kind='stable')
+        return timestamps[order], prices[order]
+
+    @property
+    def size(self) -> int:
+        return sum(len(series) for series in self.series.values())
+
+    @property
+    def nbytes(self) -> int:
+        return sum(series.nbytes for series in self.series.values())
@@ -0,0 +1,267 @@
+import uuid
+from datetime import date, datetime, time, timezone
+from typing import Dict, List, Optional, Tuple
+from flask import current_app
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
+from src.database import db
+from src.models.gas_station import GasStation, FuelPrice
+from src.services.price_intelligence import record_committed_prices
+from src.services.response_cache import response_cache
+
+VALID_FUEL_TYPES = ('gasoline', 'ethanol', 'gnv', 'diesel', 'diesel_s10')
+DEFAULT_CHUNK_SIZE = 1000
+
+# Coordenadas padrão (São Paulo) para postos criados só com nome/cidade
+DEFAULT_LATITUDE = -23.5505
+DEFAULT_LONGITUDE = -46.6333
+
+
+def _dialect_insert(table):
+    """INSERT com suporte a ON CONFLICT no dialeto em uso (ou None)"""
+    dialect = db.session.get_bind().dialect.name
+    if dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    elif dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    else:
+        return None
+    return dialect_insert(table)
+
+
+def _utc_day(value: datetime) -> date:
+    """Dia (UTC) do preço, o mesmo do índice único uq_fuel_prices_station_fuel_day"""
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc)
+    return value.date()
+
+
+def _chunks(rows: List, size: int):
+    for start in range(0, len(rows), size):
+        yield start // size, rows[start:start + size]
+
+
+class StationIndex:
+    """Mapa CNPJ/nome -> id do posto, carregado uma única vez por ingestão"""
+
+    def __init__(self):
+        self.by_cnpj: Dict[str, str] = {}
+        self.by_name: Dict[str, str] = {}
+
+        for station_id, name, cnpj in db.session.query(GasStation.id, GasStation.name, GasStation.cnpj):
+            if cnpj:
+                self.by_cnpj[cnpj] = station_id
+            # Mantém o primeiro posto com o nome, como o .first() anterior
+            self.by_name.setdefault(name, station_id)
+
+    def lookup(self, price_data: Dict) -> Optional[str]:
+        cnpj = price_data.get('cnpj')
+        if cnpj and cnpj in self.by_cnpj:
+            return self.by_cnpj[cnpj]
+        return self.by_name.get(price_data.get('station_name'))
+
+    def add(self, row: Dict):
+        if row.get('cnpj'):
+            self.by_cnpj[row['cnpj']] = row['id']
+        self.by_name.setdefault(row['name'], row['id'])
+
+
+def _new_station_row(price_data: Dict) -> Dict:
+    location = price_data.get('location', '')
+    now = datetime.now(timezone.utc)
+    return {
+        'id': str(uuid.uuid4()),
+        'name': price_data['station_name'],
+        'cnpj': price_data.get('cnpj'),
+        'address': location,
+        'city': location.split(',')[0] if ',' in location else location,
+        'state': (price_data.get('state') or 'SP').upper(),
+        'latitude': DEFAULT_LATITUDE,
+        'longitude': DEFAULT_LONGITUDE,
+        'data_source': 'web_scraping',
+        'data_confidence': price_data.get('confidence', 0.5),
+        'is_active': True,
+        'created_at': now,
+        'updated_at': now
+    }
+
+
+def _create_missing_stations(scraped_prices: List[Dict], index: StationIndex,
+                             chunk_size: int, stats: Dict):
+    """Cria, em lote, os postos citados nos preços que ainda não existem"""
+    pending = {}
+    for price_data in scraped_prices:
+        if not (price_data.get('station_name') and price_data.get('location')):
+            continue
+        if index.lookup(price_data):
+            continue
+        key = price_data.get('cnpj') or price_data['station_name']
+        if key not in pending:
+            pending[key] = _new_station_row(price_data)
+
+    rows = list(pending.values())
+    for chunk_number, chunk in _chunks(rows, chunk_size):
+        try:
+            db.session.execute(insert(GasStation.__table__), chunk)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            stats['failed_chunks'].append({'stage': 'stations', 'chunk': chunk_number,
+                                           'rows': len(chunk), 'error': str(e)})
+            stats['errors'] += len(chunk)
+            continue
+
+        for row in chunk:
+            index.add(row)
+        stats['created'] += len(chunk)
+
+
+def _stage_prices(scraped_prices: List[Dict], index: StationIndex, stats: Dict) -> List[Dict]:
+    """
+    Resolve o posto de cada preço e colapsa duplicatas (posto, combustível,
+    dia), mantendo o último valor recebido.
+    """
+    staged: Dict[Tuple[str, str, date], Dict] = {}
+
+    for price_data in scraped_prices:
+        if not (price_data.get('station_name') and price_data.get('location')):
+            continue
+
+        station_id = index.lookup(price_data)
+        if not station_id:
+            continue
+
+        fuel_type = price_data.get('fuel_type')
+        price = price_data.get('price')
+        if fuel_type not in VALID_FUEL_TYPES or not price or float(price) <= 0:
+            stats['errors'] += 1
+            continue
+
+        reported_at = price_data.get('scraped_at') or datetime.now(timezone.utc)
+        staged[(station_id, fuel_type, _utc_day(reported_at))] = {
+            'gas_station_id': station_id,
+            'fuel_type': fuel_type,
+            'price': price,
+            'source': price_data['source'],
+            'source_confidence': price_data.get('confidence', 0.5),
+            'reported_at': reported_at
+        }
+
+    return list(staged.values())
+
+
+def _upsert_chunk(rows: List[Dict]) -> Tuple[int, int]:
+    """Aplica um lote de preços com um único upsert; retorna (criados, atualizados)"""
+    station_ids = {row['gas_station_id'] for row in rows}
+    first_day = min(_utc_day(row['reported_at']) for row in rows)
+
+    # Preços ativos já reportados no mesmo dia para os postos do lote: viram
+    # UPDATE (o índice diário da migração 018 só vale para linhas ativas)
+    existing = {
+        (station_id, fuel_type, _utc_day(reported_at)): price_id
+        for price_id, station_id, fuel_type, reported_at in db.session.query(
+            FuelPrice.id, FuelPrice.gas_station_id, FuelPrice.fuel_type, FuelPrice.reported_at
+        ).filter(
+            FuelPrice.gas_station_id.in_(station_ids),
+            FuelPrice.is_active.is_(True),
+            FuelPrice.reported_at >= datetime.combine(first_day, time.min, timezone.utc)
+        )
+    }
+
+    now = datetime.now(timezone.utc)
+    updated = 0
+    for row in rows:
+        price_id = existing.get((row['gas_station_id'], row['fuel_type'], _utc_day(row['reported_at'])))
+        if price_id:
+            updated += 1
+        row['id'] = price_id or str(uuid.uuid4())
+        row['is_active'] = True
+        row['created_at'] = now
+        row['updated_at'] = now
+
+    stmt = _dialect_insert(FuelPrice.__table__)
+    if stmt is not None:
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[FuelPrice.__table__.c.id],
+            set_={
+                'price': stmt.excluded.price,
+                'source': stmt.excluded.source,
+                'source_confidence': stmt.excluded.source_confidence,
+                'reported_at': stmt.excluded.reported_at,
+                'updated_at': stmt.excluded.updated_at
+            }
+        )
+        db.session.execute(stmt, rows)
+    else:
+        # Dialeto sem ON CONFLICT: UPDATE/INSERT em lote separados
+        update_rows = [row for row in rows if row['id'] in existing.values()]
+        insert_rows = [row for row in rows if row['id'] not in existing.values()]
+        if update_rows:
+            db.session.bulk_update_mappings(FuelPrice, update_rows)
+        if insert_rows:
+            db.session.execute(insert(FuelPrice.__table__), insert_rows)
+
+    return len(rows) - updated, updated
+
+
+def _apply_chunk(rows: List[Dict]) -> Tuple[int, int]:
+    """
+    Upsert e commit de um lote. Se outra ingestão gravou o mesmo posto/
+    combustível/dia entre a leitura e o INSERT, o índice único recusa o lote;
+    ele é relido (a linha da outra ingestão vira UPDATE) e aplicado de novo.
+    """
+    try:
+        result = _upsert_chunk(rows)
+        db.session.commit()
+        return result
+    except IntegrityError:
+        db.session.rollback()
+
+    result = _upsert_chunk(rows)
+    db.session.commit()
+    return result
+
+
+def bulk_upsert_prices(scraped_prices: List[Dict], chunk_size: int = DEFAULT_CHUNK_SIZE) -> Dict:
+    """
+    Ingestão em lote dos preços coletados.
+
+    Carrega o mapa de postos uma vez, cria os postos faltantes em lote e
+    aplica os preços com upserts set-based, um commit por lote. Há um preço
+    por posto/combustível/dia (índice único da migração 018): o mesmo dia
+    vira UPDATE. A falha de um lote não desfaz os demais; cada lote com erro
+    é reportado em ``failed_chunks``.
+    """
+    stats = {
+        'processed': len(scraped_prices),
+        'updated': 0,
+        'created': 0,
+        'errors': 0,
+        'failed_chunks': []
+    }
+
+    index = StationIndex()
+    _create_missing_stations(scraped_prices, index, chunk_size, stats)
+
+    rows = _stage_prices(scraped_prices, index, stats)
+
+    for chunk_number, chunk in _chunks(rows, chunk_size):
+        try:
+            created, updated = _apply_chunk(chunk)
+        except Exception as e:
+            db.session.rollback()
+            current_app.logger.error(f"Price upsert chunk {chunk_number} failed: {e}")
+            stats['failed_chunks'].append({'stage': 'prices', 'chunk': chunk_number,
+                                           'rows': len(chunk), 'error': str(e)})
+            stats['errors'] += len(chunk)
+            continue
+
+        stats['created'] += created
+        stats['updated'] += updated
+        record_committed_prices([(row['gas_station_id'], row['fuel_type'], row['price'], row['reported_at'])
+                                 for row in chunk])
+
+    # Ingestão ampla: invalida todas as respostas em cache de uma vez
+    if stats['created'] or stats['updated']:
+        response_cache.invalidate_all()
+    return stats
@@ -1,21 +1,44 @@
 import json
 import math
-import random
+import time
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Tuple
-import statistics
+import numpy as np
+from flask import current_app, has_app_context
+from .market_aggregates import MarketAggregator
+from .price_forecasting import HORIZON_DAYS, forecast_series, forecast_store, load_forecast, persist_forecasts
+from .price_history_store import PriceHistoryStore, to_epoch
+from .region_index import COUNTRY, MACROREGIONS, RegionIndex, cell_keys, region_name, region_path
+from .scoring_engine import resolve_weights, score_candidates, top_k
+from .lazy import LazyService
+
+FUEL_TYPES = ['gasoline', 'ethanol', 'diesel', 'diesel_s10', 'gnv']
+
+DEFAULT_REGION = COUNTRY
+
+# Mínimo de postos para que um nível da hierarquia seja usado como referência
+MIN_REGION_SAMPLE = 3
+
+# Intervalo mínimo entre leituras incrementais da tabela price_history
+REFRESH_INTERVAL_SECONDS = 300
 
 class PriceIntelligenceService:
     """Serviço de inteligência de preços com análise preditiva"""
     
-    def __init__(self):
-        self.price_history = {}  # station_id -> [price_records]
-        self.market_trends = {}  # fuel_type -> trend_data
-        self.price_predictions = {}  # station_id -> predictions
-        self.regional_averages = {}  # region -> fuel_type -> average
-        
-        # Inicializar com dados simulados
-        self._initialize_sample_data()
+    def __init__(self, history: Optional[PriceHistoryStore] = None):
+        self.history = history or PriceHistoryStore()  # (station_id, fuel_type) -> série de preços
+        self.station_names = {}  # station_id -> nome
+        self.regions = RegionIndex()  # station_id -> caminho de regiões
+        self.aggregates = MarketAggregator()  # (region, fuel_type) -> agregados incrementais
+        self.forecasts = None  # ForecastBatch do último lote rodado neste processo
+        self.using_sample_data = history is None
+        self._last_refresh = None
+        
+        if self.using_sample_data:
+            # Inicializar com dados simulados até a primeira leitura do banco
+            self._initialize_sample_data()
+        else:
+            self._recalculate()
     
     def _initialize_sample_data(self):
         """Inicializar com dados de exemplo para demonstração"""
@@ -25,7 +48,9 @@ class PriceIntelligenceService:
             'shell_br101': {
                 'name': 'Posto Shell BR-101',
                 'brand': 'Shell',
-                'region': 'sul_brasil',
+                'city': 'Itajaí',
+                'state': 'SC',
+                'location': (-26.9194, -48.6706),
                 'gasoline_history': [5.89, 5.85, 5.92, 5.88, 5.75, 5.79, 5.82],
                 'ethanol_history': [4.29, 4.25, 4.32, 4.28, 4.15, 4.19, 4.22],
                 'diesel_history': [5.65, 5.62, 5.68, 5.64, 5.55, 5.58, 5.61]
@@ -33,7 +58,9 @@ class PriceIntelligenceService:
             'petrobras_itajai': {
                 'name': 'Petrobras Itajaí',
                 'brand': 'Petrobras',
-                'region': 'sul_brasil',
+                'city': 'Itajaí',
+                'state': 'SC',
+                'location': (-26.9078, -48.6619),
                 'gasoline_history': [5.75, 5.72, 5.78, 5.74, 5.69, 5.71, 5.73],
                 'ethanol_history': [4.15, 4.12, 4.18, 4.14, 4.09, 4.11, 4.13],
                 'diesel_history': [5.55, 5.52, 5.58, 5.54, 5.49, 5.51, 5.53]
@@ -41,189 +68,291 @@ class PriceIntelligenceService:
             'ipiranga_centro': {
                 'name': 'Ipiranga Centro',
                 'brand': 'Ipiranga',
-                'region': 'sul_brasil',
+                'city': 'Itajaí',
+                'state': 'SC',
+                'location': (-26.9101, -48.6705),
                 'gasoline_history': [5.69, 5.66, 5.72, 5.68, 5.63, 5.65, 5.67],
                 'ethanol_history': [4.09, 4.06, 4.12, 4.08, 4.03, 4.05, 4.07],
                 'diesel_history': [5.49, 5.46, 5.52, 5.48, 5.43, 5.45, 5.47]
             }
         }
         
-        # Processar dados históricos
+        # Criar histórico dos últimos 7 dias
         for station_id, data in stations_data.items():
-            self.price_history[station_id] = []
-            
-            # Criar histórico dos últimos 7 dias
-            for i, (gas_price, eth_price, diesel_price) in enumerate(zip(
-                data['gasoline_history'], data['ethanol_history'], data['diesel_history']
-            )):
-                date = datetime.now() - timedelta(days=6-i)
-                
-                self.price_history[station_id].append({
-                    'date': date.isoformat(),
-                    'gasoline': gas_price,
-                    'ethanol': eth_price,
-                    'diesel': diesel_price,
-                    'diesel_s10': diesel_price + 0.10,
-                    'gnv': diesel_price - 0.70
-                })
-        
-        # Calcular médias regionais
-        self._calculate_regional_averages()
-        
-        # Calcular tendências de mercado
-        self._calculate_market_trends()
-    
-    def _calculate_regional_averages(self):
-        """Calcular médias regionais de preços"""
-        regions = {}
-        
-        for station_id, history in self.price_history.items():
-            if not history:
-                continue
-                
-            # Assumir região sul_brasil para todos os postos de exemplo
-            region = 'sul_brasil'
-            
-            if region not in regions:
-                regions[region] = {'gasoline': [], 'ethanol': [], 'diesel': [], 'diesel_s10': [], 'gnv': []}
-            
-            # Usar preço mais recente
-            latest_prices = history[-1]
-            regions[region]['gasoline'].append(latest_prices['gasoline'])
-            regions[region]['ethanol'].append(latest_prices['ethanol'])
-            regions[region]['diesel'].append(latest_prices['diesel'])
-            regions[region]['diesel_s10'].append(latest_prices['diesel_s10'])
-            regions[region]['gnv'].append(latest_prices['gnv'])
-        
-        # Calcular médias
-        for region, fuel_prices in regions.items():
-            self.regional_averages[region] = {}
-            for fuel_type, prices in fuel_prices.items():
-                if prices:
-                    self.regional_averages[region][fuel_type] = {
-                        'average': round(statistics.mean(prices), 2),
-                        'min': round(min(prices), 2),
-                        'max': round(max(prices), 2),
-                        'median': round(statistics.median(prices), 2)
-                    }
-    
-    def _calculate_market_trends(self):
-        """Calcular tendências de mercado"""
-        fuel_types = ['gasoline', 'ethanol', 'diesel', 'diesel_s10', 'gnv']
-        
-        for fuel_type in fuel_types:
-            prices_over_time = []
+            self.station_names[station_id] = data['name']
+            self.regions.register(station_id, data['state'], data['city'], *data['location'])
+            diesel = np.array(data['diesel_history'])
+            series = {
+                'gasoline': np.array(data['gasoline_history']),
+                'ethanol': np.array(data['ethanol_history']),
+                'diesel': diesel,
+                'diesel_s10': diesel + 0.10,
+                'gnv': diesel - 0.70
+            }
+            for fuel_type, prices in series.items():
+                for i, price in enumerate(prices):
+                    date = datetime.now() - timedelta(days=len(prices) - 1 - i)
+                    self.history.append(station_id, fuel_type, date, round(float(price), 2))
+        
+        self._recalculate()
+    
+    @property
+    def regional_averages(self) -> Dict:
+        """region -> fuel_type -> {average, min, max, median, ...}"""
+        return self.aggregates.regional_averages()
+    
+    @property
+    def market_trends(self) -> Dict:
+        """fuel_type -> trend_data"""
+        return self.aggregates.market_trends(DEFAULT_REGION)
+    
+    def _recalculate(self):
+        """Reconstrói os agregados de mercado a partir do histórico completo"""
+        self.aggregates.rebuild(self.history, self.regions.regions_of)
+    
+    def record_price(self, station_id: str, fuel_type: str, price: float, recorded_at=None):
+        """Registra um novo preço: histórico e agregados atualizados em O(1)"""
+        timestamp = to_epoch(recorded_at or datetime.utcnow())
+        self.history.series_for(station_id, fuel_type).append(timestamp, float(price))
+        self.aggregates.update(self.regions.regions_of(station_id), str(station_id), fuel_type, price, timestamp)
+    
+    def record_prices(self, prices: List[Tuple[str, str, float, datetime]]) -> int:
+        """
+        Registra preços recém-gravados (posto, combustível, preço, data), um a
+        um; as regiões dos postos ainda desconhecidos são carregadas antes.
+        Com dados de exemplo não registra nada: a primeira leitura do banco os
+        substitui.
+        """
+        if self.using_sample_data or not prices:
+            return 0
+        
+        missing = self.regions.missing({str(station_id) for station_id, _, _, _ in prices})
+        if missing and has_app_context():
+            engine = current_app.extensions['sqlalchemy'].engine
+            with engine.connect() as connection:
+                self.station_names.update(self.regions.load(connection, missing))
+        
+        for station_id, fuel_type, price, recorded_at in prices:
+            self.record_price(station_id, fuel_type, float(price), recorded_at)
+        return len(prices)
+    
+    def refresh_from_database(self) -> int:
+        """
+        Carrega da tabela price_history as linhas novas desde a última leitura.
+        A primeira carga com dados substitui o histórico de exemplo.
+        Retorna o número de linhas lidas (0 fora de um app context).
+        """
+        if not has_app_context():
+            return 0
+        
+        engine = current_app.extensions['sqlalchemy'].engine
+        with engine.connect() as connection:
+            if self.using_sample_data:
+                history = PriceHistoryStore(self.history.max_points, self.history.history_days)
+                loaded = history.refresh(connection)
+                if loaded:
+                    self.history = history
+                    self.regions = RegionIndex()
+                    self.station_names = self.regions.load(connection, history.station_ids())
+                    self.using_sample_data = False
+                    self._recalculate()
+                    self.forecasts = None
+                return loaded
             
-            # Coletar preços ao longo do tempo
-            for station_id, history in self.price_history.items():
-                for record in history:
-                    prices_over_time.append({
-                        'date': record['date'],
-                        'price': record[fuel_type]
-                    })
+            def apply_rows(station_ids, fuel_types, timestamps, prices):
+                # Linhas novas atualizam os agregados uma a uma, sem recálculo total
+                missing = self.regions.missing(set(station_ids))
+                if missing:
+                    self.station_names.update(self.regions.load(connection, missing))
+                for station_id, fuel_type, timestamp, price in zip(station_ids, fuel_types, timestamps, prices):
+                    self.aggregates.update(self.regions.regions_of(station_id), station_id, fuel_type, price, timestamp)
             
-            if len(prices_over_time) < 2:
+            return self.history.refresh(connection, on_batch=apply_rows)
+    
+    def persist_market_analysis(self) -> int:
+        """Grava o snapshot dos agregados do dia na tabela market_analysis"""
+        if self.using_sample_data or not has_app_context():
+            return 0
+        engine = current_app.extensions['sqlalchemy'].engine
+        with engine.begin() as connection:
+            return self.aggregates.persist(connection)
+    
+    def _ensure_fresh(self):
+        """Refresh incremental com intervalo mínimo; mantém o histórico atual em caso de erro"""
+        now = time.monotonic()
+        if self._last_refresh is not None and now - self._last_refresh < REFRESH_INTERVAL_SECONDS:
+            return
+        if not has_app_context():
+            return
+        
+        self._last_refresh = now
+        try:
+            loaded = self.refresh_from_database()
+        except Exception as e:
+            current_app.logger.warning(f"Price history refresh failed: {e}")
+            return
+        
+        if loaded:
+            try:
+                self.persist_market_analysis()
+            except Exception as e:
+                current_app.logger.warning(f"Market analysis snapshot failed: {e}")
+    
+    def _most_specific(self, regions, fuel_type: str) -> Optional[str]:
+        """Nível mais específico do caminho com amostra suficiente (senão, o de maior amostra)"""
+        fallback, fallback_count = None, 0
+        for region in reversed(regions):
+            aggregate = self.aggregates.get(region, fuel_type)
+            if not aggregate:
                 continue
-            
-            # Ordenar por data
-            prices_over_time.sort(key=lambda x: x['date'])
-            
-            # Calcular tendência (simples: comparar primeiro e último)
-            first_price = prices_over_time[0]['price']
-            last_price = prices_over_time[-1]['price']
-            
-            trend = 'stable'
-            change_percent = 0
-            
-            if last_price > first_price * 1.02:  # Aumento > 2%
-                trend = 'rising'
-                change_percent = ((last_price - first_price) / first_price) * 100
-            elif last_price < first_price * 0.98:  # Diminuição > 2%
-                trend = 'falling'
-                change_percent = ((last_price - first_price) / first_price) * 100
-            
-            self.market_trends[fuel_type] = {
-                'trend': trend,
-                'change_percent': round(change_percent, 2),
-                'current_average': round(statistics.mean([p['price'] for p in prices_over_time[-3:]]), 2),
-                'volatility': self._calculate_volatility([p['price'] for p in prices_over_time])
-            }
+            if aggregate.stats.count >= MIN_REGION_SAMPLE:
+                return region
+            if aggregate.stats.count > fallback_count:
+                fallback, fallback_count = region, aggregate.stats.count
+        return fallback
     
-    def _calculate_volatility(self, prices: List[float]) -> str:
-        """Calcular volatilidade dos preços"""
-        if len(prices) < 2:
-            return 'unknown'
-        
-        std_dev = statistics.stdev(prices)
-        mean_price = statistics.mean(prices)
+    def resolve_region(self, fuel_type: str, station_id: Optional[str] = None,
+                       latitude: Optional[float] = None, longitude: Optional[float] = None,
+                       state: Optional[str] = None, city: Optional[str] = None) -> str:
+        """Região de referência para um posto, coordenada ou UF/município"""
+        regions = self._location_path(station_id, latitude, longitude, state, city)
+        return self._most_specific(regions, fuel_type) or DEFAULT_REGION
+    
+    def _location_path(self, station_id: Optional[str] = None, latitude: Optional[float] = None,
+                       longitude: Optional[float] = None, state: Optional[str] = None,
+                       city: Optional[str] = None) -> Tuple[str, ...]:
+        if station_id is not None:
+            return self.regions.regions_of(station_id)
+        if latitude is not None and longitude is not None and not state:
+            return (DEFAULT_REGION,) + cell_keys(float(latitude), float(longitude))
+        return region_path(state, city, latitude, longitude)
+    
+    def get_regional_stats(self, fuel_type: str, region: Optional[str] = None, **location) -> Dict:
+        """
+        Estatísticas regionais atuais (O(1), vindas dos agregados). Sem região
+        explícita, usa o nível mais específico para ``station_id``,
+        ``latitude``/``longitude`` ou ``state``/``city``, se informados.
+        """
+        self._ensure_fresh()
+        if region is None:
+            region = self.resolve_region(fuel_type, **location) if location else DEFAULT_REGION
+        aggregate = self.aggregates.get(region, fuel_type)
+        if not aggregate:
+            return {}
+        return dict(aggregate.regional_stats(), region=region)
+    
+    def compare_regions(self, fuel_type: str, **location) -> Dict:
+        """Compara a região de referência com a média nacional e as demais grandes regiões"""
+        current = self.get_regional_stats(fuel_type, **location)
+        if not current:
+            return {}
+        
+        def difference(average: float) -> str:
+            return f"{(average - current['average']) / current['average'] * 100:+.1f}%"
+        
+        national = self.get_regional_stats(fuel_type, region=COUNTRY)
+        national_diff = (current['average'] - national['average']) / national['average'] * 100
+        if abs(national_diff) < 0.5:
+            national_comparison = 'Região na média nacional'
+        else:
+            national_comparison = (f"Região {abs(national_diff):.0f}% "
+                                   f"{'mais barata' if national_diff < 0 else 'mais cara'} que a média nacional")
+        
+        current_path = self._location_path(**location)
+        nearby = []
+        for region in MACROREGIONS:
+            aggregate = self.aggregates.get(region, fuel_type)
+            if not aggregate or region in current_path:
+                continue
+            stats = aggregate.regional_stats()
+            nearby.append({
+                'name': region_name(region),
+                'average': stats['average'],
+                'difference': difference(stats['average']),
+                'sample_size': stats['sample_size']
+            })
         
-        coefficient_variation = (std_dev / mean_price) * 100
+        return {
+            'current_region': {
+                'name': region_name(current['region']),
+                'data': current
+            },
+            'national_average': {
+                'average': national['average'],
+                'comparison': national_comparison
+            },
+            'nearby_regions': nearby
+        }
+    
+    def run_forecasts(self, persist: bool = False) -> Dict:
+        """
+        Ajusta as previsões de todas as séries em lote. Com ``persist`` grava o
+        resultado em price_predictions; só o job agendado (run_price_forecasts.py)
+        grava, as requisições apenas leem a tabela.
+        """
+        started = time.perf_counter()
+        batch = forecast_store(self.history)
+        fit_seconds = time.perf_counter() - started
+        
+        self.forecasts = batch
+        
+        rows = 0
+        if persist and not self.using_sample_data:
+            engine = current_app.extensions['sqlalchemy'].engine
+            with engine.begin() as connection:
+                rows = persist_forecasts(connection, batch)
         
-        if coefficient_variation < 1:
-            return 'low'
-        elif coefficient_variation < 3:
-            return 'medium'
-        else:
-            return 'high'
+        return {
+            'series': len(batch.keys),
+            'fit_seconds': round(fit_seconds, 3),
+            'rows_written': rows
+        }
+    
+    def _stored_forecast(self, station_id: str, fuel_type: str) -> Optional[Dict]:
+        if self.using_sample_data or not has_app_context():
+            return None
+        engine = current_app.extensions['sqlalchemy'].engine
+        try:
+            with engine.connect() as connection:
+                return load_forecast(connection, station_id, fuel_type, datetime.now().date())
+        except Exception as e:
+            current_app.logger.warning(f"Stored price forecast lookup failed: {e}")
+            return None
+    
+    def _series_forecast(self, station_id: str, fuel_type: str) -> Optional[Dict]:
+        # Sem lote gravado (dados de exemplo ou job ainda não rodou): só a série pedida, em memória
+        batch = forecast_series((str(station_id), fuel_type), self.history.get(station_id, fuel_type))
+        return batch.get(station_id, fuel_type) if batch else None
     
     def predict_price_trend(self, station_id: str, fuel_type: str, days_ahead: int = 7) -> Dict:
-        """Prever tendência de preços para os próximos dias"""
+        """Previsão de preços para os próximos dias, a partir do lote pré-calculado (sem gravar)"""
+        self._ensure_fresh()
         
-        if station_id not in self.price_history:
+        if not any(self.history.get(station_id, fuel) for fuel in FUEL_TYPES):
             return {'error': 'Posto não encontrado no histórico'}
         
-        history = self.price_history[station_id]
-        if not history:
-            return {'error': 'Sem dados históricos suficientes'}
-        
-        # Extrair preços do combustível específico
-        prices = [record[fuel_type] for record in history]
-        
-        if len(prices) < 3:
+        forecast = self.forecasts.get(station_id, fuel_type) if self.forecasts else None
+        if forecast is None:
+            forecast = self._stored_forecast(station_id, fuel_type)
+        if forecast is None:
+            forecast = self._series_forecast(station_id, fuel_type)
+        if forecast is None:
             return {'error': 'Dados insuficientes para previsão'}
         
-        # Análise simples de tendência
-        recent_prices = prices[-3:]  # Últimos 3 registros
-        trend_slope = (recent_prices[-1] - recent_prices[0]) / len(recent_prices)
-        
-        # Gerar previsões
-        predictions = []
-        current_price = prices[-1]
-        
-        for day in range(1, days_ahead + 1):
-            # Aplicar tendência com alguma variação aleatória
-            predicted_price = current_price + (trend_slope * day)
-            
-            # Adicionar variação aleatória pequena (±2%)
-            variation = random.uniform(-0.02, 0.02)
-            predicted_price *= (1 + variation)
-            
-            predictions.append({
-                'day': day,
-                'date': (datetime.now() + timedelta(days=day)).strftime('%Y-%m-%d'),
-                'predicted_price': round(predicted_price, 2),
-                'confidence': max(0.6, 0.9 - (day * 0.05))  # Confiança diminui com o tempo
-            })
-        
-        # Análise da tendência
-        if trend_slope > 0.01:
-            trend_analysis = 'rising'
-            trend_description = 'Preços em tendência de alta'
-        elif trend_slope < -0.01:
-            trend_analysis = 'falling'
-            trend_description = 'Preços em tendência de baixa'
-        else:
-            trend_analysis = 'stable'
-            trend_description = 'Preços estáveis'
+        trend_analysis = forecast['trend_analysis']
+        trend_description = {
+            'rising': 'Preços em tendência de alta',
+            'falling': 'Preços em tendência de baixa'
+        }.get(trend_analysis, 'Preços estáveis')
         
         return {
             'station_id': station_id,
             'fuel_type': fuel_type,
-            'current_price': prices[-1],
+            'current_price': forecast['current_price'],
             'trend_analysis': trend_analysis,
             'trend_description': trend_description,
-            'predictions': predictions,
-            'recommendation': self._generate_recommendation(trend_analysis, prices[-1])
+            'predictions': forecast['predictions'][:max(1, min(int(days_ahead), HORIZON_DAYS))],
+            'recommendation': self._generate_recommendation(trend_analysis, forecast['current_price'])
         }
     
     def _generate_recommendation(self, trend: str, current_price: float) -> Dict:
@@ -251,40 +380,79 @@ class PriceIntelligenceService:
                 'icon': '➡️'
             }
     
-    def find_best_price_opportunity(self, fuel_type: str, max_distance: float = 10.0) -> Dict:
-        """Encontrar melhor oportunidade de preço na região"""
+    def find_best_price_opportunity(self, fuel_type: str, max_distance: float = 10.0,
+                                    latitude: Optional[float] = None, longitude: Optional[float] = None,
+                                    limit: int = 5, profile: Optional[str] = None,
+                                    weights: Optional[Dict[str, float]] = None) -> Dict:
+        """
+        Encontrar as melhores oportunidades de preço. Com a posição do usuário,
+        busca os postos no raio ``max_distance`` (km) pela grade espacial e
+        compara com a média da região do usuário; sem posição, compara cada
+        posto com a média da sua própria região. O score vem do motor de
+        pontuação, com o perfil de pesos do usuário.
+        """
+        weight_vector = resolve_weights(profile, weights)
+        self._ensure_fresh()
+        
+        if latitude is not None and longitude is not None:
+            nearby_ids, nearby_distances = self.regions.grid.query(float(latitude), float(longitude), max_distance)
+            station_ids, prices, distances = [], [], []
+            for station_id, distance in zip(nearby_ids, nearby_distances.tolist()):
+                series = self.history.get(station_id, fuel_type)
+                if series:
+                    station_ids.append(station_id)
+                    prices.append(series.last_price)
+                    distances.append(distance)
+            current_prices = np.array(prices, dtype=float)
+            distances = np.array(distances, dtype=float)
+            local_average = self.get_regional_stats(
+                fuel_type, latitude=float(latitude), longitude=float(longitude)
+            ).get('average')
+            regional_avgs = np.full(len(station_ids), local_average or np.nan)
+        else:
+            station_ids, current_prices = self.history.latest_prices(fuel_type)
+            distances = None
+            # Média de referência de cada posto: o nível mais específico da sua região
+            regional_avgs = np.array([
+                self._regional_average(station_id, fuel_type, float(price))
+                for station_id, price in zip(station_ids, current_prices)
+            ], dtype=float)
+        
+        if not len(station_ids) or np.isnan(regional_avgs).all():
+            return {
+                'found': False,
+                'message': 'Nenhuma oportunidade especial encontrada no momento'
+            }
         
-        opportunities = []
+        # Economia e score de todos os candidatos de uma vez
+        savings = (regional_avgs - current_prices) / regional_avgs * 100
+        candidates = np.flatnonzero(savings > 1)  # Economia > 1%
+        scores = score_candidates(
+            current_prices[candidates],
+            detour_km=distances[candidates] if distances is not None else None,
+            reference_price=regional_avgs[candidates],
+            weights=weight_vector
+        )
         
-        for station_id, history in self.price_history.items():
-            if not history:
-                continue
-            
-            latest_record = history[-1]
-            current_price = latest_record[fuel_type]
-            
-            # Calcular se é uma boa oportunidade
-            regional_avg = self.regional_averages.get('sul_brasil', {}).get(fuel_type, {}).get('average', current_price)
-            
-            savings_percent = ((regional_avg - current_price) / regional_avg) * 100
+        # Top-k por seleção parcial, sem ordenar todos os candidatos
+        top = [(candidates[position], scores[position]) for position in top_k(scores, limit).tolist()]
+        
+        opportunities = []
+        for index, score in top:
+            station_id = station_ids[index]
+            current_price = float(current_prices[index])
+            regional_avg = float(regional_avgs[index])
             
-            if savings_percent > 1:  # Economia > 1%
-                # Simular distância (em produção viria do GPS)
-                distance = random.uniform(1.0, max_distance)
-                
-                opportunities.append({
-                    'station_id': station_id,
-                    'station_name': self._get_station_name(station_id),
-                    'current_price': current_price,
-                    'regional_average': regional_avg,
-                    'savings_percent': round(savings_percent, 2),
-                    'savings_per_liter': round(regional_avg - current_price, 2),
-                    'distance': round(distance, 1),
-                    'score': self._calculate_opportunity_score(savings_percent, distance)
-                })
-        
-        # Ordenar por score (melhor oportunidade primeiro)
-        opportunities.sort(key=lambda x: x['score'], reverse=True)
+            opportunities.append({
+                'station_id': station_id,
+                'station_name': self._get_station_name(station_id),
+                'current_price': current_price,
+                'regional_average': regional_avg,
+                'savings_percent': round(float(savings[index]), 2),
+                'savings_per_liter': round(regional_avg - current_price, 2),
+                'distance': round(float(distances[index]), 1) if distances is not None else None,
+                'score': round(float(score), 4)
+            })
         
         if not opportunities:
             return {
@@ -297,34 +465,28 @@ class PriceIntelligenceService:
         return {
             'found': True,
             'best_opportunity': best_opportunity,
-            'all_opportunities': opportunities[:5],  # Top 5
+            'all_opportunities': opportunities,  # Top k
             'message': f"💰 Economia de {best_opportunity['savings_percent']:.1f}% encontrada!"
         }
     
+    def _regional_average(self, station_id: str, fuel_type: str, default: float) -> float:
+        region = self._most_specific(self.regions.regions_of(station_id), fuel_type)
+        aggregate = self.aggregates.get(region, fuel_type) if region else None
+        return aggregate.regional_stats()['average'] if aggregate else default
+    
     def _get_station_name(self, station_id: str) -> str:
         """Obter nome do posto pelo ID"""
-        names = {
-            'shell_br101': 'Posto Shell BR-101',
-            'petrobras_itajai': 'Petrobras Itajaí',
-            'ipiranga_centro': 'Ipiranga Centro'
-        }
-        return names.get(station_id, f'Posto {station_id}')
-    
-    def _calculate_opportunity_score(self, savings_percent: float, distance: float) -> float:
-        """Calcular score da oportunidade (economia vs distância)"""
-        # Score baseado em economia vs distância
-        # Economia alta + distância baixa = score alto
-        distance_penalty = distance / 10.0  # Penalidade por distância
-        return max(0, savings_percent - distance_penalty)
+        return self.station_names.get(station_id, f'Posto {station_id}')
     
     def get_market_insights(self, fuel_type: str) -> Dict:
         """Obter insights do mercado para um tipo de combustível"""
+        self._ensure_fresh()
         
         if fuel_type not in self.market_trends:
             return {'error': f'Dados não disponíveis para {fuel_type}'}
         
         trend_data = self.market_trends[fuel_type]
-        regional_data = self.regional_averages.get('sul_brasil', {}).get(fuel_type, {})
+        regional_data = self.get_regional_stats(fuel_type)
         
         # Gerar insights inteligentes
         insights = []
@@ -366,10 +528,12 @@ class PriceIntelligenceService:
             'last_updated': datetime.now().isoformat()
         }
     
-    def analyze_user_savings(self, user_id: str, fuel_consumption: float, fuel_type: str) -> Dict:
-        """Analisar potencial de economia do usuário"""
+    def analyze_user_savings(self, user_id: str, fuel_consumption: float, fuel_type: str,
+                             **location) -> Dict:
+        """Analisar potencial de economia do usuário (na região de ``location``, se informada)"""
+        self._ensure_fresh()
         
-        regional_data = self.regional_averages.get('sul_brasil', {}).get(fuel_type, {})
+        regional_data = self.get_regional_stats(fuel_type, **location)
         
         if not regional_data:
             return {'error': 'Dados regionais não disponíveis'}
@@ -422,22 +586,45 @@ class PriceIntelligenceService:
     def get_service_stats(self) -> Dict:
         """Obter estatísticas do serviço de inteligência"""
         return {
-            'stations_monitored': len(self.price_history),
+            'stations_monitored': len(self.history.station_ids()),
             'fuel_types_tracked': len(self.market_trends),
-            'regions_covered': len(self.regional_averages),
-            'total_price_records': sum(len(history) for history in self.price_history.values()),
+            'regions_covered': len(self.aggregates.regions()),
+            'total_price_records': self.history.size,
+            'history_memory_bytes': self.history.nbytes,
+            'data_source': 'sample' if self.using_sample_data else 'database',
             'last_updated': datetime.now().isoformat(),
             'service_status': 'operational'
         }
 
 # Instância global do serviço
-price_intelligence = PriceIntelligenceService()
+# Criado no primeiro uso: os dados de exemplo não entram no cold start
+price_intelligence = LazyService(PriceIntelligenceService, 'price_intelligence')
+
+def record_committed_prices(prices: List[Tuple[str, str, float, datetime]]) -> int:
+    """
+    Chamado pelas rotinas de escrita de preços logo após o commit: atualiza os
+    agregados de mercado do serviço deste processo sem recálculo. Se o serviço
+    ainda não foi carregado, não há o que atualizar (ele lê o banco ao ser
+    criado). Uma falha aqui não desfaz a gravação.
+    """
+    if not price_intelligence.loaded:
+        return 0
+    try:
+        return price_intelligence.record_prices(prices)
+    except Exception as e:
+        if has_app_context():
+            current_app.logger.warning(f"Market aggregates update failed: {e}")
+        return 0
 
-def get_smart_recommendation(fuel_type: str, consumption: float, max_distance: float = 10.0) -> Dict:
+def get_smart_recommendation(fuel_type: str, consumption: float, max_distance: float = 10.0,
+                             latitude: Optional[float] = None, longitude: Optional[float] = None,
+                             profile: Optional[str] = None, weights: Optional[Dict[str, float]] = None) -> Dict:
     """Função helper para obter recomendação inteligente"""
     
     # Combinar análise de oportunidades com insights de mercado
-    opportunities = price_intelligence.find_best_price_opportunity(fuel_type, max_distance)
+    opportunities = price_intelligence.find_best_price_opportunity(
+        fuel_type, max_distance, latitude, longitude, profile=profile, weights=weights
+    )
     market_insights = price_intelligence.get_market_insights(fuel_type)
     
     return {
@@ -0,0 +1,194 @@
+"""
+Limite de requisições por GCRA (generic cell rate algorithm).
+
+Cada chave guarda no Redis só o TAT (theoretical arrival time): o script Lua
+lê o relógio do próprio Redis, decide e atualiza numa única ida ao servidor,
+sem a corrida do GET seguido de INCR. Acima disso há uma camada local: chaves
+quentes reservam um lote de fichas de uma vez (até ``max_lease``) e as
+consomem no processo sem falar com o Redis; chaves frias continuam ficha a
+ficha, exatas. Uma negativa fica em cache local até o Retry-After, já que
+nenhuma ficha volta antes disso. Sem Redis (ou com erro), o mesmo GCRA roda
+em memória, por processo, em vez de desligar o limite.
+"""
+import logging
+import math
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Dict, Tuple
+
+logger = logging.getLogger(__name__)
+
+MAX_LEASE = 32
+LEASE_TTL_SECONDS = 1.0
+MAX_LOCAL_KEYS = 10000
+
+GCRA_SCRIPT = """
+local interval = tonumber(ARGV[1])
+local limit = tonumber(ARGV[2])
+local requested = tonumber(ARGV[3])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) * 1000 + tonumber(clock[2]) / 1000
+local tat = tonumber(redis.call('GET', KEYS[1]) or now)
+if tat < now then tat = now end
+local burst = interval * limit
+local available = math.floor((burst - (tat - now)) / interval + 1e-6)
+if available < 0 then available = 0 end
+local granted = math.min(requested, available)
+if granted > 0 then
+  tat = tat + granted * interval
+  redis.call('SET', KEYS[1], string.format('%.3f', tat), 'PX', math.ceil(tat - now))
+end
+local retry_after = 0
+if available - granted < 1 then retry_after = math.ceil(tat - burst + interval - now) end
+return {granted, available - granted, retry_after, math.ceil(tat - now)}
+"""
+
+
+def gcra(tat: float, now: float, interval: float, limit: int, requested: int) -> Tuple[float, int, int, float, float]:
+    """
+    Mesmo cálculo do script Lua, em memória: (novo TAT, fichas concedidas,
+    fichas restantes, espera até a próxima ficha, tempo até encher).
+    """
+    tat = max(tat, now)
+    burst = interval * limit
+    available = max(int(math.floor((burst - (tat - now)) / interval + 1e-6)), 0)
+    granted = min(requested, available)
+    tat += granted * interval
+    retry_after = tat - burst + interval - now if available - granted < 1 else 0.0
+    return tat, granted, available - granted, retry_after, tat - now
+
+
+@dataclass
+class RateLimitResult:
+    allowed: bool
+    limit: int
+    remaining: int
+    reset_after: float
+    retry_after: float = 0.0
+
+    def headers(self) -> Dict[str, str]:
+        """Cabeçalhos X-RateLimit-* (e Retry-After quando bloqueado)"""
+        headers = {
+            'X-RateLimit-Limit': str(self.limit),
+            'X-RateLimit-Remaining': str(self.remaining),
+            'X-RateLimit-Reset': str(int(math.ceil(self.reset_after)))
+        }
+        if not self.allowed:
+            headers['Retry-After'] = str(max(int(math.ceil(self.retry_after)), 1))
+        return headers
+
+
+@dataclass
+class _Lease:
+    tokens: int
+    size: int
+    remaining: int
+    reset_at: float
+    expires_at: float
+    blocked: bool = False
+
+
+def _default_client():
+    from src.database import get_redis
+    return get_redis()
+
+
+class RateLimiter:
+    """GCRA no Redis com reserva local de fichas e GCRA em memória como reserva"""
+
+    def __init__(self, client: Callable = _default_client, clock: Callable[[], float] = time.monotonic,
+                 max_lease: int = MAX_LEASE, lease_ttl: float = LEASE_TTL_SECONDS):
+        self.client = client
+        self.clock = clock
+        self.max_lease = max_lease
+        self.lease_ttl = lease_ttl
+        self.redis_calls = 0
+        self._script = None
+        self._script_client = None
+        self._leases: OrderedDict = OrderedDict()
+        self._local_tats: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def hit(self, identifier: str, limit: int, window: int) -> RateLimitResult:
+        """Consome uma ficha de ``identifier`` (``limit`` por ``window`` segundos)"""
+        key = f"rate_limit:{identifier}"
+        now = self.clock()
+
+        with self._lock:
+            lease = self._leases.get(key)
+            if lease is not None and lease.blocked and lease.expires_at > now:
+                return RateLimitResult(False, limit, 0, max(lease.reset_at - now, 0.0), lease.expires_at - now)
+            if lease is not None and lease.tokens > 0 and lease.expires_at > now:
+                lease.tokens -= 1
+                return RateLimitResult(True, limit, lease.remaining + lease.tokens, max(lease.reset_at - now, 0.0))
+            # Reserva esgotada dentro do prazo = chave quente: dobra o próximo lote
+            size = 1
+            if lease is not None and not lease.blocked:
+                size = min(lease.size * 2, self._max_lease(limit)) if lease.tokens == 0 and lease.expires_at > now else 1
+
+        client = self.client()
+        if client is None:
+            return self._local_hit(key, limit, window, now)
+
+        try:
+            granted, remaining, retry_ms, reset_ms = self._run_script(client, key, window * 1000.0 / limit, limit, size)
+        except Exception as e:
+            logger.error(f"Rate limit Redis error: {e}")
+            return self._local_hit(key, limit, window, now)
+
+        with self._lock:
+            if granted == 0:
+                # Nenhuma ficha volta antes de retry_after (o GCRA só recarrega com o tempo): bloqueia localmente
+                self._leases[key] = _Lease(0, 1, 0, now + reset_ms / 1000.0, now + retry_ms / 1000.0, blocked=True)
+            else:
+                self._leases[key] = _Lease(granted - 1, size, remaining, now + reset_ms / 1000.0, now + self.lease_ttl)
+            self._leases.move_to_end(key)
+            while len(self._leases) > MAX_LOCAL_KEYS:
+                self._leases.popitem(last=False)
+        if granted == 0:
+            return RateLimitResult(False, limit, 0, reset_ms / 1000.0, retry_ms / 1000.0)
+        return RateLimitResult(True, limit, remaining + granted - 1, reset_ms / 1000.0)
+
+    def peek(self, identifier: str, limit: int, window: int) -> int:
+        """Fichas disponíveis sem consumir nenhuma"""
+        key = f"rate_limit:{identifier}"
+        now = self.clock()
+        client = self.client()
+        if client is not None:
+            try:
+                with self._lock:
+                    lease = self._leases.get(key)
+                    leased = lease.tokens if lease is not None and not lease.blocked and lease.expires_at > now else 0
+                return self._run_script(client, key, window * 1000.0 / limit, limit, 0)[1] + leased
+            except Exception as e:
+                logger.error(f"Rate limit Redis error: {e}")
+        with self._lock:
+            tat = self._local_tats.get(key, now)
+        return gcra(tat, now, window / limit, limit, 0)[2]
+
+    def _max_lease(self, limit: int) -> int:
+        """Lotes pequenos perto do limite: no máximo 5% da cota por reserva"""
+        return max(1, min(self.max_lease, limit // 20))
+
+    def _run_script(self, client, key: str, interval_ms: float, limit: int, requested: int):
+        if self._script is None or self._script_client is not client:
+            self._script = client.register_script(GCRA_SCRIPT)
+            self._script_client = client
+        self.redis_calls += 1
+        return [int(value) for value in self._script(keys=[key], args=[interval_ms, limit, requested])]
+
+    def _local_hit(self, key: str, limit: int, window: int, now: float) -> RateLimitResult:
+        with self._lock:
+            tat, granted, remaining, retry_after, reset_after = gcra(
+                self._local_tats.get(key, now), now, window / limit, limit, 1
+            )
+            self._local_tats[key] = tat
+            self._local_tats.move_to_end(key)
+            while len(self._local_tats) > MAX_LOCAL_KEYS:
+                self._local_tats.popitem(last=False)
+        return RateLimitResult(granted > 0, limit, remaining, reset_after, retry_after)
+
+
+rate_limiter = RateLimiter()
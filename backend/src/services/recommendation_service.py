@@ -3,6 +3,8 @@ from .google_maps_service import GoogleMapsService
 from googlemaps.convert import decode_polyline
 from haversine import haversine, Unit
 import math
+import numpy as np
+from .scoring_engine import resolve_weights, score_candidates, top_k
 
 class RecommendationService:
 
@@ -29,7 +31,10 @@ class RecommendationService:
             return haversine(point, (ix, iy))
 
     @staticmethod
-    def get_recommendations_for_route(origin: str, destination: str, fuel_type: str) -> list:
+    def get_recommendations_for_route(origin: str, destination: str, fuel_type: str,
+                                      profile: str = None, weights: dict = None, limit: int = 10) -> list:
+        weight_vector = resolve_weights(profile, weights)
+
         maps_service = GoogleMapsService()
         directions = maps_service.get_directions(origin, destination)
 
@@ -42,7 +47,7 @@ class RecommendationService:
         # Busca postos com o tipo de combustível especificado
         fuel_prices = FuelPrice.query.filter_by(fuel_type=fuel_type, is_active=True).join(GasStation).filter(GasStation.is_active==True).all()
         
-        recommendations = []
+        candidates, detours = [], []
         for fuel_price in fuel_prices:
             station = fuel_price.gas_station
             station_coords = (station.latitude, station.longitude)
@@ -57,26 +62,38 @@ class RecommendationService:
             if min_distance_km > 5:
                 continue
 
-            avg_market_price = 5.75  # Simulado: idealmente viria de uma análise de mercado
-            savings_per_liter = max(0, avg_market_price - fuel_price.price)
-            
-            # Heurística de pontuação: prioriza economia e penaliza desvio
-            score = max(0, (savings_per_liter * 10) - (min_distance_km * 0.8))
-            
-            if score > 0:
-                recommendations.append({
-                    'station': station.to_dict(),
-                    'fuel': {
-                        'type': fuel_type,
-                        'price': fuel_price.price,
-                    },
-                    'route_info': {
-                        'detour_km': round(min_distance_km, 2),
-                    },
-                    'score': round(score, 2),
-                    'estimated_savings': round(savings_per_liter * 40, 2) # Simulado para um tanque de 40L
-                })
-        
-        recommendations.sort(key=lambda x: x['score'], reverse=True)
+            candidates.append(fuel_price)
+            detours.append(min_distance_km)
+
+        if not candidates:
+            return []
+
+        # Pontuação de todos os candidatos de uma vez; referência é o preço mediano na rota
+        prices = np.array([float(fuel_price.price) for fuel_price in candidates])
+        reference_price = float(np.median(prices))
+        scores = score_candidates(
+            prices,
+            detour_km=detours,
+            confidence=[float(fuel_price.source_confidence or 0.5) for fuel_price in candidates],
+            reference_price=reference_price,
+            weights=weight_vector
+        )
+
+        recommendations = []
+        for index in top_k(scores, limit).tolist():
+            fuel_price = candidates[index]
+            savings_per_liter = max(0, reference_price - float(fuel_price.price))
+            recommendations.append({
+                'station': fuel_price.gas_station.to_dict(),
+                'fuel': {
+                    'type': fuel_type,
+                    'price': fuel_price.price,
+                },
+                'route_info': {
+                    'detour_km': round(detours[index], 2),
+                },
+                'score': round(float(scores[index]), 2),
+                'estimated_savings': round(savings_per_liter * 40, 2) # Simulado para um tanque de 40L
+            })
         
-        return recommendations[:10]
+        return recommendations
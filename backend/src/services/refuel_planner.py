@@ -0,0 +1,155 @@
+"""
+Plano de abastecimento para viagens longas.
+
+Programação dinâmica sobre os postos do corredor, em ordem de km ao longo da
+rota. O estado é o nível do tanque (em passos de ``step_liters``) ao passar
+por cada posto. Em cada posto o motorista segue direto ou desvia, abastece
+até qualquer nível e volta à rota; o melhor custo de cada nível após a compra
+sai de um mínimo acumulado (np.minimum.accumulate), então cada posto custa
+O(níveis) em operações vetorizadas. O desvio custa o combustível gasto na ida
+e volta, mais uma penalidade opcional por parada.
+"""
+import math
+from dataclasses import dataclass, field
+from typing import Dict, List
+import numpy as np
+
+
+@dataclass
+class RefuelStop:
+    """Parada do plano: índice do candidato e litros comprados"""
+    index: int
+    along_km: float
+    liters: float
+    price: float
+
+    @property
+    def cost(self) -> float:
+        return self.liters * self.price
+
+    def to_dict(self) -> Dict:
+        return {
+            'index': self.index,
+            'along_km': round(self.along_km, 1),
+            'liters': round(self.liters, 2),
+            'price': round(self.price, 3),
+            'cost': round(self.cost, 2)
+        }
+
+
+@dataclass
+class RefuelPlan:
+    feasible: bool
+    stops: List[RefuelStop] = field(default_factory=list)
+    total_cost: float = 0.0
+    final_fuel: float = 0.0
+
+    @property
+    def fuel_cost(self) -> float:
+        return sum(stop.cost for stop in self.stops)
+
+    @property
+    def liters(self) -> float:
+        return sum(stop.liters for stop in self.stops)
+
+    def to_dict(self) -> Dict:
+        return {
+            'feasible': self.feasible,
+            'stops': [stop.to_dict() for stop in self.stops],
+            'total_stops': len(self.stops),
+            'total_liters': round(self.liters, 2),
+            'fuel_cost': round(self.fuel_cost, 2),
+            'total_cost': round(self.total_cost, 2),
+            'final_fuel': round(self.final_fuel, 2)
+        }
+
+
+def _shift_down(costs: np.ndarray, units: int) -> np.ndarray:
+    """Custos após consumir ``units`` passos: novo[f] = antigo[f + units]"""
+    if units <= 0:
+        return costs
+    shifted = np.full_like(costs, np.inf)
+    if units < len(costs):
+        shifted[:len(costs) - units] = costs[units:]
+    return shifted
+
+
+def plan_refuel(along_km, prices, detour_km, route_km: float, tank_capacity: float,
+                consumption_per_100km: float, initial_fuel: float, reserve: float = 0.0,
+                stop_penalty: float = 0.0, step_liters: float = 0.5) -> RefuelPlan:
+    """
+    Plano de menor custo para percorrer ``route_km`` partindo com
+    ``initial_fuel`` litros, sem ficar abaixo de ``reserve`` ao chegar a um
+    posto ou ao destino. ``detour_km`` é o desvio de ida e volta de cada posto.
+    """
+    along_km = np.asarray(along_km, dtype=float)
+    prices = np.asarray(prices, dtype=float)
+    detour_km = np.asarray(detour_km, dtype=float)
+    per_km = consumption_per_100km / 100.0
+
+    def units(liters: float) -> int:
+        return max(int(math.ceil(liters / step_liters - 1e-9)), 0)
+
+    levels = int(tank_capacity // step_liters) + 1
+    level_liters = np.arange(levels) * step_liters
+    reserve_units = units(reserve)
+
+    costs = np.full(levels, np.inf)
+    costs[min(int(initial_fuel // step_liters), levels - 1)] = 0.0
+
+    order = [index for index in np.argsort(along_km, kind='stable').tolist() if 0 <= along_km[index] <= route_km]
+    needs, half_detours, stop_masks, sources = [], [], [], []
+    # Consumo acumulado desde a origem, para o arredondamento não se somar trecho a trecho
+    consumed = 0
+
+    for index in order:
+        need = units(along_km[index] * per_km) - consumed
+        consumed += need
+        costs = _shift_down(costs, need)
+        costs[:reserve_units] = np.inf
+        needs.append(need)
+
+        # Desvio: metade para chegar ao posto, metade para voltar à rota
+        half = units(detour_km[index] / 2 * per_km)
+        half_detours.append(half)
+
+        # Nível na bomba a = nível na rota - metade do desvio; compra até g >= a
+        at_pump = _shift_down(costs, half)
+        relative = at_pump - level_liters * prices[index]
+        best = np.minimum.accumulate(relative)
+        source = np.maximum.accumulate(np.where(relative == best, np.arange(levels), 0))
+        after_fill = best + level_liters * prices[index] + stop_penalty
+
+        # De volta à rota com g - metade do desvio
+        stop_costs = _shift_down(after_fill, half)
+        stop_source = np.zeros(levels, dtype=np.intp)
+        if half < levels:
+            stop_source[:levels - half] = source[half:]
+
+        stop = stop_costs < costs
+        costs = np.where(stop, stop_costs, costs)
+        stop_masks.append(stop)
+        sources.append(stop_source)
+
+    final_need = units(route_km * per_km) - consumed
+    costs = _shift_down(costs, final_need)
+    costs[:reserve_units] = np.inf
+    if not np.isfinite(costs).any():
+        return RefuelPlan(feasible=False)
+
+    level = int(np.argmin(costs))
+    plan = RefuelPlan(feasible=True, total_cost=float(costs[level]), final_fuel=float(level * step_liters))
+
+    # Reconstrução de trás para frente
+    level += final_need
+    for position in range(len(order) - 1, -1, -1):
+        if stop_masks[position][level]:
+            index = order[position]
+            pump_level = int(sources[position][level])
+            bought = level + half_detours[position] - pump_level
+            plan.stops.append(RefuelStop(index, float(along_km[index]), bought * step_liters, float(prices[index])))
+            level = pump_level + half_detours[position]
+        level += needs[position]
+
+    plan.stops.reverse()
+    return plan
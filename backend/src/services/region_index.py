@@ -0,0 +1,157 @@
+"""
+Hierarquia de regiões dos postos para os agregados de mercado.
+
+Cada posto é mapeado, uma única vez, para o caminho
+país -> grande região (IBGE) -> UF -> município -> células geohash,
+do mais geral para o mais específico. Os agregados são mantidos em todos os
+níveis, então a média regional de qualquer posto ou coordenada é uma
+consulta de dicionário.
+"""
+import unicodedata
+from typing import Dict, Iterable, Optional, Tuple
+from sqlalchemy import column, select, table
+from .spatial_index import StationGrid
+
+COUNTRY = 'br'
+
+# Grandes regiões do IBGE por UF (chaves no formato já usado em market_analysis.region)
+MACROREGIONS = {
+    'sul_brasil': ('PR', 'RS', 'SC'),
+    'sudeste_brasil': ('ES', 'MG', 'RJ', 'SP'),
+    'centro_oeste_brasil': ('DF', 'GO', 'MS', 'MT'),
+    'nordeste_brasil': ('AL', 'BA', 'CE', 'MA', 'PB', 'PE', 'PI', 'RN', 'SE'),
+    'norte_brasil': ('AC', 'AM', 'AP', 'PA', 'RO', 'RR', 'TO'),
+}
+MACROREGION_BY_STATE = {state: region for region, states in MACROREGIONS.items() for state in states}
+
+REGION_NAMES = {
+    COUNTRY: 'Brasil',
+    'sul_brasil': 'Sul do Brasil',
+    'sudeste_brasil': 'Sudeste',
+    'centro_oeste_brasil': 'Centro-Oeste',
+    'nordeste_brasil': 'Nordeste',
+    'norte_brasil': 'Norte',
+}
+
+# Células geohash: 4 caracteres (~39 km) e 5 caracteres (~5 km)
+GEOHASH_PRECISIONS = (4, 5)
+GEOHASH_ALPHABET = '0123456789bcdefghjkmnpqrstuvwxyz'
+
+gas_stations_regions_table = table(
+    'gas_stations', column('id'), column('name'), column('city'), column('state'),
+    column('latitude'), column('longitude')
+)
+
+RegionPath = Tuple[str, ...]
+
+
+def geohash(latitude: float, longitude: float, precision: int = 5) -> str:
+    """Codifica uma coordenada em geohash"""
+    lat_range, lon_range = [-90.0, 90.0], [-180.0, 180.0]
+    code, bits, bit_count, even = [], 0, 0, True
+
+    while len(code) < precision:
+        target, value = (lon_range, longitude) if even else (lat_range, latitude)
+        middle = (target[0] + target[1]) / 2
+        bits <<= 1
+        if value >= middle:
+            bits |= 1
+            target[0] = middle
+        else:
+            target[1] = middle
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            code.append(GEOHASH_ALPHABET[bits])
+            bits, bit_count = 0, 0
+
+    return ''.join(code)
+
+
+def _city_slug(city: str) -> str:
+    city = unicodedata.normalize('NFKD', city.strip().lower())
+    city = ''.join(c for c in city if not unicodedata.combining(c))
+    return '_'.join(city.replace('-', ' ').split())
+
+
+def state_key(state: str) -> str:
+    return f'uf:{state.upper()}'
+
+
+def city_key(state: str, city: str) -> str:
+    return f'cidade:{state.upper()}:{_city_slug(city)}'
+
+
+def cell_keys(latitude: float, longitude: float) -> Tuple[str, ...]:
+    full = geohash(latitude, longitude, max(GEOHASH_PRECISIONS))
+    return tuple(f'geo:{full[:precision]}' for precision in GEOHASH_PRECISIONS)
+
+
+def region_path(state: Optional[str] = None, city: Optional[str] = None,
+                latitude: Optional[float] = None, longitude: Optional[float] = None) -> RegionPath:
+    """Caminho de regiões, do país à célula geohash mais específica"""
+    path = [COUNTRY]
+    if state:
+        state = state.strip().upper()
+        if state in MACROREGION_BY_STATE:
+            path.append(MACROREGION_BY_STATE[state])
+        path.append(state_key(state))
+        if city:
+            path.append(city_key(state, city))
+    # Coordenada 0,0 é o marcador de posto ainda não geocodificado (importador ANP)
+    if latitude is not None and longitude is not None and (latitude or longitude):
+        path.extend(cell_keys(float(latitude), float(longitude)))
+    return tuple(path)
+
+
+def region_name(region: str) -> str:
+    if region in REGION_NAMES:
+        return REGION_NAMES[region]
+    if region.startswith('uf:'):
+        return region[3:]
+    if region.startswith('cidade:'):
+        _, state, city = region.split(':', 2)
+        return f"{city.replace('_', ' ').title()} - {state}"
+    if region.startswith('geo:'):
+        return f'Arredores ({region[4:]})'
+    return region
+
+
+class RegionIndex:
+    """Mapa posto -> caminho de regiões, com a grade espacial das coordenadas"""
+
+    def __init__(self):
+        self.paths: Dict[str, RegionPath] = {}
+        self.grid = StationGrid()
+
+    def register(self, station_id: str, state: Optional[str] = None, city: Optional[str] = None,
+                 latitude: Optional[float] = None, longitude: Optional[float] = None):
+        station_id = str(station_id)
+        self.paths[station_id] = region_path(state, city, latitude, longitude)
+        if latitude is not None and longitude is not None and (latitude or longitude):
+            self.grid.insert(station_id, float(latitude), float(longitude))
+
+    def regions_of(self, station_id: str) -> RegionPath:
+        return self.paths.get(str(station_id), (COUNTRY,))
+
+    def missing(self, station_ids: Iterable[str]):
+        return [station_id for station_id in station_ids if station_id not in self.paths]
+
+    def load(self, connection, station_ids: Iterable[str], batch_size: int = 1000) -> Dict[str, str]:
+        """Registra os postos a partir de gas_stations; retorna id -> nome"""
+        station_ids = list(station_ids)
+        names = {}
+        columns = gas_stations_regions_table.c
+        for start in range(0, len(station_ids), batch_size):
+            query = select(
+                columns.id, columns.name, columns.state, columns.city, columns.latitude, columns.longitude
+            ).where(columns.id.in_(station_ids[start:start + batch_size]))
+            for station_id, name, state, city, latitude, longitude in connection.execute(query):
+                station_id = str(station_id)
+                names[station_id] = name
+                self.register(
+                    station_id, state, city,
+                    float(latitude) if latitude is not None else None,
+                    float(longitude) if longitude is not None else None
+                )
+        return names
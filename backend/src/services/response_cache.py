@@ -0,0 +1,263 @@
+"""
+Cache de respostas com ETag para os endpoints públicos de postos.
+
+Cada resposta depende de um conjunto de versões: ``station:<id>`` (o posto,
+seus preços e cupons), ``cell:<lat>:<lon>`` (células de 0,1° cobertas por
+uma busca por raio) e ``stations`` (listagens sem coordenadas). O ETag é o
+hash da chave normalizada da requisição (coordenadas arredondadas a
+~100 m) com essas versões, então um ``If-None-Match`` igual responde 304 sem
+executar a view. Gravar um posto, preço ou cupom incrementa só as versões
+do posto, da sua célula e de ``stations``; ingestões grandes incrementam a
+``epoch``, que entra em todos os ETags.
+
+As versões ficam num hash Redis, compartilhado entre processos. Sem Redis,
+cada processo mantém as suas (com um token aleatório no ETag) e o TTL das
+entradas limita o atraso entre processos.
+
+Com réplica de leitura, uma resposta cujas versões mudaram há menos de
+REPLICA_STICKY_SECONDS é montada no primário: a réplica ainda pode não ter a
+gravação, e a versão nova ficaria presa a dados antigos.
+"""
+import hashlib
+import logging
+import math
+import threading
+import time
+import uuid
+from functools import wraps
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from flask import make_response, request
+from sqlalchemy import column, event, select, table
+from sqlalchemy.orm import Session
+from .ttl_cache import TTLCache
+from src.db_routing import STICKY_SECONDS, primary_reads, replica_enabled
+
+logger = logging.getLogger(__name__)
+
+VERSIONS_KEY = 'response_cache:versions'
+CHANGED_AT_KEY = 'response_cache:changed_at'
+ENTRY_TTL_SECONDS = 300
+MAX_ENTRIES = 5000
+COORDINATE_DECIMALS = 3  # ~110 m
+CELL_DEGREES = 0.1  # ~11 km
+MAX_CELLS = 100
+CACHE_CONTROL = 'public, no-cache'
+
+gas_stations_table = table('gas_stations', column('id'), column('latitude'), column('longitude'))
+
+# Tabelas cujas gravações mudam as respostas dos postos
+STATION_TABLES = ('gas_stations', 'fuel_prices', 'coupons')
+
+
+def cell_of(latitude: float, longitude: float) -> str:
+    return f"cell:{math.floor(latitude / CELL_DEGREES)}:{math.floor(longitude / CELL_DEGREES)}"
+
+
+def area_cells(latitude: float, longitude: float, radius_km: float) -> Optional[List[str]]:
+    """Células cobertas pelo raio; ``None`` se forem mais de ``MAX_CELLS``"""
+    lat_delta = radius_km / 111.0
+    lon_delta = radius_km / (111.0 * max(math.cos(math.radians(latitude)), 0.01))
+    rows = range(math.floor((latitude - lat_delta) / CELL_DEGREES), math.floor((latitude + lat_delta) / CELL_DEGREES) + 1)
+    cols = range(math.floor((longitude - lon_delta) / CELL_DEGREES), math.floor((longitude + lon_delta) / CELL_DEGREES) + 1)
+    if len(rows) * len(cols) > MAX_CELLS:
+        return None
+    return [f"cell:{row}:{col}" for row in rows for col in cols]
+
+
+def area_dependencies(latitude: Optional[float], longitude: Optional[float], radius_km: float) -> List[str]:
+    """Versões de uma busca por raio (ou de uma listagem geral, sem coordenadas)"""
+    if latitude is None or longitude is None:
+        return ['stations']
+    return area_cells(latitude, longitude, radius_km) or ['stations']
+
+
+def normalized_key() -> str:
+    """Endpoint + argumentos da rota + query string ordenada, com coordenadas arredondadas"""
+    args = []
+    for name in sorted(request.args):
+        values = request.args.getlist(name)
+        if name in ('latitude', 'longitude', 'lat', 'lng'):
+            try:
+                values = [f"{float(value):.{COORDINATE_DECIMALS}f}" for value in values]
+            except ValueError:
+                pass
+        args.append((name, tuple(values)))
+    return repr((request.endpoint, sorted((request.view_args or {}).items()), args))
+
+
+def _default_client():
+    from src.database import get_redis
+    return get_redis()
+
+
+class ResponseCache:
+    """Respostas JSON em cache, validadas pelas versões de que dependem"""
+
+    def __init__(self, client: Callable = _default_client, ttl_seconds: float = ENTRY_TTL_SECONDS):
+        self.client = client
+        self.entries = TTLCache(ttl_seconds, MAX_ENTRIES)
+        self.local_versions: Dict[str, int] = {}
+        self.local_changed_at: Dict[str, float] = {}
+        self.local_token = uuid.uuid4().hex
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+        self._lock = threading.Lock()
+
+    def cached(self, dependencies: Callable[..., Optional[List[str]]]):
+        """
+        Decorator de view. ``dependencies`` recebe os argumentos da rota e
+        devolve as versões da resposta, ou ``None`` para não usar o cache.
+        """
+        def decorator(view):
+            @wraps(view)
+            def wrapper(*args, **kwargs):
+                names = dependencies(**kwargs)
+                if names is None:
+                    return view(*args, **kwargs)
+
+                key = normalized_key()
+                etag = self.etag(key, names)
+                if etag in request.if_none_match:
+                    self.not_modified += 1
+                    return self._finish(make_response('', 304), etag)
+
+                entry = self.entries.get(key)
+                if entry is not None and entry[0] == etag:
+                    self.hits += 1
+                    response = make_response(entry[1], 200)
+                    response.mimetype = entry[2]
+                    return self._finish(response, etag)
+
+                self.misses += 1
+                if replica_enabled() and self.changed_within(names, STICKY_SECONDS):
+                    with primary_reads():
+                        response = make_response(view(*args, **kwargs))
+                else:
+                    response = make_response(view(*args, **kwargs))
+                if response.status_code == 200:
+                    self.entries.set(key, (etag, response.get_data(), response.mimetype))
+                    self._finish(response, etag)
+                return response
+            return wrapper
+        return decorator
+
+    def etag(self, key: str, names: List[str]) -> str:
+        versions = self.versions(['epoch'] + list(names))
+        return hashlib.sha1(repr((key, versions)).encode()).hexdigest()
+
+    def versions(self, names: List[str]) -> Tuple:
+        client = self.client()
+        if client is not None:
+            try:
+                return tuple(client.hmget(VERSIONS_KEY, names))
+            except Exception as e:
+                logger.error(f"Response cache versions error: {e}")
+        with self._lock:
+            return (self.local_token,) + tuple(self.local_versions.get(name, 0) for name in names)
+
+    def changed_within(self, names: List[str], seconds: float) -> bool:
+        """Se alguma das versões (ou a epoch) mudou nos últimos ``seconds``"""
+        names = ['epoch'] + list(names)
+        since = time.time() - seconds
+        client = self.client()
+        if client is not None:
+            try:
+                return any(value is not None and float(value) > since
+                           for value in client.hmget(CHANGED_AT_KEY, names))
+            except Exception as e:
+                logger.error(f"Response cache changed_at error: {e}")
+        with self._lock:
+            return any(self.local_changed_at.get(name, 0) > since for name in names)
+
+    def bump(self, names: Iterable[str]):
+        names = sorted(set(names))
+        if not names:
+            return
+        now = time.time()
+        with self._lock:
+            for name in names:
+                self.local_versions[name] = self.local_versions.get(name, 0) + 1
+                self.local_changed_at[name] = now
+        client = self.client()
+        if client is None:
+            return
+        try:
+            pipeline = client.pipeline(transaction=False)
+            for name in names:
+                pipeline.hincrby(VERSIONS_KEY, name, 1)
+            pipeline.hset(CHANGED_AT_KEY, mapping={name: now for name in names})
+            pipeline.execute()
+        except Exception as e:
+            logger.error(f"Response cache bump error: {e}")
+
+    def stations_changed(self, points: Dict[str, Tuple[Optional[float], Optional[float]]]):
+        """Invalida os postos ``{id: (lat, lon)}``, suas células e as listagens"""
+        names = {'stations'}
+        for station_id, (latitude, longitude) in points.items():
+            names.add(f"station:{station_id}")
+            if latitude is not None and longitude is not None:
+                names.add(cell_of(float(latitude), float(longitude)))
+            else:
+                # Sem coordenadas não há como saber a célula
+                names.add('epoch')
+        self.bump(names)
+
+    def invalidate_all(self):
+        """Para ingestões grandes: uma nova epoch invalida todas as respostas"""
+        self.bump(['epoch'])
+
+    def _finish(self, response, etag: str):
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = CACHE_CONTROL
+        return response
+
+
+def station_points(connection, station_ids: Iterable[str]) -> Dict[str, Tuple[float, float]]:
+    """Coordenadas dos postos, numa consulta só"""
+    station_ids = list(set(station_ids))
+    if not station_ids:
+        return {}
+    stations = gas_stations_table.c
+    rows = connection.execute(
+        select(stations.id, stations.latitude, stations.longitude).where(stations.id.in_(station_ids))
+    )
+    return {station_id: (latitude, longitude) for station_id, latitude, longitude in rows}
+
+
+response_cache = ResponseCache()
+
+
+# --- Gravações pelo ORM: invalidação após o commit ---
+
+def _collect_changes(session, flush_context, instances):
+    points = session.info.setdefault('response_cache_points', {})
+    pending_ids = set()
+    for instance in list(session.new) + list(session.dirty) + list(session.deleted):
+        tablename = getattr(instance, '__tablename__', None)
+        if tablename == 'gas_stations':
+            points[instance.id] = (instance.latitude, instance.longitude)
+        elif tablename in STATION_TABLES and getattr(instance, 'gas_station_id', None):
+            pending_ids.add(instance.gas_station_id)
+    pending_ids -= set(points)
+    if pending_ids:
+        try:
+            points.update(station_points(session.connection(), pending_ids))
+        except Exception as e:
+            logger.error(f"Response cache station lookup error: {e}")
+            points.update({station_id: (None, None) for station_id in pending_ids})
+
+
+def _apply_changes(session):
+    points = session.info.pop('response_cache_points', None)
+    if points:
+        response_cache.stations_changed(points)
+
+
+def _discard_changes(session):
+    session.info.pop('response_cache_points', None)
+
+
+event.listen(Session, 'before_flush', _collect_changes)
+event.listen(Session, 'after_commit', _apply_changes)
+event.listen(Session, 'after_soft_rollback', lambda session, previous_transaction: _discard_changes(session))
@@ -0,0 +1,244 @@
+"""
+Roteamento offline sobre um grafo viário local.
+
+O grafo (extraído do OpenStreetMap para os estados atendidos) fica em arrays
+compactos no formato CSR: ``indptr``/``targets`` descrevem a adjacência e cada
+aresta guarda o comprimento (m) e o tempo de percurso (s). A busca é um A*
+por tempo, com heurística admissível (distância em linha reta na maior
+velocidade do grafo), e a resposta tem o mesmo formato de
+``MapsService.get_route`` para que as funções de rota e corredor funcionem
+sem a API do Google.
+"""
+import heapq
+import logging
+import math
+import os
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from .spatial_index import KM_PER_DEGREE, haversine_km
+
+logger = logging.getLogger(__name__)
+
+# Velocidade padrão (km/h) por classe de via do OSM, quando a aresta não tem maxspeed
+DEFAULT_SPEEDS_KMH = {
+    'motorway': 100, 'motorway_link': 60,
+    'trunk': 80, 'trunk_link': 50,
+    'primary': 60, 'primary_link': 40,
+    'secondary': 50, 'secondary_link': 40,
+    'tertiary': 40, 'tertiary_link': 30,
+    'unclassified': 30, 'residential': 30,
+    'living_street': 10, 'service': 20
+}
+FALLBACK_SPEED_KMH = 30
+
+# Pontos de origem/destino a mais disso do nó mais próximo ficam sem rota local
+MAX_SNAP_KM = 5.0
+SNAP_CELL_DEGREES = 0.01
+MAX_ROUTE_POINTS = 200
+EARTH_RADIUS_M = 6371000.0
+
+
+class RoadGraph:
+    """Grafo viário dirigido em arrays CSR"""
+
+    def __init__(self, latitudes, longitudes, indptr, targets, lengths_m, times_s):
+        self.latitudes = np.asarray(latitudes, dtype=np.float64)
+        self.longitudes = np.asarray(longitudes, dtype=np.float64)
+        self.indptr = np.asarray(indptr, dtype=np.int64)
+        self.targets = np.asarray(targets, dtype=np.int32)
+        self.lengths_m = np.asarray(lengths_m, dtype=np.float32)
+        self.times_s = np.asarray(times_s, dtype=np.float32)
+
+        # Maior velocidade do grafo (m/s) mantém a heurística do A* admissível
+        positive = self.times_s > 0
+        self.max_speed = float((self.lengths_m[positive] / self.times_s[positive]).max()) if positive.any() else 1.0
+        self._lat_rad = np.radians(self.latitudes)
+        self._lon_rad = np.radians(self.longitudes)
+        self._lists = None
+        self._build_snap_index()
+
+    @classmethod
+    def from_edges(cls, latitudes, longitudes, sources, targets, lengths_m, speeds_kmh,
+                   oneway=None) -> 'RoadGraph':
+        """Monta o CSR a partir de uma lista de arestas; sem ``oneway``, todas são de mão dupla"""
+        sources = np.asarray(sources, dtype=np.int64)
+        targets = np.asarray(targets, dtype=np.int64)
+        lengths_m = np.asarray(lengths_m, dtype=np.float64)
+        times_s = lengths_m / (np.asarray(speeds_kmh, dtype=np.float64) / 3.6)
+
+        two_way = np.ones(len(sources), dtype=bool) if oneway is None else ~np.asarray(oneway, dtype=bool)
+        sources, targets = np.concatenate([sources, targets[two_way]]), np.concatenate([targets, sources[two_way]])
+        lengths_m = np.concatenate([lengths_m, lengths_m[two_way]])
+        times_s = np.concatenate([times_s, times_s[two_way]])
+
+        order = np.argsort(sources, kind='stable')
+        indptr = np.zeros(len(latitudes) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(sources, minlength=len(latitudes)), out=indptr[1:])
+        return cls(latitudes, longitudes, indptr, targets[order], lengths_m[order], times_s[order])
+
+    @classmethod
+    def from_osm_tables(cls, nodes, edges) -> 'RoadGraph':
+        """
+        Grafo a partir das tabelas de nós (id, lat, lon) e arestas (u, v,
+        length, highway, maxspeed, oneway) exportadas de um extrato do OSM.
+        """
+        import pandas as pd
+
+        node_index = pd.Series(np.arange(len(nodes)), index=nodes['id'].to_numpy())
+        default_speeds = edges['highway'].map(DEFAULT_SPEEDS_KMH).fillna(FALLBACK_SPEED_KMH)
+        maxspeed = pd.to_numeric(edges['maxspeed'], errors='coerce') if 'maxspeed' in edges else None
+        speeds = default_speeds if maxspeed is None else maxspeed.where(maxspeed > 0, default_speeds)
+        oneway = edges['oneway'].astype(str).str.lower().isin(('1', 'true', 'yes')) if 'oneway' in edges else None
+
+        return cls.from_edges(
+            nodes['lat'].to_numpy(), nodes['lon'].to_numpy(),
+            node_index[edges['u'].to_numpy()].to_numpy(), node_index[edges['v'].to_numpy()].to_numpy(),
+            edges['length'].to_numpy(), speeds.to_numpy(),
+            None if oneway is None else oneway.to_numpy()
+        )
+
+    def save(self, path: str):
+        np.savez_compressed(
+            path, latitudes=self.latitudes, longitudes=self.longitudes, indptr=self.indptr,
+            targets=self.targets, lengths_m=self.lengths_m, times_s=self.times_s
+        )
+
+    @classmethod
+    def load(cls, path: str) -> 'RoadGraph':
+        with np.load(path) as data:
+            return cls(data['latitudes'], data['longitudes'], data['indptr'],
+                       data['targets'], data['lengths_m'], data['times_s'])
+
+    def __len__(self):
+        return len(self.latitudes)
+
+    def _cell_keys(self, latitudes, longitudes) -> np.ndarray:
+        rows = np.floor(np.asarray(latitudes) / SNAP_CELL_DEGREES).astype(np.int64)
+        columns = np.floor(np.asarray(longitudes) / SNAP_CELL_DEGREES).astype(np.int64)
+        return rows * 100000 + columns
+
+    def _build_snap_index(self):
+        """Nós ordenados por célula; cada busca lê só as células vizinhas"""
+        keys = self._cell_keys(self.latitudes, self.longitudes)
+        self._snap_order = np.argsort(keys, kind='stable')
+        self._snap_keys = keys[self._snap_order]
+
+    def nearest_node(self, latitude: float, longitude: float, max_km: float = MAX_SNAP_KM) -> Optional[int]:
+        """Nó mais próximo do ponto, ou None se não houver nenhum a até ``max_km``"""
+        lat_cells = int(math.ceil(max_km / (KM_PER_DEGREE * SNAP_CELL_DEGREES)))
+        lon_cells = int(math.ceil(lat_cells / max(math.cos(math.radians(latitude)), 0.01)))
+        row = int(math.floor(latitude / SNAP_CELL_DEGREES))
+        column = int(math.floor(longitude / SNAP_CELL_DEGREES))
+
+        # Anéis crescentes de células até achar candidatos
+        for radius in range(max(lat_cells, lon_cells) + 1):
+            r_lat, r_lon = min(radius, lat_cells), min(radius, lon_cells)
+            starts = (row + np.arange(-r_lat, r_lat + 1)) * 100000 + column - r_lon
+            lo = np.searchsorted(self._snap_keys, starts, side='left')
+            hi = np.searchsorted(self._snap_keys, starts + 2 * r_lon, side='right')
+            candidates = np.concatenate([self._snap_order[a:b] for a, b in zip(lo, hi)])
+            if len(candidates):
+                distances = haversine_km(latitude, longitude, self.latitudes[candidates], self.longitudes[candidates])
+                best = int(np.argmin(distances))
+                # O ponto achado pode não ser o mais próximo: confere um anel a mais
+                if distances[best] <= radius * SNAP_CELL_DEGREES * KM_PER_DEGREE * math.cos(math.radians(latitude)) \
+                        or radius >= max(lat_cells, lon_cells):
+                    return int(candidates[best]) if distances[best] <= max_km else None
+        return None
+
+    def _search_lists(self) -> Tuple[list, list, list, list, list]:
+        """Cópia em listas Python para o laço do A* (indexar NumPy elemento a elemento é lento)"""
+        if self._lists is None:
+            self._lists = (self.indptr.tolist(), self.targets.tolist(), self.times_s.tolist(),
+                           self._lat_rad.tolist(), self._lon_rad.tolist())
+        return self._lists
+
+    def shortest_path(self, source: int, target: int) -> Optional[Tuple[List[int], float, float]]:
+        """A* pelo menor tempo: (nós do caminho, metros, segundos) ou None sem ligação"""
+        indptr, targets, times_s, lat_rad, lon_rad = self._search_lists()
+        target_lat, target_lon = lat_rad[target], lon_rad[target]
+        cos_target = math.cos(target_lat)
+        # Segundos na maior velocidade do grafo por radiano de distância
+        seconds_per_radian = 2 * EARTH_RADIUS_M / self.max_speed
+        sin, cos, asin, sqrt = math.sin, math.cos, math.asin, math.sqrt
+
+        def heuristic(node: int) -> float:
+            a = (sin((lat_rad[node] - target_lat) / 2) ** 2
+                 + cos(lat_rad[node]) * cos_target * sin((lon_rad[node] - target_lon) / 2) ** 2)
+            return seconds_per_radian * asin(sqrt(min(a, 1.0)))
+
+        times = {source: 0.0}
+        parent_edges = {source: -1}
+        closed = set()
+        heap = [(heuristic(source), source)]
+
+        while heap:
+            _, node = heapq.heappop(heap)
+            if node == target:
+                break
+            if node in closed:
+                continue
+            closed.add(node)
+
+            elapsed = times[node]
+            for edge in range(indptr[node], indptr[node + 1]):
+                neighbor = targets[edge]
+                arrival = elapsed + times_s[edge]
+                if arrival < times.get(neighbor, math.inf):
+                    times[neighbor] = arrival
+                    parent_edges[neighbor] = edge
+                    heapq.heappush(heap, (arrival + heuristic(neighbor), neighbor))
+
+        if target not in times:
+            return None
+
+        # Reconstrução pelas arestas usadas: o nó de origem de cada aresta sai do indptr
+        path, edges = [target], []
+        while parent_edges[path[-1]] != -1:
+            edge = parent_edges[path[-1]]
+            edges.append(edge)
+            path.append(int(np.searchsorted(self.indptr, edge, side='right')) - 1)
+        path.reverse()
+        return path, float(self.lengths_m[edges].sum()), times[target]
+
+    def route(self, origin_lat: float, origin_lng: float, dest_lat: float, dest_lng: float) -> Optional[Dict]:
+        """Rota no formato de ``MapsService.get_route``, ou None fora da cobertura do grafo"""
+        source = self.nearest_node(origin_lat, origin_lng)
+        target = self.nearest_node(dest_lat, dest_lng)
+        if source is None or target is None:
+            return None
+
+        result = self.shortest_path(source, target)
+        if result is None:
+            return None
+        path, length_m, time_s = result
+
+        from googlemaps.convert import encode_polyline
+        coordinates = [(float(self.latitudes[node]), float(self.longitudes[node])) for node in path]
+        step = max(1, int(math.ceil(len(coordinates) / MAX_ROUTE_POINTS)))
+        sampled = coordinates[::step]
+        if sampled[-1] != coordinates[-1]:
+            sampled.append(coordinates[-1])
+
+        return {
+            'distance_km': round(length_m / 1000, 2),
+            'duration_minutes': round(time_s / 60, 0),
+            'route_points': [{'latitude': lat, 'longitude': lng} for lat, lng in sampled],
+            'polyline': encode_polyline(coordinates),
+            'start_address': f"{origin_lat}, {origin_lng}",
+            'end_address': f"{dest_lat}, {dest_lng}"
+        }
+
+
+def load_road_graph(path: Optional[str] = None) -> Optional[RoadGraph]:
+    """Carrega o grafo de ``ROAD_GRAPH_PATH``; None se não configurado ou ilegível"""
+    path = path or os.getenv('ROAD_GRAPH_PATH')
+    if not path or not os.path.exists(path):
+        return None
+    try:
+        graph = RoadGraph.load(path)
+        logger.info(f"Grafo viário carregado: {len(graph)} nós, {len(graph.targets)} arestas")
+        return graph
+    except Exception as e:
+        logger.error(f"Erro ao carregar grafo viário: {e}")
+        return None
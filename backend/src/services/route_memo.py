@@ -0,0 +1,514 @@
+"""
+Memoização das recomendações por rota.
+
+Rotas com origem e destino nas mesmas células geohash (~1 km) e o mesmo
+combustível compartilham a chave; a chave não depende do sentido, então a
+volta reaproveita o corredor da ida. Na primeira consulta o corredor é
+calculado (direções, postos candidatos, desvio e posição na rota) e gravado
+em ``routes``/``route_recommendations``. Nas seguintes, só os postos cujo
+preço ativo mudou desde a última pontuação são pontuados de novo.
+"""
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+import numpy as np
+from sqlalchemy import (
+    JSON, Column, DateTime, ForeignKey, Integer, MetaData, Numeric, String, Table, Text,
+    and_, bindparam, column, delete, func, insert, select, table, update
+)
+from .region_index import geohash
+from .scoring_engine import MINUTES_PER_KM, resolve_weights, score_candidates, top_k
+from .spatial_index import KM_PER_DEGREE, haversine_pairwise_km
+
+# Células de ~1,2 km x 0,6 km para origem e destino
+ROUTE_CELL_PRECISION = 6
+
+# O corredor muda pouco; depois disso é recalculado (postos novos, obras)
+MAX_AGE = timedelta(days=7)
+
+# Distância máxima do posto até a rota e passo de densificação do trajeto
+MAX_DISTANCE_TO_ROUTE_KM = 2.5
+PATH_STEP_KM = 0.5
+
+metadata = MetaData()
+
+routes_table = Table(
+    'routes', metadata,
+    Column('id', String(36), primary_key=True),
+    Column('user_profile_id', String(36), nullable=False),
+    Column('origin_latitude', Numeric(10, 8), nullable=False),
+    Column('origin_longitude', Numeric(11, 8), nullable=False),
+    Column('destination_latitude', Numeric(10, 8), nullable=False),
+    Column('destination_longitude', Numeric(11, 8), nullable=False),
+    Column('distance_km', Numeric(8, 2), nullable=False),
+    Column('estimated_duration_minutes', Integer),
+    Column('route_polyline', Text),
+    Column('preferences', JSON),
+    Column('route_key', String(64), index=True),
+    Column('fuel_type', String(20)),
+    Column('created_at', DateTime),
+)
+
+route_recommendations_table = Table(
+    'route_recommendations', metadata,
+    Column('id', String(36), primary_key=True),
+    Column('route_id', String(36), ForeignKey('routes.id', ondelete='CASCADE'), nullable=False),
+    Column('gas_station_id', String(36), nullable=False),
+    Column('fuel_price_id', String(36), nullable=False),
+    Column('detour_distance_km', Numeric(6, 2), nullable=False),
+    Column('detour_time_minutes', Integer),
+    Column('savings_amount', Numeric(6, 2)),
+    Column('recommendation_score', Numeric(4, 2)),
+    Column('position_on_route', Numeric(4, 2)),
+    Column('scored_price', Numeric(6, 3)),
+    Column('created_at', DateTime),
+)
+
+gas_stations_table = table(
+    'gas_stations', column('id'), column('name'), column('brand'), column('address'),
+    column('latitude'), column('longitude'), column('is_active')
+)
+
+fuel_prices_table = table(
+    'fuel_prices', column('id'), column('gas_station_id'), column('fuel_type'), column('price'),
+    column('source_confidence'), column('reported_at'), column('is_active')
+)
+
+Point = Tuple[float, float]
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def route_key(origin: Point, destination: Point, fuel_type: str) -> Tuple[str, bool]:
+    """Chave da rota (independente do sentido) e se a consulta está no sentido inverso"""
+    start = geohash(origin[0], origin[1], ROUTE_CELL_PRECISION)
+    end = geohash(destination[0], destination[1], ROUTE_CELL_PRECISION)
+    reverse = end < start
+    if reverse:
+        start, end = end, start
+    return f'{start}:{end}:{fuel_type}', reverse
+
+
+def densify(path: Sequence[Point], step_km: float = PATH_STEP_KM) -> np.ndarray:
+    """Pontos do trajeto com espaçamento de até ``step_km`` (interpolação linear)"""
+    points = np.asarray(path, dtype=float).reshape(-1, 2)
+    if len(points) < 2:
+        return points
+
+    starts, ends = points[:-1], points[1:]
+    lengths = haversine_pairwise_km(starts[:, 0], starts[:, 1], ends[:, 0], ends[:, 1])
+    counts = np.maximum(np.ceil(lengths / step_km).astype(int), 1)
+    segment = np.repeat(np.arange(len(starts)), counts)
+    offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    fraction = offsets / np.repeat(counts, counts)
+
+    dense = starts[segment] + (ends[segment] - starts[segment]) * fraction[:, None]
+    return np.vstack([dense, points[-1:]])
+
+
+def corridor(latitudes, longitudes, path: Sequence[Point], chunk_size: int = 256) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Distância (km) de cada posto ao trajeto e posição na rota (0 a 1) do
+    ponto mais próximo, em blocos de postos para limitar a memória.
+    """
+    points = densify(path)
+    latitudes = np.asarray(latitudes, dtype=float)
+    longitudes = np.asarray(longitudes, dtype=float)
+
+    steps = haversine_pairwise_km(points[:-1, 0], points[:-1, 1], points[1:, 0], points[1:, 1])
+    along = np.concatenate([[0.0], np.cumsum(steps)])
+    total = along[-1] or 1.0
+
+    distances = np.empty(len(latitudes))
+    nearest = np.empty(len(latitudes), dtype=np.intp)
+    for start in range(0, len(latitudes), chunk_size):
+        block = slice(start, start + chunk_size)
+        matrix = haversine_pairwise_km(
+            latitudes[block, None], longitudes[block, None], points[None, :, 0], points[None, :, 1]
+        )
+        nearest[block] = matrix.argmin(axis=1)
+        distances[block] = matrix[np.arange(len(matrix)), nearest[block]]
+
+    return distances, along[nearest] / total
+
+
+def latest_active_prices(fuel_type: str, *conditions):
+    """
+    Preço ativo mais recente de cada posto para o combustível. A ingestão e o
+    importador da ANP mantêm ativos os preços de dias anteriores, então pode
+    haver mais de um por posto.
+    """
+    prices = fuel_prices_table.c
+    ranked = select(
+        prices.id, prices.gas_station_id, prices.price, prices.source_confidence,
+        func.row_number().over(
+            partition_by=prices.gas_station_id,
+            order_by=(prices.reported_at.desc(), prices.id.desc())
+        ).label('position')
+    ).where(and_(prices.fuel_type == fuel_type, prices.is_active == True, *conditions)).subquery()
+    return ranked, ranked.c.position == 1
+
+
+def _route_path(route: Dict) -> List[Point]:
+    """Trajeto da rota: polilinha das direções ou a reta origem -> destino"""
+    if route.get('route_polyline'):
+        from googlemaps.convert import decode_polyline
+        return [(point['lat'], point['lng']) for point in decode_polyline(route['route_polyline'])]
+    return [
+        (float(route['origin_latitude']), float(route['origin_longitude'])),
+        (float(route['destination_latitude']), float(route['destination_longitude']))
+    ]
+
+
+def _is_reverse(origin: Point, route: Dict) -> bool:
+    """Consulta no sentido contrário ao da rota gravada"""
+    return geohash(origin[0], origin[1], ROUTE_CELL_PRECISION) != \
+        geohash(float(route['origin_latitude']), float(route['origin_longitude']), ROUTE_CELL_PRECISION)
+
+
+class RouteMemo:
+    """Corredores de rota gravados, reaproveitados entre consultas iguais ou inversas"""
+
+    def __init__(self, max_age: timedelta = MAX_AGE, max_distance_km: float = MAX_DISTANCE_TO_ROUTE_KM):
+        self.max_age = max_age
+        self.max_distance_km = max_distance_km
+        self.default_weights = resolve_weights()
+
+    def recommend(self, connection, origin: Point, destination: Point, fuel_type: str,
+                  directions: Optional[Callable[[], Optional[Dict]]] = None,
+                  user_profile_id: Optional[str] = None, weights: Optional[np.ndarray] = None,
+                  limit: int = 10, now: Optional[datetime] = None) -> Dict:
+        """
+        Recomendações para a rota. ``directions`` só é chamada quando o
+        corredor não está gravado; sem ``user_profile_id`` o corredor é
+        calculado mas não é gravado. ``weights`` (perfil do usuário) pontua
+        todos os candidatos em memória, sem alterar os scores gravados.
+        """
+        route, candidates, confidence, rescored, cached = self._corridor(
+            connection, origin, destination, fuel_type, directions, user_profile_id, now
+        )
+        scores = np.array([candidate['recommendation_score'] for candidate in candidates], dtype=float)
+        if weights is not None and len(candidates):
+            scores = score_candidates(
+                [candidate['scored_price'] for candidate in candidates],
+                detour_km=[candidate['detour_distance_km'] for candidate in candidates],
+                detour_minutes=[candidate['detour_time_minutes'] for candidate in candidates],
+                confidence=confidence,
+                weights=weights
+            )
+
+        # Posições gravadas no sentido da rota original; a volta inverte
+        reverse = _is_reverse(origin, route)
+
+        top = top_k(scores, limit).tolist()
+        stations = self._stations(connection, [candidates[index]['gas_station_id'] for index in top])
+        recommendations = []
+        for index in top:
+            candidate = candidates[index]
+            station = stations.get(candidate['gas_station_id'])
+            if station is None:
+                continue
+            position = candidate['position_on_route']
+            recommendations.append({
+                'station': station,
+                'fuel': {
+                    'type': fuel_type,
+                    'price': candidate['scored_price'],
+                    'fuel_price_id': candidate['fuel_price_id']
+                },
+                'route_info': {
+                    'detour_km': candidate['detour_distance_km'],
+                    'detour_time_minutes': candidate['detour_time_minutes'],
+                    'position_on_route': round(1 - position, 2) if reverse else position
+                },
+                'score': round(float(scores[index]), 2)
+            })
+
+        return {
+            'route': {
+                'id': route['id'],
+                'distance_km': route['distance_km'],
+                'estimated_duration_minutes': route['estimated_duration_minutes'],
+                'polyline': route['route_polyline']
+            },
+            'cached': cached,
+            'rescored': rescored,
+            'total_candidates': len(candidates),
+            'recommendations': recommendations
+        }
+
+    def corridor_stations(self, connection, origin: Point, destination: Point, fuel_type: str,
+                          directions: Optional[Callable[[], Optional[Dict]]] = None,
+                          user_profile_id: Optional[str] = None, now: Optional[datetime] = None) -> Dict:
+        """
+        Todos os postos do corredor com o km ao longo da rota (no sentido da
+        consulta), recalculado sobre o trajeto gravado com precisão total.
+        Cada posto aparece uma vez, com o preço ativo mais recente: o
+        planejador de abastecimento trata cada item como uma parada.
+        """
+        route, candidates, _, rescored, cached = self._corridor(
+            connection, origin, destination, fuel_type, directions, user_profile_id, now
+        )
+        stations = self._stations(connection, [candidate['gas_station_id'] for candidate in candidates])
+        candidates = [candidate for candidate in candidates if candidate['gas_station_id'] in stations]
+
+        along_km = np.empty(0)
+        if candidates:
+            path = _route_path(route)
+            _, positions = corridor(
+                [stations[candidate['gas_station_id']]['latitude'] for candidate in candidates],
+                [stations[candidate['gas_station_id']]['longitude'] for candidate in candidates],
+                path
+            )
+            along_km = positions * route['distance_km']
+            if _is_reverse(origin, route):
+                along_km = route['distance_km'] - along_km
+
+        return {
+            'route': route,
+            'cached': cached,
+            'rescored': rescored,
+            'stations': [
+                dict(candidate, station=stations[candidate['gas_station_id']], along_km=float(km))
+                for candidate, km in zip(candidates, along_km.tolist())
+            ]
+        }
+
+    def _corridor(self, connection, origin: Point, destination: Point, fuel_type: str,
+                  directions: Optional[Callable[[], Optional[Dict]]], user_profile_id: Optional[str],
+                  now: Optional[datetime]):
+        """Corredor gravado (ou calculado) com os preços atuais conferidos"""
+        now = now or _utcnow()
+        key, _ = route_key(origin, destination, fuel_type)
+
+        route = self._lookup(connection, key, now)
+        cached = route is not None
+        if cached:
+            candidates = self._load_candidates(connection, route['id'])
+        else:
+            route, candidates = self._build(
+                connection, key, origin, destination, fuel_type,
+                directions() if directions else None, user_profile_id, now
+            )
+
+        candidates, confidence, rescored = self._rescore(connection, candidates, fuel_type, persist=route['id'] is not None)
+        return route, candidates, confidence, rescored, cached
+
+    def _lookup(self, connection, key: str, now: datetime) -> Optional[Dict]:
+        routes = routes_table.c
+        row = connection.execute(
+            select(routes_table)
+            .where(and_(routes.route_key == key, routes.created_at >= now - self.max_age))
+            .order_by(routes.created_at.desc())
+            .limit(1)
+        ).mappings().first()
+        if row is None:
+            return None
+        route = dict(row)
+        for name in ('origin_latitude', 'origin_longitude', 'destination_latitude', 'destination_longitude', 'distance_km'):
+            route[name] = float(route[name])
+        return route
+
+    def _load_candidates(self, connection, route_id: str) -> List[Dict]:
+        recommendations = route_recommendations_table.c
+        rows = connection.execute(
+            select(
+                recommendations.id, recommendations.gas_station_id, recommendations.fuel_price_id,
+                recommendations.detour_distance_km, recommendations.detour_time_minutes,
+                recommendations.position_on_route, recommendations.recommendation_score,
+                recommendations.scored_price
+            ).where(recommendations.route_id == route_id)
+        ).mappings().all()
+        return [
+            {
+                'id': row['id'],
+                'gas_station_id': row['gas_station_id'],
+                'fuel_price_id': row['fuel_price_id'],
+                'detour_distance_km': float(row['detour_distance_km']),
+                'detour_time_minutes': row['detour_time_minutes'],
+                'position_on_route': float(row['position_on_route'] or 0),
+                'recommendation_score': float(row['recommendation_score'] or 0),
+                'scored_price': float(row['scored_price']) if row['scored_price'] is not None else None
+            }
+            for row in rows
+        ]
+
+    def _build(self, connection, key: str, origin: Point, destination: Point, fuel_type: str,
+               directions: Optional[Dict], user_profile_id: Optional[str], now: datetime):
+        """Calcula o corredor: postos a até ``max_distance_km`` do trajeto"""
+        path = _route_path({
+            'route_polyline': (directions or {}).get('polyline'),
+            'origin_latitude': origin[0], 'origin_longitude': origin[1],
+            'destination_latitude': destination[0], 'destination_longitude': destination[1]
+        })
+
+        distance_km = (directions or {}).get('distance_km')
+        if distance_km is None:
+            distance_km = float(haversine_pairwise_km(origin[0], origin[1], destination[0], destination[1]))
+        duration = (directions or {}).get('duration_minutes')
+
+        route = {
+            'id': str(uuid.uuid4()) if user_profile_id else None,
+            'user_profile_id': user_profile_id,
+            'origin_latitude': origin[0],
+            'origin_longitude': origin[1],
+            'destination_latitude': destination[0],
+            'destination_longitude': destination[1],
+            'distance_km': round(float(distance_km), 2),
+            'estimated_duration_minutes': int(round(duration)) if duration is not None else None,
+            'route_polyline': (directions or {}).get('polyline'),
+            'route_key': key,
+            'fuel_type': fuel_type,
+            'created_at': now
+        }
+
+        rows = self._corridor_prices(connection, path, fuel_type)
+        candidates = []
+        if rows:
+            latitudes = [float(row['latitude']) for row in rows]
+            longitudes = [float(row['longitude']) for row in rows]
+            distances, positions = corridor(latitudes, longitudes, path)
+            inside = np.flatnonzero(distances <= self.max_distance_km)
+
+            # Desvio de ida e volta até o posto
+            detours = np.round(2 * distances[inside], 2)
+            prices = np.array([float(rows[index]['price']) for index in inside])
+            confidence = [float(rows[index]['source_confidence'] or 0.5) for index in inside]
+            scores = score_candidates(prices, detour_km=detours, confidence=confidence, weights=self.default_weights)
+
+            for position, index in enumerate(inside.tolist()):
+                candidates.append({
+                    'id': str(uuid.uuid4()),
+                    'gas_station_id': str(rows[index]['gas_station_id']),
+                    'fuel_price_id': str(rows[index]['fuel_price_id']),
+                    'detour_distance_km': float(detours[position]),
+                    'detour_time_minutes': int(round(detours[position] * MINUTES_PER_KM)),
+                    'position_on_route': round(float(positions[index]), 2),
+                    'recommendation_score': round(float(scores[position]), 2),
+                    'scored_price': float(prices[position])
+                })
+
+        if route['id'] is not None:
+            self._store(connection, route, candidates)
+        return route, candidates
+
+    def _corridor_prices(self, connection, path: Sequence[Point], fuel_type: str) -> List[Dict]:
+        """Preços ativos do combustível nos postos do retângulo que envolve o trajeto"""
+        points = np.asarray(path, dtype=float)
+        pad_lat = self.max_distance_km / KM_PER_DEGREE
+        pad_lon = pad_lat / max(np.cos(np.radians(np.abs(points[:, 0]).max())), 0.01)
+
+        stations = gas_stations_table.c
+        latest, is_latest = latest_active_prices(fuel_type)
+        query = select(
+            latest.c.gas_station_id, latest.c.id.label('fuel_price_id'), latest.c.price, latest.c.source_confidence,
+            stations.latitude, stations.longitude
+        ).select_from(
+            latest.join(gas_stations_table, stations.id == latest.c.gas_station_id)
+        ).where(and_(
+            is_latest,
+            stations.is_active == True,
+            stations.latitude.between(points[:, 0].min() - pad_lat, points[:, 0].max() + pad_lat),
+            stations.longitude.between(points[:, 1].min() - pad_lon, points[:, 1].max() + pad_lon)
+        ))
+        return [dict(row) for row in connection.execute(query).mappings()]
+
+    def _store(self, connection, route: Dict, candidates: List[Dict]):
+        """Grava o corredor e descarta versões antigas da mesma chave"""
+        routes, recommendations = routes_table.c, route_recommendations_table.c
+        old = select(routes.id).where(routes.route_key == route['route_key'])
+        connection.execute(delete(route_recommendations_table).where(recommendations.route_id.in_(old)))
+        connection.execute(delete(routes_table).where(routes.route_key == route['route_key']))
+
+        connection.execute(insert(routes_table), [route])
+        if candidates:
+            connection.execute(insert(route_recommendations_table), [
+                dict(candidate, route_id=route['id'], created_at=route['created_at']) for candidate in candidates
+            ])
+
+    def _rescore(self, connection, candidates: List[Dict], fuel_type: str, persist: bool, batch_size: int = 1000):
+        """
+        Confere o preço ativo mais recente de cada posto do corredor e pontua
+        de novo só os que mudaram. Postos sem preço ativo saem da lista, e
+        postos repetidos (corredores gravados antes da deduplicação) aparecem
+        uma vez só.
+        """
+        prices = fuel_prices_table.c
+        station_ids = list(dict.fromkeys(candidate['gas_station_id'] for candidate in candidates))
+        current = {}
+        for start in range(0, len(station_ids), batch_size):
+            latest, is_latest = latest_active_prices(
+                fuel_type, prices.gas_station_id.in_(station_ids[start:start + batch_size])
+            )
+            query = select(latest.c.gas_station_id, latest.c.id, latest.c.price, latest.c.source_confidence).where(is_latest)
+            for station_id, price_id, price, confidence in connection.execute(query):
+                current[str(station_id)] = (str(price_id), float(price), float(confidence or 0.5))
+
+        live, confidence, changed, seen = [], [], [], set()
+        for candidate in candidates:
+            price = current.get(candidate['gas_station_id'])
+            if price is None or candidate['gas_station_id'] in seen:
+                continue
+            seen.add(candidate['gas_station_id'])
+            if price[0] != candidate['fuel_price_id'] or price[1] != candidate['scored_price']:
+                candidate['fuel_price_id'], candidate['scored_price'] = price[0], price[1]
+                changed.append(len(live))
+            live.append(candidate)
+            confidence.append(price[2])
+
+        if changed:
+            scores = score_candidates(
+                [live[index]['scored_price'] for index in changed],
+                detour_km=[live[index]['detour_distance_km'] for index in changed],
+                detour_minutes=[live[index]['detour_time_minutes'] for index in changed],
+                confidence=[confidence[index] for index in changed],
+                weights=self.default_weights
+            )
+            for index, score in zip(changed, scores.tolist()):
+                live[index]['recommendation_score'] = round(score, 2)
+
+            if persist:
+                recommendations = route_recommendations_table.c
+                connection.execute(
+                    update(route_recommendations_table).where(recommendations.id == bindparam('row_id')).values(
+                        fuel_price_id=bindparam('new_fuel_price_id'),
+                        scored_price=bindparam('new_scored_price'),
+                        recommendation_score=bindparam('new_score')
+                    ),
+                    [
+                        {
+                            'row_id': live[index]['id'],
+                            'new_fuel_price_id': live[index]['fuel_price_id'],
+                            'new_scored_price': live[index]['scored_price'],
+                            'new_score': live[index]['recommendation_score']
+                        }
+                        for index in changed
+                    ]
+                )
+
+        return live, confidence, len(changed)
+
+    def _stations(self, connection, station_ids: List[str]) -> Dict[str, Dict]:
+        if not station_ids:
+            return {}
+        stations = gas_stations_table.c
+        rows = connection.execute(
+            select(stations.id, stations.name, stations.brand, stations.address, stations.latitude, stations.longitude)
+            .where(stations.id.in_(station_ids))
+        ).mappings()
+        return {
+            str(row['id']): {
+                'id': str(row['id']),
+                'name': row['name'],
+                'brand': row['brand'],
+                'address': row['address'],
+                'latitude': float(row['latitude']),
+                'longitude': float(row['longitude'])
+            }
+            for row in rows
+        }
+
+
+route_memo = RouteMemo()
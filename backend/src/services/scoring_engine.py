@@ -0,0 +1,150 @@
+"""
+Motor único de pontuação das recomendações de postos.
+
+Os candidatos chegam em colunas (preço, desvio em km, desvio em minutos,
+avaliação e confiança do dado) e o score de todos é calculado de uma vez com
+NumPy: cada coluna vira uma nota de 0 a 10 e o score é a média das notas
+ponderada pelo perfil de pesos do usuário. Valores desconhecidos (NaN ou
+None) recebem a nota neutra. O top-k usa seleção parcial (argpartition) e só
+ordena os k escolhidos.
+"""
+from typing import Dict, Optional, Tuple
+import numpy as np
+from .spatial_index import haversine_km
+
+CRITERIA = ('price', 'distance', 'time', 'reliability', 'rating')
+
+WEIGHT_PROFILES = {
+    # Pesos históricos do RouteRecommendation.calculate_score
+    'balanced': {'price': 0.4, 'distance': 0.3, 'time': 0.2, 'reliability': 0.1, 'rating': 0.0},
+    'economy': {'price': 0.6, 'distance': 0.2, 'time': 0.1, 'reliability': 0.1, 'rating': 0.0},
+    'convenience': {'price': 0.2, 'distance': 0.4, 'time': 0.3, 'reliability': 0.05, 'rating': 0.05},
+    'quality': {'price': 0.3, 'distance': 0.2, 'time': 0.1, 'reliability': 0.2, 'rating': 0.2},
+}
+DEFAULT_PROFILE = 'balanced'
+
+MAX_SCORE = 10.0
+NEUTRAL_SCORE = 5.0
+
+# Preço sem referência: escala absoluta de R$ 3,00 (nota 10) a R$ 8,00 (nota 0)
+PRICE_FLOOR = 3.0
+POINTS_PER_REAL = 2.0
+# Preço com referência (média regional ou dos candidatos): cada 1% mais barato vale meio ponto
+POINTS_PER_SAVINGS_PERCENT = 0.5
+
+POINTS_PER_DETOUR_KM = 2.0
+POINTS_PER_DETOUR_MINUTE = 0.2
+# Desvio em minutos estimado pela distância quando não informado (~30 km/h urbano)
+MINUTES_PER_KM = 2.0
+
+RATING_SCALE = 5.0
+
+
+def resolve_weights(profile: Optional[str] = None, weights: Optional[Dict[str, float]] = None) -> np.ndarray:
+    """
+    Vetor de pesos (na ordem de CRITERIA, somando 1) a partir de um perfil
+    e de ajustes por critério do usuário.
+    """
+    if profile and profile not in WEIGHT_PROFILES:
+        raise ValueError(f'Perfil de pesos desconhecido: {profile}')
+    resolved = dict(WEIGHT_PROFILES[profile or DEFAULT_PROFILE])
+
+    for criterion, value in (weights or {}).items():
+        if criterion not in resolved:
+            raise ValueError(f'Critério de pontuação desconhecido: {criterion}')
+        value = float(value)
+        if value < 0:
+            raise ValueError(f'Peso negativo para {criterion}')
+        resolved[criterion] = value
+
+    vector = np.array([resolved[criterion] for criterion in CRITERIA], dtype=float)
+    total = vector.sum()
+    if total <= 0:
+        raise ValueError('Ao menos um peso deve ser positivo')
+    return vector / total
+
+
+def _column(values, size: int) -> np.ndarray:
+    if values is None:
+        return np.full(size, np.nan)
+    column = np.asarray(values, dtype=float)
+    return np.broadcast_to(column, (size,)) if column.ndim == 0 else column
+
+
+def coordinates_of(point) -> Optional[Tuple[float, float]]:
+    """(latitude, longitude) de um ponto informado como dict; endereços em texto não têm"""
+    if isinstance(point, dict) and point.get('latitude') is not None and point.get('longitude') is not None:
+        return float(point['latitude']), float(point['longitude'])
+    return None
+
+
+def route_detour_km(latitudes, longitudes, origin: Optional[Tuple[float, float]],
+                    destination: Optional[Tuple[float, float]] = None) -> np.ndarray:
+    """
+    Desvio (km) para passar em cada posto: origem -> posto -> destino menos
+    origem -> destino; sem destino, a distância até a origem. Sem origem, NaN.
+    """
+    latitudes = np.asarray(latitudes, dtype=float)
+    longitudes = np.asarray(longitudes, dtype=float)
+    if origin is None:
+        return np.full(len(latitudes), np.nan)
+
+    to_station = haversine_km(origin[0], origin[1], latitudes, longitudes)
+    if destination is None:
+        return to_station
+    direct = haversine_km(origin[0], origin[1], np.array([destination[0]]), np.array([destination[1]]))[0]
+    from_station = haversine_km(destination[0], destination[1], latitudes, longitudes)
+    return np.maximum(to_station + from_station - direct, 0.0)
+
+
+def criterion_scores(prices, detour_km=None, detour_minutes=None, ratings=None,
+                     confidence=None, reference_price=None) -> np.ndarray:
+    """Notas de 0 a 10 por critério, em uma matriz (critérios x candidatos)"""
+    prices = np.asarray(prices, dtype=float)
+    size = len(prices)
+    detour_km = _column(detour_km, size)
+    detour_minutes = _column(detour_minutes, size)
+
+    if reference_price is None:
+        price_score = MAX_SCORE - (prices - PRICE_FLOOR) * POINTS_PER_REAL
+    else:
+        reference = _column(reference_price, size)
+        savings_percent = (reference - prices) / reference * 100
+        price_score = NEUTRAL_SCORE + savings_percent * POINTS_PER_SAVINGS_PERCENT
+
+    minutes = np.where(np.isnan(detour_minutes), detour_km * MINUTES_PER_KM, detour_minutes)
+
+    scores = np.vstack([
+        price_score,
+        MAX_SCORE - detour_km * POINTS_PER_DETOUR_KM,
+        MAX_SCORE - minutes * POINTS_PER_DETOUR_MINUTE,
+        _column(confidence, size) * MAX_SCORE,
+        _column(ratings, size) / RATING_SCALE * MAX_SCORE,
+    ])
+    np.clip(scores, 0, MAX_SCORE, out=scores)
+    scores[np.isnan(scores)] = NEUTRAL_SCORE
+    return scores
+
+
+def score_candidates(prices, detour_km=None, detour_minutes=None, ratings=None, confidence=None,
+                     reference_price=None, weights: Optional[np.ndarray] = None) -> np.ndarray:
+    """Score ponderado (0 a 10) de todos os candidatos"""
+    if weights is None:
+        weights = resolve_weights()
+    return weights @ criterion_scores(prices, detour_km, detour_minutes, ratings, confidence, reference_price)
+
+
+def top_k(scores, k: int) -> np.ndarray:
+    """Índices dos k maiores scores, do melhor para o pior (NaN fica de fora)"""
+    scores = np.asarray(scores, dtype=float)
+    valid = np.flatnonzero(~np.isnan(scores))
+    k = min(k, len(valid))
+    if k <= 0:
+        return np.empty(0, dtype=np.intp)
+
+    keys = -scores[valid]
+    if k < len(valid):
+        chosen = np.argpartition(keys, k - 1)[:k]
+    else:
+        chosen = np.arange(len(valid))
+    return valid[chosen[np.argsort(keys[chosen], kind='stable')]]
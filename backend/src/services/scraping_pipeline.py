@@ -0,0 +1,160 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import urlparse
+import requests
+
+
+class TokenBucket:
+    """Token bucket thread-safe: ``rate`` tokens por segundo, rajada de até ``capacity``"""
+
+    def __init__(self, rate: float, capacity: float = 1.0,
+                 clock: Callable[[], float] = time.monotonic,
+                 sleep: Callable[[float], None] = time.sleep):
+        if rate <= 0:
+            raise ValueError(f'Taxa do token bucket deve ser positiva: {rate}')
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self._clock = clock
+        self._sleep = sleep
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = self._clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_acquire(self) -> float:
+        """Consome um token; retorna 0 se conseguiu ou o tempo de espera necessário"""
+        with self._lock:
+            self._refill()
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0.0
+            return (1 - self.tokens) / self.rate
+
+    def acquire(self):
+        """Bloqueia até haver um token disponível"""
+        while True:
+            wait = self.try_acquire()
+            if not wait:
+                return
+            self._sleep(wait)
+
+
+class HostRateLimiter:
+    """Um token bucket por host, para não sobrecarregar nenhum site"""
+
+    def __init__(self, rate: float = 0.5, capacity: float = 1.0,
+                 host_rates: Optional[Dict[str, float]] = None, **bucket_kwargs):
+        # Taxas inválidas falham na configuração, não no primeiro request ao host
+        for host, host_rate in {'*': rate, **(host_rates or {})}.items():
+            if host_rate <= 0:
+                raise ValueError(f'Taxa de requisições deve ser positiva ({host}): {host_rate}')
+        self.rate = rate
+        self.capacity = capacity
+        self.host_rates = host_rates or {}
+        self._bucket_kwargs = bucket_kwargs
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._lock = threading.Lock()
+
+    def bucket_for(self, url: str) -> TokenBucket:
+        host = urlparse(url).netloc.lower()
+        with self._lock:
+            bucket = self._buckets.get(host)
+            if bucket is None:
+                rate = self.host_rates.get(host, self.rate)
+                bucket = TokenBucket(rate, self.capacity, **self._bucket_kwargs)
+                self._buckets[host] = bucket
+            return bucket
+
+    def wait(self, url: str):
+        self.bucket_for(url).acquire()
+
+
+@dataclass
+class ScrapeJob:
+    """Uma URL a buscar e a função que transforma a resposta em preços"""
+    name: str
+    url: str
+    parser: Callable[[requests.Response], List[Dict]]
+
+
+@dataclass
+class ScrapeResult:
+    job: ScrapeJob
+    prices: List[Dict] = field(default_factory=list)
+    not_modified: bool = False
+    error: Optional[str] = None
+
+
+class ScrapingPipeline:
+    """
+    Busca várias fontes em paralelo (pool limitado de threads), respeitando o
+    rate limit de cada host e usando requisições condicionais (ETag /
+    If-Modified-Since) para não reprocessar páginas que não mudaram.
+    """
+
+    def __init__(self, session: Optional[requests.Session] = None, max_workers: int = 4,
+                 rate_limiter: Optional[HostRateLimiter] = None, timeout: int = 10):
+        self.session = session or requests.Session()
+        self.max_workers = max_workers
+        self.rate_limiter = rate_limiter or HostRateLimiter()
+        self.timeout = timeout
+        # url -> (etag, last_modified) da última resposta 200
+        self._validators: Dict[str, Tuple[Optional[str], Optional[str]]] = {}
+        self._validators_lock = threading.Lock()
+
+    def fetch(self, url: str) -> Optional[requests.Response]:
+        """GET condicional; retorna None quando o conteúdo não mudou (304)"""
+        headers = {}
+        with self._validators_lock:
+            etag, last_modified = self._validators.get(url, (None, None))
+        if etag:
+            headers['If-None-Match'] = etag
+        if last_modified:
+            headers['If-Modified-Since'] = last_modified
+
+        self.rate_limiter.wait(url)
+        response = self.session.get(url, headers=headers, timeout=self.timeout)
+
+        if response.status_code == 304:
+            return None
+
+        response.raise_for_status()
+
+        etag = response.headers.get('ETag')
+        last_modified = response.headers.get('Last-Modified')
+        if etag or last_modified:
+            with self._validators_lock:
+                self._validators[url] = (etag, last_modified)
+
+        return response
+
+    def _run_job(self, job: ScrapeJob) -> ScrapeResult:
+        try:
+            response = self.fetch(job.url)
+            if response is None:
+                return ScrapeResult(job, not_modified=True)
+            return ScrapeResult(job, prices=job.parser(response))
+        except Exception as e:
+            return ScrapeResult(job, error=str(e))
+
+    def run(self, jobs: List[ScrapeJob]) -> Iterator[ScrapeResult]:
+        """
+        Executa os jobs e entrega cada resultado assim que fica pronto.
+
+        O consumo acontece na thread chamadora, então o gravador no banco
+        (que depende do app context / sessão do Flask) fica fora das workers.
+        """
+        if not jobs:
+            return
+
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(jobs))) as executor:
+            futures = [executor.submit(self._run_job, job) for job in jobs]
+            for future in as_completed(futures):
+                yield future.result()
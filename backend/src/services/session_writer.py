@@ -0,0 +1,352 @@
+"""
+Gravação assíncrona e em lote das sessões de login.
+
+O login só gera os tokens e enfileira: uma thread de fundo junta as sessões
+novas e os ``last_login`` pendentes e grava tudo numa transação por lote
+(um INSERT com vários registros e um UPDATE por usuário, coalescido); um
+lote que falha volta para a fila e é tentado de novo.
+
+Revogações (``/logout``, ``/logout-all``) são síncronas e deixam uma marca
+durável que o lote confere na hora do INSERT, sob a mesma trava da linha do
+usuário: ``users.sessions_revoked_before`` para todas as sessões, ou uma
+linha inativa com o hash do token quando a sessão ainda está na fila de outro
+processo. Assim nenhuma sessão pendente, em qualquer worker, escapa da
+revogação.
+
+As sessões ativas de cada usuário ficam em cache para ``/sessions``; logins
+gravados e revogações publicam a invalidação no canal Redis
+``sessions:invalidate`` e cada processo descarta a entrada do usuário.
+"""
+import atexit
+import hashlib
+import json
+import logging
+import queue
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from sqlalchemy import (
+    JSON, Boolean, Column, DateTime, MetaData, String, Table, bindparam, column, insert, select, table, update
+)
+from .ttl_cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+FLUSH_INTERVAL_SECONDS = 0.2
+MAX_BATCH = 500
+MAX_QUEUE = 20000
+SESSIONS_CACHE_TTL_SECONDS = 60
+MAX_WRITE_ATTEMPTS = 5
+
+INVALIDATION_CHANNEL = 'sessions:invalidate'
+
+metadata = MetaData()
+
+user_sessions_table = Table(
+    'user_sessions', metadata,
+    Column('id', String(36), primary_key=True),
+    Column('user_id', String(36), nullable=False, index=True),
+    Column('token_hash', String(255), nullable=False),
+    Column('refresh_token_hash', String(255)),
+    Column('device_info', JSON),
+    Column('ip_address', String(45)),
+    Column('expires_at', DateTime(timezone=True), nullable=False),
+    Column('is_active', Boolean, default=True),
+    Column('created_at', DateTime(timezone=True))
+)
+
+users_table = table(
+    'users', column('id'), column('last_login', DateTime(timezone=True)),
+    column('sessions_revoked_before', DateTime(timezone=True))
+)
+
+# Item da fila: (sessão, atualiza last_login, tentativas de gravação)
+QueueItem = Tuple[Dict, bool, int]
+
+
+def hash_token(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def _as_utc(value: datetime) -> datetime:
+    # SQLite devolve datas sem fuso; são gravadas em UTC
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+def _default_client():
+    from src.database import get_redis
+    return get_redis()
+
+
+def serialize_session(row: Dict) -> Dict:
+    """Sessão para a API, sem os hashes dos tokens"""
+    device_info = row.get('device_info') or {}
+    return {
+        'id': row['id'],
+        'user_id': row['user_id'],
+        'device_info': device_info.get('user_agent') if isinstance(device_info, dict) else device_info,
+        'ip_address': row.get('ip_address'),
+        'is_active': row.get('is_active', True),
+        'expires_at': row['expires_at'].isoformat() if row.get('expires_at') else None,
+        'created_at': row['created_at'].isoformat() if row.get('created_at') else None
+    }
+
+
+class SessionWriter:
+    """Fila de sessões e last_login gravada em lote por uma thread de fundo"""
+
+    def __init__(self, flush_interval: float = FLUSH_INTERVAL_SECONDS, max_batch: int = MAX_BATCH,
+                 max_queue: int = MAX_QUEUE, client: Callable = _default_client):
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self.client = client
+        self.engine = None
+        self.sessions_cache = TTLCache(SESSIONS_CACHE_TTL_SECONDS, 50000)
+        self.batches_written = 0
+        self.batches_failed = 0
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue)
+        self._flush_lock = threading.Lock()
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._listener = None
+        self._listener_lock = threading.Lock()
+
+    def record_login(self, engine, user_id: str, access_token: str, refresh_token: str, expires_at: datetime,
+                     user_agent: Optional[str] = None, ip_address: Optional[str] = None,
+                     update_last_login: bool = True) -> Dict:
+        """Enfileira a sessão (e o last_login do usuário); devolve a sessão, ainda não gravada"""
+        now = datetime.now(timezone.utc)
+        row = {
+            'id': str(uuid.uuid4()),
+            'user_id': user_id,
+            'token_hash': hash_token(access_token),
+            'refresh_token_hash': hash_token(refresh_token),
+            'device_info': {'user_agent': user_agent} if user_agent else None,
+            'ip_address': ip_address,
+            'expires_at': expires_at,
+            'is_active': True,
+            'created_at': now
+        }
+        self._ensure_started(engine)
+        try:
+            self._queue.put_nowait((row, update_last_login, 0))
+        except queue.Full:
+            # Fila cheia: grava na hora para não perder a sessão (contrapressão)
+            logger.warning("Session writer queue full, writing synchronously")
+            self._write([(row, update_last_login, 0)])
+
+        cached = self.sessions_cache.get(user_id)
+        if cached is not None:
+            self.sessions_cache.set(user_id, [row] + cached)
+        return row
+
+    def active_sessions(self, engine, user_id: str) -> List[Dict]:
+        """Sessões ativas do usuário, mais recentes primeiro (cache, ou banco após esvaziar a fila)"""
+        self._ensure_started(engine)
+        cached = self.sessions_cache.get(user_id)
+        if cached is not None:
+            return cached
+
+        self.flush()
+        with engine.connect() as connection:
+            rows = connection.execute(
+                select(user_sessions_table)
+                .where(user_sessions_table.c.user_id == user_id, user_sessions_table.c.is_active.is_(True))
+                .order_by(user_sessions_table.c.created_at.desc())
+            ).mappings().all()
+        sessions = [dict(row) for row in rows]
+        self.sessions_cache.set(user_id, sessions)
+        return sessions
+
+    def revoke(self, engine, user_id: str, token_hash: Optional[str] = None) -> int:
+        """Revoga uma sessão (pelo hash do access token) ou todas as do usuário"""
+        self._ensure_started(engine)
+        self.flush()
+        now = datetime.now(timezone.utc)
+        statement = update(user_sessions_table).where(user_sessions_table.c.user_id == user_id,
+                                                 user_sessions_table.c.is_active.is_(True))
+        if token_hash is not None:
+            statement = statement.where(user_sessions_table.c.token_hash == token_hash)
+        with engine.begin() as connection:
+            # Mesma trava dos lotes: uma sessão na fila de outro processo é gravada antes ou depois da marca
+            self._lock_users(connection, [user_id])
+            if token_hash is None:
+                connection.execute(
+                    update(users_table).where(users_table.c.id == user_id).values(sessions_revoked_before=now)
+                )
+            revoked = connection.execute(statement.values(is_active=False)).rowcount
+            if token_hash is not None and not revoked:
+                # Sessão ainda não gravada (fila de outro processo): o lote a grava já inativa
+                connection.execute(insert(user_sessions_table).values(
+                    id=str(uuid.uuid4()), user_id=user_id, token_hash=token_hash,
+                    expires_at=now, is_active=False, created_at=now
+                ))
+        self._invalidate([user_id])
+        return revoked
+
+    def flush(self):
+        """Grava tudo o que está na fila (chamado também pela thread de fundo)"""
+        with self._flush_lock:
+            while True:
+                batch = self._drain(self.max_batch)
+                if not batch:
+                    return
+                if not self._write(batch):
+                    # O lote voltou para a fila: nova tentativa no próximo ciclo
+                    return
+
+    def _drain(self, limit: int) -> List[QueueItem]:
+        batch = []
+        while len(batch) < limit:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _write(self, items: List[QueueItem]) -> bool:
+        user_ids = sorted({row['user_id'] for row, _, _ in items})
+        # Um UPDATE por usuário, com o login mais recente do lote
+        last_logins: Dict[str, datetime] = {}
+        for row, update_last_login, _ in items:
+            if update_last_login:
+                user_id = row['user_id']
+                last_logins[user_id] = max(row['created_at'], last_logins.get(user_id, row['created_at']))
+
+        try:
+            with self.engine.begin() as connection:
+                revoked_before = self._lock_users(connection, user_ids)
+                revoked_tokens = set(connection.execute(
+                    select(user_sessions_table.c.token_hash).where(
+                        user_sessions_table.c.user_id.in_(user_ids),
+                        user_sessions_table.c.token_hash.in_([row['token_hash'] for row, _, _ in items]),
+                        user_sessions_table.c.is_active.is_(False)
+                    )
+                ).scalars())
+                rows = [
+                    dict(row, is_active=False)
+                    if self._revoked(row, revoked_before.get(row['user_id']), revoked_tokens) else row
+                    for row, _, _ in items
+                ]
+                # Idempotente: um lote repetido após falha no commit não duplica sessões
+                connection.execute(self._insert_ignoring_duplicates(connection), rows)
+                if last_logins:
+                    connection.execute(
+                        update(users_table)
+                        .where(users_table.c.id == bindparam('user_key'))
+                        .values(last_login=bindparam('login_at')),
+                        [{'user_key': user_id, 'login_at': login_at} for user_id, login_at in last_logins.items()]
+                    )
+            self.batches_written += 1
+        except Exception as e:
+            self.batches_failed += 1
+            self._requeue(items, e)
+            return False
+
+        self._invalidate(user_ids)
+        return True
+
+    def _requeue(self, items: List[QueueItem], error: Exception):
+        """Devolve o lote à fila; descarta só o que esgotou as tentativas"""
+        dropped = 0
+        for row, update_last_login, attempts in items:
+            if attempts + 1 >= MAX_WRITE_ATTEMPTS:
+                dropped += 1
+                continue
+            try:
+                self._queue.put_nowait((row, update_last_login, attempts + 1))
+            except queue.Full:
+                dropped += 1
+        if dropped:
+            logger.error(f"Session writer dropped {dropped} of {len(items)} sessions: {error}")
+        else:
+            logger.warning(f"Session writer batch of {len(items)} failed, will retry: {error}")
+
+    @staticmethod
+    def _lock_users(connection, user_ids: Iterable[str]) -> Dict[str, Optional[datetime]]:
+        """Trava as linhas dos usuários (FOR UPDATE) e devolve a marca de revogação de cada um"""
+        rows = connection.execute(
+            select(users_table.c.id, users_table.c.sessions_revoked_before)
+            .where(users_table.c.id.in_(list(user_ids)))
+            .order_by(users_table.c.id)
+            .with_for_update()
+        ).all()
+        return {user_id: revoked_before for user_id, revoked_before in rows}
+
+    @staticmethod
+    def _revoked(row: Dict, revoked_before: Optional[datetime], revoked_tokens) -> bool:
+        if row['token_hash'] in revoked_tokens:
+            return True
+        return revoked_before is not None and _as_utc(row['created_at']) <= _as_utc(revoked_before)
+
+    @staticmethod
+    def _insert_ignoring_duplicates(connection):
+        dialect = connection.dialect.name
+        if dialect == 'postgresql':
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        elif dialect == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        else:
+            return insert(user_sessions_table)
+        return dialect_insert(user_sessions_table).on_conflict_do_nothing(index_elements=['id'])
+
+    def _invalidate(self, user_ids: List[str]):
+        """Descarta o cache de /sessions aqui e avisa os outros processos"""
+        for user_id in user_ids:
+            self.sessions_cache.delete(user_id)
+        client = self.client()
+        if client is None:
+            return
+        try:
+            client.publish(INVALIDATION_CHANNEL, json.dumps({'users': user_ids}))
+        except Exception as e:
+            logger.error(f"Session cache publish error: {e}")
+
+    def handle_message(self, data):
+        """Aplica uma invalidação recebida pelo canal"""
+        try:
+            message = json.loads(data)
+        except (TypeError, ValueError):
+            return
+        for user_id in message.get('users', []):
+            self.sessions_cache.delete(user_id)
+
+    def _ensure_listener(self):
+        """Assina o canal uma vez por processo, em thread daemon"""
+        if self._listener is not None:
+            return
+        with self._listener_lock:
+            if self._listener is not None:
+                return
+            client = self.client()
+            if client is None:
+                return
+            try:
+                pubsub = client.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(**{INVALIDATION_CHANNEL: lambda message: self.handle_message(message['data'])})
+                self._listener = pubsub.run_in_thread(sleep_time=1.0, daemon=True)
+            except Exception as e:
+                logger.error(f"Session cache subscribe error: {e}")
+                self._listener = False
+
+    def _run(self):
+        # Nenhum item fica fora da fila enquanto espera: flush() vê tudo o que está pendente
+        while True:
+            time.sleep(self.flush_interval)
+            self.flush()
+
+    def _ensure_started(self, engine):
+        self._ensure_listener()
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is None:
+                self.engine = engine
+                self._thread = threading.Thread(target=self._run, name='session-writer', daemon=True)
+                self._thread.start()
+                atexit.register(self.flush)
+
+
+session_writer = SessionWriter()
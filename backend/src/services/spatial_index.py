@@ -0,0 +1,71 @@
+"""
+Índice espacial em grade para busca de postos por raio.
+
+Os postos são distribuídos em células de ``cell_degrees`` graus; uma busca
+por raio visita só as células que cobrem o retângulo envolvente e calcula as
+distâncias exatas (haversine) dos candidatos de uma vez com NumPy.
+"""
+import math
+from typing import Dict, List, Tuple
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0
+KM_PER_DEGREE = 111.32
+
+
+def haversine_km(latitude: float, longitude: float, latitudes: np.ndarray, longitudes: np.ndarray) -> np.ndarray:
+    """Distância (km) de um ponto a vários pontos, vetorizada"""
+    lat1, lon1 = math.radians(latitude), math.radians(longitude)
+    lat2, lon2 = np.radians(latitudes), np.radians(longitudes)
+    a = np.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def haversine_pairwise_km(lat1, lon1, lat2, lon2) -> np.ndarray:
+    """Distância (km) elemento a elemento entre arrays (com broadcasting)"""
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(value, dtype=float)) for value in (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+class StationGrid:
+    """Grade lat/lon -> postos, com inserção O(1)"""
+
+    def __init__(self, cell_degrees: float = 0.1):
+        self.cell_degrees = cell_degrees
+        self.cells: Dict[Tuple[int, int], List[str]] = {}
+        self.positions: Dict[str, Tuple[float, float]] = {}
+
+    def _cell(self, latitude: float, longitude: float) -> Tuple[int, int]:
+        return int(math.floor(latitude / self.cell_degrees)), int(math.floor(longitude / self.cell_degrees))
+
+    def insert(self, station_id: str, latitude: float, longitude: float):
+        previous = self.positions.get(station_id)
+        if previous is not None:
+            if previous == (latitude, longitude):
+                return
+            self.cells[self._cell(*previous)].remove(station_id)
+        self.positions[station_id] = (latitude, longitude)
+        self.cells.setdefault(self._cell(latitude, longitude), []).append(station_id)
+
+    def query(self, latitude: float, longitude: float, radius_km: float) -> Tuple[List[str], np.ndarray]:
+        """Postos a até ``radius_km`` do ponto e suas distâncias (ordem arbitrária)"""
+        lat_delta = radius_km / KM_PER_DEGREE
+        lon_delta = radius_km / (KM_PER_DEGREE * max(math.cos(math.radians(latitude)), 0.01))
+        min_x, min_y = self._cell(latitude - lat_delta, longitude - lon_delta)
+        max_x, max_y = self._cell(latitude + lat_delta, longitude + lon_delta)
+
+        candidates = []
+        for x in range(min_x, max_x + 1):
+            for y in range(min_y, max_y + 1):
+                candidates.extend(self.cells.get((x, y), ()))
+        if not candidates:
+            return [], np.empty(0)
+
+        coordinates = np.array([self.positions[station_id] for station_id in candidates])
+        distances = haversine_km(latitude, longitude, coordinates[:, 0], coordinates[:, 1])
+        inside = np.flatnonzero(distances <= radius_km)
+        return [candidates[i] for i in inside], distances[inside]
+
+    def __len__(self):
+        return len(self.positions)
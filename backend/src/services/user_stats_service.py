@@ -0,0 +1,197 @@
+from datetime import datetime, timezone
+from typing import Dict, Iterable, Optional
+from flask import current_app
+from sqlalchemy import case
+from sqlalchemy.exc import IntegrityError
+from src.database import db
+from src.db_routing import primary_reads
+from src.models.user import User
+from src.models.user_stats import UserStats
+from src.models.trip_summary import TripSummary
+from src.models.gps_tracking import GPSTracking, Notification
+
+
+def increment_counters(user_id: str, **deltas) -> None:
+    """
+    Aplica incrementos nos contadores do usuário na transação corrente.
+
+    Deve ser chamado junto com a escrita que originou o evento (notificação
+    criada/lida/clicada, ponto GPS ou viagem registrada), antes do commit,
+    para que contador e dado de origem sejam persistidos atomicamente.
+    """
+    deltas = {field: delta for field, delta in deltas.items() if delta}
+    if not user_id or not deltas:
+        return
+
+    for field in deltas:
+        if field not in UserStats.COUNTER_FIELDS:
+            raise ValueError(f"Contador desconhecido: {field}")
+
+    values = {
+        getattr(UserStats, field): getattr(UserStats, field) + delta
+        for field, delta in deltas.items()
+    }
+    values[UserStats.updated_at] = datetime.now(timezone.utc)
+
+    updated = UserStats.query.filter_by(user_id=user_id)\
+                             .update(values, synchronize_session=False)
+    if updated:
+        return
+
+    # Primeira escrita do usuário: a linha é criada a partir das tabelas de
+    # origem, que (após o flush) já incluem o evento corrente.
+    try:
+        with db.session.begin_nested():
+            db.session.flush()
+            db.session.add(_build_from_source(user_id))
+    except IntegrityError:
+        # Outra requisição criou a linha concorrentemente; aplica o delta nela
+        UserStats.query.filter_by(user_id=user_id)\
+                       .update(values, synchronize_session=False)
+
+
+def record_trip_point(user_id: str, trip_id: Optional[str], recorded_at: datetime,
+                      distance_km: float = 0.0) -> bool:
+    """
+    Soma um ponto GPS ao resumo da viagem, na transação corrente.
+
+    Retorna True se o ponto abriu uma viagem nova (resumo criado), que é o
+    que conta em ``trips_total``: contador e listagens de viagens saem da
+    mesma tabela.
+    """
+    if not trip_id:
+        return False
+
+    if _add_point_to_trip(user_id, trip_id, recorded_at, distance_km):
+        return False
+
+    try:
+        with db.session.begin_nested():
+            db.session.add(TripSummary(
+                user_id=user_id,
+                trip_id=trip_id,
+                start_time=recorded_at,
+                end_time=recorded_at,
+                points_count=1,
+                total_distance_km=distance_km or 0
+            ))
+        return True
+    except IntegrityError:
+        # Outra requisição abriu a viagem concorrentemente; soma o ponto nela
+        _add_point_to_trip(user_id, trip_id, recorded_at, distance_km)
+        return False
+
+
+def _add_point_to_trip(user_id: str, trip_id: str, recorded_at: datetime, distance_km: float) -> int:
+    return TripSummary.query.filter_by(user_id=user_id, trip_id=trip_id).update({
+        TripSummary.points_count: TripSummary.points_count + 1,
+        TripSummary.start_time: case((TripSummary.start_time > recorded_at, recorded_at),
+                                     else_=TripSummary.start_time),
+        TripSummary.end_time: case((TripSummary.end_time < recorded_at, recorded_at),
+                                   else_=TripSummary.end_time),
+        TripSummary.total_distance_km: TripSummary.total_distance_km + (distance_km or 0)
+    }, synchronize_session=False)
+
+
+def get_user_stats(user_id: str) -> UserStats:
+    """
+    Retorna os contadores do usuário (leitura de uma única linha).
+
+    Chamado em caminhos de leitura (inclusive views na réplica): a primeira
+    materialização é um INSERT isolado no primário e não faz commit do que
+    estiver pendente na sessão de quem chamou.
+    """
+    stats = UserStats.query.get(user_id)
+    if stats:
+        return stats
+
+    # Usuário sem contadores ainda: materializa a partir das tabelas de origem
+    stats = _build_from_source(user_id)
+    if _insert_if_missing(stats):
+        return stats
+
+    # Outra requisição criou a linha: relê no primário (a réplica pode não ter ainda)
+    with primary_reads():
+        return UserStats.query.get(user_id) or stats
+
+
+def _insert_if_missing(stats: UserStats) -> bool:
+    """INSERT ... ON CONFLICT DO NOTHING em transação própria; True se criou a linha"""
+    engine = db.engine
+    if engine.dialect.name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+
+    values = {column.key: getattr(stats, column.key) for column in UserStats.__table__.columns}
+    statement = dialect_insert(UserStats.__table__).values(**values)\
+        .on_conflict_do_nothing(index_elements=['user_id'])
+    with engine.begin() as connection:
+        return connection.execute(statement).rowcount == 1
+
+
+def _count_from_source(user_id: str) -> Dict[str, int]:
+    """Recalcula os contadores diretamente das tabelas de origem"""
+    notifications = Notification.query.filter_by(user_id=user_id)
+
+    return {
+        'notifications_total': notifications.count(),
+        'notifications_unread': notifications.filter_by(is_read=False).count(),
+        'notifications_clicked': notifications.filter_by(is_clicked=True).count(),
+        'gps_points_total': GPSTracking.query.filter_by(user_id=user_id).count(),
+        'trips_total': TripSummary.query.filter_by(user_id=user_id).count()
+    }
+
+
+def _build_from_source(user_id: str) -> UserStats:
+    return UserStats(
+        user_id=user_id,
+        reconciled_at=datetime.now(timezone.utc),
+        **_count_from_source(user_id)
+    )
+
+
+def reconcile_user_stats(user_ids: Optional[Iterable[str]] = None, batch_size: int = 500) -> Dict:
+    """
+    Job de reconciliação: recalcula os contadores a partir das tabelas de
+    origem e corrige divergências (drift) acumuladas.
+
+    Sem ``user_ids`` percorre todos os usuários cadastrados.
+    """
+    if user_ids is None:
+        user_ids = [row.id for row in db.session.query(User.id).all()]
+
+    stats = {'checked': 0, 'repaired': 0, 'created': 0}
+
+    for user_id in user_ids:
+        stats['checked'] += 1
+
+        # Trava a linha antes da contagem para não competir com incrementos
+        current = UserStats.query.filter_by(user_id=user_id).with_for_update().first()
+        expected = _count_from_source(user_id)
+
+        if not current:
+            db.session.add(UserStats(
+                user_id=user_id,
+                reconciled_at=datetime.now(timezone.utc),
+                **expected
+            ))
+            stats['created'] += 1
+        else:
+            drift = {
+                field: value for field, value in expected.items()
+                if getattr(current, field) != value
+            }
+            if drift:
+                current_app.logger.warning(f"User stats drift for {user_id}: {drift}")
+                for field, value in drift.items():
+                    setattr(current, field, value)
+                stats['repaired'] += 1
+            current.reconciled_at = datetime.now(timezone.utc)
+
+        if stats['checked'] % batch_size == 0:
+            db.session.commit()
+
+    db.session.commit()
+    current_app.logger.info(f"User stats reconciliation: {stats}")
+    return stats
@@ -23,4 +23,4 @@ python -c "from database_postgres import populate_sample_data; from main import
 
 # Iniciar o servidor Gunicorn
 echo "Iniciando o servidor Gunicorn..."
-exec gunicorn --bind 0.0.0.0:$PORT --workers 4 --timeout 120 main:create_app
+exec gunicorn -c ../gunicorn.conf.py --bind 0.0.0.0:$PORT --workers 4 --timeout 120 "main:create_app()"
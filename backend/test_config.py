@@ -5,6 +5,7 @@ import sys
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from src.config_consolidated import Config, ProductionConfig
+from src.db_pool import engine_options
 
 def print_config():
     print("Verificando configurações do banco de dados...\n")
@@ -14,7 +15,7 @@ def print_config():
     
     # Imprimir configurações importantes
     print(f"SQLALCHEMY_DATABASE_URI: {config.SQLALCHEMY_DATABASE_URI}")
-    print(f"SQLALCHEMY_ENGINE_OPTIONS: {config.SQLALCHEMY_ENGINE_OPTIONS}")
+    print(f"SQLALCHEMY_ENGINE_OPTIONS: {engine_options(config.SQLALCHEMY_DATABASE_URI)}")
     
     # Verificar se o banco de dados está acessível
     try:
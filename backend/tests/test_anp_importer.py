@@ -0,0 +1,71 @@
+import os
+import shutil
+
+import pandas as pd
+from flask import Flask
+
+from src.data_importers.anp_importer import (
+    COLUMN_MAPPING, _normalize_header, import_anp_data, normalize_chunk, normalize_stations
+)
+from src.database import db
+from src.models.gas_station import FuelPrice, GasStation
+from src.services.price_history_store import PriceHistoryStore
+from src.services.price_intelligence import PriceIntelligenceService, price_intelligence
+
+SAMPLE_CSV = os.path.join(os.path.dirname(__file__), 'fixtures', 'anp_sample.csv')
+
+
+def read_sample():
+    return pd.read_csv(
+        SAMPLE_CSV, sep=';', encoding='latin-1', dtype=str, keep_default_na=False,
+        usecols=lambda column: _normalize_header(column) in COLUMN_MAPPING
+    )
+
+
+def test_normalize_chunk_filters_invalid_rows():
+    """Testa que produtos não mapeados (GLP) e linhas sem preço são descartados."""
+    normalized = normalize_chunk(read_sample())
+
+    assert list(normalized['fuel_type']) == ['gasoline', 'ethanol', 'diesel_s10']
+    assert list(normalized['price']) == [5.79, 3.89, 6.19]
+    assert normalized['reported_at'].iloc[0] == pd.Timestamp(2024, 1, 2)
+
+
+def test_normalize_chunk_formats_cnpj():
+    """Testa que o CNPJ sem máscara é formatado como na coluna gas_stations.cnpj."""
+    normalized = normalize_chunk(read_sample())
+
+    assert set(normalized['cnpj']) == {'12.345.678/0001-90', '01.234.567/0001-55'}
+
+
+def test_normalize_stations_one_row_per_cnpj():
+    """Testa que os dados cadastrais são consolidados por CNPJ."""
+    stations = normalize_stations(normalize_chunk(read_sample())).set_index('cnpj')
+
+    assert len(stations) == 2
+    central = stations.loc['12.345.678/0001-90']
+    assert central['address'] == 'AVENIDA PAULISTA, 1000 - LOJA 2, BELA VISTA'
+    assert central['city'] == 'Sao Paulo'
+    assert central['brand'] == 'Vibra Energia'
+    assert central['postal_code'] == '01310100'
+    assert stations.loc['01.234.567/0001-55', 'address'] == 'RUA XV, CENTRO'
+
+
+def test_import_records_only_new_prices_in_the_aggregates(tmp_path, monkeypatch):
+    """Testa que só os preços inseridos (não os já existentes) chegam ao histórico do serviço carregado."""
+    csv_path = str(tmp_path / 'anp.csv')
+    shutil.copy(SAMPLE_CSV, csv_path)
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{tmp_path}/anp.db'
+    db.init_app(app)
+    service = PriceIntelligenceService(PriceHistoryStore())
+    monkeypatch.setattr(price_intelligence, '_instance', service)
+
+    with app.app_context():
+        db.metadata.create_all(db.engine, tables=[GasStation.__table__, FuelPrice.__table__])
+        assert import_anp_data(csv_path, progress_callback=None)['prices'] == 3
+        assert service.history.size == 3
+
+        assert import_anp_data(csv_path, resume=False, progress_callback=None)['prices'] == 0
+        assert service.history.size == 3
+        db.session.remove()
@@ -0,0 +1,92 @@
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from src.services.auth_cache import NOT_REVOKED_TTL_SECONDS, AuthCache
+
+fakeredis = pytest.importorskip('fakeredis')
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def counting(function):
+    def wrapper(key):
+        wrapper.calls += 1
+        return function(key)
+    wrapper.calls = 0
+    return wrapper
+
+
+def wait_for(condition, timeout=3.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+def test_revocation_status_is_cached_including_negatives():
+    """Testa que o Redis só é consultado no primeiro acesso e após o TTL negativo."""
+    clock = FakeClock()
+    cache = AuthCache(client=lambda: None, clock=clock)
+    lookup = counting(lambda jti: False)
+
+    assert not any(cache.is_token_revoked('jti-1', lookup) for _ in range(100))
+    assert lookup.calls == 1
+
+    clock.now += NOT_REVOKED_TTL_SECONDS + 1
+    cache.is_token_revoked('jti-1', lookup)
+    assert lookup.calls == 2
+
+    cache.token_revoked('jti-1')
+    assert cache.is_token_revoked('jti-1', lookup)
+    assert lookup.calls == 2
+
+
+def test_partner_lookup_is_cached_and_unknown_keys_too():
+    """Testa o cache do parceiro e o cache negativo de chaves desconhecidas."""
+    partner = SimpleNamespace(id='p1', company_name='Rede Sul', is_active=True,
+                              api_key_expires=None, rate_limit_per_hour=500)
+    loader = counting(lambda key: partner if key == 'sk_valida' else None)
+    cache = AuthCache(client=lambda: None)
+
+    records = [cache.get_partner('sk_valida', loader) for _ in range(10)]
+    assert records[0].id == 'p1' and records[0].is_api_key_valid()
+    assert all(record is records[0] for record in records)
+    assert [cache.get_partner('sk_falsa', loader) for _ in range(10)] == [None] * 10
+    assert loader.calls == 2
+    assert 'sk_valida' not in str(list(cache.partners.entries))
+
+
+def test_invalidation_reaches_other_processes_via_pubsub():
+    """Testa que revogação e troca de chave publicadas limpam o cache de outro processo."""
+    server = fakeredis.FakeServer()
+    clients = [fakeredis.FakeRedis(server=server) for _ in range(2)]
+    worker, admin = AuthCache(client=lambda: clients[0]), AuthCache(client=lambda: clients[1])
+    partner = SimpleNamespace(id='p1', company_name='Rede Sul', is_active=True,
+                              api_key_expires=None, rate_limit_per_hour=500)
+    active = {'sk_valida': partner}
+    loader = counting(lambda key: active.get(key))
+
+    assert not worker.is_token_revoked('jti-9', lambda jti: False)
+    assert worker.get_partner('sk_valida', loader) is not None
+    assert wait_for(lambda: worker._listener and worker._listener.is_alive())
+
+    admin.token_revoked('jti-9')
+    active.clear()
+    admin.partner_changed('sk_valida')
+
+    assert wait_for(lambda: worker.revocations.get('jti-9') is True)
+    assert wait_for(lambda: len(worker.partners) == 0)
+    assert worker.is_token_revoked('jti-9', lambda jti: False)
+    assert worker.get_partner('sk_valida', loader) is None
+    assert loader.calls == 2
+    worker._listener.stop()
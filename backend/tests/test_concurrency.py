@@ -0,0 +1,27 @@
+import threading
+
+from flask import Flask, current_app
+
+from src.services.concurrency import run_concurrently, submit
+
+
+def test_calls_run_in_parallel_and_keep_order():
+    """Testa que as chamadas rodam juntas e os resultados saem na ordem dos itens."""
+    # Cada chamada só termina quando todas estiverem em andamento ao mesmo
+    # tempo; executadas uma a uma, a barreira estoura o timeout
+    barrier = threading.Barrier(8, timeout=5)
+
+    def square_together(value):
+        barrier.wait()
+        return value * value
+
+    assert run_concurrently(square_together, range(8)) == [value * value for value in range(8)]
+
+
+def test_submitted_calls_see_the_app_context():
+    """Testa que a função submetida roda com o contexto da aplicação de quem chamou."""
+    app = Flask(__name__)
+    app.config['NOME'] = 'tanque-cheio'
+    with app.app_context():
+        assert submit(lambda: current_app.config['NOME']).result() == 'tanque-cheio'
+    assert submit(lambda value: value + 1, 1).result() == 2
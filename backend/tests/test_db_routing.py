@@ -0,0 +1,118 @@
+import pytest
+from flask import Flask, jsonify
+from flask_jwt_extended import JWTManager, create_access_token, jwt_required
+from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import text
+
+from src import db_routing
+from src.db_routing import ReplicaRouter, RoutingSession, instrument_replica, replica_reads
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(db_routing, 'replica_router',
+                        ReplicaRouter(client=lambda: None, sticky_seconds=5, retry_seconds=30, clock=clock))
+    return clock
+
+
+def make_app(tmp_path, replica_url=None):
+    """App com dois SQLite: o primário e a réplica têm dados diferentes para sabermos quem respondeu"""
+    db = SQLAlchemy(session_options={'class_': RoutingSession})
+
+    class Station(db.Model):
+        __tablename__ = 'stations'
+        id = db.Column(db.String, primary_key=True)
+        name = db.Column(db.String)
+
+    app = Flask(__name__)
+    app.config.update(
+        SQLALCHEMY_DATABASE_URI=f'sqlite:///{tmp_path}/primary.db',
+        SQLALCHEMY_BINDS={'replica': replica_url or f'sqlite:///{tmp_path}/replica.db'},
+        JWT_SECRET_KEY='segredo-de-teste-com-32-caracteres!'
+    )
+    db.init_app(app)
+    JWTManager(app)
+
+    with app.app_context():
+        db.create_all(bind_key=None)
+        db.session.add(Station(id='s1', name='primário'))
+        db.session.commit()
+        if replica_url is None:
+            db.metadata.create_all(db.engines['replica'])
+            with db.engines['replica'].begin() as connection:
+                connection.execute(text("INSERT INTO stations (id, name) VALUES ('s1', 'réplica')"))
+        instrument_replica(db.engines['replica'])
+
+    @app.route('/stations/<station_id>')
+    @replica_reads
+    def station(station_id):
+        names = [db.session.get(Station, station_id).name,
+                 db.session.execute(text('SELECT name FROM stations WHERE id = :id'), {'id': station_id}).scalar()]
+        return jsonify({'names': names})
+
+    @app.route('/admin/stations/<station_id>')
+    def station_from_primary(station_id):
+        return jsonify({'names': [db.session.get(Station, station_id).name]})
+
+    @app.route('/stations', methods=['POST'])
+    @jwt_required()
+    def create_station():
+        db.session.add(Station(id='s2', name='nova'))
+        db.session.commit()
+        return jsonify({'success': True}), 201
+
+    with app.app_context():
+        app.tokens = {user: create_access_token(identity=user) for user in ('u1', 'u2')}
+    return app
+
+
+def auth(app, user):
+    return {'Authorization': f'Bearer {app.tokens[user]}'}
+
+
+def test_read_only_views_use_the_replica(tmp_path, clock):
+    """Testa que a view de leitura consulta a réplica (ORM e SQL) e as demais o primário."""
+    client = make_app(tmp_path).test_client()
+
+    assert client.get('/stations/s1').get_json() == {'names': ['réplica', 'réplica']}
+    assert client.get('/admin/stations/s1').get_json() == {'names': ['primário']}
+    assert db_routing.replica_router.stats()['replica'] == 1
+
+
+def test_users_read_their_own_writes_from_the_primary(tmp_path, clock):
+    """Testa a leitura no primário logo após a gravação do próprio usuário, só por alguns segundos."""
+    app = make_app(tmp_path)
+    client = app.test_client()
+
+    assert client.post('/stations', headers=auth(app, 'u1')).status_code == 201
+    assert client.get('/stations/s1', headers=auth(app, 'u1')).get_json() == {'names': ['primário', 'primário']}
+    assert client.get('/stations/s1', headers=auth(app, 'u2')).get_json() == {'names': ['réplica', 'réplica']}
+    assert client.get('/stations/s1').get_json() == {'names': ['réplica', 'réplica']}
+
+    clock.now += 6
+    assert client.get('/stations/s1', headers=auth(app, 'u1')).get_json() == {'names': ['réplica', 'réplica']}
+    assert db_routing.replica_router.stats()['sticky'] == 1
+
+
+def test_replica_failure_falls_back_to_the_primary(tmp_path, clock):
+    """Testa que erro de conexão na réplica refaz a leitura no primário e a tira de rotação."""
+    client = make_app(tmp_path, replica_url=f'sqlite:///{tmp_path}/inexistente/replica.db').test_client()
+
+    assert client.get('/stations/s1').get_json() == {'names': ['primário', 'primário']}
+    stats = db_routing.replica_router.stats()
+    assert stats['fallback'] == 1 and not stats['available']
+
+    # Fora de rotação, nem tenta a réplica; volta a tentar depois do intervalo
+    assert client.get('/stations/s1').get_json() == {'names': ['primário', 'primário']}
+    assert db_routing.replica_router.stats()['fallback'] == 1
+    clock.now += 31
+    assert db_routing.replica_router.available()
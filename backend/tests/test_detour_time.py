@@ -0,0 +1,87 @@
+import numpy as np
+import pytest
+
+from src.services.detour_time import DetourTimeService, TTLCache, estimate_minutes
+
+ORIGIN = (-26.90, -48.70)
+DESTINATION = (-26.90, -48.60)
+
+
+class FakeMatrix:
+    """Distance Matrix falsa: 1 minuto por 0,01 grau de longitude"""
+
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.calls = []
+
+    def __call__(self, origins, destinations):
+        self.calls.append((len(origins), len(destinations)))
+        if self.fail:
+            return None
+        matrix = [[{'duration_minutes': abs(o[1] - d[1]) * 100 + 1} for d in destinations] for o in origins]
+        return {'matrix': matrix}
+
+
+def stations(count):
+    ids = ['s%d' % i for i in range(count)]
+    lats = np.full(count, -26.90)
+    lons = np.linspace(-48.69, -48.61, count)
+    return ids, lats, lons
+
+
+def test_requests_are_batched_within_provider_limits():
+    """Testa que 60 postos viram 3 chamadas de no máximo 25 destinos."""
+    matrix = FakeMatrix()
+    service = DetourTimeService(matrix=matrix)
+    ids, lats, lons = stations(60)
+
+    service.travel_minutes(ORIGIN, ids, lats, lons)
+
+    assert matrix.calls == [(1, 25), (1, 25), (1, 10)]
+    assert all(o * d <= 100 for o, d in matrix.calls)
+
+
+def test_cached_pairs_skip_api_until_ttl_expires():
+    """Testa o cache por (célula da origem, posto) e a expiração pelo TTL."""
+    now = [0.0]
+    matrix = FakeMatrix()
+    service = DetourTimeService(matrix=matrix, cache=TTLCache(ttl_seconds=60, clock=lambda: now[0]))
+    ids, lats, lons = stations(10)
+
+    first = service.travel_minutes(ORIGIN, ids, lats, lons)
+    nearby = service.travel_minutes((ORIGIN[0] + 0.0005, ORIGIN[1]), ids, lats, lons)
+    assert len(matrix.calls) == 1
+    np.testing.assert_allclose(first, nearby)
+
+    now[0] = 61.0
+    service.travel_minutes(ORIGIN, ids, lats, lons)
+    assert len(matrix.calls) == 2
+
+
+def test_falls_back_to_speed_profile_without_api():
+    """Testa a estimativa local quando a API falha ou não está configurada."""
+    ids, lats, lons = stations(3)
+    failing = DetourTimeService(matrix=FakeMatrix(fail=True))
+    offline = DetourTimeService()
+
+    minutes = failing.travel_minutes(ORIGIN, ids, lats, lons, hour=12)
+    np.testing.assert_allclose(minutes, offline.travel_minutes(ORIGIN, ids, lats, lons, hour=12))
+    assert np.all(minutes > 0)
+    assert len(failing.cache) == 0
+
+
+def test_peak_hours_are_slower():
+    """Testa que o perfil de velocidade fica mais lento no horário de pico."""
+    assert estimate_minutes(10.0, hour=8) > estimate_minutes(10.0, hour=12)
+    assert estimate_minutes(1.0, hour=12) == pytest.approx(1.3 / 25 * 60)
+
+
+def test_detour_is_extra_time_over_direct_trip():
+    """Testa o desvio: origem -> posto -> destino menos origem -> destino."""
+    service = DetourTimeService(matrix=FakeMatrix())
+
+    detour = service.detour_minutes(ORIGIN, DESTINATION, ['a'], [-26.90], [-48.65])
+    assert detour[0] == pytest.approx(6 + 6 - 11)
+
+    round_trip = service.detour_minutes(ORIGIN, None, ['a'], [-26.90], [-48.65])
+    assert round_trip[0] == pytest.approx(12)
@@ -0,0 +1,45 @@
+import threading
+import time
+
+from src.services.lazy import LazyService, loaded_services
+
+
+class SlowService:
+    built = 0
+
+    def __init__(self):
+        time.sleep(0.01)
+        SlowService.built += 1
+        self.value = SlowService.built
+
+    def describe(self):
+        return f'serviço {self.value}'
+
+
+def test_service_is_built_once_on_first_use():
+    """Testa que a fábrica só roda no primeiro acesso, uma vez mesmo com várias threads."""
+    SlowService.built = 0
+    service = LazyService(SlowService, 'teste_lento')
+    assert not service.loaded and SlowService.built == 0
+    assert loaded_services()['teste_lento'] is False
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(service.describe())) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert SlowService.built == 1 and results == ['serviço 1'] * 8
+    assert service.loaded and loaded_services()['teste_lento'] is True
+    assert service.value == 1
+
+
+def test_reset_builds_a_new_instance():
+    """Testa que reset descarta a instância e o próximo acesso chama a fábrica de novo."""
+    SlowService.built = 0
+    service = LazyService(SlowService, 'teste_reset')
+    first = service.instance
+    service.reset()
+    assert not service.loaded
+    assert service.instance is not first and service.value == 2
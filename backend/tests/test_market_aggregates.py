@@ -0,0 +1,75 @@
+from datetime import date
+
+import numpy as np
+import pytest
+from sqlalchemy import create_engine, select
+
+from src.services.market_aggregates import (
+    SECONDS_PER_DAY, MarketAggregate, MarketAggregator, PriceHistogram, RunningStats, market_analysis_table
+)
+
+
+def test_running_stats_matches_numpy_after_removal():
+    """Testa que a média/variância de Welford acompanham inserções e remoções."""
+    values = [5.79, 5.89, 5.69, 6.09, 5.49]
+    stats = RunningStats()
+    for value in values:
+        stats.add(value)
+    stats.remove(6.09)
+
+    remaining = [5.79, 5.89, 5.69, 5.49]
+    assert stats.mean == pytest.approx(np.mean(remaining))
+    assert stats.variance == pytest.approx(np.var(remaining, ddof=1))
+
+
+def test_histogram_quantiles():
+    """Testa mínimo, mediana e máximo do histograma em centavos."""
+    histogram = PriceHistogram()
+    for price in (5.79, 5.49, 6.09, 5.89, 5.69):
+        histogram.add(price)
+    histogram.remove(6.09)
+
+    assert histogram.quantiles(0.0, 0.5, 1.0) == (5.49, 5.69, 5.89)
+
+
+def test_aggregate_uses_latest_price_per_station():
+    """Testa que um novo preço do posto substitui o anterior nas estatísticas."""
+    aggregate = MarketAggregate()
+    aggregate.update('a', 6.0, 0)
+    aggregate.update('b', 5.0, 0)
+    aggregate.update('a', 5.5, SECONDS_PER_DAY)
+
+    stats = aggregate.regional_stats()
+    assert stats['sample_size'] == 2
+    assert stats['average'] == 5.25
+    assert stats['max'] == 5.5
+
+
+def test_trend_follows_rising_prices():
+    """Testa que aumentos diários consistentes viram tendência de alta."""
+    aggregate = MarketAggregate()
+    for day in range(10):
+        aggregate.update('a', 5.0 + 0.05 * day, day * SECONDS_PER_DAY)
+
+    trend = aggregate.market_trend()
+    assert trend['trend'] == 'rising'
+    assert trend['change_percent'] > 2
+
+
+def test_persist_replaces_daily_snapshot():
+    """Testa que o snapshot do dia é gravado uma única vez por região (sem células geohash)."""
+    engine = create_engine('sqlite://')
+    market_analysis_table.metadata.create_all(engine)
+    aggregator = MarketAggregator()
+    aggregator.update(('sul_brasil', 'geo:6gjqu'), 'a', 'gasoline', 5.8, 0)
+    aggregator.update(('sul_brasil', 'geo:6gjqu'), 'b', 'gasoline', 5.6, 0)
+
+    with engine.begin() as connection:
+        aggregator.persist(connection, date(2024, 1, 2))
+        aggregator.persist(connection, date(2024, 1, 2))
+        rows = connection.execute(select(market_analysis_table)).mappings().all()
+
+    assert len(rows) == 1
+    assert rows[0]['region'] == 'sul_brasil'
+    assert float(rows[0]['average_price']) == 5.7
+    assert rows[0]['sample_size'] == 2
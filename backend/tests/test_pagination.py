@@ -0,0 +1,71 @@
+import pytest
+from datetime import datetime, timedelta
+from sqlalchemy import Column, DateTime, Integer, String, create_engine
+from sqlalchemy.orm import Session, declarative_base
+
+from src.pagination import (
+    InvalidCursorError, decode_cursor, encode_cursor, keyset_paginate
+)
+
+Base = declarative_base()
+
+
+class Item(Base):
+    __tablename__ = 'items'
+
+    id = Column(String(8), primary_key=True)
+    owner = Column(Integer, nullable=False)
+    created_at = Column(DateTime, nullable=False)
+
+
+@pytest.fixture
+def session():
+    engine = create_engine('sqlite://')
+    Base.metadata.create_all(engine)
+    with Session(engine) as session:
+        base = datetime(2025, 1, 1)
+        # Timestamps repetidos para exercitar o desempate pelo id
+        for i in range(25):
+            session.add(Item(id=f'{i:03d}', owner=1, created_at=base + timedelta(hours=i // 3)))
+        session.add(Item(id='999', owner=2, created_at=base))
+        session.commit()
+        yield session
+
+
+def test_cursor_roundtrip():
+    """Testa que o cursor preserva datetimes e strings."""
+    values = [datetime(2025, 5, 1, 12, 30), 'abc']
+    assert decode_cursor(encode_cursor(values), 2) == values
+
+
+def test_invalid_cursor_rejected():
+    """Testa que cursores malformados ou de tamanho errado são rejeitados."""
+    with pytest.raises(InvalidCursorError):
+        decode_cursor('não-é-base64!', 2)
+    with pytest.raises(InvalidCursorError):
+        decode_cursor(encode_cursor(['a']), 2)
+
+
+def test_keyset_walks_all_pages_without_gaps(session):
+    """Testa que percorrer todas as páginas retorna cada item uma única vez, em ordem."""
+    query = session.query(Item).filter(Item.owner == 1)
+    keys = [Item.created_at, Item.id]
+
+    seen, cursor = [], None
+    while True:
+        items, cursor = keyset_paginate(query, keys, cursor, per_page=4)
+        seen.extend(item.id for item in items)
+        if cursor is None:
+            break
+
+    expected = [item.id for item in query.order_by(Item.created_at.desc(), Item.id.desc())]
+    assert seen == expected
+    assert len(seen) == 25
+
+
+def test_last_page_has_no_cursor(session):
+    """Testa que a última página não retorna cursor."""
+    query = session.query(Item).filter(Item.owner == 2)
+    items, cursor = keyset_paginate(query, [Item.created_at, Item.id], None, per_page=4)
+    assert [item.id for item in items] == ['999']
+    assert cursor is None
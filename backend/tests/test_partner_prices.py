@@ -0,0 +1,112 @@
+import io
+
+import pytest
+from sqlalchemy import create_engine, event, text
+
+from src.services.partner_prices import PartnerPriceImport, iter_csv, iter_json_lines
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'prices.db'}")
+    with engine.begin() as connection:
+        connection.execute(text('CREATE TABLE gas_stations (id VARCHAR(36) PRIMARY KEY, partner_id VARCHAR(36), latitude FLOAT, longitude FLOAT)'))
+        connection.execute(text(
+            'CREATE TABLE fuel_prices (id VARCHAR(36) PRIMARY KEY, gas_station_id VARCHAR(36), fuel_type VARCHAR(20), '
+            'price NUMERIC(6, 3), source VARCHAR(50) NOT NULL, source_confidence FLOAT, reported_at TIMESTAMP NOT NULL, '
+            'is_active BOOLEAN, created_at TIMESTAMP, updated_at TIMESTAMP)'
+        ))
+        connection.execute(text(
+            "INSERT INTO gas_stations VALUES " + ', '.join(f"('s{i}', 'p1', -23.5, -46.6)" for i in range(300)) + ", ('outro', 'p2', NULL, NULL)"
+        ))
+        connection.execute(text(
+            "INSERT INTO fuel_prices VALUES ('old', 's1', 'gasoline', 5.99, 'anp', 0.5, '2024-01-01', 1, NULL, NULL)"
+        ))
+    return engine
+
+
+def run_import(engine, items, chunk_size=100):
+    """Mesma sequência da rota: uma transação, desfeita se houver erro"""
+    with engine.connect() as connection:
+        transaction = connection.begin()
+        importer = PartnerPriceImport(connection, 'p1', chunk_size=chunk_size)
+        result = importer.run(items, keep_rows=True)
+        if result['error_count']:
+            transaction.rollback()
+        else:
+            transaction.commit()
+    return importer, result
+
+
+def active_prices(engine):
+    with engine.connect() as connection:
+        return dict(((station, fuel), float(price)) for station, fuel, price in connection.execute(text(
+            'SELECT gas_station_id, fuel_type, price FROM fuel_prices WHERE is_active')))
+
+
+def test_bulk_update_uses_set_based_statements(engine):
+    """Testa que milhares de itens viram poucos comandos por lote e desativam o preço anterior."""
+    items = [{'station_id': f's{i}', 'fuel_type': fuel, 'price': 5 + i / 1000}
+             for i in range(300) for fuel in ('gasoline', 'ethanol', 'diesel')]
+    statements = []
+    event.listen(engine, 'before_cursor_execute', lambda *args: statements.append(args[2]))
+
+    importer, result = run_import(engine, enumerate(items, start=1))
+
+    assert result['updated'] == 900 and result['error_count'] == 0
+    # Por lote de 100: uma consulta de posse, um UPDATE e um INSERT
+    assert len(statements) <= 9 * 3 + 2
+    prices = active_prices(engine)
+    assert len(prices) == 900
+    assert prices[('s1', 'gasoline')] != 5.99
+    assert len(importer.written) == 900
+
+
+def test_written_prices_are_kept_for_the_market_aggregates(engine):
+    """Testa que o import guarda (posto, combustível, preço, data) para atualizar os agregados após o commit."""
+    importer, result = run_import(engine, enumerate([{'station_id': 's1', 'fuel_type': 'gasoline', 'price': 6.2},
+                                                      {'station_id': 's2', 'fuel_type': 'diesel', 'price': '6.49'}],
+                                                     start=1))
+
+    assert result['error_count'] == 0
+    assert [price[:3] for price in importer.prices] == [('s1', 'gasoline', 6.2), ('s2', 'diesel', 6.49)]
+
+
+def test_any_invalid_item_rolls_back_everything(engine):
+    """Testa o tudo ou nada: posto de outro parceiro e preço inválido não gravam nada."""
+    items = [{'station_id': 's2', 'fuel_type': 'gasoline', 'price': 6.1}] * 150 + [
+        {'station_id': 'outro', 'fuel_type': 'gasoline', 'price': 6.1},
+        {'station_id': 's3', 'fuel_type': 'ethanol', 'price': -1},
+        {'station_id': 's3', 'fuel_type': 'querosene', 'price': 4},
+    ]
+
+    _, result = run_import(engine, enumerate(items, start=1))
+
+    assert result['updated'] == 0
+    assert [error['line'] for error in result['errors']] == [151, 152, 153]
+    assert active_prices(engine) == {('s1', 'gasoline'): 5.99}
+
+
+def test_last_price_wins_for_duplicates(engine):
+    """Testa que a mesma combinação posto/combustível repetida fica com o último preço."""
+    items = [{'station_id': 's1', 'fuel_type': 'gasoline', 'price': price} for price in (6.0, 6.1, 6.2)]
+
+    _, result = run_import(engine, enumerate(items, start=1), chunk_size=2)
+
+    assert result['updated'] == 3
+    assert active_prices(engine) == {('s1', 'gasoline'): 6.2}
+
+
+def test_streaming_parsers_report_line_numbers(engine):
+    """Testa a leitura de CSV e NDJSON, com o número da linha nos erros."""
+    csv_body = io.BytesIO(b'station_id,fuel_type,price\ns5,diesel,6.49\ns6,gnv,4.2\n')
+    ndjson_body = io.BytesIO(b'{"station_id": "s7", "fuel_type": "ethanol", "price": 4.1}\n\nnao e json\n')
+
+    assert [line for line, _ in iter_csv(csv_body)] == [2, 3]
+    _, result = run_import(engine, iter_json_lines(ndjson_body))
+    assert result['errors'][0]['line'] == 3
+    assert ('s7', 'ethanol') not in active_prices(engine)
+
+    _, result = run_import(engine, iter_csv(io.BytesIO(b'station_id,fuel_type,price\ns5,diesel,6.49\n')))
+    assert result['updated'] == 1
+    assert active_prices(engine)[('s5', 'diesel')] == 6.49
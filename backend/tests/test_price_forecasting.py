@@ -0,0 +1,80 @@
+from datetime import date
+
+import numpy as np
+from sqlalchemy import create_engine, func, select
+
+from src.services.price_forecasting import (
+    SECONDS_PER_DAY, _upsert, daily_matrix, forecast_matrix, load_forecast, persist_forecasts, price_predictions_table
+)
+
+
+def test_daily_matrix_keeps_last_price_and_forward_fills():
+    """Testa a reamostragem diária: último preço do dia e forward-fill."""
+    views = [
+        (np.array([0, 2 * SECONDS_PER_DAY, 2 * SECONDS_PER_DAY + 60]), np.array([5.0, 5.1, 5.2])),
+        (np.array([3 * SECONDS_PER_DAY]), np.array([6.0])),
+    ]
+
+    matrix = daily_matrix(views, end_day=4, window_days=5)
+
+    assert list(matrix[0]) == [5.0, 5.0, 5.2, 5.2, 5.2]
+    assert np.isnan(matrix[1, :3]).all()
+    assert list(matrix[1, 3:]) == [6.0, 6.0]
+
+
+def test_forecast_follows_trend_with_intervals():
+    """Testa que séries em alta e estáveis são classificadas e têm intervalos coerentes."""
+    days = np.arange(30)
+    matrix = np.vstack([5.0 + 0.05 * days, np.full(30, 5.5)])
+
+    batch = forecast_matrix([('a', 'gasoline'), ('b', 'gasoline')], matrix, date(2024, 1, 1))
+
+    assert list(batch.trends) == ['rising', 'stable']
+    assert (np.diff(batch.predicted[0]) > 0).all()
+    assert (batch.lower <= batch.predicted).all() and (batch.predicted <= batch.upper).all()
+    assert batch.get('b', 'gasoline')['predictions'][0]['predicted_price'] == 5.5
+
+
+def test_forecast_is_deterministic():
+    """Testa que o mesmo histórico gera sempre a mesma previsão."""
+    matrix = 5.5 + np.sin(np.arange(30))[None, :] * 0.05
+    first = forecast_matrix([('a', 'ethanol')], matrix, date(2024, 1, 1))
+    second = forecast_matrix([('a', 'ethanol')], matrix.copy(), date(2024, 1, 1))
+
+    assert np.array_equal(first.predicted, second.predicted)
+
+
+def test_persisted_forecast_round_trip():
+    """Testa que as previsões gravadas são lidas de volta no formato da API."""
+    engine = create_engine('sqlite://')
+    price_predictions_table.metadata.create_all(engine)
+    batch = forecast_matrix([('st-1', 'diesel')], np.full((1, 10), 6.0), date(2024, 1, 1))
+
+    with engine.begin() as connection:
+        assert persist_forecasts(connection, batch) == 7
+        assert persist_forecasts(connection, batch) == 7
+        stored = load_forecast(connection, 'st-1', 'diesel', date(2024, 1, 1))
+
+    assert len(stored['predictions']) == 7
+    assert stored['predictions'][0]['date'] == '2024-01-02'
+    assert stored['trend_analysis'] == 'stable'
+    assert stored['predictions'] == batch.get('st-1', 'diesel')['predictions']
+
+
+def test_concurrent_batches_do_not_duplicate_days():
+    """Testa que gravar o mesmo dia de novo (outro lote em paralelo) atualiza a linha em vez de duplicar."""
+    engine = create_engine('sqlite://')
+    price_predictions_table.metadata.create_all(engine)
+    first = forecast_matrix([('st-1', 'diesel')], np.full((1, 10), 6.0), date(2024, 1, 1))
+
+    with engine.begin() as connection:
+        persist_forecasts(connection, first)
+        # O segundo lote chega depois do DELETE do primeiro: só o upsert evita a duplicata
+        row = {'gas_station_id': 'st-1', 'fuel_type': 'diesel', 'current_price': 6.5, 'predicted_price': 6.5,
+               'prediction_date': date(2024, 1, 2)}
+        connection.execute(_upsert(connection, price_predictions_table), [row])
+        total = connection.execute(select(func.count()).select_from(price_predictions_table)).scalar()
+        stored = load_forecast(connection, 'st-1', 'diesel', date(2024, 1, 1))
+
+    assert total == 7
+    assert stored['predictions'][0]['predicted_price'] == 6.5
@@ -0,0 +1,153 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+from flask import Flask
+from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import insert, text
+
+from src.services.price_forecasting import price_predictions_table
+from src.services.price_history_store import PriceHistoryStore, PriceSeries, price_history_table
+from src.services.price_intelligence import PriceIntelligenceService
+
+
+@pytest.fixture
+def app():
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    db = SQLAlchemy(app)
+    with app.app_context():
+        price_history_table.metadata.create_all(db.engine)
+        with db.engine.begin() as connection:
+            connection.execute(text(
+                'CREATE TABLE gas_stations (id VARCHAR(36) PRIMARY KEY, name VARCHAR(200), '
+                'city VARCHAR(100), state VARCHAR(2), latitude NUMERIC, longitude NUMERIC)'
+            ))
+            connection.execute(text(
+                "INSERT INTO gas_stations VALUES "
+                "('st-1', 'Posto Um', 'Itajaí', 'SC', -26.91, -48.66), "
+                "('st-2', 'Posto Dois', 'Curitiba', 'PR', -25.43, -49.27)"
+            ))
+        app.db = db
+        yield app
+
+
+def insert_prices(app, rows):
+    with app.db.engine.begin() as connection:
+        connection.execute(insert(price_history_table), rows)
+
+
+def test_series_keeps_only_last_points():
+    """Testa que a série cresce por dobra e descarta os pontos mais antigos além do limite."""
+    series = PriceSeries(capacity=2, max_points=5)
+    for i in range(12):
+        series.append(i, float(i))
+
+    timestamps, prices = series.view()
+    assert list(timestamps) == [7, 8, 9, 10, 11]
+    assert len(series.prices) <= 10
+    assert not prices.flags.writeable
+
+
+def test_view_is_zero_copy():
+    """Testa que a view compartilha memória com o buffer da série."""
+    series = PriceSeries()
+    series.extend(np.arange(3, dtype=np.int64), np.array([5.0, 5.1, 5.2]))
+
+    _, prices = series.view()
+    assert np.shares_memory(prices, series.prices)
+
+
+def test_bulk_load_groups_and_sorts_by_series():
+    """Testa que a carga em lote separa as séries e ordena cada uma por tempo."""
+    store = PriceHistoryStore(max_points=None)
+    store.load(['a', 'b', 'a', 'a'], ['gasoline', 'gasoline', 'gasoline', 'ethanol'],
+               [30, 10, 20, 5], [5.3, 6.0, 5.2, 4.0])
+
+    timestamps, prices = store.get('a', 'gasoline').view()
+    assert list(timestamps) == [20, 30]
+    assert list(prices) == [5.2, 5.3]
+    station_ids, latest = store.latest_prices('gasoline')
+    assert dict(zip(station_ids, latest)) == {'a': 5.3, 'b': 6.0}
+
+
+def test_refresh_reads_only_new_rows(app):
+    """Testa o refresh incremental a partir da tabela price_history."""
+    now = datetime.utcnow()
+    insert_prices(app, [
+        {'gas_station_id': 'st-1', 'fuel_type': 'gasoline', 'price': 5.5, 'recorded_at': now - timedelta(days=2)},
+        {'gas_station_id': 'st-1', 'fuel_type': 'gasoline', 'price': 5.6, 'recorded_at': now - timedelta(days=1)},
+        {'gas_station_id': 'st-1', 'fuel_type': 'gasoline', 'price': 9.9, 'recorded_at': now - timedelta(days=400)},
+    ])
+    store = PriceHistoryStore()
+
+    with app.db.engine.connect() as connection:
+        assert store.refresh(connection) == 2
+        insert_prices(app, [{'gas_station_id': 'st-1', 'fuel_type': 'gasoline', 'price': 5.7, 'recorded_at': now}])
+        assert store.refresh(connection) == 1
+
+    assert list(store.get('st-1', 'gasoline').view()[1]) == [5.5, 5.6, 5.7]
+
+
+def test_service_replaces_sample_data_with_database(app):
+    """Testa que o serviço passa a usar o histórico do banco quando há dados."""
+    now = datetime.utcnow()
+    insert_prices(app, [
+        {'gas_station_id': station_id, 'fuel_type': 'gasoline', 'price': price,
+         'recorded_at': now - timedelta(days=day)}
+        for station_id, base in (('st-1', 5.0), ('st-2', 6.0))
+        for day, price in ((2, base), (1, base + 0.1), (0, base + 0.2))
+    ])
+    service = PriceIntelligenceService()
+    assert service.using_sample_data
+
+    assert service.refresh_from_database() == 6
+    assert not service.using_sample_data
+    assert service.regional_averages['sul_brasil']['gasoline']['average'] == 5.7
+    assert service.predict_price_trend('st-1', 'gasoline', 1)['current_price'] == 5.2
+    assert service.find_best_price_opportunity('gasoline')['best_opportunity']['station_name'] == 'Posto Um'
+
+
+def test_forecasts_are_written_only_by_the_batch(app):
+    """Testa que a previsão da requisição não grava nada e que o lote agendado grava e é lido depois."""
+    now = datetime.utcnow()
+    insert_prices(app, [
+        {'gas_station_id': 'st-1', 'fuel_type': 'gasoline', 'price': 5.0 + day / 10,
+         'recorded_at': now - timedelta(days=3 - day)}
+        for day in range(4)
+    ])
+    price_predictions_table.metadata.create_all(app.db.engine)
+
+    def stored_rows():
+        with app.db.engine.connect() as connection:
+            return connection.execute(text('SELECT COUNT(*) FROM price_predictions')).scalar()
+
+    service = PriceIntelligenceService()
+    service.refresh_from_database()
+    assert service.predict_price_trend('st-1', 'gasoline', 3)['current_price'] == 5.3
+    assert stored_rows() == 0
+
+    assert service.run_forecasts(persist=True)['rows_written'] == 7
+    assert service.run_forecasts(persist=True)['rows_written'] == 7
+    assert stored_rows() == 7
+
+    # Outro worker, sem o lote em memória, lê a tabela
+    other = PriceIntelligenceService()
+    other.refresh_from_database()
+    prediction = other.predict_price_trend('st-1', 'gasoline', 7)
+    assert other.forecasts is None and len(prediction['predictions']) == 7
+
+
+def test_service_refresh_updates_aggregates_incrementally(app):
+    """Testa que linhas novas atualizam as médias regionais sem recálculo total."""
+    now = datetime.utcnow()
+    insert_prices(app, [
+        {'gas_station_id': 'st-1', 'fuel_type': 'gasoline', 'price': 5.0, 'recorded_at': now - timedelta(days=1)},
+        {'gas_station_id': 'st-2', 'fuel_type': 'gasoline', 'price': 6.0, 'recorded_at': now - timedelta(days=1)},
+    ])
+    service = PriceIntelligenceService()
+    service.refresh_from_database()
+
+    insert_prices(app, [{'gas_station_id': 'st-2', 'fuel_type': 'gasoline', 'price': 5.4, 'recorded_at': now}])
+    assert service.refresh_from_database() == 1
+    assert service.get_regional_stats('gasoline')['average'] == 5.2
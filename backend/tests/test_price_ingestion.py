@@ -0,0 +1,153 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from flask import Flask
+from sqlalchemy import func, select, text
+
+from src.database import db
+from src.models.gas_station import FuelPrice, GasStation
+from src.services import price_ingestion
+from src.services.price_history_store import PriceHistoryStore
+from src.services.price_ingestion import bulk_upsert_prices
+from src.services.price_intelligence import PriceIntelligenceService, price_intelligence
+
+NOW = datetime.now(timezone.utc)
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{tmp_path}/prices.db'
+    db.init_app(app)
+    with app.app_context():
+        db.metadata.create_all(db.engine, tables=[GasStation.__table__, FuelPrice.__table__])
+        with db.engine.begin() as connection:
+            # Mesmo índice da migração 018, no dialeto do SQLite
+            connection.execute(text(
+                'CREATE UNIQUE INDEX uq_fuel_prices_station_fuel_day '
+                'ON fuel_prices (gas_station_id, fuel_type, date(reported_at)) WHERE is_active'
+            ))
+        yield app
+        db.session.remove()
+
+
+def scraped(station, fuel_type, price, cnpj=None, scraped_at=NOW):
+    return {'station_name': station, 'location': 'Itajaí, SC', 'state': 'SC', 'cnpj': cnpj,
+            'fuel_type': fuel_type, 'price': price, 'source': 'combustivel_api', 'scraped_at': scraped_at}
+
+
+def stored_prices():
+    rows = db.session.execute(select(GasStation.name, FuelPrice.fuel_type, FuelPrice.price)
+                              .join(GasStation, GasStation.id == FuelPrice.gas_station_id)).all()
+    return sorted((name, fuel_type, float(price)) for name, fuel_type, price in rows)
+
+
+def test_new_stations_and_prices_are_inserted(app):
+    """Testa a ingestão inicial: cria os postos faltantes e um preço por posto/combustível."""
+    stats = bulk_upsert_prices([
+        scraped('Posto Um', 'gasoline', 5.79, cnpj='11.111.111/0001-11'),
+        scraped('Posto Um', 'ethanol', 3.99, cnpj='11.111.111/0001-11'),
+        scraped('Posto Dois', 'diesel', 6.09),
+        scraped('Posto Dois', 'querosene', 4.00),
+    ], chunk_size=2)
+
+    assert stats['created'] == 2 + 3 and stats['updated'] == 0
+    assert stats['errors'] == 1 and stats['failed_chunks'] == []
+    assert stored_prices() == [('Posto Dois', 'diesel', 6.09), ('Posto Um', 'ethanol', 3.99),
+                               ('Posto Um', 'gasoline', 5.79)]
+
+
+def test_same_day_price_is_updated(app):
+    """Testa que um novo preço no mesmo dia atualiza a linha e que outro dia cria uma nova."""
+    bulk_upsert_prices([scraped('Posto Um', 'gasoline', 5.79)])
+    stats = bulk_upsert_prices([scraped('Posto Um', 'gasoline', 5.69), scraped('Posto Um', 'gasoline', 5.59)])
+
+    assert stats['updated'] == 1 and stats['created'] == 0
+    assert stored_prices() == [('Posto Um', 'gasoline', 5.59)]
+
+    bulk_upsert_prices([scraped('Posto Um', 'gasoline', 5.89, scraped_at=NOW - timedelta(days=1))])
+    assert db.session.scalar(select(func.count()).select_from(FuelPrice)) == 2
+
+
+def test_inactive_same_day_price_is_left_alone(app):
+    """Testa que o preço do dia é atualizado na linha ativa, e não numa linha desativada do mesmo dia."""
+    bulk_upsert_prices([scraped('Posto Um', 'gasoline', 5.00)])
+    station_id = db.session.scalar(select(GasStation.id))
+    db.session.add(FuelPrice(gas_station_id=station_id, fuel_type='gasoline', price=4.50,
+                             source='partner_api', reported_at=NOW, is_active=False))
+    db.session.commit()
+
+    stats = bulk_upsert_prices([scraped('Posto Um', 'gasoline', 6.66)])
+
+    assert stats['updated'] == 1 and stats['created'] == 0
+    rows = db.session.execute(select(FuelPrice.price, FuelPrice.is_active)).all()
+    assert sorted((float(price), is_active) for price, is_active in rows) == [(4.5, False), (6.66, True)]
+
+
+def test_concurrent_ingestion_of_the_same_day_becomes_an_update(app, monkeypatch):
+    """Testa que o índice único barra a duplicata de outra ingestão e o lote é reaplicado como UPDATE."""
+    bulk_upsert_prices([scraped('Posto Um', 'gasoline', 5.79, scraped_at=NOW - timedelta(days=1))])
+    station_id = db.session.scalar(select(GasStation.id))
+    original = price_ingestion._dialect_insert
+    calls = []
+
+    def competing_insert(table):
+        # Outra ingestão grava o mesmo dia entre a leitura e o INSERT deste lote
+        if not calls:
+            with db.engine.begin() as connection:
+                connection.execute(FuelPrice.__table__.insert(), [{
+                    'id': 'outra-ingestao', 'gas_station_id': station_id, 'fuel_type': 'gasoline',
+                    'price': 5.75, 'source': 'petrobras', 'reported_at': NOW
+                }])
+        calls.append(table)
+        return original(table)
+
+    monkeypatch.setattr(price_ingestion, '_dialect_insert', competing_insert)
+    stats = bulk_upsert_prices([scraped('Posto Um', 'gasoline', 5.69)])
+
+    assert len(calls) == 2 and stats['failed_chunks'] == []
+    assert stats['updated'] == 1
+    today = db.session.execute(select(FuelPrice.id, FuelPrice.price)
+                               .where(FuelPrice.reported_at > NOW - timedelta(hours=1))).all()
+    assert [(price_id, float(price)) for price_id, price in today] == [('outra-ingestao', 5.69)]
+
+
+def test_failed_chunk_does_not_undo_the_others(app, monkeypatch):
+    """Testa que o lote com erro é reportado em failed_chunks e os demais são gravados."""
+    original = price_ingestion._upsert_chunk
+
+    def failing_second_chunk(rows):
+        if any(row['fuel_type'] == 'ethanol' for row in rows):
+            raise RuntimeError('conexão perdida')
+        return original(rows)
+
+    monkeypatch.setattr(price_ingestion, '_upsert_chunk', failing_second_chunk)
+    stats = bulk_upsert_prices([
+        scraped('Posto Um', 'gasoline', 5.79),
+        scraped('Posto Um', 'ethanol', 3.99),
+        scraped('Posto Um', 'diesel', 6.09),
+    ], chunk_size=1)
+
+    assert stats['failed_chunks'] == [{'stage': 'prices', 'chunk': 1, 'rows': 1, 'error': 'conexão perdida'}]
+    assert stats['errors'] == 1 and stats['created'] == 1 + 2
+    assert stored_prices() == [('Posto Um', 'diesel', 6.09), ('Posto Um', 'gasoline', 5.79)]
+
+
+def test_ingested_prices_update_the_market_aggregates(app, monkeypatch):
+    """Testa que, após o commit, os preços entram no histórico e nos agregados do serviço carregado."""
+    service = PriceIntelligenceService(PriceHistoryStore())
+    monkeypatch.setattr(price_intelligence, '_instance', service)
+
+    bulk_upsert_prices([scraped('Posto Um', 'gasoline', 5.79), scraped('Posto Dois', 'gasoline', 5.59)])
+
+    assert service.regions.regions_of(db.session.scalar(select(GasStation.id).limit(1)))[:2] == ('br', 'sul_brasil')
+    stats = service.aggregates.get('sul_brasil', 'gasoline').regional_stats()
+    assert stats['sample_size'] == 2 and stats['average'] == 5.69
+
+
+def test_aggregates_are_left_alone_when_the_service_is_not_loaded(app, monkeypatch):
+    """Testa que a ingestão não constrói o serviço (com dados de exemplo) só para registrar preços."""
+    monkeypatch.setattr(price_intelligence, '_instance', None)
+
+    bulk_upsert_prices([scraped('Posto Um', 'gasoline', 5.79)])
+    assert not price_intelligence.loaded
@@ -0,0 +1,94 @@
+import pytest
+
+from src.services.rate_limiter import RateLimiter, RateLimitResult, gcra
+
+fakeredis = pytest.importorskip('fakeredis')
+pytest.importorskip('lupa')
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def limiter(server, **kwargs):
+    client = fakeredis.FakeRedis(server=server)
+    return RateLimiter(client=lambda: client, clock=FakeClock(), **kwargs)
+
+
+def test_gcra_allows_burst_then_spaces_requests():
+    """Testa o GCRA em memória: rajada até o limite e depois uma ficha por intervalo."""
+    tat, now = 0.0, 0.0
+    for _ in range(5):
+        tat, granted, _, _, _ = gcra(tat, now, 720.0, 5, 1)
+        assert granted == 1
+
+    tat, granted, remaining, retry_after, _ = gcra(tat, now, 720.0, 5, 1)
+    assert granted == 0 and remaining == 0
+    assert retry_after == pytest.approx(720.0)
+    assert gcra(tat, now + 720.0, 720.0, 5, 1)[1] == 1
+
+
+def test_redis_script_enforces_limit_and_retry_after():
+    """Testa o script Lua: 5 por hora, a sexta é bloqueada com Retry-After."""
+    rate = limiter(fakeredis.FakeServer())
+    results = [rate.hit('login:1.2.3.4', 5, 3600) for _ in range(6)]
+
+    assert [result.allowed for result in results] == [True] * 5 + [False]
+    assert [result.remaining for result in results[:5]] == [4, 3, 2, 1, 0]
+    assert results[-1].retry_after == pytest.approx(720, abs=1)
+    assert rate.redis_calls == 6
+
+    # A negativa fica em cache local até o Retry-After
+    assert not rate.hit('login:1.2.3.4', 5, 3600).allowed
+    assert rate.redis_calls == 6
+    # Vencido o bloqueio local, a decisão volta ao Redis (cujo relógio não andou)
+    rate.clock.now += 721
+    assert not rate.hit('login:1.2.3.4', 5, 3600).allowed
+    assert rate.redis_calls == 7
+
+
+def test_processes_sharing_redis_never_exceed_quota():
+    """Testa que reservas locais de dois processos somadas respeitam a cota."""
+    server = fakeredis.FakeServer()
+    first, second = limiter(server), limiter(server)
+
+    allowed = sum(rate.hit('partner:p1', 400, 3600).allowed for _ in range(300) for rate in (first, second))
+
+    assert allowed == 400
+
+
+def test_hot_keys_are_served_from_local_lease():
+    """Testa que chaves quentes consomem fichas locais e poupam idas ao Redis."""
+    rate = limiter(fakeredis.FakeServer())
+    results = [rate.hit('partner:p1', 100000, 3600) for _ in range(1000)]
+
+    assert all(result.allowed for result in results)
+    assert rate.redis_calls < 50
+    assert results[-1].remaining == pytest.approx(99000, abs=32)
+    assert rate.peek('partner:p1', 100000, 3600) == pytest.approx(99000, abs=32)
+
+
+def test_falls_back_to_local_gcra_without_redis():
+    """Testa que sem Redis (ou com erro) o limite continua valendo por processo."""
+    class BrokenRedis:
+        def register_script(self, script):
+            raise ConnectionError('redis fora do ar')
+
+    clock = FakeClock()
+    for client in (lambda: None, BrokenRedis):
+        rate = RateLimiter(client=client, clock=clock)
+        assert [rate.hit('register:ip', 3, 3600).allowed for _ in range(4)] == [True, True, True, False]
+        clock.now += 1200
+        assert rate.hit('register:ip', 3, 3600).allowed
+
+
+def test_headers():
+    """Testa os cabeçalhos X-RateLimit-* e o Retry-After."""
+    assert RateLimitResult(True, 1000, 998, 7.2).headers() == {
+        'X-RateLimit-Limit': '1000', 'X-RateLimit-Remaining': '998', 'X-RateLimit-Reset': '8'
+    }
+    assert RateLimitResult(False, 5, 0, 3600, 719.4).headers()['Retry-After'] == '720'
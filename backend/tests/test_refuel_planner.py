@@ -0,0 +1,83 @@
+import math
+
+import numpy as np
+import pytest
+
+from src.services.refuel_planner import plan_refuel
+
+
+def naive_cost(along_km, prices, detour_km, route_km, tank, per_100km, initial, reserve, step):
+    """Mesma discretização, por força bruta sobre (posto, nível)"""
+    per_km = per_100km / 100
+    units = lambda liters: max(int(math.ceil(liters / step - 1e-9)), 0)
+    levels = int(tank // step) + 1
+    costs = {int(initial // step): 0.0}
+    consumed = 0
+    for km, price, detour in sorted(zip(along_km, prices, detour_km)):
+        need = units(km * per_km) - consumed
+        consumed += need
+        costs = {level - need: cost for level, cost in costs.items() if level - need >= units(reserve)}
+        half = units(detour / 2 * per_km)
+        result = dict(costs)
+        for level, cost in costs.items():
+            pump = level - half
+            if pump < 0:
+                continue
+            for target in range(pump, levels):
+                back = target - half
+                if back < 0:
+                    continue
+                total = cost + (target - pump) * step * price
+                if total < result.get(back, math.inf):
+                    result[back] = total
+        costs = result
+    need = units(route_km * per_km) - consumed
+    finals = [cost for level, cost in costs.items() if level - need >= units(reserve)]
+    return min(finals) if finals else None
+
+
+def test_buys_just_enough_before_cheaper_station():
+    """Testa o plano clássico: compra o mínimo no caro e enche antes do barato."""
+    plan = plan_refuel([100, 300, 600, 800], [6.0, 5.0, 5.5, 4.0], [0, 0, 0, 0],
+                       route_km=1000, tank_capacity=50, consumption_per_100km=10, initial_fuel=20)
+
+    assert plan.feasible
+    assert [(stop.index, stop.liters) for stop in plan.stops] == [(0, 10.0), (1, 50.0), (3, 20.0)]
+    assert plan.total_cost == pytest.approx(390.0)
+
+
+def test_detour_can_make_cheap_station_not_worth_it():
+    """Testa que o combustível gasto no desvio entra no custo da parada."""
+    args = dict(route_km=400, tank_capacity=50, consumption_per_100km=10, initial_fuel=20)
+
+    near = plan_refuel([150, 200], [5.8, 5.7], [0, 0], **args)
+    far = plan_refuel([150, 200], [5.8, 5.7], [0, 40], **args)
+    assert [stop.index for stop in near.stops] == [1]
+    assert [stop.index for stop in far.stops] == [0]
+
+
+def test_infeasible_when_gap_exceeds_tank():
+    """Testa que um trecho maior que a autonomia torna o plano inviável."""
+    plan = plan_refuel([100], [5.0], [0], route_km=800, tank_capacity=50, consumption_per_100km=10,
+                       initial_fuel=20)
+
+    assert not plan.feasible and plan.stops == []
+
+
+def test_matches_brute_force_on_random_routes():
+    """Testa o DP vetorizado contra a força bruta na mesma discretização."""
+    rng = np.random.default_rng(7)
+    for _ in range(20):
+        n = 8
+        along = np.sort(rng.uniform(0, 600, n))
+        prices = rng.uniform(5.0, 6.5, n)
+        detours = rng.uniform(0, 8, n)
+        args = (along, prices, detours, 600, 20, 8, 6)
+
+        plan = plan_refuel(*args, reserve=2, step_liters=1.0)
+        expected = naive_cost(*args, 2, 1.0)
+        if expected is None:
+            assert not plan.feasible
+        else:
+            assert plan.total_cost == pytest.approx(expected)
+            assert plan.fuel_cost == pytest.approx(expected)
@@ -0,0 +1,37 @@
+from src.services.market_aggregates import MarketAggregator
+from src.services.region_index import RegionIndex, geohash, region_name, region_path
+
+
+def test_geohash_known_value():
+    """Testa a codificação geohash com um valor de referência."""
+    assert geohash(57.64911, 10.40744, 11) == 'u4pruydqqvj'
+
+
+def test_region_path_from_state_city_and_coordinates():
+    """Testa o caminho país -> grande região -> UF -> município -> células."""
+    path = region_path('sc', 'Itajaí', -26.91, -48.66)
+
+    assert path[:4] == ('br', 'sul_brasil', 'uf:SC', 'cidade:SC:itajai')
+    assert [region[:4] for region in path[4:]] == ['geo:', 'geo:']
+    assert region_name('cidade:SC:itajai') == 'Itajai - SC'
+
+
+def test_ungeocoded_station_has_no_cells():
+    """Testa que postos em 0,0 (sem geocodificação) não entram em células geohash."""
+    assert region_path('SP', 'Santos', 0, 0) == ('br', 'sudeste_brasil', 'uf:SP', 'cidade:SP:santos')
+
+
+def test_price_rolls_up_every_level():
+    """Testa que um preço atualiza todos os níveis da hierarquia do posto."""
+    index = RegionIndex()
+    index.register('a', 'PR', 'Curitiba', -25.43, -49.27)
+    index.register('b', 'SP', 'Campinas', -22.90, -47.06)
+    aggregator = MarketAggregator()
+
+    aggregator.update(index.regions_of('a'), 'a', 'gasoline', 6.0, 0)
+    aggregator.update(index.regions_of('b'), 'b', 'gasoline', 5.0, 0)
+
+    assert aggregator.get('br', 'gasoline').regional_stats()['average'] == 5.5
+    assert aggregator.get('sul_brasil', 'gasoline').regional_stats()['average'] == 6.0
+    assert aggregator.get('cidade:SP:campinas', 'gasoline').regional_stats()['sample_size'] == 1
+    assert index.regions_of('desconhecido') == ('br',)
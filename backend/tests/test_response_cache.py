@@ -0,0 +1,121 @@
+import pytest
+from flask import Flask, jsonify, request
+from sqlalchemy import Column, Float, ForeignKey, String, create_engine
+from sqlalchemy.orm import Session, declarative_base
+
+from src.services import response_cache as response_cache_module
+from src.services.response_cache import ResponseCache, area_dependencies, cell_of
+
+Base = declarative_base()
+
+
+class Station(Base):
+    __tablename__ = 'gas_stations'
+    id = Column(String, primary_key=True)
+    latitude = Column(Float)
+    longitude = Column(Float)
+
+
+class Price(Base):
+    __tablename__ = 'fuel_prices'
+    id = Column(String, primary_key=True)
+    gas_station_id = Column(String, ForeignKey('gas_stations.id'))
+    price = Column(Float)
+
+
+def make_app(cache):
+    app = Flask(__name__)
+    app.calls = 0
+
+    @app.route('/stations/<station_id>')
+    @cache.cached(lambda station_id: [f'station:{station_id}'])
+    def station(station_id):
+        app.calls += 1
+        return jsonify({'id': station_id, 'calls': app.calls}), 200
+
+    @app.route('/nearby')
+    @cache.cached(lambda: area_dependencies(request.args.get('latitude', type=float),
+                                            request.args.get('longitude', type=float), 5))
+    def nearby():
+        app.calls += 1
+        return jsonify({'calls': app.calls}), 200
+
+    return app
+
+
+def test_conditional_get_and_station_invalidation():
+    """Testa 304 com If-None-Match, hit no cache e invalidação só do posto gravado."""
+    cache = ResponseCache(client=lambda: None)
+    client = make_app(cache).test_client()
+
+    first = client.get('/stations/s1')
+    etag = first.headers['ETag']
+    assert client.get('/stations/s1', headers={'If-None-Match': etag}).status_code == 304
+    assert client.get('/stations/s1').get_json() == {'id': 's1', 'calls': 1}
+
+    cache.stations_changed({'s2': (-23.55, -46.63)})
+    assert client.get('/stations/s1', headers={'If-None-Match': etag}).status_code == 304
+
+    cache.stations_changed({'s1': (-23.55, -46.63)})
+    changed = client.get('/stations/s1', headers={'If-None-Match': etag})
+    assert changed.status_code == 200 and changed.get_json()['calls'] == 2
+    assert changed.headers['ETag'] != etag
+
+
+def test_area_queries_snap_coordinates_and_follow_cells():
+    """Testa a chave com coordenadas arredondadas e a invalidação pela célula do posto."""
+    cache = ResponseCache(client=lambda: None)
+    app = make_app(cache)
+    client = app.test_client()
+
+    client.get('/nearby?latitude=-23.55001&longitude=-46.63001')
+    client.get('/nearby?longitude=-46.63004&latitude=-23.55004')
+    assert app.calls == 1
+
+    cache.stations_changed({'longe': (-3.1, -60.0)})
+    client.get('/nearby?latitude=-23.55&longitude=-46.63')
+    assert app.calls == 1
+
+    cache.stations_changed({'perto': (-23.56, -46.62)})
+    client.get('/nearby?latitude=-23.55&longitude=-46.63')
+    assert app.calls == 2
+    assert cell_of(-23.56, -46.62) in area_dependencies(-23.55, -46.63, 5)
+
+
+def test_versions_are_shared_between_processes_through_redis():
+    """Testa que o ETag de um processo vale no outro e a invalidação chega a ambos."""
+    fakeredis = pytest.importorskip('fakeredis')
+    server = fakeredis.FakeServer()
+    first = ResponseCache(client=lambda: fakeredis.FakeRedis(server=server))
+    second = ResponseCache(client=lambda: fakeredis.FakeRedis(server=server))
+    first_client, second_client = make_app(first).test_client(), make_app(second).test_client()
+
+    etag = first_client.get('/stations/s1').headers['ETag']
+    assert second_client.get('/stations/s1', headers={'If-None-Match': etag}).status_code == 304
+
+    second.invalidate_all()
+    assert first_client.get('/stations/s1', headers={'If-None-Match': etag}).status_code == 200
+
+
+def test_orm_writes_invalidate_after_commit(monkeypatch):
+    """Testa que preço gravado pelo ORM invalida o posto só depois do commit."""
+    cache = ResponseCache(client=lambda: None)
+    monkeypatch.setattr(response_cache_module, 'response_cache', cache)
+    engine = create_engine('sqlite://')
+    Base.metadata.create_all(engine)
+    with Session(engine) as session:
+        session.add(Station(id='s1', latitude=-23.55, longitude=-46.63))
+        session.commit()
+    before = cache.versions(['station:s1', cell_of(-23.55, -46.63)])
+
+    with Session(engine) as session:
+        session.add(Price(id='p1', gas_station_id='s1', price=5.89))
+        session.flush()
+        session.rollback()
+    assert cache.versions(['station:s1', cell_of(-23.55, -46.63)]) == before
+
+    with Session(engine) as session:
+        session.add(Price(id='p1', gas_station_id='s1', price=5.89))
+        session.commit()
+    after = cache.versions(['station:s1', cell_of(-23.55, -46.63)])
+    assert after[1:] == (before[1] + 1, before[2] + 1)
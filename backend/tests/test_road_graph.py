@@ -0,0 +1,108 @@
+import heapq
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.services.road_graph import RoadGraph
+
+# Quadrado de ~1,1 km de lado: 0 -- 1 (rodovia) e 0 -- 2 -- 1 (ruas locais)
+LATITUDES = [-26.90, -26.90, -26.91, -26.95]
+LONGITUDES = [-48.70, -48.69, -48.695, -48.70]
+
+
+def small_graph():
+    return RoadGraph.from_edges(
+        LATITUDES, LONGITUDES,
+        sources=[0, 0, 2, 3], targets=[1, 2, 1, 0],
+        lengths_m=[1500, 700, 700, 5500], speeds_kmh=[100, 30, 30, 60],
+        oneway=[False, False, False, True]
+    )
+
+
+def dijkstra(graph, source):
+    times = {source: 0.0}
+    heap = [(0.0, source)]
+    while heap:
+        time_s, node = heapq.heappop(heap)
+        if time_s > times[node]:
+            continue
+        for edge in range(graph.indptr[node], graph.indptr[node + 1]):
+            neighbor = int(graph.targets[edge])
+            arrival = time_s + float(graph.times_s[edge])
+            if arrival < times.get(neighbor, np.inf):
+                times[neighbor] = arrival
+                heapq.heappush(heap, (arrival, neighbor))
+    return times
+
+
+def test_prefers_faster_road_over_shorter_one():
+    """Testa que o A* escolhe o caminho mais rápido, não o mais curto."""
+    path, length_m, time_s = small_graph().shortest_path(0, 1)
+
+    assert path == [0, 1]
+    assert length_m == pytest.approx(1500)
+    assert time_s == pytest.approx(1500 / (100 / 3.6))
+
+
+def test_one_way_edges_are_respected():
+    """Testa que a aresta de mão única só vale no sentido permitido."""
+    graph = small_graph()
+
+    assert graph.shortest_path(3, 1)[0] == [3, 0, 1]
+    assert graph.shortest_path(0, 3) is None
+
+
+def test_astar_matches_dijkstra_on_random_grid():
+    """Testa o A* contra Dijkstra numa grade com velocidades aleatórias."""
+    rng = np.random.default_rng(3)
+    size = 12
+    rows, columns = np.divmod(np.arange(size * size), size)
+    latitudes, longitudes = -27.0 + rows * 0.005, -48.7 + columns * 0.005
+    right = np.flatnonzero(columns < size - 1)
+    down = np.flatnonzero(rows < size - 1)
+    sources = np.concatenate([right, down])
+    targets = np.concatenate([right + 1, down + size])
+    graph = RoadGraph.from_edges(latitudes, longitudes, sources, targets,
+                                 lengths_m=np.full(len(sources), 550.0),
+                                 speeds_kmh=rng.uniform(20, 90, len(sources)))
+
+    expected = dijkstra(graph, 0)
+    for target in rng.choice(size * size, 10, replace=False):
+        assert graph.shortest_path(0, int(target))[2] == pytest.approx(expected[int(target)], rel=1e-5)
+
+
+def test_route_has_maps_service_shape_and_snaps_to_nodes():
+    """Testa o formato de get_route e o encaixe dos pontos no nó mais próximo."""
+    from googlemaps.convert import decode_polyline
+
+    graph = small_graph()
+    assert graph.nearest_node(-26.9005, -48.6905) == 1
+    assert graph.nearest_node(-20.0, -40.0) is None
+
+    route = graph.route(-26.9001, -48.7001, -26.9001, -48.6899)
+    assert set(route) == {'distance_km', 'duration_minutes', 'route_points', 'polyline',
+                          'start_address', 'end_address'}
+    assert route['distance_km'] == pytest.approx(1.5)
+    assert route['route_points'][-1] == {'latitude': LATITUDES[1], 'longitude': LONGITUDES[1]}
+    assert len(decode_polyline(route['polyline'])) == 2
+
+
+def test_osm_tables_round_trip(tmp_path):
+    """Testa a montagem a partir das tabelas do OSM e o arquivo .npz."""
+    nodes = pd.DataFrame({'id': [101, 202, 303], 'lat': LATITUDES[:3], 'lon': LONGITUDES[:3]})
+    edges = pd.DataFrame({
+        'u': [101, 101, 303], 'v': [202, 303, 202], 'length': [1500, 700, 700],
+        'highway': ['motorway', 'residential', 'residential'],
+        'maxspeed': ['', '20', None], 'oneway': ['no', 'yes', 'yes']
+    })
+    graph = RoadGraph.from_osm_tables(nodes, edges)
+    graph.save(tmp_path / 'grafo.npz')
+    loaded = RoadGraph.load(tmp_path / 'grafo.npz')
+
+    assert len(loaded.targets) == 4
+    np.testing.assert_array_equal(loaded.indptr, graph.indptr)
+    # 303 -> 202 é mão única: de 202 para 303 só dando a volta por 101, com maxspeed 20 na rua local
+    path, _, time_s = loaded.shortest_path(1, 2)
+    assert path == [1, 0, 2]
+    assert time_s == pytest.approx(1500 / (100 / 3.6) + 700 / (20 / 3.6))
@@ -0,0 +1,161 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, select, text
+
+from src.services.refuel_planner import plan_refuel
+from src.services.route_memo import RouteMemo, corridor, densify, route_key, route_recommendations_table, routes_table
+
+ORIGIN = (-26.90, -48.70)
+DESTINATION = (-26.90, -48.60)
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine('sqlite://')
+    routes_table.metadata.create_all(engine)
+    with engine.begin() as connection:
+        connection.execute(text(
+            'CREATE TABLE gas_stations (id VARCHAR(36) PRIMARY KEY, name VARCHAR(255), brand VARCHAR(100), '
+            'address TEXT, latitude NUMERIC, longitude NUMERIC, is_active BOOLEAN)'
+        ))
+        connection.execute(text(
+            'CREATE TABLE fuel_prices (id VARCHAR(36) PRIMARY KEY, gas_station_id VARCHAR(36), '
+            'fuel_type VARCHAR(20), price NUMERIC, source_confidence NUMERIC, is_active BOOLEAN, reported_at TIMESTAMP)'
+        ))
+        connection.execute(text(
+            "INSERT INTO gas_stations VALUES "
+            "('near', 'Posto Rota', 'Shell', 'BR-101', -26.901, -48.65, 1), "
+            "('cheap', 'Posto Barato', 'Ipiranga', 'BR-101', -26.902, -48.62, 1), "
+            "('far', 'Posto Longe', 'BR', 'Centro', -26.99, -48.65, 1)"
+        ))
+        connection.execute(text(
+            "INSERT INTO fuel_prices VALUES "
+            "('p1', 'near', 'gasoline', 5.90, 0.8, 1, '2024-01-01 08:00'), "
+            "('p2', 'cheap', 'gasoline', 5.50, 0.8, 1, '2024-01-01 08:00'), "
+            "('p3', 'far', 'gasoline', 4.90, 0.8, 1, '2024-01-01 08:00')"
+        ))
+    return engine
+
+
+def test_route_key_ignores_direction_and_small_moves():
+    """Testa que ida, volta e pontos na mesma célula compartilham a chave."""
+    key, reverse = route_key(ORIGIN, DESTINATION, 'gasoline')
+    back, back_reverse = route_key(DESTINATION, ORIGIN, 'gasoline')
+
+    assert key == back and reverse != back_reverse
+    assert route_key((ORIGIN[0] + 0.0005, ORIGIN[1]), DESTINATION, 'gasoline')[0] == key
+    assert route_key(ORIGIN, DESTINATION, 'ethanol')[0] != key
+
+
+def test_corridor_distance_and_position():
+    """Testa a distância até o trajeto densificado e a posição relativa na rota."""
+    assert len(densify([ORIGIN, DESTINATION], step_km=1.0)) > 10
+
+    distances, positions = corridor([-26.90, -26.95], [-48.65, -48.65], [ORIGIN, DESTINATION])
+    assert distances[0] == pytest.approx(0.0, abs=0.3)
+    assert distances[1] == pytest.approx(5.56, abs=0.1)
+    assert positions[0] == pytest.approx(0.5, abs=0.05)
+
+
+def test_repeat_route_is_served_from_memo(engine):
+    """Testa que a segunda consulta usa o corredor gravado sem pedir direções."""
+    memo = RouteMemo()
+    calls = []
+
+    def directions():
+        calls.append(1)
+        return None
+
+    with engine.begin() as connection:
+        first = memo.recommend(connection, ORIGIN, DESTINATION, 'gasoline', directions, user_profile_id='u1')
+        again = memo.recommend(connection, DESTINATION, ORIGIN, 'gasoline', directions, user_profile_id='u2')
+
+    assert len(calls) == 1
+    assert not first['cached'] and again['cached']
+    assert [r['station']['id'] for r in first['recommendations']] == ['cheap', 'near']
+    assert again['rescored'] == 0
+    positions = {r['station']['id']: r['route_info']['position_on_route'] for r in again['recommendations']}
+    assert positions['near'] == pytest.approx(0.5, abs=0.05)
+
+    with engine.connect() as connection:
+        assert len(connection.execute(select(routes_table)).all()) == 1
+        assert len(connection.execute(select(route_recommendations_table)).all()) == 2
+
+
+def test_only_changed_prices_are_rescored(engine):
+    """Testa que só o posto com preço novo é pontuado de novo e gravado."""
+    memo = RouteMemo()
+    with engine.begin() as connection:
+        memo.recommend(connection, ORIGIN, DESTINATION, 'gasoline', user_profile_id='u1')
+        connection.execute(text("UPDATE fuel_prices SET is_active = 0 WHERE id = 'p1'"))
+        connection.execute(text("INSERT INTO fuel_prices VALUES ('p4', 'near', 'gasoline', 4.99, 0.8, 1, '2024-01-02 08:00')"))
+
+        result = memo.recommend(connection, ORIGIN, DESTINATION, 'gasoline', user_profile_id='u1')
+        stored = dict(connection.execute(
+            select(route_recommendations_table.c.gas_station_id, route_recommendations_table.c.fuel_price_id)
+        ).all())
+
+    assert result['cached'] and result['rescored'] == 1
+    assert result['recommendations'][0]['station']['id'] == 'near'
+    assert stored == {'near': 'p4', 'cheap': 'p2'}
+
+
+def test_only_the_latest_active_price_of_each_station_is_used(engine):
+    """Testa que um posto com preços ativos de vários dias entra uma vez só, com o preço mais recente."""
+    memo = RouteMemo()
+    with engine.begin() as connection:
+        connection.execute(text(
+            "INSERT INTO fuel_prices VALUES ('p0', 'near', 'gasoline', 4.50, 0.8, 1, '2023-12-31 08:00')"
+        ))
+        first = memo.recommend(connection, ORIGIN, DESTINATION, 'gasoline', user_profile_id='u1')
+        connection.execute(text(
+            "INSERT INTO fuel_prices VALUES ('p5', 'cheap', 'gasoline', 4.00, 0.8, 1, '2023-12-30 08:00')"
+        ))
+        again = memo.recommend(connection, ORIGIN, DESTINATION, 'gasoline', user_profile_id='u1')
+
+    for result in (first, again):
+        assert [r['station']['id'] for r in result['recommendations']] == ['cheap', 'near']
+    assert again['cached'] and again['rescored'] == 0
+    assert {r['station']['id']: r['fuel']['price'] for r in again['recommendations']} == {
+        'cheap': 5.50, 'near': 5.90
+    }
+
+
+def test_refuel_plan_sees_each_station_once_at_its_latest_price(engine):
+    """Testa que o planejador recebe um candidato por posto, com o preço mais recente, como na rota /refuel-plan."""
+    memo = RouteMemo()
+    with engine.begin() as connection:
+        connection.execute(text(
+            "INSERT INTO fuel_prices VALUES "
+            "('p0', 'near', 'gasoline', 3.00, 0.8, 1, '2023-12-30 08:00'), "
+            "('p5', 'near', 'gasoline', 3.50, 0.8, 1, '2023-12-31 08:00')"
+        ))
+        corridor_result = memo.corridor_stations(connection, ORIGIN, DESTINATION, 'gasoline')
+
+    stations = corridor_result['stations']
+    assert sorted((s['gas_station_id'], s['scored_price']) for s in stations) == [('cheap', 5.50), ('near', 5.90)]
+
+    plan = plan_refuel(
+        along_km=[s['along_km'] for s in stations],
+        prices=[s['scored_price'] for s in stations],
+        detour_km=[s['detour_distance_km'] for s in stations],
+        route_km=corridor_result['route']['distance_km'],
+        tank_capacity=2.0, consumption_per_100km=20.0, initial_fuel=1.5
+    )
+    assert plan.feasible and plan.stops
+    stops = [(stations[stop.index]['gas_station_id'], stop.price) for stop in plan.stops]
+    assert len({station_id for station_id, _ in stops}) == len(stops)
+    assert all(price == {'near': 5.90, 'cheap': 5.50}[station_id] for station_id, price in stops)
+
+
+def test_stale_route_is_rebuilt(engine):
+    """Testa que um corredor mais antigo que max_age é recalculado e substituído."""
+    memo = RouteMemo(max_age=timedelta(days=1))
+    with engine.begin() as connection:
+        memo.recommend(connection, ORIGIN, DESTINATION, 'gasoline', user_profile_id='u1',
+                       now=datetime(2024, 1, 1))
+        result = memo.recommend(connection, ORIGIN, DESTINATION, 'gasoline', user_profile_id='u1',
+                                now=datetime(2024, 1, 3))
+        assert not result['cached']
+        assert len(connection.execute(select(routes_table)).all()) == 1
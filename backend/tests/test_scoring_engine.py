@@ -0,0 +1,69 @@
+import numpy as np
+import pytest
+
+from src.services.scoring_engine import (
+    NEUTRAL_SCORE, WEIGHT_PROFILES, criterion_scores, resolve_weights, route_detour_km, score_candidates, top_k
+)
+
+
+def test_balanced_profile_matches_route_formula():
+    """Testa que o perfil padrão reproduz a fórmula histórica do RouteRecommendation."""
+    score = score_candidates([5.0], detour_km=[1.0], detour_minutes=[10], confidence=[0.8])[0]
+
+    # preço 6, distância 8, tempo 8, confiabilidade 8
+    assert score == pytest.approx(6 * 0.4 + 8 * 0.3 + 8 * 0.2 + 8 * 0.1)
+
+
+def test_unknown_values_get_neutral_score():
+    """Testa que desvio, avaliação e confiança ausentes recebem a nota neutra."""
+    scores = criterion_scores([5.5], reference_price=5.5)
+
+    assert np.all(scores == NEUTRAL_SCORE)
+
+
+def test_reference_price_rewards_savings():
+    """Testa que, com referência, o posto mais barato recebe nota de preço maior."""
+    scores = criterion_scores([5.0, 5.5, 6.0], reference_price=5.5)
+
+    assert list(scores[0]) == pytest.approx([9.55, 5.0, 0.45], abs=0.01)
+
+
+def test_profiles_change_ranking():
+    """Testa que o perfil do usuário troca o posto barato e longe pelo próximo."""
+    prices, detours = [5.2, 5.6], [4.0, 0.5]
+
+    economy = score_candidates(prices, detours, reference_price=5.6, weights=resolve_weights('economy'))
+    convenience = score_candidates(prices, detours, reference_price=5.6, weights=resolve_weights('convenience'))
+    assert top_k(economy, 1)[0] == 0
+    assert top_k(convenience, 1)[0] == 1
+
+
+def test_resolve_weights_overrides_and_validation():
+    """Testa ajustes de peso por critério e a rejeição de perfis/critérios inválidos."""
+    weights = resolve_weights('balanced', {'rating': 0.5})
+    assert weights.sum() == pytest.approx(1.0)
+    assert weights[-1] == pytest.approx(0.5 / 1.5)
+
+    with pytest.raises(ValueError):
+        resolve_weights('turbo')
+    with pytest.raises(ValueError):
+        resolve_weights(weights={'color': 1})
+    assert set(WEIGHT_PROFILES) >= {'balanced', 'economy', 'convenience'}
+
+
+def test_top_k_orders_best_first_and_skips_nan():
+    """Testa o top-k por seleção parcial, do maior para o menor score."""
+    scores = np.array([3.0, np.nan, 9.0, 1.0, 7.0])
+
+    assert list(top_k(scores, 2)) == [2, 4]
+    assert list(top_k(scores, 10)) == [2, 4, 0, 3]
+    assert len(top_k(scores, 0)) == 0
+
+
+def test_route_detour():
+    """Testa o desvio origem -> posto -> destino e a ausência de origem."""
+    origin, destination = (-23.55, -46.63), (-23.60, -46.69)
+
+    on_route = route_detour_km([origin[0]], [origin[1]], origin, destination)
+    assert on_route[0] == pytest.approx(0.0, abs=1e-9)
+    assert np.isnan(route_detour_km([-23.5], [-46.6], None)).all()
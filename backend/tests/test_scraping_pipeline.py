@@ -0,0 +1,148 @@
+import os
+import pytest
+import requests
+from flask import Flask
+
+from src.services.fuel_scraper import FuelPriceScraper
+from src.services.scraping_pipeline import HostRateLimiter, ScrapeJob, ScrapingPipeline, TokenBucket
+
+FIXTURES = os.path.join(os.path.dirname(__file__), 'fixtures', 'scraping')
+
+
+def load_fixture(name):
+    with open(os.path.join(FIXTURES, name), 'rb') as f:
+        return f.read()
+
+
+class StubSession(requests.Session):
+    """Sessão HTTP offline: responde a partir das fixtures e honra If-None-Match."""
+
+    def __init__(self, routes):
+        super().__init__()
+        self.routes = routes
+        self.calls = []
+
+    def get(self, url, headers=None, timeout=None, **kwargs):
+        headers = headers or {}
+        self.calls.append((url, dict(headers)))
+
+        response = requests.Response()
+        response.url = url
+        if url not in self.routes:
+            response.status_code = 404
+            return response
+
+        body, etag = self.routes[url]
+        if etag and headers.get('If-None-Match') == etag:
+            response.status_code = 304
+            return response
+
+        response.status_code = 200
+        response._content = body
+        if etag:
+            response.headers['ETag'] = etag
+        return response
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+@pytest.fixture
+def app():
+    app = Flask(__name__)
+    app.config['SCRAPER_REQUESTS_PER_SECOND'] = 1000
+    with app.app_context():
+        yield app
+
+
+def test_token_bucket_spaces_requests():
+    """Testa que o bucket libera uma requisição a cada 1/rate segundos após a rajada."""
+    clock = FakeClock()
+    bucket = TokenBucket(rate=2, capacity=2, clock=clock, sleep=clock.sleep)
+
+    for _ in range(6):
+        bucket.acquire()
+
+    # 2 tokens da rajada inicial + 4 a 0,5s cada
+    assert clock.now == pytest.approx(2.0)
+
+
+def test_rate_limiter_is_per_host():
+    """Testa que hosts diferentes não compartilham o mesmo bucket."""
+    limiter = HostRateLimiter(rate=1, host_rates={'api.example.com': 5})
+
+    site = limiter.bucket_for('https://site.example.com/a')
+    assert limiter.bucket_for('https://site.example.com/b') is site
+    assert limiter.bucket_for('https://api.example.com/x').rate == 5
+    assert site.rate == 1
+
+
+def test_rate_limiter_rejects_non_positive_rates():
+    """Testa que taxa zero ou negativa é recusada na configuração."""
+    with pytest.raises(ValueError):
+        TokenBucket(rate=0)
+    with pytest.raises(ValueError):
+        HostRateLimiter(rate=1, host_rates={'api.example.com': 0})
+
+
+def test_conditional_request_skips_unchanged_page():
+    """Testa que a segunda busca envia If-None-Match e recebe 304."""
+    url = 'https://site.example.com/precos'
+    session = StubSession({url: (load_fixture('station_site.html'), '"v1"')})
+    pipeline = ScrapingPipeline(session=session, rate_limiter=HostRateLimiter(rate=1000))
+
+    assert pipeline.fetch(url).status_code == 200
+    assert pipeline.fetch(url) is None
+    assert session.calls[1][1]['If-None-Match'] == '"v1"'
+
+
+def test_pipeline_reports_errors_per_job():
+    """Testa que a falha de uma fonte não interrompe as demais."""
+    ok_url = 'https://site.example.com/ok'
+    session = StubSession({ok_url: (b'ok', None)})
+    pipeline = ScrapingPipeline(session=session, rate_limiter=HostRateLimiter(rate=1000))
+
+    jobs = [
+        ScrapeJob('ok', ok_url, lambda response: [{'body': response.text}]),
+        ScrapeJob('missing', 'https://site.example.com/missing', lambda response: []),
+    ]
+    results = {result.job.name: result for result in pipeline.run(jobs)}
+
+    assert results['ok'].prices == [{'body': 'ok'}]
+    assert results['missing'].error is not None
+
+
+def test_full_cycle_streams_each_source_to_writer(app, monkeypatch):
+    """Testa o ciclo completo offline: cada fonte é gravada separadamente."""
+    station_url = 'https://posto.example.com/'
+    session = StubSession({
+        FuelPriceScraper.PETROBRAS_URL: (load_fixture('petrobras_prices.html'), None),
+        FuelPriceScraper.COMBUSTIVEL_API_URL: (load_fixture('combustivel_api.json'), None),
+        station_url: (load_fixture('station_site.html'), None),
+    })
+    scraper = FuelPriceScraper(session=session)
+
+    batches = []
+
+    def fake_update(prices):
+        batches.append(prices)
+        return {'processed': len(prices), 'updated': 0, 'created': len(prices), 'errors': 0}
+
+    monkeypatch.setattr(scraper, 'update_database_prices', fake_update)
+
+    result = scraper.run_full_scraping_cycle(station_urls=[station_url])
+
+    assert result['total_scraped'] == 6
+    assert result['update_stats']['created'] == 6
+    assert len(batches) == 3
+    assert result['sources']['combustivel_api'] == 2
+    fuel_types = sorted(p['fuel_type'] for batch in batches for p in batch)
+    assert fuel_types == ['diesel', 'ethanol', 'ethanol', 'gasoline', 'gasoline', 'gnv']
@@ -0,0 +1,97 @@
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from types import SimpleNamespace
+
+import pytest
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+from sqlalchemy import column, create_engine, select, table, text
+
+from src import serializers
+from src.serializers import FUEL_PRICE_SERIALIZER, STATION_SERIALIZER, FastJSONProvider
+
+NOW = datetime.now(timezone.utc)
+
+
+def price_object(**overrides):
+    values = dict(id='p1', gas_station_id='s1', fuel_type='diesel_s10', price=Decimal('6.190'), source='anp',
+                  source_confidence=Decimal('0.80'), reported_at=NOW - timedelta(hours=2), verified_at=None,
+                  verified_by=None, is_active=True, created_at=NOW, updated_at=None)
+    values.update(overrides)
+    return SimpleNamespace(**values)
+
+
+def test_object_and_row_paths_build_the_same_payload():
+    """Testa que from_object e from_row geram o mesmo dicionário do antigo to_dict."""
+    price = price_object()
+    expected = {
+        'id': 'p1', 'gas_station_id': 's1', 'fuel_type': 'diesel_s10', 'fuel_type_display': 'Diesel S10',
+        'price': 6.19, 'source': 'anp', 'source_confidence': 0.8, 'reported_at': price.reported_at.isoformat(),
+        'verified_at': None, 'verified_by': None, 'is_active': True, 'is_recent': True,
+        'created_at': NOW.isoformat(), 'updated_at': None
+    }
+
+    assert FUEL_PRICE_SERIALIZER.from_object(price) == expected
+    row = tuple(getattr(price, name) for name in FUEL_PRICE_SERIALIZER.columns)
+    assert FUEL_PRICE_SERIALIZER.from_row(row) == expected
+    assert not FUEL_PRICE_SERIALIZER.from_object(price_object(reported_at=NOW - timedelta(days=2)))['is_recent']
+
+
+def test_joined_row_tuples_are_split_between_serializers():
+    """Testa a consulta só de colunas com posto e preço na mesma tupla."""
+    engine = create_engine('sqlite://')
+    with engine.begin() as connection:
+        connection.execute(text(
+            'CREATE TABLE gas_stations (' + ', '.join(f'{name} TEXT' for name in STATION_SERIALIZER.columns) + ')'
+        ))
+        connection.execute(text(
+            'CREATE TABLE fuel_prices (' + ', '.join(f'{name} TEXT' for name in FUEL_PRICE_SERIALIZER.columns) + ')'
+        ))
+        connection.execute(text(
+            "INSERT INTO gas_stations (id, name, latitude, longitude, data_confidence, is_active) "
+            "VALUES ('s1', 'Posto Sul', '-23.5', '-46.6', '0.5', 1)"
+        ))
+        connection.execute(text(
+            "INSERT INTO fuel_prices (id, gas_station_id, fuel_type, price, source) VALUES ('p1', 's1', 'gnv', '4.5', 'anp')"
+        ))
+
+    stations = table('gas_stations', *[column(name) for name in STATION_SERIALIZER.columns])
+    prices = table('fuel_prices', *[column(name) for name in FUEL_PRICE_SERIALIZER.columns])
+    station_columns = STATION_SERIALIZER.select_columns(stations)
+    with engine.connect() as connection:
+        row = connection.execute(
+            select(*station_columns, *FUEL_PRICE_SERIALIZER.select_columns(prices))
+            .join_from(prices, stations, prices.c.gas_station_id == stations.c.id)
+        ).one()
+
+    station = STATION_SERIALIZER.from_row(row[:len(station_columns)])
+    price = FUEL_PRICE_SERIALIZER.from_row(row[len(station_columns):])
+    assert (station['id'], station['latitude'], station['name']) == ('s1', -23.5, 'Posto Sul')
+    assert (price['id'], price['price'], price['fuel_type_display']) == ('p1', 4.5, 'GNV')
+
+
+@pytest.mark.parametrize('payload', [
+    {'b': 1, 'a': [1.5, None, True], 'quando': NOW, 'preco': Decimal('5.99')},
+    {7: 'chave numérica', 3: None},
+    [{'z': 'ç', 'a': {'y': 1, 'x': 2}}],
+    {'grande': 2 ** 70},
+])
+def test_fast_provider_matches_flask_default(payload):
+    """Testa que o provider rápido gera o mesmo JSON do provider padrão do Flask."""
+    pytest.importorskip('orjson')
+    app = Flask(__name__)
+    fast, default = FastJSONProvider(app), DefaultJSONProvider(app)
+
+    assert fast.loads(fast.dumps(payload)) == default.loads(default.dumps(payload))
+    with app.app_context():
+        assert fast.loads(fast.response(payload).get_data()) == default.loads(default.response(payload).get_data())
+        assert list(fast.loads(fast.response(payload).get_data())) == list(default.loads(default.response(payload).get_data()))
+
+
+def test_fast_provider_falls_back_without_orjson(monkeypatch):
+    """Testa que sem orjson o provider usa o json da biblioteca padrão."""
+    monkeypatch.setattr(serializers, 'orjson', None)
+    app = Flask(__name__)
+    app.json = FastJSONProvider(app)
+    with app.app_context():
+        assert app.json.response({'b': 1, 'a': NOW}).get_json() == {'a': DefaultJSONProvider.default(NOW), 'b': 1}
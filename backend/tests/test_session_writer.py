@@ -0,0 +1,159 @@
+import time
+from datetime import datetime, timezone
+
+import pytest
+from sqlalchemy import create_engine, select, text
+
+from src.services.session_writer import SessionWriter, hash_token, serialize_session, user_sessions_table
+
+EXPIRES = datetime(2030, 1, 1, tzinfo=timezone.utc)
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'sessions.db'}")
+    user_sessions_table.metadata.create_all(engine)
+    with engine.begin() as connection:
+        connection.execute(text(
+            'CREATE TABLE users (id VARCHAR(36) PRIMARY KEY, last_login TIMESTAMP, sessions_revoked_before TIMESTAMP)'
+        ))
+        connection.execute(text("INSERT INTO users (id) VALUES ('u1'), ('u2')"))
+    return engine
+
+
+def wait_for(condition, timeout=3.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+def writer():
+    # Intervalo longo: nos testes o lote só é gravado por flush() explícito
+    return SessionWriter(flush_interval=60)
+
+
+def test_logins_are_written_in_one_batch(engine):
+    """Testa que vários logins viram um lote só, com last_login coalescido por usuário."""
+    sessions = writer()
+    for index in range(30):
+        sessions.record_login(engine, 'u1' if index % 2 else 'u2', f'access-{index}', f'refresh-{index}',
+                              EXPIRES, user_agent='app/1.0', ip_address='10.0.0.1')
+
+    with engine.connect() as connection:
+        assert connection.execute(select(user_sessions_table)).all() == []
+
+    sessions.flush()
+    with engine.connect() as connection:
+        assert len(connection.execute(select(user_sessions_table)).all()) == 30
+        last_logins = dict(connection.execute(text('SELECT id, last_login FROM users')).all())
+    assert sessions.batches_written == 1
+    assert all(last_logins.values())
+
+
+def test_registration_does_not_touch_last_login(engine):
+    """Testa que a sessão do cadastro não altera last_login."""
+    sessions = writer()
+    sessions.record_login(engine, 'u1', 'a', 'r', EXPIRES, update_last_login=False)
+    sessions.flush()
+
+    with engine.connect() as connection:
+        assert connection.execute(text("SELECT last_login FROM users WHERE id = 'u1'")).scalar() is None
+
+
+def test_active_sessions_cache_follows_logins_and_revocations(engine):
+    """Testa o cache de /sessions: inclui logins pendentes e some na revogação."""
+    sessions = writer()
+    sessions.record_login(engine, 'u1', 'a1', 'r1', EXPIRES)
+    first = sessions.active_sessions(engine, 'u1')
+    assert len(first) == 1
+
+    sessions.record_login(engine, 'u1', 'a2', 'r2', EXPIRES)
+    cached = sessions.active_sessions(engine, 'u1')
+    assert len(cached) == 2
+    assert 'token_hash' not in serialize_session(cached[0])
+
+    assert sessions.revoke(engine, 'u1', token_hash=hash_token('a1')) == 1
+    assert [session['token_hash'] for session in sessions.active_sessions(engine, 'u1')] == [hash_token('a2')]
+
+
+def test_logout_all_revokes_sessions_still_in_queue(engine):
+    """Testa que /logout-all esvazia a fila antes de revogar."""
+    sessions = writer()
+    for index in range(5):
+        sessions.record_login(engine, 'u1', f'a{index}', f'r{index}', EXPIRES)
+
+    assert sessions.revoke(engine, 'u1') == 5
+    assert sessions.active_sessions(engine, 'u1') == []
+
+
+def active_rows(engine):
+    with engine.connect() as connection:
+        return connection.execute(
+            select(user_sessions_table.c.token_hash).where(user_sessions_table.c.is_active.is_(True))
+        ).scalars().all()
+
+
+def test_logout_all_reaches_sessions_queued_in_another_process(engine):
+    """Testa que a marca de revogação alcança a sessão que estava na fila de outro worker."""
+    worker, other = writer(), writer()
+    worker.record_login(engine, 'u1', 'a1', 'r1', EXPIRES)
+
+    assert other.revoke(engine, 'u1') == 0
+    worker.flush()
+    assert active_rows(engine) == []
+
+    # Logins depois da revogação continuam valendo
+    worker.record_login(engine, 'u1', 'a2', 'r2', EXPIRES)
+    worker.flush()
+    assert active_rows(engine) == [hash_token('a2')]
+
+
+def test_logout_reaches_session_queued_in_another_process(engine):
+    """Testa que o logout de uma sessão ainda não gravada a deixa inativa quando o lote chega."""
+    worker, other = writer(), writer()
+    worker.record_login(engine, 'u1', 'a1', 'r1', EXPIRES)
+    worker.record_login(engine, 'u1', 'a2', 'r2', EXPIRES)
+
+    assert other.revoke(engine, 'u1', token_hash=hash_token('a1')) == 0
+    worker.flush()
+    assert active_rows(engine) == [hash_token('a2')]
+
+
+def test_failed_batch_is_retried(engine, tmp_path):
+    """Testa que um lote que falha volta para a fila e é gravado na tentativa seguinte."""
+    sessions = writer()
+    sessions.record_login(engine, 'u1', 'a1', 'r1', EXPIRES)
+    sessions.engine = create_engine(f"sqlite:///{tmp_path / 'inexistente' / 'sessions.db'}")
+
+    sessions.flush()
+    assert sessions.batches_failed == 1 and active_rows(engine) == []
+
+    sessions.engine = engine
+    sessions.flush()
+    assert sessions.batches_written == 1 and active_rows(engine) == [hash_token('a1')]
+
+
+def test_sessions_cache_is_invalidated_across_processes(engine):
+    """Testa que login gravado e revogação em um worker limpam o cache de /sessions dos outros."""
+    fakeredis = pytest.importorskip('fakeredis')
+    server = fakeredis.FakeServer()
+    clients = [fakeredis.FakeRedis(server=server) for _ in range(2)]
+    worker = SessionWriter(flush_interval=60, client=lambda: clients[0])
+    other = SessionWriter(flush_interval=60, client=lambda: clients[1])
+
+    assert other.active_sessions(engine, 'u1') == []
+    assert wait_for(lambda: other._listener and other._listener.is_alive())
+
+    worker.record_login(engine, 'u1', 'a1', 'r1', EXPIRES)
+    worker.flush()
+    assert wait_for(lambda: other.sessions_cache.get('u1') is None)
+    assert len(other.active_sessions(engine, 'u1')) == 1
+
+    worker.revoke(engine, 'u1')
+    assert wait_for(lambda: other.sessions_cache.get('u1') is None)
+    assert other.active_sessions(engine, 'u1') == []
+    other._listener.stop()
+    worker._listener.stop()
@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+from haversine import haversine
+
+from src.services.price_intelligence import PriceIntelligenceService
+from src.services.price_history_store import PriceHistoryStore
+from src.services.spatial_index import StationGrid, haversine_km
+
+
+def test_haversine_matches_reference_distance():
+    """Testa a distância São Paulo -> Rio de Janeiro contra o pacote haversine."""
+    distance = haversine_km(-23.5505, -46.6333, np.array([-22.9068]), np.array([-43.1729]))[0]
+    assert distance == pytest.approx(haversine((-23.5505, -46.6333), (-22.9068, -43.1729)), rel=1e-3)
+
+
+def test_grid_query_returns_only_stations_inside_radius():
+    """Testa que a busca por raio usa as distâncias exatas, inclusive entre células."""
+    grid = StationGrid(cell_degrees=0.05)
+    grid.insert('perto', -26.910, -48.670)
+    grid.insert('vizinha', -26.950, -48.700)
+    grid.insert('longe', -27.600, -48.550)
+
+    station_ids, distances = grid.query(-26.905, -48.665, radius_km=10)
+
+    assert sorted(station_ids) == ['perto', 'vizinha']
+    assert (distances <= 10).all()
+
+
+def test_grid_moves_station_on_new_position():
+    """Testa que reinserir um posto o remove da célula anterior."""
+    grid = StationGrid()
+    grid.insert('a', -23.5, -46.6)
+    grid.insert('a', -26.9, -48.6)
+
+    assert grid.query(-23.5, -46.6, 5)[0] == []
+    assert grid.query(-26.9, -48.6, 5)[0] == ['a']
+
+
+def test_best_opportunity_uses_user_position():
+    """Testa a busca por posição: só postos no raio, com distância real e top-k."""
+    service = PriceIntelligenceService(history=PriceHistoryStore())
+    stations = {
+        'a': (-26.910, -48.670, 5.49),
+        'b': (-26.920, -48.660, 5.79),
+        'c': (-26.915, -48.665, 5.89),
+        'd': (-26.900, -48.680, 5.59),
+        'longe': (-25.430, -49.270, 4.99),
+    }
+    for station_id, (latitude, longitude, price) in stations.items():
+        service.regions.register(station_id, 'SC', 'Itajaí', latitude, longitude)
+        service.record_price(station_id, 'gasoline', price)
+
+    result = service.find_best_price_opportunity('gasoline', 5, -26.912, -48.668, limit=1)
+
+    assert result['found']
+    assert [o['station_id'] for o in result['all_opportunities']] == ['a']
+    assert 0 < result['best_opportunity']['distance'] < 1
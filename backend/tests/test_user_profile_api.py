@@ -0,0 +1,125 @@
+from datetime import datetime, timedelta
+
+import pytest
+from flask import Flask
+from flask_jwt_extended import JWTManager, create_access_token
+
+from src.database import db
+from src.models.user import User
+from src.models.user_profile import GPSTracking, UserProfile
+from src.models.user_stats import UserStats
+from src.models.trip_summary import TripSummary
+from src.routes.gps_tracking import gps_bp
+from src.routes.user_profile import profile_bp
+from src.services.user_stats_service import get_user_stats, record_trip_point
+
+START = datetime(2025, 3, 1, 8, 0)
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = Flask(__name__)
+    app.config.update(
+        SQLALCHEMY_DATABASE_URI=f'sqlite:///{tmp_path}/profile.db',
+        JWT_SECRET_KEY='segredo-de-teste-com-32-caracteres!'
+    )
+    db.init_app(app)
+    JWTManager(app)
+    app.register_blueprint(profile_bp, url_prefix='/api/profile')
+    app.register_blueprint(gps_bp, url_prefix='/api/gps')
+
+    with app.app_context():
+        db.create_all()
+        user = User(email='motorista@example.com', password='senha-segura', name='Motorista')
+        user.id = 'u1'
+        profile = UserProfile(user_id='u1')
+        db.session.add_all([user, profile])
+        db.session.flush()
+        # Três viagens com 2 pontos cada (a tabela gps_tracking tem as colunas dos dois modelos)
+        points = [
+            {'id': f'p{trip}{point}', 'user_id': 'u1', 'user_profile_id': profile.id, 'trip_id': f't{trip}',
+             'latitude': -23.5, 'longitude': -46.6, 'distance_from_last': 1.5,
+             'recorded_at': START + timedelta(hours=trip, minutes=30 * point),
+             'timestamp': START + timedelta(hours=trip, minutes=30 * point)}
+            for trip in range(3) for point in (1, 0)
+        ]
+        db.session.execute(GPSTracking.__table__.insert(), points)
+        for point in points:
+            record_trip_point('u1', point['trip_id'], point['recorded_at'], point['distance_from_last'])
+        db.session.commit()
+        app.headers = {'Authorization': f"Bearer {create_access_token(identity='u1')}"}
+    yield app
+    with app.app_context():
+        db.session.remove()
+
+
+def test_stats_endpoint_reads_the_counters(app):
+    """Testa o /api/profile/stats com os contadores materializados a partir das tabelas de origem."""
+    response = app.test_client().get('/api/profile/stats', headers=app.headers)
+
+    assert response.status_code == 200
+    tracking = response.get_json()['data']['tracking']
+    assert tracking['total_gps_points'] == 6 and tracking['unique_trips'] == 3
+
+
+def test_trips_endpoint_pages_trips_with_total(app):
+    """Testa o /api/profile/trips: viagens mais recentes primeiro, cursor e total de viagens."""
+    client = app.test_client()
+    first = client.get('/api/profile/trips?per_page=2', headers=app.headers).get_json()['data']
+
+    assert [trip['trip_id'] for trip in first['trips']] == ['t2', 't1']
+    assert first['total_trips'] == 3
+    assert first['trips'][0]['duration_minutes'] == 30 and first['trips'][0]['total_distance_km'] == 3.0
+
+    cursor = first['pagination']['next_cursor']
+    second = client.get(f'/api/profile/trips?per_page=2&cursor={cursor}', headers=app.headers).get_json()['data']
+    assert [trip['trip_id'] for trip in second['trips']] == ['t0']
+    assert second['pagination']['has_next'] is False
+
+
+def test_stats_creation_does_not_commit_the_callers_session(app):
+    """Testa que criar a linha de contadores não faz commit do que está pendente na sessão."""
+    with app.app_context():
+        profile = UserProfile.find_by_user_id('u1')
+        profile.preferred_fuel_type = 'diesel'
+
+        # Sem autoflush: no SQLite a alteração já gravada travaria o INSERT na outra conexão
+        with db.session.no_autoflush:
+            assert get_user_stats('u1').gps_points_total == 6
+        db.session.rollback()
+
+        assert UserProfile.find_by_user_id('u1').preferred_fuel_type == 'gasoline'
+        assert db.session.get(UserStats, 'u1').trips_total == 3
+
+
+def test_trip_points_keep_one_summary_per_trip(app):
+    """Testa o resumo da viagem: só o primeiro ponto abre viagem, início e fim acompanham os pontos."""
+    with app.app_context():
+        assert record_trip_point('u1', 't9', START + timedelta(days=1), 2.0) is True
+        assert record_trip_point('u1', 't9', START + timedelta(days=1, hours=-1), 0.5) is False
+        assert record_trip_point('u1', None, START) is False
+        db.session.commit()
+
+        summary = db.session.get(TripSummary, ('u1', 't9'))
+        assert summary.points_count == 2 and float(summary.total_distance_km) == 2.5
+        assert summary.duration_minutes == 60
+
+
+def test_trip_history_pages_trips_with_two_or_more_points(app):
+    """Testa o /api/gps/trip-history: só viagens com 2+ pontos, pelo início, com cursor."""
+    with app.app_context():
+        db.session.execute(GPSTracking.__table__.insert(), [{
+            'id': 'solo', 'user_id': 'u1', 'user_profile_id': UserProfile.find_by_user_id('u1').id,
+            'trip_id': 'solo', 'latitude': -23.5, 'longitude': -46.6, 'timestamp': START + timedelta(days=2)
+        }])
+        record_trip_point('u1', 'solo', START + timedelta(days=2))
+        db.session.commit()
+
+    client = app.test_client()
+    first = client.get('/api/gps/trip-history?per_page=2', headers=app.headers).get_json()
+    assert [trip['trip_id'] for trip in first['trips']] == ['t2', 't1']
+    assert first['trips'][0]['points_count'] == 2
+
+    cursor = first['pagination']['next_cursor']
+    second = client.get(f'/api/gps/trip-history?per_page=2&cursor={cursor}', headers=app.headers).get_json()
+    assert [trip['trip_id'] for trip in second['trips']] == ['t0']
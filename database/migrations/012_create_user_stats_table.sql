@@ -0,0 +1,30 @@
+-- =====================================================
+-- MIGRAÇÃO 012: CRIAR TABELA DE ESTATÍSTICAS POR USUÁRIO
+-- =====================================================
+
+-- Contadores agregados mantidos incrementalmente pelas rotinas de escrita
+-- (notificações e rastreamento GPS). Substituem os COUNT(*) dos endpoints
+-- de estatísticas; o script reconcile_user_stats.py corrige eventuais
+-- divergências recalculando a partir das tabelas de origem.
+CREATE TABLE IF NOT EXISTS user_stats (
+    user_id INTEGER PRIMARY KEY REFERENCES users(id) ON DELETE CASCADE,
+    notifications_total INTEGER NOT NULL DEFAULT 0,
+    notifications_unread INTEGER NOT NULL DEFAULT 0,
+    notifications_clicked INTEGER NOT NULL DEFAULT 0,
+    gps_points_total INTEGER NOT NULL DEFAULT 0,
+    trips_total INTEGER NOT NULL DEFAULT 0,
+    reconciled_at TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Índice para o job de reconciliação (usuários menos recentemente verificados)
+CREATE INDEX IF NOT EXISTS idx_user_stats_reconciled_at ON user_stats(reconciled_at);
+
+-- Comentários
+COMMENT ON TABLE user_stats IS 'Contadores agregados de notificações e GPS por usuário';
+COMMENT ON COLUMN user_stats.notifications_total IS 'Total de notificações enviadas';
+COMMENT ON COLUMN user_stats.notifications_unread IS 'Notificações ainda não lidas';
+COMMENT ON COLUMN user_stats.notifications_clicked IS 'Notificações clicadas';
+COMMENT ON COLUMN user_stats.gps_points_total IS 'Total de pontos GPS registrados';
+COMMENT ON COLUMN user_stats.trips_total IS 'Total de viagens distintas';
+COMMENT ON COLUMN user_stats.reconciled_at IS 'Última verificação contra as tabelas de origem';
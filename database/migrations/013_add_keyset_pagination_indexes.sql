@@ -0,0 +1,50 @@
+-- =====================================================
+-- MIGRAÇÃO 013: ÍNDICES PARA PAGINAÇÃO POR CURSOR (KEYSET)
+-- =====================================================
+
+-- Os endpoints de histórico (notificações, viagens, pontos GPS e preços por
+-- posto) paginam por cursor ordenando por (data DESC, id DESC). Os índices
+-- compostos abaixo cobrem o filtro por dono + chave de ordenação, de modo que
+-- cada página é uma busca no índice, independente da profundidade.
+--
+-- As colunas de data variam entre as versões do schema (sent_at/created_at,
+-- timestamp/recorded_at), por isso cada índice só é criado se as colunas
+-- existirem na tabela.
+
+CREATE OR REPLACE FUNCTION create_index_if_columns_exist(
+    index_name TEXT, table_name TEXT, index_columns TEXT[], index_expr TEXT
+) RETURNS VOID AS $$
+BEGIN
+    IF (
+        SELECT COUNT(*) FROM information_schema.columns c
+        WHERE c.table_name = create_index_if_columns_exist.table_name
+          AND c.column_name = ANY(index_columns)
+    ) = array_length(index_columns, 1) THEN
+        EXECUTE format('CREATE INDEX IF NOT EXISTS %I ON %I (%s)', index_name, table_name, index_expr);
+    END IF;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Notificações por usuário
+SELECT create_index_if_columns_exist('idx_notifications_user_created_id', 'notifications',
+    ARRAY['user_id', 'created_at', 'id'], 'user_id, created_at DESC, id DESC');
+SELECT create_index_if_columns_exist('idx_notifications_user_sent_id', 'notifications',
+    ARRAY['user_id', 'sent_at', 'id'], 'user_id, sent_at DESC, id DESC');
+SELECT create_index_if_columns_exist('idx_notifications_profile_sent_id', 'notifications',
+    ARRAY['user_profile_id', 'sent_at', 'id'], 'user_profile_id, sent_at DESC, id DESC');
+
+-- Pontos GPS e agrupamento por viagem
+SELECT create_index_if_columns_exist('idx_gps_user_trip_timestamp', 'gps_tracking',
+    ARRAY['user_id', 'trip_id', 'timestamp'], 'user_id, trip_id, timestamp');
+SELECT create_index_if_columns_exist('idx_gps_profile_recorded_id', 'gps_tracking',
+    ARRAY['user_profile_id', 'recorded_at', 'id'], 'user_profile_id, recorded_at DESC, id DESC');
+SELECT create_index_if_columns_exist('idx_gps_profile_trip_recorded', 'gps_tracking',
+    ARRAY['user_profile_id', 'trip_id', 'recorded_at'], 'user_profile_id, trip_id, recorded_at');
+
+-- Histórico de preços por posto
+SELECT create_index_if_columns_exist('idx_fuel_prices_station_reported_id', 'fuel_prices',
+    ARRAY['gas_station_id', 'reported_at', 'id'], 'gas_station_id, reported_at DESC, id DESC');
+SELECT create_index_if_columns_exist('idx_fuel_prices_station_fuel_reported', 'fuel_prices',
+    ARRAY['gas_station_id', 'fuel_type', 'reported_at'], 'gas_station_id, fuel_type, reported_at DESC');
+
+DROP FUNCTION create_index_if_columns_exist(TEXT, TEXT, TEXT[], TEXT);
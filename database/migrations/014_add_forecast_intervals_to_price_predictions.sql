@@ -0,0 +1,29 @@
+-- =====================================================
+-- MIGRAÇÃO 014: INTERVALOS DE PREVISÃO EM PRICE_PREDICTIONS
+-- =====================================================
+
+-- As previsões passam a ser geradas em lote (price_forecasting.py) para todas
+-- as séries posto/combustível pelo job agendado (run_price_forecasts.py) e
+-- servidas pelo /predict-prices a partir desta tabela. Cada linha guarda
+-- também os limites do intervalo de previsão.
+ALTER TABLE price_predictions ADD COLUMN IF NOT EXISTS lower_price DECIMAL(6, 3);
+ALTER TABLE price_predictions ADD COLUMN IF NOT EXISTS upper_price DECIMAL(6, 3);
+
+-- Uma previsão por posto/combustível/dia: remove as duplicatas (mantém a
+-- mais recente) antes de criar a restrição única
+DELETE FROM price_predictions p
+USING price_predictions newer
+WHERE p.gas_station_id = newer.gas_station_id
+  AND p.fuel_type = newer.fuel_type
+  AND p.prediction_date = newer.prediction_date
+  AND p.id < newer.id;
+
+-- A restrição também serve à leitura do /predict-prices (previsões futuras de
+-- um posto/combustível) e ao upsert do lote
+DROP INDEX IF EXISTS idx_price_predictions_station_fuel_date;
+CREATE UNIQUE INDEX IF NOT EXISTS uq_price_predictions_station_fuel_date
+    ON price_predictions(gas_station_id, fuel_type, prediction_date);
+
+-- Comentários
+COMMENT ON COLUMN price_predictions.lower_price IS 'Limite inferior do intervalo de previsão (90%)';
+COMMENT ON COLUMN price_predictions.upper_price IS 'Limite superior do intervalo de previsão (90%)';
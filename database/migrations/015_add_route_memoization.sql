@@ -0,0 +1,21 @@
+-- =====================================================
+-- MIGRAÇÃO 015: MEMOIZAÇÃO DE RECOMENDAÇÕES POR ROTA
+-- =====================================================
+
+-- O /api/gas-stations/route-recommendations grava o corredor de cada rota
+-- (postos candidatos, desvio e posição) em routes/route_recommendations e o
+-- reaproveita para rotas com origem e destino nas mesmas células geohash.
+-- route_key identifica a rota (células + combustível, sem sentido) e
+-- scored_price guarda o preço usado no score, para pontuar de novo só os
+-- postos cujo preço mudou.
+ALTER TABLE routes ADD COLUMN IF NOT EXISTS route_key VARCHAR(64);
+ALTER TABLE routes ADD COLUMN IF NOT EXISTS fuel_type VARCHAR(20);
+ALTER TABLE route_recommendations ADD COLUMN IF NOT EXISTS scored_price DECIMAL(6, 3);
+
+-- Busca da rota gravada mais recente por chave
+CREATE INDEX IF NOT EXISTS idx_routes_route_key_created ON routes(route_key, created_at DESC);
+CREATE INDEX IF NOT EXISTS idx_route_recommendations_route_id ON route_recommendations(route_id);
+
+-- Comentários
+COMMENT ON COLUMN routes.route_key IS 'Células geohash de origem/destino (ordenadas) e combustível';
+COMMENT ON COLUMN route_recommendations.scored_price IS 'Preço do combustível usado no recommendation_score';
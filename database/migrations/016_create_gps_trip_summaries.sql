@@ -0,0 +1,66 @@
+-- =====================================================
+-- MIGRAÇÃO 016: RESUMO POR VIAGEM PARA AS LISTAGENS DE VIAGENS
+-- =====================================================
+
+-- /api/profile/trips e /api/gps/trip-history agrupavam todos os pontos GPS do
+-- usuário a cada página para paginar por cursor sobre o agregado. Agora cada
+-- ponto gravado atualiza uma linha por viagem nesta tabela, e as listagens
+-- paginam direto pelo índice (usuário, fim/início, viagem).
+-- user_stats.trips_total conta as linhas desta tabela.
+CREATE TABLE IF NOT EXISTS gps_trip_summaries (
+    user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    trip_id VARCHAR(36) NOT NULL,
+    start_time TIMESTAMP NOT NULL,
+    end_time TIMESTAMP NOT NULL,
+    points_count INTEGER NOT NULL DEFAULT 0,
+    total_distance_km DECIMAL(10, 3) NOT NULL DEFAULT 0,
+    PRIMARY KEY (user_id, trip_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_trip_summaries_user_end
+    ON gps_trip_summaries(user_id, end_time DESC, trip_id DESC);
+CREATE INDEX IF NOT EXISTS idx_trip_summaries_user_start
+    ON gps_trip_summaries(user_id, start_time DESC, trip_id DESC);
+
+-- Carga inicial a partir dos pontos já gravados. A coluna de data e a de
+-- distância variam entre as versões do schema (timestamp/recorded_at,
+-- distance_from_last), como na migração 013.
+DO $$
+DECLARE
+    time_column TEXT;
+    distance_expr TEXT := '0';
+BEGIN
+    SELECT column_name INTO time_column FROM information_schema.columns
+    WHERE table_name = 'gps_tracking' AND column_name IN ('timestamp', 'recorded_at')
+    ORDER BY column_name = 'timestamp' DESC
+    LIMIT 1;
+
+    IF EXISTS (
+        SELECT 1 FROM information_schema.columns
+        WHERE table_name = 'gps_tracking' AND column_name = 'distance_from_last'
+    ) THEN
+        distance_expr := 'COALESCE(SUM(distance_from_last), 0)';
+    END IF;
+
+    IF time_column IS NOT NULL THEN
+        EXECUTE format(
+            'INSERT INTO gps_trip_summaries (user_id, trip_id, start_time, end_time, points_count, total_distance_km)
+             SELECT user_id, trip_id::text, MIN(%1$I), MAX(%1$I), COUNT(*), %2$s
+             FROM gps_tracking
+             WHERE trip_id IS NOT NULL AND %1$I IS NOT NULL
+             GROUP BY user_id, trip_id
+             ON CONFLICT (user_id, trip_id) DO NOTHING',
+            time_column, distance_expr
+        );
+    END IF;
+END;
+$$;
+
+-- Contador de viagens passa a refletir o resumo
+UPDATE user_stats SET trips_total = (
+    SELECT COUNT(*) FROM gps_trip_summaries s WHERE s.user_id = user_stats.user_id
+);
+
+-- Comentários
+COMMENT ON TABLE gps_trip_summaries IS 'Uma linha por viagem, atualizada a cada ponto GPS';
+COMMENT ON COLUMN gps_trip_summaries.points_count IS 'Pontos GPS registrados na viagem';
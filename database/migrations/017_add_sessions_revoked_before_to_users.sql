@@ -0,0 +1,19 @@
+-- =====================================================
+-- MIGRAÇÃO 017: MARCA DURÁVEL DE REVOGAÇÃO DE SESSÕES
+-- =====================================================
+
+-- As sessões de login são gravadas em lote por cada worker
+-- (services/session_writer.py). Uma revogação feita em outro processo não vê
+-- as sessões ainda na fila, então deixa uma marca que o lote confere na hora
+-- do INSERT: /logout-all e a troca de senha gravam o instante em
+-- users.sessions_revoked_before, e sessões criadas até ele são gravadas já
+-- inativas.
+ALTER TABLE users ADD COLUMN IF NOT EXISTS sessions_revoked_before TIMESTAMP WITH TIME ZONE;
+
+-- /logout de uma sessão ainda na fila grava uma linha inativa com o hash do
+-- token; o lote consulta essas linhas pelo hash
+CREATE INDEX IF NOT EXISTS idx_user_sessions_revoked_token
+    ON user_sessions(token_hash) WHERE is_active = FALSE;
+
+-- Comentários
+COMMENT ON COLUMN users.sessions_revoked_before IS 'Sessões criadas até este instante são revogadas (logout-all)';
@@ -0,0 +1,32 @@
+-- =====================================================
+-- MIGRAÇÃO 018: UM PREÇO ATIVO POR POSTO/COMBUSTÍVEL/DIA
+-- =====================================================
+
+-- A ingestão em lote (services/price_ingestion.py) e o importador da ANP
+-- gravam um preço por posto, combustível e dia (UTC); um novo valor no mesmo
+-- dia vira UPDATE. Sem restrição no banco, duas ingestões simultâneas
+-- gravavam o mesmo dia duas vezes. O índice único fecha essa janela: a
+-- ingestão que perde relê o lote e atualiza a linha da outra. Só os preços
+-- ativos entram no índice: a atualização dos parceiros desativa o preço
+-- anterior e grava um novo, mesmo que no mesmo dia.
+
+-- Duplicatas existentes: mantém ativo só o preço mais recente de cada dia
+UPDATE fuel_prices SET is_active = FALSE, updated_at = NOW()
+WHERE id IN (
+    SELECT id FROM (
+        SELECT id, ROW_NUMBER() OVER (
+            PARTITION BY gas_station_id, fuel_type, (reported_at AT TIME ZONE 'UTC')::date
+            ORDER BY reported_at DESC, updated_at DESC NULLS LAST, id
+        ) AS position
+        FROM fuel_prices
+        WHERE is_active
+    ) ranked
+    WHERE position > 1
+);
+
+CREATE UNIQUE INDEX IF NOT EXISTS uq_fuel_prices_station_fuel_day
+    ON fuel_prices(gas_station_id, fuel_type, ((reported_at AT TIME ZONE 'UTC')::date))
+    WHERE is_active;
+
+-- Comentários
+COMMENT ON INDEX uq_fuel_prices_station_fuel_day IS 'Um preço ativo por posto, combustível e dia (UTC)';